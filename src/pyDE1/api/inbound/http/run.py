@@ -12,11 +12,26 @@ SPDX-License-Identifier: GPL-3.0-only
 
 import multiprocessing
 import multiprocessing.connection as mpc
+from typing import Iterable
+from urllib.parse import parse_qsl
 
 import pyDE1.config
 from pyDE1.exceptions import *
 
 
+def request_parameters(path_parameters: dict, query: str,
+                       allowed: Iterable[str]) -> dict:
+    """
+    Those from the path, then the allowed ones from the query,
+    which can't replace any from the path
+    """
+    parameter_dict = dict(path_parameters)
+    for (key, val) in parse_qsl(query):
+        if key in allowed and key not in parameter_dict:
+            parameter_dict[key] = val
+    return parameter_dict
+
+
 # Right now, this is all "sync" processing. As it is a benefit to only have
 # one request pending at a time, this shouldn't be a big problem.
 # Going to async for the "second half" of waiting for the response
@@ -25,7 +40,8 @@ from pyDE1.exceptions import *
 
 def run_api_inbound(master_config: pyDE1.config.Config,
                     log_queue: multiprocessing.Queue,
-                    api_pipe: mpc.Connection):
+                    api_pipe: mpc.Connection,
+                    metrics_pipe: mpc.Connection):
 
     # Not clear why this one needs to be different
     import pyDE1.config
@@ -33,25 +49,36 @@ def run_api_inbound(master_config: pyDE1.config.Config,
     from pyDE1.config import config
 
     import asyncio
+    import glob
+    import hashlib
     import http.server
     import json
+    import logging
     import os
     import re
+    import tempfile
     import time
 
     from email.utils import formatdate  # RFC2822 dates
     from http import HTTPStatus
     from traceback import TracebackException
     from typing import Optional, Union, NamedTuple, Dict, Pattern
+    from urllib.parse import urlsplit
 
     import pyDE1
+    import pyDE1.log_archive as log_archive
+    import pyDE1.process_metrics as process_metrics
     import pyDE1.pyde1_logging as pyde1_logging
+    import pyDE1.runtime_profile as runtime_profile
     import pyDE1.shutdown_manager as sm
     import pyDE1.status_reporter as status_reporter
 
-    from pyDE1.dispatcher.mapping import MAPPING, mapping_requires
+    from pyDE1.dispatcher.batch import batch_requests
+    from pyDE1.dispatcher.plan import plan_for
     from pyDE1.dispatcher.resource import Resource
-    from pyDE1.dispatcher.payloads import APIRequest, APIResponse, HTTPMethod
+    from pyDE1.dispatcher.payloads import (
+        APIRequest, APIResponse, HTTPMethod, UploadedFile
+    )
     from pyDE1.dispatcher.validate import validate_patch_return_targets
     # These two needed as they have specific fields that need to be unpickled
     # from pyDE1.exceptions import *  # Only allowed at module level
@@ -66,8 +93,8 @@ def run_api_inbound(master_config: pyDE1.config.Config,
     pyde1_logging.setup_queue_logging(config.logging, log_queue)
     pyde1_logging.config_logger_levels(config.logging)
 
-    loop = asyncio.get_event_loop()
-    loop.set_debug(True)
+    runtime_profile.mark_imported()
+    loop = runtime_profile.new_event_loop()
 
     async def cleanup_on_shutdown():
         logger.info("Watching for shutdown event")
@@ -115,6 +142,9 @@ def run_api_inbound(master_config: pyDE1.config.Config,
         atime: float
         mtime: float
         ctime: float
+        # From the time index, if there is one
+        first: Optional[float]
+        last: Optional[float]
 
     def file_detail_list(dirname: str):
         if not os.path.isdir(dirname):
@@ -125,20 +155,102 @@ def run_api_inbound(master_config: pyDE1.config.Config,
         with os.scandir(dirname) as dir_entries:
             for dir_entry in dir_entries:
                 dir_entry: os.DirEntry
-                if not dir_entry.is_file():
+                if (not dir_entry.is_file()
+                        or dir_entry.name.endswith(log_archive.INDEX_SUFFIX)):
                     continue
                 dir_entry_stat = dir_entry.stat()
+                (first, last) = log_archive.index_time_range(dir_entry.path)
                 details = FileDetails(
                     id=dir_entry.name,
                     name=dir_entry.name,
                     size=dir_entry_stat.st_size,
                     atime=dir_entry_stat.st_atime,
                     mtime=dir_entry_stat.st_mtime,
-                    ctime=dir_entry_stat.st_ctime
+                    ctime=dir_entry_stat.st_ctime,
+                    first=first,
+                    last=last,
                 )
                 retval.append(details._asdict())
         return retval
 
+    # PUT of these is streamed to a file, see stream_content()
+    STREAMED_UPLOADS = (
+        Resource.DE1_FIRMWARE,
+        Resource.DE1_PROFILES,
+    )
+    UPLOAD_PREFIX = 'upload-'
+    UPLOAD_CHUNK = 64 * 1024
+
+    def content_limit(resource: Optional[Resource]) -> int:
+        if resource == Resource.DE1_FIRMWARE:
+            return 1 * 1024 * 1024  # FW1258 < 500 kB
+        elif resource == Resource.DE1_PROFILES:
+            return config.http.PROFILE_IMPORT_SIZE_LIMIT
+        else:
+            return config.http.PATCH_SIZE_LIMIT
+
+    def remove_stale_uploads():
+        # Left by an earlier process, the controller removes its own
+        try:
+            os.makedirs(config.http.UPLOAD_DIRECTORY, exist_ok=True)
+            for path in glob.glob(os.path.join(config.http.UPLOAD_DIRECTORY,
+                                               f"{UPLOAD_PREFIX}*")):
+                logger.warning(f"Removing stale upload {path}")
+                os.unlink(path)
+        except OSError as e:
+            logger.error(
+                f"Unable to use {config.http.UPLOAD_DIRECTORY}: {repr(e)}")
+
+    def http_status_for(exception: Exception) -> HTTPStatus:
+
+        if isinstance(exception,
+                      (DE1DBNoMatchingRecord,
+                       FileNotFoundError)):
+            http_status = HTTPStatus.NOT_FOUND
+
+        elif isinstance(exception,
+                      (DE1APIUnsupportedStateTransitionError,
+                       DE1NotConnectedError,
+                       DE1IsConnectedError,
+                       DE1NoAddressError,
+                       DE1OperationInProgressError,)):
+            http_status = HTTPStatus.CONFLICT
+
+        elif isinstance(exception,
+                        DE1APIUnsupportedFeatureError):
+            http_status = HTTPStatus.IM_A_TEAPOT
+
+        elif isinstance(exception, DE1APIError):
+            http_status = HTTPStatus.BAD_REQUEST
+            logger.debug(f"400 BAD_REQUEST: {exception}")
+
+        elif isinstance(exception,
+                        (TimeoutError,
+                         asyncio.exceptions.TimeoutError)):
+            http_status = HTTPStatus.REQUEST_TIMEOUT
+
+        else:
+            http_status = HTTPStatus.INTERNAL_SERVER_ERROR
+
+        return http_status
+
+    def batch_result(operation, resp: APIResponse) -> dict:
+        """
+        The status, and body or error, of one operation of a batch
+        """
+        result = {}
+        if isinstance(operation, dict):
+            for key in ('method', 'resource'):
+                if key in operation:
+                    result[key] = operation[key]
+        if resp.exception is None:
+            result['status'] = HTTPStatus.OK.value
+            result['body'] = resp.payload
+        else:
+            result['status'] = http_status_for(resp.exception).value
+            result['error'] = repr(resp.exception)
+        return result
+
     # TODO: This should somehow be "automated" and driven off Resource
 
     resources_with_params: Dict[Resource, Pattern] = {
@@ -147,10 +259,11 @@ def run_api_inbound(master_config: pyDE1.config.Config,
 
     class RequestHandler (http.server.BaseHTTPRequestHandler):
 
+        _logger = pyDE1.getLogger('Inbound.HTTP')
+
         def __init__(self, *args, **kwargs):
-            # Calling super().__init__() starts processing, set up logger first
+            # Calling super().__init__() starts processing
             self._start = time.time()
-            self._logger = pyDE1.getLogger('Inbound.HTTP')
             super(RequestHandler, self).__init__(*args, **kwargs)
 
         def _format_log_message(self, fmt, *args) -> str:
@@ -161,7 +274,8 @@ def run_api_inbound(master_config: pyDE1.config.Config,
                                    self.address_string())
 
         def log_message(self, fmt, *args):
-            self._logger.info(self._format_log_message(fmt, *args))
+            if self._logger.isEnabledFor(logging.INFO):
+                self._logger.info(self._format_log_message(fmt, *args))
 
         def log_error(self, fmt, *args):
             self._logger.error(self._format_log_message(fmt, *args))
@@ -193,7 +307,8 @@ def run_api_inbound(master_config: pyDE1.config.Config,
             parameter_dict = {}
             code = None
             resp_str = ''
-            root_relative = self.path.removeprefix(config.http.SERVER_ROOT)
+            url = urlsplit(self.path)
+            root_relative = url.path.removeprefix(config.http.SERVER_ROOT)
             try:
                 # resource = Resource(self.path.removeprefix(SERVER_ROOT))
                 resource = Resource(root_relative)
@@ -224,6 +339,9 @@ def run_api_inbound(master_config: pyDE1.config.Config,
             if code is not None:
                 self.send_error_response(code, resp_str)
 
+            if resource is not None:
+                parameter_dict = request_parameters(
+                    parameter_dict, url.query, resource.query_parameters)
             return resource, parameter_dict
 
         # NB: This does not support Transfer-encoding: chunked
@@ -242,16 +360,13 @@ def run_api_inbound(master_config: pyDE1.config.Config,
                 content_length = int(content_length)
 
 
-            this_content_limit = config.http.PATCH_SIZE_LIMIT
             try:
                 resource = Resource(self.path.removeprefix(
                                                 config.http.SERVER_ROOT))
-                if resource == Resource.DE1_FIRMWARE:
-                    this_content_limit = 1 * 1024 * 1024  # FW1258 < 500 kB
             except ValueError:
-                pass
+                resource = None
 
-            if content_length > this_content_limit:
+            if content_length > content_limit(resource):
                 self.send_error_response(
                     HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
                     "Patch is too large")
@@ -264,7 +379,66 @@ def run_api_inbound(master_config: pyDE1.config.Config,
 
             return content
 
+        def stream_content(self, resource: Resource) \
+                -> Optional[UploadedFile]:
+            """
+            The content, written to a file in config.http.UPLOAD_DIRECTORY
+            as it is read, rather than held in memory
+
+            None if there's an error, which has been sent
+            """
+            content_length = self.headers.get('content-length')
+            if content_length is None:
+                self.send_error_response(
+                    HTTPStatus.LENGTH_REQUIRED,
+                    "Missing Content-Length header")
+                return None
+            content_length = int(content_length)
+            if content_length > content_limit(resource):
+                self.send_error_response(
+                    HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                    "Upload is too large")
+                return None
+
+            sha256 = hashlib.sha256()
+            remaining = content_length
+            try:
+                (fd, path) = tempfile.mkstemp(
+                    prefix=UPLOAD_PREFIX, dir=config.http.UPLOAD_DIRECTORY)
+            except OSError as e:
+                logger.error(f"Unable to stream upload: {repr(e)}")
+                self.send_error_response(
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    f"Unable to stream upload: {repr(e)}")
+                return None
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    while remaining > 0:
+                        chunk = self.rfile.read(min(UPLOAD_CHUNK, remaining))
+                        if not chunk:
+                            break
+                        sha256.update(chunk)
+                        fh.write(chunk)
+                        remaining -= len(chunk)
+            except Exception:
+                os.unlink(path)
+                raise
+
+            if remaining > 0:
+                os.unlink(path)
+                self.send_error_response(
+                    HTTPStatus.BAD_REQUEST,
+                    f"Upload ended after {content_length - remaining} "
+                    f"of {content_length} bytes")
+                return None
+
+            return UploadedFile(path=path, size=content_length,
+                                sha256=sha256.hexdigest())
+
         def queue_and_respond(self, req: APIRequest):
+            self.process_response(self.send_and_wait(req))
+
+        def send_and_wait(self, req: APIRequest) -> APIResponse:
 
             api_pipe.send(req)
 
@@ -286,7 +460,32 @@ def run_api_inbound(master_config: pyDE1.config.Config,
                     tbe=TracebackException.from_exception(e)
                 )
 
-            self.process_response(resp)
+            return resp
+
+        def send_metrics(self, timestamp: float):
+            """
+            From the MetricsCollector in the main process
+            """
+            # From an earlier request that timed out
+            while metrics_pipe.poll():
+                metrics_pipe.recv()
+            metrics_pipe.send(timestamp)
+            payload = None
+            exc = None
+            tbe = None
+            if metrics_pipe.poll(timeout=config.http.RESPONSE_TIMEOUT):
+                payload = metrics_pipe.recv()
+            else:
+                exc = TimeoutError(
+                    "Timeout waiting for metrics from main process, "
+                    f"over {config.http.RESPONSE_TIMEOUT} sec")
+                tbe = TracebackException.from_exception(exc)
+            self.process_response(APIResponse(
+                original_timestamp=timestamp,
+                timestamp=time.time(),
+                payload=payload,
+                exception=exc,
+                tbe=tbe))
 
         # Split as some requests are handled in this process directly
         def process_response(self, resp: APIResponse,
@@ -315,35 +514,7 @@ def run_api_inbound(master_config: pyDE1.config.Config,
             else:
 
                 body = ''.join(resp.tbe.format())
-
-                if isinstance(resp.exception,
-                              (DE1DBNoMatchingRecord,)):
-                    http_status = HTTPStatus.NOT_FOUND
-
-                elif isinstance(resp.exception,
-                              (DE1APIUnsupportedStateTransitionError,
-                               DE1NotConnectedError,
-                               DE1IsConnectedError,
-                               DE1NoAddressError,
-                               DE1OperationInProgressError,)):
-                    http_status = HTTPStatus.CONFLICT
-
-                elif isinstance(resp.exception,
-                                DE1APIUnsupportedFeatureError):
-                    http_status = HTTPStatus.IM_A_TEAPOT
-
-                elif isinstance(resp.exception, DE1APIError):
-                    http_status = HTTPStatus.BAD_REQUEST
-                    logger.debug(f"400 BAD_REQUEST: {resp.exception}")
-
-                elif isinstance(resp.exception,
-                                (TimeoutError,
-                                 asyncio.exceptions.TimeoutError)):
-                    http_status = HTTPStatus.REQUEST_TIMEOUT
-
-                else:
-                    http_status = HTTPStatus.INTERNAL_SERVER_ERROR
-
+                http_status = http_status_for(resp.exception)
                 self.send_error_response(code=http_status,
                                          resp_str=body,
                                          timestamp=resp.timestamp)
@@ -354,6 +525,109 @@ def run_api_inbound(master_config: pyDE1.config.Config,
             )
             return
 
+        def send_log_lines(self, timestamp: float, filename: str,
+                           parameter_dict: dict):
+            """
+            Uncompressed lines, the last `tail`, those from `start` to `end`,
+            or those of `sequence_id`, to within config.logging.INDEX_SECONDS
+            """
+            payload = None
+            exc = None
+            tbe = None
+            try:
+                try:
+                    if 'tail' in parameter_dict:
+                        payload = log_archive.read_tail(
+                            filename, int(parameter_dict['tail']))
+                    else:
+                        if 'sequence_id' in parameter_dict:
+                            (start, end) = log_archive.sequence_window(
+                                config.database.FILENAME,
+                                parameter_dict['sequence_id'])
+                        else:
+                            start = parameter_dict.get('start')
+                            end = parameter_dict.get('end')
+                            start = None if start is None else float(start)
+                            end = None if end is None else float(end)
+                        payload = log_archive.read_window(filename,
+                                                          start, end)
+                except ValueError as e:
+                    raise DE1APIValueError(
+                        f"Unable to use {parameter_dict}: {e}")
+            except Exception as e:
+                exc = e
+                tbe = TracebackException.from_exception(e)
+
+            resp = APIResponse(
+                original_timestamp=timestamp,
+                timestamp=time.time(),
+                payload=payload,
+                exception=exc,
+                tbe=tbe)
+
+            self.process_response(resp, 'text/plain')
+
+        def send_file(self, timestamp: float, filename: str, mime_type: str):
+            """
+            As is, with sendfile(), all of it or a single Range of bytes
+            """
+            try:
+                log_file = open(filename, 'rb')
+            except Exception as e:
+                self.process_response(APIResponse(
+                    original_timestamp=timestamp,
+                    timestamp=time.time(),
+                    payload=None,
+                    exception=e,
+                    tbe=TracebackException.from_exception(e)))
+                return
+
+            with log_file:
+                size = os.fstat(log_file.fileno()).st_size
+                offset = 0
+                count = size
+                status = HTTPStatus.OK
+                byte_range = self.headers.get('range')
+                if byte_range is not None:
+                    found = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*',
+                                         byte_range)
+                    if found is None or found.groups() == ('', ''):
+                        # Multiple ranges aren't supported, send it all
+                        found = None
+                    elif found.group(1) == '':
+                        # Suffix, the last n bytes
+                        offset = max(0, size - int(found.group(2)))
+                    else:
+                        offset = int(found.group(1))
+                        if found.group(2) != '':
+                            count = min(size, int(found.group(2)) + 1)
+                    if found is not None:
+                        count -= offset
+                        if offset >= size or count <= 0:
+                            self.send_response(
+                                HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                            self.send_header("Content-Range",
+                                             f"bytes */{size}")
+                            self.send_header("Content-length", "0")
+                            self.end_headers()
+                            return
+                        status = HTTPStatus.PARTIAL_CONTENT
+
+                self.send_response(status)
+                self.send_header("Content-type", mime_type)
+                self.send_header("Content-length", str(count))
+                self.send_header("Accept-Ranges", "bytes")
+                if status == HTTPStatus.PARTIAL_CONTENT:
+                    self.send_header(
+                        "Content-Range",
+                        f"bytes {offset}-{offset + count - 1}/{size}")
+                self.send_header("Last-Modified", formatdate(
+                    os.fstat(log_file.fileno()).st_mtime, localtime=True))
+                self.send_header(X_TIMESTAMP_HEADER, str(timestamp))
+                self.end_headers()
+                self.wfile.flush()
+                self.connection.sendfile(log_file, offset, count)
+
         def do_GET(self):
 
             timestamp = time.time()
@@ -380,29 +654,28 @@ def run_api_inbound(master_config: pyDE1.config.Config,
 
                 self.process_response(resp)
 
-            elif resource == Resource.LOG:
+            elif resource == Resource.METRICS:
+                self.send_metrics(timestamp)
 
-                payload = None
-                exc = None
-                tbe = None
+            elif resource == Resource.LOG:
 
                 # TODO: Another ugly combination of id with filename
-                filename = os.path.join(config.logging.LOG_DIRECTORY,
-                                        parameter_dict['id'])
-
                 try:
-                    with open(filename, 'rb') as log_file:
-                        payload = log_file.read()
-                except Exception as e:
-                    exc = e
-                    tbe = TracebackException.from_exception(e)
-
-                resp = APIResponse(
-                    original_timestamp=timestamp,
-                    timestamp=time.time(),
-                    payload=payload,
-                    exception=exc,
-                    tbe=tbe)
+                    filename = log_archive.log_path(
+                        config.logging.LOG_DIRECTORY, parameter_dict['id'])
+                except FileNotFoundError as e:
+                    self.process_response(APIResponse(
+                        original_timestamp=timestamp,
+                        timestamp=time.time(),
+                        payload=None,
+                        exception=e,
+                        tbe=TracebackException.from_exception(e)))
+                    return
+
+                if any(k in parameter_dict
+                       for k in ('tail', 'start', 'end', 'sequence_id')):
+                    self.send_log_lines(timestamp, filename, parameter_dict)
+                    return
 
                 mime_type = MIME_TYPE_DEFAULT
                 for suffix, mime_for_suffix in MIME_TYPE_MAP.items():
@@ -410,18 +683,23 @@ def run_api_inbound(master_config: pyDE1.config.Config,
                         mime_type = mime_for_suffix
                         break
 
-                self.process_response(resp, mime_type)
+                self.send_file(timestamp, filename, mime_type)
 
             else:
 
                 # Not actionable here as connectivity is unknown
-                requires = mapping_requires(MAPPING[resource])
+                requires = dict(plan_for(resource).requires)
+
+                if resource == Resource.DE1_PROFILES:
+                    payload = parameter_dict
+                else:
+                    payload = None
 
                 req = APIRequest(timestamp=timestamp,
                                  method=HTTPMethod.GET,
                                  resource=resource,
                                  connectivity_required=requires,
-                                 payload=None)
+                                 payload=payload)
 
                 self.queue_and_respond(req)
 
@@ -474,6 +752,7 @@ def run_api_inbound(master_config: pyDE1.config.Config,
             if resource not in (Resource.DE1_PROFILE,
                                 Resource.DE1_PROFILE_ID,
                                 Resource.DE1_PROFILE_STORE,
+                                Resource.DE1_PROFILES,
                                 Resource.DE1_FIRMWARE,
                                 Resource.DE1_FIRMWARE_CANCEL,
                                 Resource.SCAN,):
@@ -483,18 +762,25 @@ def run_api_inbound(master_config: pyDE1.config.Config,
                 )
                 return
 
-            content = self.get_content()
-            if content is None:
-                logger.debug(f"400 BAD_REQUEST: No content")
-                self.send_error_response(
-                    HTTPStatus.BAD_REQUEST,
-                    "No content provided for PUT request"
-                )
-                return
+            if resource in STREAMED_UPLOADS:
+                content = self.stream_content(resource)
+                if content is None:
+                    # The error has been sent
+                    return
+            else:
+                content = self.get_content()
+                if content is None:
+                    logger.debug(f"400 BAD_REQUEST: No content")
+                    self.send_error_response(
+                        HTTPStatus.BAD_REQUEST,
+                        "No content provided for PUT request"
+                    )
+                    return
 
             try:
                 if resource in (Resource.DE1_PROFILE,
                                 Resource.DE1_PROFILE_STORE,
+                                Resource.DE1_PROFILES,
                                 Resource.DE1_FIRMWARE,
                                 Resource.DE1_FIRMWARE_CANCEL,
                                 ):
@@ -507,6 +793,8 @@ def run_api_inbound(master_config: pyDE1.config.Config,
                                                         patch=patch)
 
             except (json.JSONDecodeError, DE1APIError) as exception:
+                if isinstance(content, UploadedFile):
+                    content.remove()
                 logger.debug(f"400 BAD_REQUEST: {exception}")
                 self.send_error_response(
                     HTTPStatus.BAD_REQUEST,
@@ -522,6 +810,57 @@ def run_api_inbound(master_config: pyDE1.config.Config,
             self.queue_and_respond(req)
             return
 
+        def do_POST(self):
+
+            timestamp = time.time()
+            (resource, parameter_dict) = self.get_resource()
+            # Only a batch, anything else has been refused
+            if resource is not Resource.BATCH:
+                return
+
+            content = self.get_content()
+            if content is None:
+                logger.debug(f"400 BAD_REQUEST: No content")
+                self.send_error_response(
+                    HTTPStatus.BAD_REQUEST,
+                    "No content provided for POST request"
+                )
+                return
+
+            try:
+                operations = json.loads(content)
+                items = batch_requests(timestamp=timestamp,
+                                       operations=operations,
+                                       limit=config.http.BATCH_SIZE_LIMIT)
+
+            except (json.JSONDecodeError, DE1APIError) as exception:
+                logger.debug(f"400 BAD_REQUEST: {exception}")
+                self.send_error_response(
+                    HTTPStatus.BAD_REQUEST,
+                    repr(exception))
+                return
+
+            # Each item is checked by the controller as it is run
+            req = APIRequest(timestamp=timestamp,
+                             method=HTTPMethod.POST,
+                             resource=resource,
+                             connectivity_required={
+                                 'DE1': False,
+                                 'Scale': False,
+                             },
+                             payload=items)
+
+            resp = self.send_and_wait(req)
+            if resp.exception is None:
+                resp = APIResponse(
+                    original_timestamp=resp.original_timestamp,
+                    timestamp=resp.timestamp,
+                    payload=[batch_result(operation, item_resp)
+                             for (operation, item_resp)
+                             in zip(operations, resp.payload)])
+            self.process_response(resp)
+            return
+
     # try:
     server = http.server.HTTPServer((config.http.SERVER_HOST,
                                      config.http.SERVER_PORT),
@@ -539,8 +878,15 @@ def run_api_inbound(master_config: pyDE1.config.Config,
             from_str = ''
         logger.warning(f"Flushing stale response{from_str}: {got}")
 
+    remove_stale_uploads()
+
     SupervisedExecutor(None, server.serve_forever)
 
     status_reporter.attach('status/http', loop, logger)
+    monitor = runtime_profile.start_loop_monitor(loop, log=logger)
+    runtime_profile.report_startup(loop, log=logger)
+    process_metrics.start_process_metrics(loop, queues={
+        'api_pipe': api_pipe,
+    }, monitor=monitor)
 
     loop.run_forever()
@@ -55,7 +55,9 @@ def run_mqtt_outbound(master_config: pyDE1.config.Config,
     import paho.mqtt.client as mqtt
     from paho.mqtt.client import MQTTv5, MQTT_CLEAN_START_FIRST_ONLY
 
+    import pyDE1.process_metrics as process_metrics
     import pyDE1.pyde1_logging as pyde1_logging
+    import pyDE1.runtime_profile as runtime_profile
     import pyDE1.shutdown_manager as sm
 
     from pyDE1.supervise import SupervisedTask
@@ -82,8 +84,8 @@ def run_mqtt_outbound(master_config: pyDE1.config.Config,
 
     # MQTT_PROTOCOL_VERSION = asyncio_mqtt.client.ProtocolVersion.V5
 
-    loop = asyncio.get_event_loop()
-    loop.set_debug(True)
+    runtime_profile.mark_imported()
+    loop = runtime_profile.new_event_loop()
 
     async def cleanup_on_shutdown():
         logger.info("Watching for shutdown event")
@@ -301,7 +303,7 @@ def run_mqtt_outbound(master_config: pyDE1.config.Config,
             nonlocal last_update, update_period, counts
             nonlocal outbound_pipe, mqtt_client
 
-            record: logging.LogRecord = outbound_pipe.recv()
+            record = pyde1_logging.as_log_record(outbound_pipe.recv())
             formatted = mqtt_formatter.format(record)
 
             mqtt_client.publish(
@@ -330,4 +332,21 @@ def run_mqtt_outbound(master_config: pyDE1.config.Config,
 
     loop.add_reader(outbound_pipe.fileno(), reader)
 
+    def send_to_status(subtopic: str):
+        def send(payload: str) -> bool:
+            if not mqtt_client.is_connected():
+                return False
+            mqtt_client.publish(topic=f"{will_topic}/{subtopic}",
+                                payload=payload, qos=0, retain=False)
+            return True
+        return send
+
+    monitor = runtime_profile.start_loop_monitor(
+        loop, log=logger, send=send_to_status('loop'))
+    runtime_profile.report_startup(loop, log=logger,
+                                   send=send_to_status('startup'))
+    process_metrics.start_process_metrics(loop, queues={
+        'outbound_pipe': outbound_pipe,
+    }, monitor=monitor, send=send_to_status('metrics'))
+
     loop.run_forever()
@@ -0,0 +1,63 @@
+"""
+Copyright © 2021-2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+The capture/release requests of a ManagedBleakClient, apart from bleak,
+so that the Inbound API can use them without importing it
+"""
+
+import enum
+from typing import NamedTuple, Optional
+
+
+class CaptureRequest (enum.Enum):
+    CAPTURE = 'C'
+    RELEASE = 'R'
+    CANCEL  = 'X'
+
+
+class CaptureQueue (NamedTuple):
+    connected:  Optional[CaptureRequest]
+    pending:    Optional[CaptureRequest]
+    target:     Optional[CaptureRequest]
+
+    def __str__(self):
+        try:
+            retval =  '{}({}, {}, {})'.format(
+                self.__class__.__name__,
+                self.connected.name if self.connected else None,
+                self.pending.name if self.pending else None,
+                self.target.name if self.target else None,
+            )
+        except AttributeError:
+            retval = repr(self)
+
+        return retval
+
+
+def cq_from_code(code: str) -> CaptureQueue:
+    tt = {
+        'C': CaptureRequest.CAPTURE,
+        'R': CaptureRequest.RELEASE,
+        'X': CaptureRequest.CANCEL,
+        'N': None,
+    }
+    return CaptureQueue(
+        connected=tt[code[0].upper()],
+        pending=tt[code[1].upper()],
+        target=tt[code[2].upper()],
+    )
+
+
+def cq_to_code(cq: CaptureQueue) -> str:
+    retval = ''
+    for attr in ('connected', 'pending', 'target'):
+        try:
+            c = getattr(cq, attr).value
+        except AttributeError:
+            c = 'N'
+        retval += c
+    return retval
@@ -0,0 +1,220 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Connection attempts of all the ManagedBleakClient instances go through
+the one ConnectionScheduler, rather than each retrying on its own.
+
+Operations on the adapter are one at a time, so that a scale and the DE1
+don't both call Connect() and get org.bluez.Error.InProgress.
+When more than one is waiting, the DE1 goes first.
+
+The hold-off between attempts comes from each device's history.
+Without history, retries are immediate for RECONNECT_FAST_WINDOW,
+then back off from RECONNECT_BACKOFF_INITIAL, doubling,
+to RECONNECT_BACKOFF_MAX. Once a device has reconnected, the window
+of immediate retries follows how long that has typically taken,
+but not less than RECONNECT_FAST_WINDOW_MIN.
+
+ManagedBleakDevice reports the history after each attempt
+as a ReconnectStatus.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+from typing import Dict, Optional
+
+from pyDE1.config import config
+from pyDE1.event_manager.events import DeviceRole
+
+# Weight of the latest reconnect in the typical time to reconnect
+_LATENCY_ALPHA = 0.3
+
+# With the typical time to reconnect, immediate retries for this multiple
+_FAST_WINDOW_FACTOR = 3
+
+
+class ConnectionHistory:
+    """
+    Attempts to connect to one address, whichever client makes them
+    """
+
+    def __init__(self, address: str, role: Optional[DeviceRole]):
+        self.address = address
+        self.role = role
+        self.attempts = 0
+        self.failures = 0
+        self.successes = 0
+        self.consecutive_failures = 0
+        # Outage is from the first attempt until connected or abandoned
+        self.outage_since: Optional[float] = None
+        self.outage_attempts = 0
+        self.last_reconnect_latency: Optional[float] = None
+        self.last_reconnect_attempts: Optional[int] = None
+        self.typical_latency: Optional[float] = None
+        self.last_adapter_wait: Optional[float] = None
+        self.next_delay: float = 0
+        self._backoff_step = 0
+
+    def outage_start(self):
+        if self.outage_since is None:
+            self.outage_since = time.time()
+            self.outage_attempts = 0
+            self._backoff_step = 0
+
+    def outage_reset(self):
+        self.outage_since = None
+        self.outage_attempts = 0
+        self._backoff_step = 0
+        self.next_delay = 0
+
+    @property
+    def fast_window(self) -> float:
+        if self.typical_latency is None:
+            return config.bluetooth.RECONNECT_FAST_WINDOW
+        return min(config.bluetooth.RECONNECT_FAST_WINDOW,
+                   max(config.bluetooth.RECONNECT_FAST_WINDOW_MIN,
+                       _FAST_WINDOW_FACTOR * self.typical_latency))
+
+    def schedule_next(self) -> float:
+        """
+        Seconds to wait before the next attempt
+        """
+        if (self.outage_since is None
+                or time.time() - self.outage_since < self.fast_window):
+            delay = 0
+        else:
+            delay = min(config.bluetooth.RECONNECT_BACKOFF_MAX,
+                        config.bluetooth.RECONNECT_BACKOFF_INITIAL
+                        * 2 ** self._backoff_step)
+            self._backoff_step += 1
+        self.next_delay = delay
+        return delay
+
+    def attempt_started(self, adapter_wait: float):
+        self.attempts += 1
+        self.outage_attempts += 1
+        self.last_adapter_wait = adapter_wait
+
+    def attempt_ended(self, connected: bool):
+        if not connected:
+            self.failures += 1
+            self.consecutive_failures += 1
+            return
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self.outage_since is not None:
+            latency = time.time() - self.outage_since
+            self.last_reconnect_latency = latency
+            self.last_reconnect_attempts = self.outage_attempts
+            if self.typical_latency is None:
+                self.typical_latency = latency
+            else:
+                self.typical_latency += \
+                    _LATENCY_ALPHA * (latency - self.typical_latency)
+        self.outage_reset()
+
+    def as_dict(self) -> dict:
+        if self.outage_since is not None:
+            outage_time = round(time.time() - self.outage_since, 3)
+        else:
+            outage_time = None
+        return {
+            'attempts': self.attempts,
+            'failures': self.failures,
+            'successes': self.successes,
+            'consecutive_failures': self.consecutive_failures,
+            'outage_time': outage_time,
+            'outage_attempts': self.outage_attempts,
+            'last_reconnect_latency': _round_or_none(
+                self.last_reconnect_latency),
+            'last_reconnect_attempts': self.last_reconnect_attempts,
+            'typical_latency': _round_or_none(self.typical_latency),
+            'last_adapter_wait': _round_or_none(self.last_adapter_wait),
+            'next_delay': self.next_delay,
+        }
+
+
+def _round_or_none(val: Optional[float]) -> Optional[float]:
+    return round(val, 3) if val is not None else None
+
+
+class ConnectionScheduler:
+
+    def __init__(self):
+        self._histories: Dict[str, ConnectionHistory] = {}
+        self._adapter_busy = False
+        # Heap of (priority, sequence, future) of those waiting
+        self._waiters: list = []
+        self._sequence = itertools.count()
+
+    @staticmethod
+    def priority(role: Optional[DeviceRole]) -> int:
+        """
+        Lower goes first
+        """
+        return 0 if role == DeviceRole.DE1 else 1
+
+    def history_for(self, address: str,
+                    role: Optional[DeviceRole]) -> ConnectionHistory:
+        try:
+            history = self._histories[address]
+        except KeyError:
+            history = self._histories.setdefault(
+                address, ConnectionHistory(address, role))
+        if role is not None:
+            history.role = role
+        return history
+
+    def get_history(self, address: Optional[str]) \
+            -> Optional[ConnectionHistory]:
+        if not address:
+            return None
+        return self._histories.get(address)
+
+    @contextlib.asynccontextmanager
+    async def adapter_operation(self, role: Optional[DeviceRole]):
+        """
+        Hold the adapter for the duration of the context
+        """
+        await self._acquire(self.priority(role))
+        try:
+            yield
+        finally:
+            self._release()
+
+    @property
+    def adapter_waiting(self) -> int:
+        return sum(1 for w in self._waiters if not w[2].done())
+
+    async def _acquire(self, priority: int):
+        if not self._adapter_busy and not self._waiters:
+            self._adapter_busy = True
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Handed the adapter, but no longer wanting it
+                self._release()
+            raise
+
+    def _release(self):
+        # Hand off to the next waiting, leaving the adapter busy
+        while self._waiters:
+            fut = heapq.heappop(self._waiters)[2]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._adapter_busy = False
+
+
+connection_scheduler = ConnectionScheduler()
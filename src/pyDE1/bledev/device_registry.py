@@ -0,0 +1,224 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Bluetooth devices that have been seen in scans or connected,
+persisted in the ble_device table.
+
+A 'scan' request for a role first tries the device last connected
+for that role by address, see scanner.capture_known_or_first_matching().
+A full scan is only needed if that fails, or for the first connection.
+
+Seen devices are updated in memory on each matching advertisement
+and written once, at the end of a scan or after connecting.
+"""
+
+import asyncio
+import sqlite3
+import time
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import aiosqlite
+
+import pyDE1
+from pyDE1.config import config
+from pyDE1.event_manager.events import DeviceRole
+
+logger = pyDE1.getLogger('Bluetooth.Registry')
+
+
+class KnownDevice (NamedTuple):
+    address: str
+    name: Optional[str]
+    role: Optional[DeviceRole]
+    vendor_class: Optional[str]     # Such as AcaiaAcaia, for information
+    rssi: Optional[int]
+    last_seen: Optional[float]
+    last_connected: Optional[float]
+    connect_count: int = 0
+
+    def as_dict(self) -> dict:
+        retval = self._asdict()
+        retval['role'] = self.role.value if self.role else None
+        return retval
+
+
+class _RoleMetrics:
+    """
+    Time from a 'scan' request to connected, by how it was found
+    """
+
+    def __init__(self):
+        self.known_count = 0
+        self.known_time_total = 0.0
+        self.known_failed = 0
+        self.scan_count = 0
+        self.scan_time_total = 0.0
+        self.last: Optional[float] = None
+        self.last_via: Optional[str] = None
+
+    def record(self, seconds: float, via: str):
+        if via == 'known':
+            self.known_count += 1
+            self.known_time_total += seconds
+        else:
+            self.scan_count += 1
+            self.scan_time_total += seconds
+        self.last = seconds
+        self.last_via = via
+
+    def as_dict(self) -> dict:
+        return {
+            'known_count': self.known_count,
+            'known_mean': (round(self.known_time_total / self.known_count, 3)
+                           if self.known_count else None),
+            'known_failed': self.known_failed,
+            'scan_count': self.scan_count,
+            'scan_mean': (round(self.scan_time_total / self.scan_count, 3)
+                          if self.scan_count else None),
+            'last': round(self.last, 3) if self.last is not None else None,
+            'last_via': self.last_via,
+        }
+
+
+class DeviceRegistry:
+
+    def __init__(self):
+        self._devices: Dict[str, KnownDevice] = {}
+        self._dirty: Set[str] = set()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._metrics: Dict[DeviceRole, _RoleMetrics] = {}
+
+    def get(self, address: Optional[str]) -> Optional[KnownDevice]:
+        if not address:
+            return None
+        return self._devices.get(address)
+
+    async def known_for_role(self, role: DeviceRole) -> List[KnownDevice]:
+        """
+        Devices that have connected in this role, most recent first,
+        ignoring those not connected within REGISTRY_EXPIRY
+        """
+        await self.load()
+        oldest = time.time() - config.bluetooth.REGISTRY_EXPIRY
+        retval = [kd for kd in self._devices.values()
+                  if kd.role == role
+                  and kd.last_connected is not None
+                  and kd.last_connected > oldest]
+        retval.sort(key=lambda kd: kd.last_connected, reverse=True)
+        return retval
+
+    def seen(self, address: str, name: Optional[str], rssi: Optional[int],
+             role: Optional[DeviceRole]):
+        """
+        From the scanner's detection callback, so no I/O
+        """
+        kd = self._devices.get(address)
+        if kd is None:
+            kd = KnownDevice(address=address, name=name, role=role,
+                             vendor_class=None, rssi=rssi,
+                             last_seen=time.time(), last_connected=None)
+        else:
+            kd = kd._replace(name=name or kd.name,
+                             role=kd.role or role,
+                             rssi=rssi,
+                             last_seen=time.time())
+        self._devices[address] = kd
+        self._dirty.add(address)
+
+    def connected(self, address: str, name: Optional[str],
+                  role: DeviceRole, vendor_class: Optional[str]):
+        now = time.time()
+        kd = self._devices.get(address)
+        if kd is None:
+            kd = KnownDevice(address=address, name=name, role=role,
+                             vendor_class=vendor_class, rssi=None,
+                             last_seen=now, last_connected=now,
+                             connect_count=1)
+        else:
+            kd = kd._replace(name=name or kd.name,
+                             role=role,
+                             vendor_class=vendor_class,
+                             last_seen=now,
+                             last_connected=now,
+                             connect_count=kd.connect_count + 1)
+        self._devices[address] = kd
+        self._dirty.add(address)
+        asyncio.get_running_loop().create_task(self.flush(),
+                                               name='DeviceRegistryFlush')
+
+    async def load(self):
+        async with self._load_lock:
+            if self._loaded:
+                return
+            # Without the registry, a scan is still possible
+            self._loaded = True
+            try:
+                async with aiosqlite.connect(config.database.FILENAME) as db:
+                    sql = "SELECT address, name, role, vendor_class, rssi, " \
+                          "last_seen, last_connected, connect_count " \
+                          "FROM ble_device"
+                    async with db.execute(sql) as cur:
+                        rows = await cur.fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Unable to load known devices: {repr(e)}")
+                return
+            for row in rows:
+                kd = KnownDevice(*row)
+                if kd.role is not None:
+                    kd = kd._replace(role=DeviceRole(kd.role))
+                # Anything seen since startup is newer
+                if (mem := self._devices.get(kd.address)) is not None:
+                    kd = mem._replace(
+                        role=mem.role or kd.role,
+                        vendor_class=mem.vendor_class or kd.vendor_class,
+                        last_connected=mem.last_connected or kd.last_connected,
+                        connect_count=mem.connect_count + kd.connect_count)
+                self._devices[kd.address] = kd
+            logger.info(f"Loaded {len(rows)} known devices")
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty = [self._devices[addr].as_dict() for addr in self._dirty]
+        self._dirty = set()
+        try:
+            async with aiosqlite.connect(config.database.FILENAME) as db:
+                sql = "INSERT OR REPLACE INTO ble_device " \
+                      "(address, name, role, vendor_class, rssi, " \
+                      "last_seen, last_connected, connect_count) " \
+                      "VALUES (:address, :name, :role, :vendor_class, " \
+                      ":rssi, :last_seen, :last_connected, :connect_count)"
+                await db.executemany(sql, dirty)
+                await db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Unable to write known devices: {repr(e)}")
+            self._dirty.update([kd['address'] for kd in dirty])
+            return
+        logger.debug(f"Wrote {len(dirty)} devices")
+
+    def metrics_for_role(self, role: DeviceRole) -> _RoleMetrics:
+        try:
+            return self._metrics[role]
+        except KeyError:
+            return self._metrics.setdefault(role, _RoleMetrics())
+
+    # For the API
+
+    @property
+    def devices_for_json(self) -> List[dict]:
+        return [kd.as_dict() for kd in sorted(
+            self._devices.values(),
+            key=lambda kd: kd.last_seen or 0, reverse=True)]
+
+    @property
+    def metrics_for_json(self) -> Dict[str, dict]:
+        return {role.value: metrics.as_dict()
+                for role, metrics in self._metrics.items()}
+
+
+device_registry = DeviceRegistry()
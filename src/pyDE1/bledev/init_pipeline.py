@@ -0,0 +1,181 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Dependency-aware runner for the steps of _initialize_after_connection()
+
+Each step starts as soon as the steps it is after have completed,
+so independent steps (a GATT read, a database lookup, waiting on
+notifications) overlap rather than running one after another.
+
+Steps marked gatt_write hold a per-device lock while they run.
+Parallel writes have generated
+
+    bleak.exc.BleakDBusError: org.bluez.Error.InProgress
+
+and it isn't clear if that is by adapter, device, or characteristic.
+Steps that are waiting on a response, rather than writing,
+should not be marked so that they don't hold up the writes.
+
+gatt_write steps that become runnable together acquire the lock
+in the order they were added.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Coroutine, Dict, List, NamedTuple, \
+    Optional, Tuple
+
+
+class InitStep (NamedTuple):
+    name: str
+    coro_fn: Callable[[], Coroutine]
+    after: Tuple[str, ...]
+    gatt_write: bool
+
+
+class StepTiming (NamedTuple):
+    """
+    Seconds from the start of the pipeline
+        ready   dependencies complete
+        start   running (after the write lock, if needed)
+        end     complete
+    """
+    name: str
+    ready: float
+    start: float
+    end: float
+
+    def as_dict(self) -> dict:
+        return {
+            'step': self.name,
+            'ready': round(self.ready, 3),
+            'start': round(self.start, 3),
+            'end': round(self.end, 3),
+        }
+
+
+class InitPipeline:
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        if logger is None:
+            logger = logging.getLogger('InitPipeline')
+        self.logger = logger
+        self._steps: Dict[str, InitStep] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._gatt_write_lock = asyncio.Lock()
+        self.timeline: List[StepTiming] = []
+        self.t0: Optional[float] = None
+        self.t1: Optional[float] = None
+
+    def add(self, name: str, coro_fn: Callable[[], Coroutine],
+            after: Tuple[str, ...] = (), gatt_write=False):
+        """
+        coro_fn is called without arguments when the step starts.
+        Use a lambda if the method should be looked up at that time,
+        such as when the instance may change class.
+
+        Steps can only be after ones already added, so there are no cycles.
+        """
+        if name in self._steps:
+            raise ValueError(f"Step '{name}' already added")
+        for dep in after:
+            if dep not in self._steps:
+                raise ValueError(
+                    f"Step '{name}' is after unknown step '{dep}'")
+        self._steps[name] = InitStep(name=name,
+                                     coro_fn=coro_fn,
+                                     after=tuple(after),
+                                     gatt_write=gatt_write)
+
+    @property
+    def gatt_write_lock(self) -> asyncio.Lock:
+        """
+        For a step that writes only part of the time, such as around a sleep
+        """
+        return self._gatt_write_lock
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        if self.t0 is None or self.t1 is None:
+            return None
+        return self.t1 - self.t0
+
+    def result(self, name: str) -> Any:
+        """
+        Return value of a completed step
+        """
+        return self._tasks[name].result()
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run all steps, returning their results by name
+
+        If any step fails, the rest are cancelled
+        and the exception is raised
+        """
+        self.t0 = time.time()
+        self.t1 = None
+        self.timeline = []
+        self._tasks = {}
+        # Added in order, so a step's dependencies already have tasks
+        for step in self._steps.values():
+            self._tasks[step.name] = asyncio.create_task(
+                self._run_step(step),
+                name=f"InitStep.{step.name}")
+        try:
+            await asyncio.gather(*self._tasks.values())
+        except BaseException as e:
+            for task in self._tasks.values():
+                task.cancel()
+            self.logger.error(
+                f"Initialization failed after {time.time() - self.t0:.3f} "
+                f"sec, {self._describe_failure()}")
+            raise e
+        finally:
+            self.t1 = time.time()
+        return {name: task.result() for name, task in self._tasks.items()}
+
+    async def _run_step(self, step: InitStep):
+        if step.after:
+            await asyncio.gather(*[self._tasks[dep] for dep in step.after])
+        ready = time.time()
+        if step.gatt_write:
+            async with self._gatt_write_lock:
+                start = time.time()
+                retval = await step.coro_fn()
+        else:
+            start = ready
+            retval = await step.coro_fn()
+        end = time.time()
+        self.timeline.append(StepTiming(name=step.name,
+                                        ready=ready - self.t0,
+                                        start=start - self.t0,
+                                        end=end - self.t0))
+        return retval
+
+    def _describe_failure(self) -> str:
+        failed = [name for name, task in self._tasks.items()
+                  if task.done() and not task.cancelled()
+                  and task.exception() is not None]
+        return f"failed: {', '.join(failed)}" if failed else "cancelled"
+
+    def timeline_as_list(self) -> List[dict]:
+        return [st.as_dict() for st in self.timeline]
+
+    def log_timeline(self, level=logging.INFO):
+        if not self.logger.isEnabledFor(level):
+            return
+        steps = ', '.join([
+            f"{st.name} {st.start:.3f}-{st.end:.3f}"
+            + (f" (waited {st.start - st.ready:.3f})"
+               if st.start - st.ready >= 0.001 else '')
+            for st in sorted(self.timeline, key=lambda st: st.start)
+        ])
+        elapsed = self.elapsed
+        elapsed = f"{elapsed:.3f}" if elapsed is not None else '(running)'
+        self.logger.log(level, f"Initialized in {elapsed} sec: {steps}")
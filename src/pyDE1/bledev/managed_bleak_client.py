@@ -7,13 +7,12 @@ SPDX-License-Identifier: GPL-3.0-only
 """
 
 import asyncio
-import enum
 import logging
 import time
 import warnings
 
 from typing import (
-    Optional, Union, NamedTuple, Callable, Type, TypedDict, Literal
+    Optional, Union, Callable, Type, TypedDict, Literal
 )
 
 import bleak
@@ -21,6 +20,13 @@ import bleak.exc
 from bleak import BleakClient
 from bleak.backends.device import BLEDevice
 
+from pyDE1.bledev.capture_queue import (
+    CaptureRequest, CaptureQueue, cq_from_code, cq_to_code
+)
+from pyDE1.bledev.connection_scheduler import (
+    connection_scheduler, ConnectionHistory
+)
+from pyDE1.event_manager.events import DeviceRole
 from pyDE1.exceptions import DE1NoAddressError
 from pyDE1.utils import EventReadOnly
 
@@ -49,56 +55,6 @@ from pyDE1.lock_logger import LockLogger
 
 IN_PROGRESS_HOLDOFF = 0.2 # seconds, works, 0.1 seemed too short
 
-class CaptureRequest (enum.Enum):
-    CAPTURE = 'C'
-    RELEASE = 'R'
-    CANCEL  = 'X'
-
-
-class CaptureQueue (NamedTuple):
-    connected:  Optional[CaptureRequest]
-    pending:    Optional[CaptureRequest]
-    target:     Optional[CaptureRequest]
-
-    def __str__(self):
-        try:
-            retval =  '{}({}, {}, {})'.format(
-                self.__class__.__name__,
-                self.connected.name if self.connected else None,
-                self.pending.name if self.pending else None,
-                self.target.name if self.target else None,
-            )
-        except AttributeError:
-            retval = repr(self)
-
-        return retval
-
-
-def cq_from_code(code: str) -> CaptureQueue:
-    tt = {
-        'C': CaptureRequest.CAPTURE,
-        'R': CaptureRequest.RELEASE,
-        'X': CaptureRequest.CANCEL,
-        'N': None,
-    }
-    return CaptureQueue(
-        connected=tt[code[0].upper()],
-        pending=tt[code[1].upper()],
-        target=tt[code[2].upper()],
-    )
-
-
-def cq_to_code(cq: CaptureQueue) -> str:
-    retval = ''
-    for attr in ('connected', 'pending', 'target'):
-        try:
-            c = getattr(cq, attr).value
-        except AttributeError:
-            c = 'N'
-        retval += c
-    return retval
-
-
 def task_for_log(t: asyncio.Task) -> str:
     try:
         name = t.get_name()
@@ -134,6 +90,10 @@ class ManagedBleakClient (BleakClient):
                                CaptureQueue,
                                CaptureQueue], None]] = None,
                  logger: Optional[logging.Logger] = None,
+                 role: Optional[DeviceRole] = None,
+                 on_attempt_callback: Optional[
+                     Callable[['ManagedBleakClient',
+                               ConnectionHistory], None]] = None,
                  **kwargs,
                  ):
 
@@ -153,6 +113,9 @@ class ManagedBleakClient (BleakClient):
 
         self._legacy_disconnected_callback = disconnected_callback
         self._on_change_callback = on_change_callback
+        # For priority with the connection_scheduler
+        self.role = role
+        self._on_attempt_callback = on_attempt_callback
 
         # Retain init params for potentially replacing backend
         self._init_winrt = winrt
@@ -194,12 +157,8 @@ class ManagedBleakClient (BleakClient):
         self._retry_wait_task: Optional[asyncio.Task] = None
         # Using an event allow retries to resume immediately
         # without fancy scheduling and rescheduling
+        # The delays themselves come from the connection_scheduler
         self._retry_since = None
-        #
-        self._retry_start_initial_delay = 300 # seconds
-        self._retry_initial_delay = 15 # seconds
-        self._retry_start_long_delay = 1800  # seconds
-        self._retry_long_delay = 60 # seconds
 
         self._pending_task: Optional[asyncio.Task] = None
 
@@ -420,6 +379,13 @@ class ManagedBleakClient (BleakClient):
         """
         return self._capture_queue.target
 
+    @property
+    def connection_history(self) -> Optional[ConnectionHistory]:
+        """
+        Attempts to connect to the present address, if any have been made
+        """
+        return connection_scheduler.get_history(self.address)
+
     @property
     def on_change_callback(self):
         return self._on_change_callback
@@ -626,11 +592,18 @@ class ManagedBleakClient (BleakClient):
         # NB: Not clearing here has the advantage for testing
         #     that the event is always set after _backend.connect()
         # self._retry_wait_event.clear()
+        history = connection_scheduler.history_for(self.address, self.role)
+        connected = False
         try:
-            await self._backend.connect()
+            t0 = time.time()
+            async with connection_scheduler.adapter_operation(self.role):
+                history.attempt_started(adapter_wait=time.time() - t0)
+                await self._backend.connect()
+            connected = self._backend.is_connected
         except asyncio.CancelledError:
+            # Not a failure of the device, so not in its history
             self.logger.info("connect retry CancelledError caught, pass")
-            pass
+            return
         except asyncio.TimeoutError:
             self.logger.debug("connect retry TimeoutError caught, pass")
             pass
@@ -639,14 +612,19 @@ class ManagedBleakClient (BleakClient):
             e: bleak.exc.BleakDeviceNotFoundError
             self.logger.info(f"Seemingly stale device, resetting: {e}")
             self._backend._device_path = None
+            history.attempt_ended(connected=False)
             await self._backend_connect_after_retry_wait_event()
+            return
         except bleak.exc.BleakDBusError as e:
             # Here we go again, parsing messages to determine *which* exception
+            # Outside the adapter_operation(), so something else is using it
             if e.args[0] == 'org.bluez.Error.InProgress':
                 self.logger.info(
                     f"connect retry caught {e}, delaying this one a bit")
+                history.attempt_ended(connected=False)
                 await asyncio.sleep(IN_PROGRESS_HOLDOFF)
                 await self._backend_connect_after_retry_wait_event()
+                return
             else:
                 self.logger.exception(
                     'Failed to connect(), unrecognized exception.')
@@ -655,6 +633,9 @@ class ManagedBleakClient (BleakClient):
             self.logger.exception(
                 'Failed to connect(), unrecognized exception.')
             raise
+        history.attempt_ended(connected=connected)
+        if self._on_attempt_callback is not None:
+            self._on_attempt_callback(self, history)
 
 
     @property
@@ -669,23 +650,23 @@ class ManagedBleakClient (BleakClient):
         self._retry_since = None
         self._retry_wait_event.clear()
         self._last_retry_delay_notified = None
+        if (history := self.connection_history) is not None:
+            history.outage_reset()
 
     def _retry_start(self):
         self._retry_reset()
         self.logger.debug("Starting retry timer")
         self._retry_since = time.time()
+        if self.address:
+            connection_scheduler.history_for(
+                self.address, self.role).outage_start()
 
     def _retry_delay(self) -> float:
-        if self._retry_since is None:
+        if self._retry_since is None or not self.address:
             retval = 0
         else:
-            dt = time.time() - self._retry_since
-            if dt < self._retry_start_initial_delay:
-                retval = 0
-            elif self._retry_start_initial_delay <= dt < self._retry_start_long_delay:
-                retval = self._retry_initial_delay
-            else:
-                retval = self._retry_long_delay
+            retval = connection_scheduler.history_for(
+                self.address, self.role).schedule_next()
         return retval
 
     def _retry_set_timer(self):
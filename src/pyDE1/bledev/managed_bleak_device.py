@@ -16,6 +16,9 @@ from bleak import BLEDevice
 
 import pyDE1.task_logger
 
+from pyDE1.bledev.connection_scheduler import ConnectionHistory
+from pyDE1.bledev.device_registry import device_registry
+from pyDE1.bledev.init_pipeline import InitPipeline
 from pyDE1.bledev.managed_bleak_client import CaptureQueue, CaptureRequest, \
     ManagedBleakClient, cq_to_code
 from pyDE1.btcontrack import persist_connection_file, remove_connection_file
@@ -24,6 +27,7 @@ from pyDE1.event_manager.event_manager import SubscribedEvent
 from pyDE1.event_manager.events import (
     ConnectivityState, ConnectivityChange,
     DeviceAvailabilityState, DeviceAvailability, DeviceRole,
+    DeviceReadyTiming, ReconnectStatus,
 )
 
 # The behavior of sending a ConnectivityChange notice is the same
@@ -58,14 +62,23 @@ class ManagedBleakDevice:
             disconnected_callback=self._create_disconnected_callback(),
             on_change_callback=self._create_on_change_callback(),
             logger=self.logger.getChild('Client'),
+            role=self._role,
+            on_attempt_callback=self._create_on_attempt_callback(),
         )
 
         self._event_connectivity = SubscribedEvent(
             self, adjust_payload=_resend_last_state_if_none)
         self._event_availability = SubscribedEvent(self)
+        self._event_ready_timing = SubscribedEvent(self)
+        self._event_reconnect_status = SubscribedEvent(self)
         self._ready = asyncio.Event()
         self._ready_ro = EventReadOnly(self._ready)
 
+        # For DeviceReadyTiming
+        self._connecting_time: Optional[float] = None
+        self._connected_time: Optional[float] = None
+        self._init_pipeline: Optional[InitPipeline] = None
+
         self._prepare_for_connection()
 
     def _prepare_for_connection(self):
@@ -121,6 +134,21 @@ class ManagedBleakDevice:
     def event_ready(self) -> EventReadOnly:
         return self._ready_ro
 
+    @property
+    def event_ready_timing(self) -> SubscribedEvent:
+        return self._event_ready_timing
+
+    @property
+    def event_reconnect_status(self) -> SubscribedEvent:
+        return self._event_reconnect_status
+
+    @property
+    def init_pipeline(self) -> Optional[InitPipeline]:
+        """
+        The pipeline of the most recent initialization, if one was used
+        """
+        return self._init_pipeline
+
     async def capture(self, timeout: Optional[float] = None) -> bool:
         return await self._bleak_client.capture(timeout=timeout)
 
@@ -167,6 +195,8 @@ class ManagedBleakDevice:
                              address: Optional[Union[BLEDevice, str]]) -> bool:
         if isinstance(address, BLEDevice):
             self._name = address.name
+        elif (known := device_registry.get(address)) is not None:
+            self._name = known.name
         else:
             self._name = None
         changed = await self._bleak_client.change_address(address)
@@ -228,6 +258,20 @@ class ManagedBleakDevice:
 
         return None
 
+    def _create_on_attempt_callback(self):
+
+        def on_attempt_callback(client: ManagedBleakClient,
+                                history: ConnectionHistory) -> None:
+            asyncio.create_task(
+                self._event_reconnect_status.publish(
+                    ReconnectStatus(arrival_time=time.time(),
+                                    role=self.role,
+                                    id=self.address,
+                                    name=self.name,
+                                    history=history.as_dict())))
+
+        return on_attempt_callback
+
     def _create_on_change_callback(self):
 
         def on_change_callback(client: ManagedBleakClient,
@@ -283,9 +327,15 @@ class ManagedBleakDevice:
                 and current_cs != ConnectivityState.CONNECTED):
             self._notify_not_ready()
 
+        if (current_cs == ConnectivityState.CONNECTING
+                and previous_cs != ConnectivityState.CONNECTING):
+            self._connecting_time = arrival_time
+
         if (not self.is_ready
                 and current_cs == ConnectivityState.CONNECTED
                 and previous_cs != ConnectivityState.CONNECTED):
+            self._connected_time = arrival_time
+            self._init_pipeline = None
             pyDE1.task_logger.create_task(
                 self._initialize_after_connection(),
                 logger=self.logger,
@@ -293,6 +343,8 @@ class ManagedBleakDevice:
 
         if (current_cs == ConnectivityState.DISCONNECTED
                 and previous_cs != ConnectivityState.DISCONNECTED):
+            self._connecting_time = None
+            self._connected_time = None
             self._prepare_for_connection()
 
         self._send_device_availability(arrival_time=arrival_time,
@@ -357,11 +409,23 @@ class ManagedBleakDevice:
 
     def _device_availability(self, arrival_time: float,
                              state: DeviceAvailabilityState):
+        attempts = None
+        latency = None
+        if (history := self._bleak_client.connection_history) is not None:
+            if history.outage_since is not None:
+                attempts = history.outage_attempts
+            else:
+                attempts = history.last_reconnect_attempts
+            latency = history.last_reconnect_latency
+            if latency is not None:
+                latency = round(latency, 3)
         return DeviceAvailability(arrival_time=arrival_time,
                                   role=self.role,
                                   state=state,
                                   id=self.address,
-                                  name=self.name)
+                                  name=self.name,
+                                  reconnect_attempts=attempts,
+                                  reconnect_latency=latency)
 
     def _send_device_availability(self, arrival_time: float,
                                   new_state: DeviceAvailabilityState):
@@ -374,6 +438,14 @@ class ManagedBleakDevice:
                                           state=new_state)))
 
 
+    def _new_init_pipeline(self) -> InitPipeline:
+        """
+        For use in _initialize_after_connection(),
+        the timeline is included in DeviceReadyTiming
+        """
+        self._init_pipeline = InitPipeline(logger=self.logger)
+        return self._init_pipeline
+
     def _notify_ready(self):
         self._ready.set()
         # Send the same way to prevent things from getting out of order
@@ -384,6 +456,44 @@ class ManagedBleakDevice:
                                        new_state=ConnectivityState.READY)
 
         self.logger.info("Ready")
+        self._send_ready_timing(arrival_time=time.time())
+        # The advertised name, if any, is from the scan
+        device_registry.connected(address=self.address, name=None,
+                                  role=self.role,
+                                  vendor_class=self.__class__.__name__)
+
+    def _send_ready_timing(self, arrival_time: float):
+        if self._connected_time is None:
+            return
+        initialize_time = arrival_time - self._connected_time
+        if (self._connecting_time is not None
+                and self._connecting_time <= self._connected_time):
+            connect_time = self._connected_time - self._connecting_time
+        else:
+            connect_time = None
+        time_to_ready = initialize_time + (connect_time or 0)
+        steps = (self._init_pipeline.timeline_as_list()
+                 if self._init_pipeline is not None else [])
+        # Once per connection
+        self._connecting_time = None
+        self._connected_time = None
+
+        self.logger.info(
+            f"Time to ready: {time_to_ready:.3f} sec "
+            + (f"(connect {connect_time:.3f}, "
+               if connect_time is not None else "(")
+            + f"initialize {initialize_time:.3f})")
+
+        asyncio.create_task(
+            self._event_ready_timing.publish(
+                DeviceReadyTiming(arrival_time=arrival_time,
+                                  role=self.role,
+                                  id=self.address,
+                                  name=self.name,
+                                  connect_time=connect_time,
+                                  initialize_time=initialize_time,
+                                  time_to_ready=time_to_ready,
+                                  steps=steps)))
 
     def _notify_not_ready(self):
         self._ready.clear()
@@ -102,6 +102,8 @@ class Config (ConfigYAML):
         self.http = _HTTP(self)    # Calculating timeout needs bluetooth
         self.logging = _Logging()
         self.mqtt = _MQTT()
+        self.runtime = _Runtime()
+        self.scale = _Scale()
         self.steam = _Steam()
         self.acaia = _Acaia()  # For development, will be deprecated
 
@@ -143,6 +145,14 @@ class _HTTP (ConfigLoadable):
         # Seconds, 20*2 frames + head + tail at ~100 ms each
         self.PROFILE_TIMEOUT = 4.5
         self.FIRMWARE_TIMEOUT = 15  # Seconds for upload and start (~260 kbps)
+        # PUT de1/profiles, a few hundred typical profiles
+        self.PROFILE_IMPORT_SIZE_LIMIT = 4 * 1024 * 1024
+        self.PROFILE_IMPORT_TIMEOUT = 10    # Seconds
+        # Firmware and bulk profile PUTs are streamed to a file here,
+        # rather than read into memory. Not on a tmpfs, which is memory.
+        self.UPLOAD_DIRECTORY = '/var/lib/pyde1/uploads'
+        # Operations in one POST batch
+        self.BATCH_SIZE_LIMIT = 32
         self._response_timeout = None
 
         # If true, don't output nodes that have no value (write-only)
@@ -169,7 +179,9 @@ class _HTTP (ConfigLoadable):
                            + self.ASYNC_TIMEOUT),
                           (self.PROFILE_TIMEOUT
                            + self.ASYNC_TIMEOUT
-                           + self._parent.de1.CUUID_LOCK_WAIT_TIMEOUT))
+                           + self._parent.de1.CUUID_LOCK_WAIT_TIMEOUT),
+                          (self.PROFILE_IMPORT_TIMEOUT
+                           + self.ASYNC_TIMEOUT))
                       + 0.100)
         return retval
 
@@ -201,6 +213,19 @@ class _Bluetooth (ConfigLoadable):
         self.SCAN_CACHE_EXPIRY = 300  # Seconds, probably too long
         self.RECONNECT_RETRY_COUNT = 10 # Before using RECONNECT_GAP
         self.RECONNECT_GAP = 10 # Seconds
+        # Hold-off between connection attempts, see connection_scheduler.py
+        # Retry immediately this long, or less once a device has reconnected
+        self.RECONNECT_FAST_WINDOW = 300  # Seconds
+        self.RECONNECT_FAST_WINDOW_MIN = 60  # Seconds
+        # Then back off, doubling
+        self.RECONNECT_BACKOFF_INITIAL = 15  # Seconds
+        self.RECONNECT_BACKOFF_MAX = 60  # Seconds
+        # For 'scan', try the last-connected device this long before scanning
+        self.KNOWN_DEVICE_TIMEOUT = 4  # Seconds
+        # Devices not connected for this long aren't tried without a scan
+        self.REGISTRY_EXPIRY = 30 * 24 * 3600  # Seconds
+        # Most frequent ScanResults while devices are being found
+        self.SCAN_RESULTS_HOLDOFF = 0.25  # Seconds
         # Files that hold the Bluetooth ID of connected devices
         # for potential cleanup by supervisor scripts
         self.ID_FILE_DIRECTORY = '/var/lib/pyde1/'
@@ -211,11 +236,28 @@ class _Database (ConfigLoadable):
     def __init__(self):
         self.FILENAME = '/var/lib/pyde1/pyde1.sqlite3'
         self.BACKUP_TIMEOUT = 120  # seconds (500 MB taking nearly 60 seconds)
+        # Profiles per page for GET de1/profiles, and most allowed
+        self.PROFILE_LIST_LIMIT = 50
+        self.PROFILE_LIST_LIMIT_MAX = 1000
+        # Notifications to the recorder, 20 per second, 20 seconds ~ 400
+        self.QUEUE_SIZE = 400
+        # When the queue is full, in order, until the recorder catches up
+        self.SPILL_DIRECTORY = '/var/lib/pyde1/spill'
+        # Journal a sequence, loading it into the database once complete
+        self.DEFER_WRITES = False
+        self.JOURNAL_FILENAME = '/var/lib/pyde1/sequence.journal'
+        # 16384 x 512 bytes is 8 MB, over 10 minutes of notifications
+        self.JOURNAL_SLOT_BYTES = 512
+        self.JOURNAL_SLOTS = 16384
 
 
 class _DE1 (ConfigLoadable):
     def __init__(self):
         self.LINE_FREQUENCY = 60
+        # ShotSample de1_time from a fit of the DE1's clock,
+        # see de1/sample_clock.py
+        self.CLOCK_RECOVERY = True
+        self.CLOCK_WINDOW = 1200  # Samples, about four minutes
         self.MAX_WAIT_FOR_READY_EVENTS = 4.0 # Seconds (28 at 0.1 each)
         self.CUUID_LOCK_WAIT_TIMEOUT = 2 # Seconds
         self.SEQUENCE_WATCHDOG_TIMEOUT = 270 # seconds
@@ -224,6 +266,15 @@ class _DE1 (ConfigLoadable):
         self.bump_resist = _BumpResist()
         self.API_STOP_IGNORES_CHECKS = False  # Request Idle in all cases
         self.PATCH_ON_CONNECT = None  # If defined as a dict, PATCH /de1
+        # Seconds before a cached MMR setting is re-read from the DE1
+        # None relies on the read-back after each write
+        self.MMR_CACHE_TTL = None
+        # Refuse firmware whose CRC32s don't match those in its header
+        self.FIRMWARE_REQUIRE_CRC = False
+        # Firmware catalog, see database/firmware_catalog.py
+        self.FIRMWARE_DIRECTORY = '/var/lib/pyde1/firmware'
+        # Refuse to upload the version the DE1 already has
+        self.FIRMWARE_REFUSE_INSTALLED = True
 
 
 class _BumpResist (ConfigLoadable):
@@ -238,11 +289,51 @@ class _BumpResist (ConfigLoadable):
         self.USE_MEDIAN_FLOW_ALWAYS = False
 
 
+class _Runtime (ConfigLoadable):
+    def __init__(self):
+        # 'production' or 'debug' (asyncio debug mode), see runtime_profile.py
+        self.PROFILE = 'production'
+        # By process name, such as {'Controller': 'debug'}
+        self.PROCESS_PROFILE = {}
+        self.USE_UVLOOP = True  # If installed
+        # debug: asyncio logs callbacks that take longer
+        self.SLOW_CALLBACK_DURATION = 0.1  # Seconds
+        # production: sample loop lag, report percentiles through MQTT
+        self.LOOP_MONITOR_INTERVAL = 0.1  # Seconds
+        self.LOOP_MONITOR_REPORT = 60  # Seconds
+        self.LOOP_LAG_SLOW = 0.05  # Seconds, counted as a slow callback
+        # Each process reports resource use, see process_metrics.py
+        self.METRICS_INTERVAL = 10  # Seconds, None to not sample
+        # 'spawn' or 'forkserver', how run.py starts the other processes
+        self.START_METHOD = 'spawn'
+        # With forkserver, imported once, then already there in each process
+        # Not those that use pyDE1.config on import, it isn't loaded yet
+        self.FORKSERVER_PRELOAD = [
+            'asyncio',
+            'yaml',
+            'paho.mqtt.client',
+            'aiosqlite',
+            'pyDE1.de1.c_api',
+        ]
+
+
+class _Scale (ConfigLoadable):
+    def __init__(self):
+        # scale_time from a fit of the scale's sample clock,
+        # see scale/clock_recovery.py
+        self.CLOCK_RECOVERY = True
+        self.CLOCK_WINDOW = 600  # Reports, about a minute
+        self.CLOCK_GAP = 1.0  # Seconds, a longer gap is taken as lost reports
+
+
 class _Steam(ConfigLoadable):
     def __init__(self):
         self.STOP_LAG = 1.0   # 0.530 is from API call on localhost
         self.SKIP_INITIAL_SECONDS = 4.0
-        self.MAX_SAMPLES_FOR_ESTIMATE = 5
+        self.MAX_SAMPLES_FOR_ESTIMATE = 15
+        # Fit a quadratic, as the rate of rise slows,
+        # see thermometer/time_at_target.py
+        self.CURVATURE = True
         self.IDLE_SECONDS_PER_SAMPLE = 10  # When connected but not steaming
 
 
@@ -25,10 +25,13 @@ def run_controller(master_config: pyDE1.config.Config,
     import asyncio
     import time
 
+    import pyDE1.process_metrics as process_metrics
     import pyDE1.pyde1_logging as pyde1_logging
+    import pyDE1.runtime_profile as runtime_profile
     import pyDE1.shutdown_manager as sm
     import pyDE1.status_reporter as status_reporter
 
+    from pyDE1.database.spill import SpillingQueue
     from pyDE1.de1 import DE1
     from pyDE1.de1.c_api import API_MachineStates
     from pyDE1.dispatcher.dispatcher import (
@@ -44,8 +47,8 @@ def run_controller(master_config: pyDE1.config.Config,
 
     logger = pyDE1.getLogger('Controller')
 
-    loop = asyncio.get_event_loop()
-    loop.set_debug(True)
+    runtime_profile.mark_imported()
+    loop = runtime_profile.new_event_loop()
 
     async def cleanup_on_shutdown():
         logger.info("Watching for shutdown event")
@@ -101,6 +104,13 @@ def run_controller(master_config: pyDE1.config.Config,
         response_pipe=inbound_pipe
     )
 
+    # Rather than drop notifications when the recorder falls behind
+    database_queue = SpillingQueue(
+        database_queue,
+        directory=config.database.SPILL_DIRECTORY,
+        resume_below=config.database.QUEUE_SIZE // 2,
+        loop=loop)
+
     # Sets up the destination for events to be sent to outbound (MQTT) API
     SubscribedEvent.outbound_pipe = outbound_pipe
     SubscribedEvent.database_queue = database_queue
@@ -109,5 +119,16 @@ def run_controller(master_config: pyDE1.config.Config,
     FlowSequencer.database_queue = database_queue
 
     status_reporter.attach('status/controller', loop, logger)
+    monitor = runtime_profile.start_loop_monitor(loop, log=logger)
+    runtime_profile.report_startup(loop, log=logger)
+    process_metrics.start_process_metrics(loop, queues={
+        'database_queue': database_queue,
+        'inbound_pipe': inbound_pipe,
+        'outbound_pipe': outbound_pipe,
+        'request_queue': request_queue,
+        'response_queue': response_queue,
+    }, monitor=monitor, sources={
+        'de1_clock': lambda: DE1().sample_clock.stats(),
+    })
 
     loop.run_forever()
@@ -0,0 +1,177 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Firmware images that have been PUT to de1/firmware, kept on disk
+in config.de1.FIRMWARE_DIRECTORY as <sha256>.dat, with what was found
+in their header in the firmware table, for GET de1/firmwares
+
+An image is validated and its SHA-256 is computed in a worker thread,
+so that the Controller's loop isn't blocked, then it is moved into
+the directory. An image already in the catalog isn't stored again.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from typing import List, NamedTuple, Optional, Union
+
+import aiosqlite
+
+import pyDE1
+from pyDE1.config import config
+from pyDE1.de1.firmware_file import FirmwareFile
+from pyDE1.dispatcher.payloads import UploadedFile
+
+logger = pyDE1.getLogger('Database.Firmware')
+
+_HASH_CHUNK = 1024 * 1024
+
+
+class CatalogEntry (NamedTuple):
+    sha256: str
+    version: int
+    filename: str
+    size: int
+    byte_count: int
+    cpu_bytes: int
+    checksum: int
+    header_checksum: int
+    dc_sum: int
+    crc_matches: bool
+    date_added: float
+    last_uploaded: Optional[float] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(config.de1.FIRMWARE_DIRECTORY, self.filename)
+
+    def as_dict(self) -> dict:
+        retval = self._asdict()
+        retval['crc_matches'] = bool(self.crc_matches)
+        return retval
+
+
+_COLUMNS = CatalogEntry._fields
+
+_INSERT_SQL = \
+    f"INSERT OR IGNORE INTO firmware ({', '.join(_COLUMNS)}) " \
+    f"VALUES ({', '.join(':' + c for c in _COLUMNS)})"
+
+
+def _sha256_of(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        while chunk := fh.read(_HASH_CHUNK):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def inspect_image(path: str, sha256: Optional[str] = None) -> CatalogEntry:
+    """
+    Validate the image at path, see FirmwareFile, and what is in its header
+
+    Blocking, run in a worker thread
+    """
+    if sha256 is None:
+        sha256 = _sha256_of(path)
+    fw = FirmwareFile(filename=path, sha256=sha256)
+    try:
+        return CatalogEntry(
+            sha256=sha256,
+            version=fw.version,
+            filename=f"{sha256}.dat",
+            size=len(fw.content),
+            byte_count=fw._byte_count,
+            cpu_bytes=fw._cpu_bytes,
+            checksum=fw._checksum,
+            header_checksum=fw._header_checksum,
+            dc_sum=fw._dc_sum,
+            crc_matches=fw.crc_matches,
+            date_added=time.time(),
+        )
+    finally:
+        fw.close()
+
+
+def _store(content: Union[bytes, bytearray, UploadedFile]) -> CatalogEntry:
+    """
+    Validate and move into the directory, blocking
+    """
+    directory = config.de1.FIRMWARE_DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(content, UploadedFile):
+        (path, sha256) = (content.path, content.sha256)
+    else:
+        (fd, path) = tempfile.mkstemp(prefix='upload-', dir=directory)
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(content)
+        sha256 = None
+    try:
+        entry = inspect_image(path, sha256)
+        if not os.path.exists(entry.path):
+            # os.replace() if on the same file system
+            shutil.move(path, entry.path)
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+    return entry
+
+
+async def _entry_for(db: aiosqlite.Connection,
+                     sha256: str) -> Optional[CatalogEntry]:
+    async with db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM firmware WHERE sha256 = ?",
+            (sha256,)) as cur:
+        row = await cur.fetchone()
+    return None if row is None else CatalogEntry(*row)
+
+
+async def add_image(content: Union[bytes, bytearray, UploadedFile]) \
+        -> CatalogEntry:
+    """
+    Validate the image in a worker thread, then add it to the catalog,
+    unless it is already there. Its file is removed either way.
+
+    Raises DE1ValueError or DE1APIValueError if it isn't valid firmware
+    """
+    entry = await asyncio.get_running_loop().run_in_executor(
+        None, _store, content)
+    async with aiosqlite.connect(config.database.FILENAME) as db:
+        await db.execute(_INSERT_SQL, entry._asdict())
+        await db.commit()
+        stored = await _entry_for(db, entry.sha256)
+    if stored.date_added == entry.date_added:
+        logger.info(f"Added firmware {entry.version} {entry.sha256}")
+    else:
+        logger.info(f"Firmware {entry.version} already present, "
+                    f"added {stored.date_added}")
+    return stored
+
+
+async def mark_uploaded(sha256: str, when: Optional[float] = None):
+    if when is None:
+        when = time.time()
+    async with aiosqlite.connect(config.database.FILENAME) as db:
+        await db.execute(
+            "UPDATE firmware SET last_uploaded = ? WHERE sha256 = ?",
+            (when, sha256))
+        await db.commit()
+
+
+async def list_firmware() -> List[dict]:
+    """
+    GET de1/firmwares, the newest version first
+    """
+    async with aiosqlite.connect(config.database.FILENAME) as db:
+        async with db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM firmware "
+                "ORDER BY version DESC, date_added DESC") as cur:
+            rows = await cur.fetchall()
+    return [CatalogEntry(*row).as_dict() for row in rows]
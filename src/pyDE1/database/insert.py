@@ -8,7 +8,7 @@ SPDX-License-Identifier: GPL-3.0-only
 
 import json
 import time
-from typing import Optional
+from typing import Dict, Iterable, Optional, Tuple
 
 import aiosqlite
 
@@ -95,6 +95,15 @@ async def dict_notification_cursor_only(notification: dict,
         logger.debug(f"No {__name__} method for {class_name}")
 
 
+def _volume_by_frames_str(volume_by_frames: Optional[list]) -> Optional[str]:
+    """
+    Only present when the frame changes and when tracking stops, NULL otherwise
+    """
+    if volume_by_frames is None:
+        return None
+    return str(volume_by_frames)
+
+
 async def shot_sample_with_volume_update(notification: dict,
                                          sequence_id: str,
                                          cur: aiosqlite.Cursor):
@@ -113,7 +122,8 @@ async def shot_sample_with_volume_update(notification: dict,
           ":frame_number, :steam_temp, :volume_preinfuse, :volume_pour, " \
           ":volume_total, :volume_by_frames)"
     notification['sequence_id'] = sequence_id
-    notification['volume_by_frames'] = str(notification['volume_by_frames'])
+    notification['volume_by_frames'] = _volume_by_frames_str(
+        notification['volume_by_frames'])
     await cur.execute(sql, notification)
 
 
@@ -160,10 +170,18 @@ async def sequencer_gate_notification(notification: dict,
           ":event_time, :name, :action, :active_state)"
     notification['sequence_id'] = sequence_id
     await cur.execute(sql, notification)
+    await _update_sequence_for_gate(name=notification['name'],
+                                    action=notification['action'],
+                                    event_time=notification['event_time'],
+                                    sequence_id=sequence_id,
+                                    cur=cur)
+
 
+async def _update_sequence_for_gate(name: str, action: str,
+                                    event_time: float,
+                                    sequence_id: str,
+                                    cur: aiosqlite.Cursor):
     # Update the history record, if needed
-    action = notification['action']
-    name = notification['name']
     if action == EventNotificationAction.SET.value:
         target = None
         if name == SequencerGateName.GATE_FLOW_BEGIN.value:
@@ -175,7 +193,7 @@ async def sequencer_gate_notification(notification: dict,
         if target is not None:
             sql = f"UPDATE sequence SET {target} = ? " \
                   "WHERE sequence.id == ?"
-            await cur.execute(sql, (notification['event_time'], sequence_id))
+            await cur.execute(sql, (event_time, sequence_id))
 
 
 async def stop_at_notification(notification: dict,
@@ -306,4 +324,110 @@ CLASS_NAME_TO_METHOD = {
     'DeviceAvailability': device_availability,
     'ScaleChange': scale_change,
     'BlueDOTUpdate': bluedot_update,
-}
\ No newline at end of file
+}
+
+
+# For the rolling buffers, each notification as a row, a tuple
+# of the values of its table's columns, in this order, after sequence_id.
+# These match the INSERT of the methods above.
+
+_COMMON_COLUMNS = ('version', 'sender',
+                   'arrival_time', 'create_time', 'event_time')
+
+NOTIFICATION_COLUMNS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'ShotSampleWithVolumesUpdate': ('shot_sample_with_volume_update', (
+        *_COMMON_COLUMNS, 'de1_time', 'sample_time', 'group_pressure',
+        'group_flow', 'mix_temp', 'head_temp', 'set_mix_temp',
+        'set_head_temp', 'set_group_pressure', 'set_group_flow',
+        'frame_number', 'steam_temp', 'volume_preinfuse', 'volume_pour',
+        'volume_total', 'volume_by_frames')),
+    'WeightAndFlowUpdate': ('weight_and_flow_update', (
+        *_COMMON_COLUMNS, 'scale_time',
+        'current_weight', 'current_weight_time',
+        'average_flow', 'average_flow_time',
+        'median_weight', 'median_weight_time',
+        'median_flow', 'median_flow_time')),
+    'StateUpdate': ('state_update', (
+        *_COMMON_COLUMNS, 'state', 'substate',
+        'previous_state', 'previous_substate', 'is_error_state')),
+    'SequencerGateNotification': ('sequencer_gate_notification', (
+        *_COMMON_COLUMNS, 'name', 'action', 'active_state')),
+    'StopAtNotification': ('stop_at_notification', (
+        *_COMMON_COLUMNS, 'stop_at', 'action', 'active_state',
+        'target_value', 'current_value')),
+    'WaterLevelUpdate': ('water_level_update', (
+        *_COMMON_COLUMNS, 'level', 'start_fill_level')),
+    'ScaleTareSeen': ('scale_tare_seen', _COMMON_COLUMNS),
+    'AutoTareNotification': ('auto_tare_notification', (
+        *_COMMON_COLUMNS, 'action')),
+    'ScaleButtonPress': ('scale_button_press', (
+        *_COMMON_COLUMNS, 'button')),
+    'ConnectivityChange': ('connectivity_change', (
+        *_COMMON_COLUMNS, 'state', 'id', 'name')),
+    'DeviceAvailability': ('device_availability', (
+        *_COMMON_COLUMNS, 'state', 'id', 'name', 'role')),
+    'ScaleChange': ('scale_change', (
+        *_COMMON_COLUMNS, 'state', 'id', 'name')),
+    'BlueDOTUpdate': ('bluedot_update', (
+        *_COMMON_COLUMNS, 'temperature', 'high_alarm', 'units',
+        'alarm_byte', 'name')),
+}
+
+_ROW_SQL = {
+    class_name: f"INSERT INTO {table} (sequence_id, {', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * (len(columns) + 1))})"
+    for (class_name, (table, columns)) in NOTIFICATION_COLUMNS.items()
+}
+
+_GATE_COLUMNS = NOTIFICATION_COLUMNS['SequencerGateNotification'][1]
+_GATE_NAME = _GATE_COLUMNS.index('name')
+_GATE_ACTION = _GATE_COLUMNS.index('action')
+_GATE_EVENT_TIME = _GATE_COLUMNS.index('event_time')
+
+
+def notification_row(notification: dict) -> Optional[tuple]:
+    """
+    The notification as a row, None if not in NOTIFICATION_COLUMNS
+
+    Raises KeyError if a column is missing
+    """
+    try:
+        columns = NOTIFICATION_COLUMNS[notification['class']][1]
+    except KeyError:
+        return None
+    row = tuple(notification[column] for column in columns)
+    if notification['class'] == 'ShotSampleWithVolumesUpdate':
+        # As shot_sample_with_volume_update()
+        row = row[:-1] + (_volume_by_frames_str(row[-1]),)
+    return row
+
+
+def row_notification(class_name: str, row: tuple) -> dict:
+    """
+    The notification, as a dict, with the columns of the row
+    """
+    notification = dict(zip(NOTIFICATION_COLUMNS[class_name][1], row))
+    notification['class'] = class_name
+    return notification
+
+
+async def notification_rows(class_name: str,
+                            rows: Iterable[tuple],
+                            sequence_id: str,
+                            cur: aiosqlite.Cursor) -> int:
+    """
+    Insert the rows with one executemany(), returning how many
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    await cur.executemany(_ROW_SQL[class_name],
+                          [(sequence_id, *row) for row in rows])
+    if class_name == 'SequencerGateNotification':
+        for row in rows:
+            await _update_sequence_for_gate(name=row[_GATE_NAME],
+                                            action=row[_GATE_ACTION],
+                                            event_time=row[_GATE_EVENT_TIME],
+                                            sequence_id=sequence_id,
+                                            cur=cur)
+    return len(rows)
@@ -22,9 +22,22 @@ from pyDE1.exceptions import DE1DBError
 
 logger = pyDE1.getLogger('Database.Manage')
 
-CURRENT_USER_VERSION = 3
-CURRENT_SCHEMA_RELPATH = 'schema/schema.003.sql'
+CURRENT_USER_VERSION = 7
+CURRENT_SCHEMA_RELPATH = 'schema/schema.007.sql'
 UPGRADE_2_3_RELPATH = 'schema/upgrade.002.003.sql'
+UPGRADE_3_4_RELPATH = 'schema/upgrade.003.004.sql'
+UPGRADE_4_5_RELPATH = 'schema/upgrade.004.005.sql'
+UPGRADE_5_6_RELPATH = 'schema/upgrade.005.006.sql'
+UPGRADE_6_7_RELPATH = 'schema/upgrade.006.007.sql'
+
+# Applied in turn, from the user_version found
+UPGRADE_FROM_RELPATH = {
+    2: UPGRADE_2_3_RELPATH,
+    3: UPGRADE_3_4_RELPATH,
+    4: UPGRADE_4_5_RELPATH,
+    5: UPGRADE_5_6_RELPATH,
+    6: UPGRADE_6_7_RELPATH,
+}
 
 
 def create_backup_filename () -> str:
@@ -47,26 +60,29 @@ def check_schema(loop: Optional[asyncio.AbstractEventLoop] = None):
             user_version = cur.fetchone()[0]
             if user_version == CURRENT_USER_VERSION:
                 logger.debug(f"Confirmed user_version {user_version}")
-            elif user_version == 2 and CURRENT_USER_VERSION == 3:
-                # One-off implementation for now
+            elif user_version in UPGRADE_FROM_RELPATH:
                 bu_fname = create_backup_filename()
                 logger.warning(
-                    "Upgrading schema from version 2 to 3. "
+                    f"Upgrading schema from version {user_version} "
+                    f"to {CURRENT_USER_VERSION}. "
                     f"Database will be backed up to {bu_fname}.")
                 # Will raise on failure
                 backup_db(config.database.FILENAME, bu_fname)
-                upgrade_sql_path = Path(__file__).resolve().parent.joinpath(
-                    # UPGRADE_2_3_RELPATH).resolve()
-                    CURRENT_SCHEMA_RELPATH).resolve()
-                logger.info(
-                    f"Updating schema using {upgrade_sql_path}")
-                upgrade_sql = sql_commands_from_file(upgrade_sql_path)
-                logger.debug(
-                    f"Read {len(upgrade_sql)} commands from {upgrade_sql_path}")
-                for sql in upgrade_sql:
-                    db.execute(sql)
-                db.commit()
-                logger.info("Upgrade completed")
+                while user_version in UPGRADE_FROM_RELPATH:
+                    upgrade_sql_path = Path(__file__).resolve().parent.joinpath(
+                        UPGRADE_FROM_RELPATH[user_version]).resolve()
+                    logger.info(
+                        f"Updating schema using {upgrade_sql_path}")
+                    upgrade_sql = sql_commands_from_file(upgrade_sql_path)
+                    logger.debug(
+                        f"Read {len(upgrade_sql)} commands "
+                        f"from {upgrade_sql_path}")
+                    for sql in upgrade_sql:
+                        db.execute(sql)
+                    db.commit()
+                    user_version = db.execute(
+                        'PRAGMA user_version').fetchone()[0]
+                logger.info(f"Upgrade to version {user_version} completed")
             elif user_version:
                 msg = (f"Database needs upgrade from {user_version} "
                        f"to {CURRENT_USER_VERSION}. Exiting.")
@@ -138,7 +154,17 @@ def sql_commands_from_file(filename: Union[Path, str]) -> list:
     uncommented[-1] = (uncommented[-1].rstrip()).rstrip(';')
 
     # retval = ('\n'.join(uncommented)).split(';\n')
-    return (' '.join(uncommented)).split('; ')
+    # A trigger has statements of its own, so rejoin until it is complete
+    commands = []
+    partial = None
+    for piece in (' '.join(uncommented)).split('; '):
+        partial = piece if partial is None else f"{partial}; {piece}"
+        if sqlite3.complete_statement(partial + ';'):
+            commands.append(partial)
+            partial = None
+    if partial is not None:
+        commands.append(partial)
+    return commands
 
 
 def backup_db(db_filename: str, backup_filename: str):
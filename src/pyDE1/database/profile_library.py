@@ -0,0 +1,231 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Bulk import and listing of the profiles in the database
+
+The profile table keeps the source of every profile, which is typically
+several kB. Nothing here reads the source column, so listing and search
+only touch the metadata and the indices, even with thousands of profiles.
+
+Text search is through profile_fts, an FTS5 index over title, author,
+and notes, with the id of the profile. Triggers on the profile table
+keep it current, however the profile is added.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import aiosqlite
+
+import pyDE1
+from pyDE1.config import config
+from pyDE1.de1.profile import Profile
+from pyDE1.dispatcher.resource import Resource
+from pyDE1.exceptions import DE1APIKeyError, DE1APIValueError
+
+logger = pyDE1.getLogger('Database.ProfileLibrary')
+
+# No source, that is what de1/profile/id is for
+METADATA_COLUMNS = ('id', 'fingerprint', 'date_added', 'title', 'author',
+                    'notes', 'beverage_type', 'source_format')
+
+# Below SQLITE_MAX_VARIABLE_NUMBER of older versions (999)
+_IN_CHUNK = 500
+
+_INSERT_SQL = \
+    "INSERT INTO profile (id, source, source_format, fingerprint, " \
+    "date_added, title, author, notes, beverage_type) " \
+    "VALUES (:id, :source, :source_format, :fingerprint, " \
+    ":date_added, :title, :author, :notes, :beverage_type)"
+
+LIST_PARAMETERS = Resource.DE1_PROFILES.query_parameters
+
+
+async def ids_by_fingerprint(db: aiosqlite.Connection,
+                             fingerprints: Iterable[str]) -> Dict[str, str]:
+    """
+    The id of the oldest profile present for each fingerprint that is
+    """
+    fingerprints = list(fingerprints)
+    retval = {}
+    for i in range(0, len(fingerprints), _IN_CHUNK):
+        chunk = fingerprints[i:i + _IN_CHUNK]
+        sql = "SELECT fingerprint, id FROM profile " \
+              f"WHERE fingerprint IN ({','.join('?' * len(chunk))}) " \
+              "ORDER BY date_added DESC"
+        async with db.execute(sql, chunk) as cur:
+            # Descending, so the oldest is the one left
+            for fingerprint, pid in await cur.fetchall():
+                retval[fingerprint] = pid
+    return retval
+
+
+async def import_profiles(profiles: Iterable[Profile],
+                          db: aiosqlite.Connection,
+                          when: float) -> List[dict]:
+    """
+    Add the profiles in one transaction, skipping any with a fingerprint
+    already present, in the database or earlier in profiles.
+
+    Each profile must already have its fingerprint.
+
+    Returns a dict for each profile, in order, with the id of the profile
+    in the database for that fingerprint, which is not that profile's id
+    if it was skipped.
+    """
+    profiles = list(profiles)
+    for profile in profiles:
+        if profile.fingerprint is None:
+            raise DE1APIValueError(
+                f"Profile {profile.id} has not been fingerprinted")
+
+    present = await ids_by_fingerprint(
+        db, {profile.fingerprint for profile in profiles})
+
+    results = []
+    to_insert = []
+    for profile in profiles:
+        try:
+            pid = present[profile.fingerprint]
+            added = False
+        except KeyError:
+            pid = profile.id
+            added = True
+            present[profile.fingerprint] = pid
+            to_insert.append({
+                'id': profile.id,
+                'source': profile.source,
+                'source_format': profile.source_format.value,
+                'fingerprint': profile.fingerprint,
+                'date_added': when,
+                'title': profile.title,
+                'author': profile.author,
+                'notes': profile.notes,
+                'beverage_type': profile.beverage_type,
+            })
+        results.append({
+            'id': pid,
+            'fingerprint': profile.fingerprint,
+            'added': added,
+        })
+
+    try:
+        await db.executemany(_INSERT_SQL, to_insert)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+
+    logger.info(
+        f"Imported {len(to_insert)} of {len(profiles)} profiles, "
+        f"{len(profiles) - len(to_insert)} already present")
+    return results
+
+
+def match_expression(text: str, column: Optional[str] = None) -> str:
+    """
+    FTS5 query that matches all the words in text, each as a prefix
+
+    Each word is quoted, so FTS5 syntax in user input is just text
+    """
+    terms = [
+        '"{}"*'.format(word.replace('"', '""')) for word in text.split()
+    ]
+    if len(terms) == 0:
+        raise DE1APIValueError(f"No words to search for in '{text}'")
+    expr = ' '.join(terms)
+    if column is not None:
+        expr = f"{column} : ({expr})"
+    return expr
+
+
+async def list_profiles(db: aiosqlite.Connection,
+                        q: Optional[str] = None,
+                        title: Optional[str] = None,
+                        author: Optional[str] = None,
+                        fingerprint: Optional[str] = None,
+                        limit: Optional[int] = None,
+                        offset: int = 0) -> dict:
+    """
+    Metadata of the profiles, newest first, or best match first
+    if any of q (title, author, or notes), title, or author is given.
+    """
+    if limit is None:
+        limit = config.database.PROFILE_LIST_LIMIT
+
+    matches = []
+    if q is not None:
+        matches.append(match_expression(q))
+    if title is not None:
+        matches.append(match_expression(title, 'title'))
+    if author is not None:
+        matches.append(match_expression(author, 'author'))
+
+    columns = ', '.join([f"profile.{col}" for col in METADATA_COLUMNS])
+    where = ["profile.source_format != 'dummy'"]
+    vals = {'limit': limit, 'offset': offset}
+    if fingerprint is not None:
+        where.append("profile.fingerprint = :fingerprint")
+        vals['fingerprint'] = fingerprint
+
+    if matches:
+        where.append("profile_fts MATCH :match")
+        vals['match'] = ' AND '.join(matches)
+        from_clause = "profile_fts JOIN profile " \
+                      "ON profile.id = profile_fts.id"
+        order_by = "profile_fts.rank"
+    else:
+        from_clause = "profile"
+        order_by = "profile.date_added DESC"
+
+    where_clause = ' AND '.join(where)
+    sql = f"SELECT {columns} FROM {from_clause} WHERE {where_clause} " \
+          f"ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+    count_sql = f"SELECT COUNT(*) FROM {from_clause} WHERE {where_clause}"
+
+    async with db.execute(sql, vals) as cur:
+        rows = await cur.fetchall()
+    async with db.execute(count_sql, vals) as cur:
+        total = (await cur.fetchone())[0]
+
+    return {
+        'profiles': [dict(zip(METADATA_COLUMNS, row)) for row in rows],
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+    }
+
+
+async def list_profiles_from_api(parameters: Optional[dict]) -> dict:
+    """
+    GET de1/profiles, with the parameters from the query string
+    """
+    if parameters is None:
+        parameters = {}
+    kwargs = {}
+    for key, val in parameters.items():
+        if key not in LIST_PARAMETERS:
+            raise DE1APIKeyError(
+                f"Unrecognized parameter '{key}', "
+                f"expected one of {', '.join(LIST_PARAMETERS)}")
+        if key in ('limit', 'offset'):
+            try:
+                val = int(val)
+            except ValueError:
+                raise DE1APIValueError(
+                    f"Expected an integer for '{key}', not '{val}'")
+            if val < 0:
+                raise DE1APIValueError(
+                    f"Expected a non-negative '{key}', not {val}")
+        kwargs[key] = val
+
+    if kwargs.get('limit', 0) > config.database.PROFILE_LIST_LIMIT_MAX:
+        raise DE1APIValueError(
+            f"Limit of {kwargs['limit']} is over "
+            f"{config.database.PROFILE_LIST_LIMIT_MAX}")
+
+    async with aiosqlite.connect(config.database.FILENAME) as db:
+        return await list_profiles(db, **kwargs)
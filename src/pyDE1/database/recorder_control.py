@@ -1,5 +1,5 @@
 """
-Copyright © 2021 Jeff Kletsky. All Rights Reserved.
+Copyright © 2021, 2023 Jeff Kletsky. All Rights Reserved.
 
 License for this software, part of the pyDE1 package, is granted under
 GNU General Public License v3.0 only
@@ -8,9 +8,17 @@ SPDX-License-Identifier: GPL-3.0-only
 Message definitions for database/write_notifications queue
 to break cyclical imports
 """
-from typing import NamedTuple
+from typing import NamedTuple, Optional
 
 
 class RecorderControl (NamedTuple):
     recording: bool
     sequence_id: str
+
+
+class SpilledNotifications (NamedTuple):
+    """
+    In place of what was spilled to the journal at path, see spill.py
+    """
+    path: str
+    count: Optional[int]   # None if left from an earlier Controller
@@ -25,7 +25,9 @@ def run_database_recorder(master_config: pyDE1.config.Config,
     import asyncio
     import threading
 
+    import pyDE1.process_metrics as process_metrics
     import pyDE1.pyde1_logging as pyde1_logging
+    import pyDE1.runtime_profile as runtime_profile
     import pyDE1.shutdown_manager as sm
     import pyDE1.status_reporter as status_reporter
 
@@ -39,8 +41,8 @@ def run_database_recorder(master_config: pyDE1.config.Config,
     pyde1_logging.setup_queue_logging(config.logging, log_queue)
     pyde1_logging.config_logger_levels(config.logging)
 
-    loop = asyncio.get_event_loop()
-    loop.set_debug(True)
+    runtime_profile.mark_imported()
+    loop = runtime_profile.new_event_loop()
 
     async def cleanup_on_shutdown():
         logger.info("Watching for shutdown event")
@@ -72,5 +74,10 @@ def run_database_recorder(master_config: pyDE1.config.Config,
     SupervisedTask(record_data, notification_queue)
 
     status_reporter.attach('status/db_recorder', loop, logger)
+    monitor = runtime_profile.start_loop_monitor(loop, log=logger)
+    runtime_profile.report_startup(loop, log=logger)
+    process_metrics.start_process_metrics(loop, queues={
+        'database_queue': notification_queue,
+    }, monitor=monitor)
 
     loop.run_forever()
\ No newline at end of file
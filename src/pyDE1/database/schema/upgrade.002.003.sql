@@ -5,10 +5,11 @@
 -- SPDX-License-Identifier: GPL-3.0-only
 
 -- NB: This does not check schema version prior to execution
+-- NB: schema.003.sql set user_version = 2, so the tables may already exist
 
 BEGIN TRANSACTION;
 
-CREATE TABLE device_availability (
+CREATE TABLE IF NOT EXISTS device_availability (
     sequence_id         TEXT NOT NULL REFERENCES sequence (id),
     version             TEXT,
     sender              TEXT,
@@ -22,10 +23,10 @@ CREATE TABLE device_availability (
     role                TEXT
 );
 
-CREATE INDEX idx_device_availability_sequence_id
+CREATE INDEX IF NOT EXISTS idx_device_availability_sequence_id
     ON device_availability (sequence_id);
 
-CREATE TABLE scale_change (
+CREATE TABLE IF NOT EXISTS scale_change (
     sequence_id         TEXT,
     version             TEXT,
     sender              TEXT,
@@ -38,10 +39,10 @@ CREATE TABLE scale_change (
     name                TEXT
 );
 
-CREATE INDEX idx_scale_change_sequence_id
+CREATE INDEX IF NOT EXISTS idx_scale_change_sequence_id
     ON scale_change (sequence_id);
 
-CREATE TABLE bluedot_update (
+CREATE TABLE IF NOT EXISTS bluedot_update (
     sequence_id         TEXT,
     version             TEXT,
     sender              TEXT,
@@ -56,7 +57,7 @@ CREATE TABLE bluedot_update (
     name                TEXT
 );
 
-CREATE INDEX idx_bluedot_update_sequence_id
+CREATE INDEX IF NOT EXISTS idx_bluedot_update_sequence_id
     ON bluedot_update (sequence_id);
 
 PRAGMA user_version = 3;
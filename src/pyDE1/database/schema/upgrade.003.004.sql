@@ -0,0 +1,26 @@
+-- Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+--
+-- License for this software, part of the pyDE1 package, is granted under
+-- GNU General Public License v3.0 only
+-- SPDX-License-Identifier: GPL-3.0-only
+
+-- NB: This does not check schema version prior to execution
+
+BEGIN TRANSACTION;
+
+CREATE VIRTUAL TABLE profile_fts USING fts5(
+    title,
+    author,
+    notes,
+    content='profile',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+-- Index the existing profiles
+INSERT INTO profile_fts(profile_fts) VALUES('rebuild');
+
+PRAGMA user_version = 4;
+
+END TRANSACTION;
@@ -0,0 +1,27 @@
+-- Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+--
+-- License for this software, part of the pyDE1 package, is granted under
+-- GNU General Public License v3.0 only
+-- SPDX-License-Identifier: GPL-3.0-only
+
+-- NB: This does not check schema version prior to execution
+
+BEGIN TRANSACTION;
+
+CREATE TABLE ble_device (
+    address         TEXT NOT NULL PRIMARY KEY,
+    name            TEXT,
+    role            TEXT,
+    vendor_class    TEXT,
+    rssi            INTEGER,
+    last_seen       REAL,
+    last_connected  REAL,
+    connect_count   INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_ble_device_role_last_connected
+    ON ble_device(role, last_connected);
+
+PRAGMA user_version = 5;
+
+END TRANSACTION;
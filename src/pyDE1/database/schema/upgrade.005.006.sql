@@ -0,0 +1,31 @@
+-- Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+--
+-- License for this software, part of the pyDE1 package, is granted under
+-- GNU General Public License v3.0 only
+-- SPDX-License-Identifier: GPL-3.0-only
+
+-- NB: This does not check schema version prior to execution
+
+BEGIN TRANSACTION;
+
+CREATE TABLE firmware (
+    sha256          TEXT NOT NULL PRIMARY KEY,
+    version         INTEGER NOT NULL,
+    filename        TEXT NOT NULL,
+    size            INTEGER NOT NULL,
+    byte_count      INTEGER NOT NULL,
+    cpu_bytes       INTEGER NOT NULL,
+    checksum        INTEGER NOT NULL,
+    header_checksum INTEGER NOT NULL,
+    dc_sum          INTEGER NOT NULL,
+    crc_matches     INTEGER NOT NULL,
+    date_added      REAL NOT NULL,
+    last_uploaded   REAL
+);
+
+CREATE INDEX idx_firmware_version
+    ON firmware(version);
+
+PRAGMA user_version = 6;
+
+END TRANSACTION;
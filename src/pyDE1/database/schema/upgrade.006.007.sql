@@ -0,0 +1,47 @@
+-- Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+--
+-- License for this software, part of the pyDE1 package, is granted under
+-- GNU General Public License v3.0 only
+-- SPDX-License-Identifier: GPL-3.0-only
+
+-- NB: This does not check schema version prior to execution
+
+BEGIN TRANSACTION;
+
+-- Was external content on the rowid of profile, which VACUUM can change
+DROP TABLE profile_fts;
+
+CREATE VIRTUAL TABLE profile_fts USING fts5(
+    id UNINDEXED,
+    title,
+    author,
+    notes,
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER profile_fts_insert AFTER INSERT ON profile
+BEGIN
+    INSERT INTO profile_fts (id, title, author, notes)
+        VALUES (NEW.id, NEW.title, NEW.author, NEW.notes);
+END;
+
+CREATE TRIGGER profile_fts_update
+    AFTER UPDATE OF id, title, author, notes ON profile
+BEGIN
+    DELETE FROM profile_fts WHERE id = OLD.id;
+    INSERT INTO profile_fts (id, title, author, notes)
+        VALUES (NEW.id, NEW.title, NEW.author, NEW.notes);
+END;
+
+CREATE TRIGGER profile_fts_delete AFTER DELETE ON profile
+BEGIN
+    DELETE FROM profile_fts WHERE id = OLD.id;
+END;
+
+INSERT INTO profile_fts (id, title, author, notes)
+    SELECT id, title, author, notes FROM profile;
+
+PRAGMA user_version = 7;
+
+END TRANSACTION;
@@ -0,0 +1,158 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Memory-mapped journal of the notifications of a sequence
+
+With config.database.DEFER_WRITES, the recorder appends each
+notification, as the JSON it arrived as, to this journal while a sequence
+is being recorded, rather than inserting it. Once the sequence is
+complete, the journal is loaded into the database in one transaction.
+
+The file is a fixed number of fixed-size slots, after a header:
+
+    header      magic, slot_bytes, slots, next_slot, records
+    record      sequence_id length (H), notification length (I),
+                sequence_id, notification, taking as many slots as needed
+
+next_slot and records are updated after the record is written,
+so a partial record is never read. The pages are the kernel's once
+written, so a crash of the process loses nothing, and what is left
+is loaded when the recorder next starts. Only flush() writes them to disk.
+"""
+
+import mmap
+import os
+import struct
+from typing import List, Tuple
+
+import pyDE1
+
+logger = pyDE1.getLogger('Database.Journal')
+
+MAGIC = b'pyDE1sj1'
+
+_HEADER = struct.Struct('>8sIIII')
+_RECORD = struct.Struct('>HI')
+_DATA_START = _HEADER.size
+
+
+class JournalFull (Exception):
+    pass
+
+
+class SequenceJournal:
+    """
+    See module docstring
+    """
+
+    def __init__(self, filename: str, slot_bytes: int = 512,
+                 slots: int = 16384):
+        self.filename = filename
+        new = not os.path.exists(filename)
+        self._file = open(filename, 'a+b')
+        header = None
+        if not new:
+            self._file.seek(0)
+            header = self._file.read(_HEADER.size)
+        if header and len(header) == _HEADER.size \
+                and header[:len(MAGIC)] == MAGIC:
+            (_, self.slot_bytes, self.slots,
+             self._next_slot, self._records) = _HEADER.unpack(header)
+            if self._records and (self.slot_bytes, self.slots) \
+                    != (slot_bytes, slots):
+                logger.info(
+                    "Keeping the size of the journal with records, "
+                    f"{self.slot_bytes} x {self.slots}")
+            elif not self._records:
+                (self.slot_bytes, self.slots) = (slot_bytes, slots)
+        else:
+            if header:
+                logger.error(f"Not a sequence journal, replacing {filename}")
+            (self.slot_bytes, self.slots) = (slot_bytes, slots)
+            self._next_slot = 0
+            self._records = 0
+        self._file.truncate(_DATA_START + self.slot_bytes * self.slots)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._write_header()
+
+    @property
+    def records(self) -> int:
+        return self._records
+
+    @property
+    def used_slots(self) -> int:
+        return self._next_slot
+
+    def _write_header(self):
+        _HEADER.pack_into(self._mm, 0, MAGIC, self.slot_bytes, self.slots,
+                          self._next_slot, self._records)
+
+    def _slots_for(self, length: int) -> int:
+        return -(-length // self.slot_bytes)
+
+    def append(self, sequence_id: str, notification: str):
+        """
+        Raises JournalFull if there isn't room
+        """
+        sid = sequence_id.encode('utf-8')
+        data = notification.encode('utf-8')
+        length = _RECORD.size + len(sid) + len(data)
+        n_slots = self._slots_for(length)
+        if self._next_slot + n_slots > self.slots:
+            raise JournalFull(
+                f"{self.filename} has {self.slots - self._next_slot} "
+                f"slots free, needs {n_slots}")
+        offset = _DATA_START + self._next_slot * self.slot_bytes
+        _RECORD.pack_into(self._mm, offset, len(sid), len(data))
+        start = offset + _RECORD.size
+        self._mm[start:start + len(sid)] = sid
+        start += len(sid)
+        self._mm[start:start + len(data)] = data
+        self._next_slot += n_slots
+        self._records += 1
+        self._write_header()
+
+    def read(self) -> Tuple[int, List[Tuple[str, str]]]:
+        """
+        The slots used and (sequence_id, notification) of each record
+        """
+        found = []
+        slot = 0
+        while slot < self._next_slot:
+            offset = _DATA_START + slot * self.slot_bytes
+            (sid_len, data_len) = _RECORD.unpack_from(self._mm, offset)
+            start = offset + _RECORD.size
+            sid = self._mm[start:start + sid_len].decode('utf-8')
+            start += sid_len
+            data = self._mm[start:start + data_len].decode('utf-8')
+            found.append((sid, data))
+            slot += self._slots_for(_RECORD.size + sid_len + data_len)
+        return slot, found
+
+    def discard(self, slots: int, records: int):
+        """
+        Remove the first slots, holding records, once they are loaded,
+        keeping any appended since
+        """
+        remaining = self._next_slot - slots
+        if remaining > 0:
+            start = _DATA_START + slots * self.slot_bytes
+            self._mm.move(_DATA_START, start,
+                          remaining * self.slot_bytes)
+        self._next_slot = max(0, remaining)
+        self._records = max(0, self._records - records)
+        self._write_header()
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+            self._file.close()
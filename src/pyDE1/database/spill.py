@@ -0,0 +1,310 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Spill to disk, rather than drop, when the database queue is full
+
+SpillingQueue wraps the multiprocessing.Queue to the DatabaseLogger
+with the same put_nowait(). When the queue is full, that item and all
+after it are appended to a journal file, so that their order is kept.
+Once the queue is below resume_below, a SpilledNotifications with the
+path of the journal is put on the queue in their place. The recorder
+replays the journal, as if each item had come from the queue,
+then removes it.
+
+A journal is renamed as it moves along, so that each is replayed once,
+even if queued more than once: .journal while being written, .queued
+once handed to the recorder, and .replaying once the recorder has
+claimed it. A marker for a journal that has already been claimed
+is skipped.
+
+As it replays, the recorder keeps the offset of the records it has
+handled in a .offset file alongside. A .replaying journal left by
+a recorder that stopped partway through is resumed from there when
+the recorder next starts, see ReplayProgress.
+
+Spilling starting and stopping is published under
+<status topic>/database_spill
+
+Journals left by a Controller that exited while spilling, or that were
+queued but not yet claimed, are queued when the next SpillingQueue
+is created.
+
+Each record of a journal is a 4-byte, big-endian length, then the
+pickled item, a JSON string or a RecorderControl. A partial record
+at the end, from an interrupted write, is ignored.
+"""
+
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import pickle
+import queue
+import struct
+import time
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+import pyDE1
+from pyDE1.database.recorder_control import SpilledNotifications
+
+logger = pyDE1.getLogger('Database.Spill')
+
+JOURNAL_PREFIX = 'spill-'
+JOURNAL_SUFFIX = '.journal'
+QUEUED_SUFFIX = '.queued'
+REPLAYING_SUFFIX = '.replaying'
+OFFSET_SUFFIX = '.offset'
+
+_HEADER = struct.Struct('>I')
+_OFFSET = struct.Struct('>Q')
+
+
+def write_record(journal: BinaryIO, item):
+    data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+    journal.write(_HEADER.pack(len(data)) + data)
+
+
+def read_records(path: str) -> Iterator[Tuple[int, object]]:
+    """
+    (offset after it, item) for each record in the journal at path,
+    in the order written
+    """
+    with open(path, 'rb') as journal:
+        offset = 0
+        while len(header := journal.read(_HEADER.size)) == _HEADER.size:
+            (length,) = _HEADER.unpack(header)
+            data = journal.read(length)
+            if len(data) < length:
+                logger.warning(f"Ignoring partial record at end of {path}")
+                break
+            offset += _HEADER.size + length
+            yield offset, pickle.loads(data)
+
+
+def read_journal(path: str) -> Iterator:
+    """
+    The items in the journal at path, in the order written
+    """
+    for (_, item) in read_records(path):
+        yield item
+
+
+def claim(path: str, suffix: str) -> Optional[str]:
+    """
+    Rename the journal at path to have suffix, returning the new path,
+    or None if it is no longer there, as another has claimed it
+    """
+    claimed = os.path.splitext(path)[0] + suffix
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def unfinished_replays(directory: str) -> List[str]:
+    """
+    Journals a recorder had claimed, but didn't finish replaying,
+    removing any .offset file left after its journal was removed
+    """
+    pattern = os.path.join(directory, f"{JOURNAL_PREFIX}*{REPLAYING_SUFFIX}")
+    for path in glob.glob(pattern + OFFSET_SUFFIX):
+        if not os.path.exists(path.removesuffix(OFFSET_SUFFIX)):
+            os.remove(path)
+    return sorted(glob.glob(pattern))
+
+
+class ReplayProgress:
+    """
+    The offset into a journal of the records that have been replayed,
+    kept in a file alongside it, so that a replay can resume
+
+    Updated after each record is handled, so if the recorder stops
+    between the two, only that one record is replayed again.
+    """
+
+    def __init__(self, journal_path: str):
+        self.path = journal_path + OFFSET_SUFFIX
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        data = os.pread(self._fd, _OFFSET.size, 0)
+        if len(data) == _OFFSET.size:
+            (self.offset,) = _OFFSET.unpack(data)
+        else:
+            self.offset = 0
+
+    def update(self, offset: int):
+        os.pwrite(self._fd, _OFFSET.pack(offset), 0)
+        self.offset = offset
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def remove(self):
+        self.close()
+        os.remove(self.path)
+
+
+def _publish_status(status: dict):
+    import pyDE1.status_reporter as status_reporter
+    status_reporter.publish('database_spill', json.dumps(status))
+
+
+class SpillingQueue:
+    """
+    See module docstring
+    """
+
+    def __init__(self, mp_queue: multiprocessing.Queue,
+                 directory: str,
+                 resume_below: Optional[int] = None,
+                 retry_interval: float = 1.0,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 on_change: Optional[Callable[[dict], None]] = None):
+        self._queue = mp_queue
+        self._directory = directory
+        self._resume_below = resume_below
+        self._retry_interval = retry_interval
+        self._loop = loop
+        self._on_change = on_change if on_change is not None \
+            else _publish_status
+        self._journal: Optional[BinaryIO] = None
+        self._journal_path: Optional[str] = None
+        self._spilled = 0
+        self._spill_started: Optional[float] = None
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+        self.total_spilled = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._queue_leftovers()
+
+    @property
+    def spilling(self) -> bool:
+        return self._journal is not None
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def put_nowait(self, item):
+        if self._journal is not None:
+            self._try_resume()
+        if self._journal is None:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            try:
+                self._start_spill()
+            except OSError as e:
+                logger.error(f"Database queue full, unable to spill: {e}")
+                return
+        try:
+            write_record(self._journal, item)
+            self._journal.flush()
+            self._spilled += 1
+            self.total_spilled += 1
+        except OSError as e:
+            logger.error(
+                f"Unable to spill to {self._journal_path}, dropped: {e}")
+
+    def _queue_leftovers(self):
+        # Queued ones may already be on the queue, if the recorder
+        # outlived the Controller, but it skips those it has claimed
+        leftovers = sorted(
+            glob.glob(os.path.join(
+                self._directory, f"{JOURNAL_PREFIX}*{JOURNAL_SUFFIX}"))
+            + glob.glob(os.path.join(
+                self._directory, f"{JOURNAL_PREFIX}*{QUEUED_SUFFIX}")))
+        for path in leftovers:
+            if path.endswith(JOURNAL_SUFFIX):
+                path = claim(path, QUEUED_SUFFIX)
+                if path is None:
+                    continue
+            logger.warning(f"Queueing spilled notifications from {path}")
+            self.put_nowait(SpilledNotifications(path=path, count=None))
+
+    def _start_spill(self):
+        now = time.time()
+        self._journal_path = os.path.join(
+            self._directory,
+            f"{JOURNAL_PREFIX}{time.time_ns()}-{os.getpid()}{JOURNAL_SUFFIX}")
+        self._journal = open(self._journal_path, 'ab')
+        self._spilled = 0
+        self._spill_started = now
+        logger.warning(
+            f"Database queue full, spilling to {self._journal_path}")
+        self._report({
+            'spilling': True,
+            'journal': self._journal_path,
+            'time': now,
+        })
+        self._schedule_retry()
+
+    def _room(self) -> bool:
+        if self._resume_below is None:
+            return True
+        try:
+            return self._queue.qsize() < self._resume_below
+        except NotImplementedError:
+            return True
+
+    def _try_resume(self) -> bool:
+        """
+        Hand the journal to the recorder, if there is room in the queue
+        """
+        if self._journal is None or not self._room():
+            return False
+        queued_path = os.path.splitext(self._journal_path)[0] + QUEUED_SUFFIX
+        marker = SpilledNotifications(path=queued_path, count=self._spilled)
+        try:
+            os.rename(self._journal_path, queued_path)
+        except OSError as e:
+            logger.error(f"Unable to hand off {self._journal_path}: {e}")
+            return False
+        try:
+            self._queue.put_nowait(marker)
+        except queue.Full:
+            os.rename(queued_path, self._journal_path)
+            return False
+        self._journal.close()
+        self._journal = None
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        now = time.time()
+        logger.info(
+            f"Database queue has room, spilled {self._spilled} "
+            f"over {now - self._spill_started:.1f} sec to {marker.path}")
+        self._report({
+            'spilling': False,
+            'journal': marker.path,
+            'count': marker.count,
+            'seconds': round(now - self._spill_started, 3),
+            'time': now,
+        })
+        return True
+
+    def _schedule_retry(self):
+        # Without more items to put, the journal would wait
+        if self._loop is None:
+            return
+        self._retry_handle = self._loop.call_later(self._retry_interval,
+                                                   self._retry)
+
+    def _retry(self):
+        self._retry_handle = None
+        if not self._try_resume() and self._journal is not None:
+            self._schedule_retry()
+
+    def _report(self, status: dict):
+        try:
+            self._on_change(status)
+        except Exception as e:
+            logger.error(f"Unable to report spill status: {repr(e)}")
@@ -9,28 +9,32 @@ SPDX-License-Identifier: GPL-3.0-only
 import asyncio
 import json
 import multiprocessing
-import pprint
+import os
 import queue
 import threading
 import time
 from asyncio import Task
 from collections import deque
-from copy import deepcopy
-from typing import Dict, Deque
+from typing import Dict, Deque, Optional
 
 import aiosqlite
 
 import pyDE1
 import pyDE1.database.insert as db_insert
+import pyDE1.database.spill as spill
+from pyDE1.database.sequence_journal import JournalFull, SequenceJournal
 import pyDE1.shutdown_manager as sm
 from pyDE1.config import config
-from pyDE1.database.recorder_control import RecorderControl
+from pyDE1.database.recorder_control import (
+    RecorderControl, SpilledNotifications
+)
 
 # from pyDE1.dispatcher.dispatcher import QUEUE_TOO_DEEP
 QUEUE_TOO_DEEP = 1
 
-from pyDE1.event_manager.event_manager import SequencerGateName
-from pyDE1.event_manager.payloads import EventNotificationAction
+from pyDE1.event_manager.payloads import (
+    EventNotificationAction, SequencerGateName
+)
 from pyDE1.exceptions import DE1TypeError
 
 
@@ -105,50 +109,148 @@ ROLLING_BUFFER_TIME_LIMITED = [
 ]
 
 DO_NOT_PERSIST = (
+    'DeviceReadyTiming',
     'FirmwareUpload',
+    'ReconnectStatus',
     'ScanResults',
 )
 
-# This is probably superfluous, but safer
-rolling_buffers_lock = threading.Lock()
-
-
-# This will likely take a while, run as a task
-async def dump_rolling_buffers_to_database(rolling_buffers: Dict[str, Deque],
+class RollingBuffers:
+    """
+    The last ROLLING_BUFFER_SIZE notifications of each class,
+    as rows (see insert.notification_row()), so that those from
+    just before a sequence starts can be recorded with it.
+
+    SequencerGateNotification rows are kept as (sequence_id, row),
+    as only the gates of the new sequence are recorded.
+
+    snapshot() swaps in a spare set of empty buffers, so takes the same
+    time, however full they are. Once the snapshot is recorded,
+    refill() carries it into the new buffers, where there is room,
+    keeping the last-known values, and makes a new spare.
+    """
+
+    def __init__(self, sizes: Dict[str, int]):
+        self._sizes = dict(sizes)
+        self._lock = threading.Lock()
+        self._live = self._empty()
+        self._spare: Optional[Dict[str, Deque]] = self._empty()
+
+    def _empty(self) -> Dict[str, Deque]:
+        return {rb_class: deque((), size)
+                for (rb_class, size) in self._sizes.items()}
+
+    def append(self, rb_class: str, entry) -> bool:
+        """
+        False if there is no buffer for the class
+        """
+        try:
+            self._live[rb_class].append(entry)
+        except KeyError:
+            return False
+        return True
+
+    def snapshot(self) -> Dict[str, Deque]:
+        with self._lock:
+            snapshot = self._live
+            self._live = self._spare if self._spare is not None \
+                else self._empty()
+            self._spare = None
+        return snapshot
+
+    def refill(self, snapshot: Dict[str, Deque]):
+        with self._lock:
+            for (rb_class, old) in snapshot.items():
+                live = self._live[rb_class]
+                room = live.maxlen - len(live)
+                if room > 0 and old:
+                    live.extendleft(reversed(list(old)[-room:]))
+            self._spare = self._empty()
+
+    def entries(self) -> Dict[str, list]:
+        with self._lock:
+            return {rb_class: list(rb)
+                    for (rb_class, rb) in self._live.items()}
+
+
+def rows_for_sequence(rb_class: str, entries, sequence_id: str):
+    if rb_class == 'SequencerGateNotification':
+        return [row for (gate_sequence_id, row) in entries
+                if gate_sequence_id == sequence_id]
+    return entries
+
+
+# Runs as a task, yielding to the recorder between tables
+async def dump_rolling_buffers_to_database(rolling_buffers: RollingBuffers,
+                                           snapshot: Dict[str, Deque],
                                            sequence_id: str,
                                            db: aiosqlite.Connection):
-
-    with rolling_buffers_lock:
-        snapshot = deepcopy(rolling_buffers)
-
     t0 = time.time()
     count = 0
-    async with db.cursor() as cur:
-        for rb_class, rb in snapshot.items():
-            for notification in rb:
-                if rb_class == 'SequencerGateNotification' \
-                        and notification['sequence_id'] != sequence_id:
-                    pass
-                else:
-                    try:
-                        await db_insert.dict_notification_cursor_only(
-                            notification=notification,
-                            sequence_id=sequence_id,
-                            cur=cur
-                        )
-                        count += 1
-                    except AttributeError as e:
-                        # There were some strange "no state" errors during dev
-                        # that have not been seen since
-                        logger.exception(e)
-                        logger.info(
-                            f"notification:\n{pprint.pformat(notification)}")
-                        stop_here = notification
+    try:
+        async with db.cursor() as cur:
+            for (rb_class, entries) in snapshot.items():
+                await asyncio.sleep(0)
+                count += await db_insert.notification_rows(
+                    class_name=rb_class,
+                    rows=rows_for_sequence(rb_class, entries, sequence_id),
+                    sequence_id=sequence_id,
+                    cur=cur)
         await db.commit()
+    except Exception as e:
+        logger.exception(
+            f"Unable to record the notifications before the sequence: "
+            f"{repr(e)}")
+    finally:
+        rolling_buffers.refill(snapshot)
     t1 = time.time()
     logger.info(f"Dump of {count} notifications in {(t1-t0)*1000:.3f} ms")
 
 
+def journal_rolling_buffers(rolling_buffers: RollingBuffers,
+                            sequence_id: str,
+                            journal: SequenceJournal):
+    """
+    As dump_rolling_buffers_to_database(), to the journal
+    """
+    count = 0
+    for (rb_class, entries) in rolling_buffers.entries().items():
+        for row in rows_for_sequence(rb_class, entries, sequence_id):
+            journal.append(sequence_id, json.dumps(
+                db_insert.row_notification(rb_class, row)))
+            count += 1
+    logger.info(f"Journaled {count} notifications from before the sequence")
+
+
+async def load_sequence_journal(journal: SequenceJournal,
+                                db: aiosqlite.Connection) -> int:
+    """
+    Insert what is in the journal, in one transaction, then discard it
+    """
+    (slots, records) = journal.read()
+    if not records:
+        return 0
+    t0 = time.time()
+    try:
+        async with db.cursor() as cur:
+            for (sequence_id, notification) in records:
+                await db_insert.dict_notification_cursor_only(
+                    notification=json.loads(notification),
+                    sequence_id=sequence_id,
+                    cur=cur)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.exception(
+            f"Unable to load the journal, keeping it: {repr(e)}")
+        return 0
+    journal.discard(slots, len(records))
+    t1 = time.time()
+    logger.info(f"Loaded {len(records)} notifications from the journal "
+                f"in {(t1-t0)*1000:.3f} ms")
+    return len(records)
+
+
 async def record_data(incoming: multiprocessing.Queue):
 
     # Status:
@@ -171,19 +273,64 @@ async def record_data(incoming: multiprocessing.Queue):
         else:
             pass
 
-    rolling_buffers = {}
-    for rb_class, rb in ROLLING_BUFFER_SIZE.items():
-        rolling_buffers[rb_class] = deque([], rb)
+    rolling_buffers = RollingBuffers(ROLLING_BUFFER_SIZE)
+
+    # With DEFER_WRITES, see sequence_journal.py
+    journal: Optional[SequenceJournal] = None
+    journal_lock = asyncio.Lock()
+    if config.database.DEFER_WRITES:
+        journal = SequenceJournal(config.database.JOURNAL_FILENAME,
+                                  slot_bytes=config.database.JOURNAL_SLOT_BYTES,
+                                  slots=config.database.JOURNAL_SLOTS)
 
     async with aiosqlite.connect(config.database.FILENAME) as db:
         try:
             recording = False
             sequence_id = 'dummy'
             waiting_for_id = None
+            started_at = None   # Until the first notification is recorded
             consider_sequence_complete.set()    # Previous sequence is "done"
 
-            while not sm.shutdown_underway.is_set():
-                data = await async_queue_get(incoming)
+            async def load_journal():
+                async with journal_lock:
+                    await load_sequence_journal(journal, db)
+
+            async def load_journal_when_complete():
+                await consider_sequence_complete.wait()
+                journal.flush()
+                await load_journal()
+
+            async def append_to_journal(data: str, data_dict: dict):
+                try:
+                    journal.append(sequence_id, data)
+                    return
+                except JournalFull as e:
+                    logger.warning(f"Loading the journal now, as {e}")
+                await load_journal()
+                try:
+                    journal.append(sequence_id, data)
+                    return
+                except JournalFull as e:
+                    # Not loaded, keep recording, if without the journal
+                    logger.error(f"Writing directly, as {e}")
+                try:
+                    await db_insert.dict_notification(
+                        notification=data_dict,
+                        sequence_id=sequence_id,
+                        db=db)
+                except Exception as e:
+                    logger.error(
+                        f"Dropping {data_dict['class']}, "
+                        f"unable to write it: {repr(e)}")
+
+            if journal is not None and journal.records:
+                logger.warning(
+                    f"Loading {journal.records} notifications left "
+                    f"in {journal.filename}")
+                await load_journal()
+
+            async def handle(data):
+                nonlocal recording, sequence_id, waiting_for_id, started_at
 
                 if isinstance(data, str):
                     data_dict = json.loads(data)
@@ -191,23 +338,37 @@ async def record_data(incoming: multiprocessing.Queue):
                     # this way there is always pre-history available
                     # and associated with the sequence_id
 
+                    rb_class = data_dict['class']
                     try:
-                        with rolling_buffers_lock:
-                            rolling_buffers[data_dict['class']].append(
-                                data_dict)
-                    except KeyError:
-                        if data_dict['class'] not in DO_NOT_PERSIST:
-                            logger.info("No rolling buffer for "
-                                        f"{data_dict['class']}")
-                    pass
+                        row = db_insert.notification_row(data_dict)
+                    except KeyError as e:
+                        logger.error(
+                            f"{rb_class} without {e}, not buffered")
+                        row = None
+                    if row is not None:
+                        if rb_class == 'SequencerGateNotification':
+                            row = (data_dict['sequence_id'], row)
+                        if not rolling_buffers.append(rb_class, row):
+                            logger.info(f"No rolling buffer for {rb_class}")
+                    elif rb_class not in DO_NOT_PERSIST:
+                        logger.info(f"No rolling buffer for {rb_class}")
 
                     if recording or not consider_sequence_complete.is_set():
                         # The history record has already been created
                         # before the RecorderControl message is sent
-                        await db_insert.dict_notification(
-                            notification=data_dict,
-                            sequence_id=sequence_id,
-                            db=db)
+                        if journal is not None:
+                            await append_to_journal(data, data_dict)
+                        else:
+                            await db_insert.dict_notification(
+                                notification=data_dict,
+                                sequence_id=sequence_id,
+                                db=db)
+                        if started_at is not None:
+                            logger.info(
+                                "First notification recorded "
+                                f"{(time.time() - started_at) * 1000:.1f} ms "
+                                "after the sequence started")
+                            started_at = None
                         # Check to see if this is the "matching" sequence complete
                         try:
                             if (not consider_sequence_complete.is_set()
@@ -225,22 +386,34 @@ async def record_data(incoming: multiprocessing.Queue):
                         except ValueError:
                             pass
 
+                elif isinstance(data, SpilledNotifications):
+                    await replay(data)
+
                 elif isinstance(data, RecorderControl):
                     recording = data.recording
                     sequence_id = data.sequence_id
                     if recording:   # start
                         waiting_for_id = None
                         consider_sequence_complete.clear()
+                        started_at = time.time()
                         logger.info("Starting recorder")
-                        # Kick off "dribble" of back data here
-                        # Even at 5 ms per INSERT, could be 100 ms or more
-                        asyncio.create_task(
-                            dump_rolling_buffers_to_database(
+                        if journal is not None:
+                            journal_rolling_buffers(
                                 rolling_buffers=rolling_buffers,
                                 sequence_id=sequence_id,
-                                db=db,
+                                journal=journal)
+                            asyncio.create_task(load_journal_when_complete())
+                        else:
+                            # Record the back data as a task,
+                            # one executemany() per table
+                            asyncio.create_task(
+                                dump_rolling_buffers_to_database(
+                                    rolling_buffers=rolling_buffers,
+                                    snapshot=rolling_buffers.snapshot(),
+                                    sequence_id=sequence_id,
+                                    db=db,
+                                )
                             )
-                        )
                     else:   # recording stop
                         waiting_for_id = sequence_id
                         # This is raising asyncio.exceptions.CancelledError
@@ -259,8 +432,56 @@ async def record_data(incoming: multiprocessing.Queue):
                         raise DE1TypeError(
                             "Unrecognized data type passed for recording:"
                             f"{type(data)}")
-                    else:
-                        continue
+
+            async def replay(spilled: SpilledNotifications):
+                # Queued again after a restart, only the first replays it
+                path = spill.claim(spilled.path, spill.REPLAYING_SUFFIX)
+                if path is None:
+                    logger.info(
+                        f"Spilled notifications already replayed: "
+                        f"{spilled.path}")
+                    return
+                await replay_claimed(path)
+
+            async def replay_claimed(path: str):
+                nonlocal recording, sequence_id, waiting_for_id
+                progress = spill.ReplayProgress(path)
+                resume_at = progress.offset
+                if resume_at:
+                    logger.warning(
+                        f"Resuming replay of {path} after {resume_at} bytes")
+                count = 0
+                try:
+                    for (offset, item) in spill.read_records(path):
+                        if offset <= resume_at:
+                            # Already recorded, only its state is needed
+                            if isinstance(item, RecorderControl):
+                                recording = item.recording
+                                sequence_id = item.sequence_id
+                                waiting_for_id = None
+                                if recording:
+                                    consider_sequence_complete.clear()
+                                else:
+                                    consider_sequence_complete.set()
+                            continue
+                        await handle(item)
+                        progress.update(offset)
+                        count += 1
+                finally:
+                    progress.close()
+                # The journal first, without it the offset is ignored
+                os.remove(path)
+                progress.remove()
+                logger.info(
+                    f"Replayed {count} spilled notifications from {path}")
+
+            for path in spill.unfinished_replays(
+                    config.database.SPILL_DIRECTORY):
+                await replay_claimed(path)
+
+            while not sm.shutdown_underway.is_set():
+                data = await async_queue_get(incoming)
+                await handle(data)
 
             if sm.shutdown_underway.is_set():
                 logger.info("Shut down record_data() loop")
@@ -270,4 +491,9 @@ async def record_data(incoming: multiprocessing.Queue):
             await db.close()
             raise
 
+        finally:
+            # What is left is loaded on the next start
+            if journal is not None:
+                journal.close()
+
 
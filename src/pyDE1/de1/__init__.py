@@ -6,4 +6,12 @@ GNU General Public License v3.0 only
 SPDX-License-Identifier: GPL-3.0-only
 """
 
-from .de1 import DE1
\ No newline at end of file
+# DE1 is imported on first use, so that pyDE1.de1.profile and the like
+# don't bring in bleak and the rest of the Controller with them
+
+
+def __getattr__(name):
+    if name == 'DE1':
+        from .de1 import DE1
+        return DE1
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
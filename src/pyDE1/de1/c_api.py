@@ -14,7 +14,7 @@ import copy
 import enum
 import time
 import traceback
-from struct import unpack, pack
+from struct import unpack, pack, Struct
 from typing import Union, Optional
 
 import pyDE1
@@ -130,8 +130,14 @@ class PackedAttr:
 
     Range checking is generally done in subclasses. Can raise:
     DE1APITypeError and DE1APIValueError and subclasses
+
+    The high-rate, notified classes (ShotSample, StateInfo, WaterLevels)
+    define __slots__ and a precompiled struct.Struct for their wire format.
+    Subclasses that don't define __slots__ still get a __dict__
     """
 
+    __slots__ = ('_arrival_time',)
+
     def __init__(self):
         self._arrival_time = None
         pass
@@ -141,6 +147,18 @@ class PackedAttr:
 
         return self
 
+    @classmethod
+    def from_notification(cls, wire_bytes: Union[bytes, bytearray],
+                          arrival_time=None):
+        """
+        Fast path for trusted, inbound data from the DE1
+
+        Skips __init__() and the range checks in the property setters.
+        Only valid for classes where from_wire_bytes() populates
+        every attribute without relying on __init__()
+        """
+        return cls.__new__(cls).from_wire_bytes(wire_bytes, arrival_time)
+
     def as_wire_bytes(self) -> Union[bytes, bytearray]:
         raise NotImplementedError
 
@@ -763,6 +781,8 @@ class API_Substates (enum.IntEnum):
 
 class StateInfo (PackedAttr):
 
+    __slots__ = ('_State', '_SubState')
+
     cuuid = CUUID.StateInfo
     can_read = bool(cuuid is not None and cuuid.can_read)
     can_write = bool(cuuid is not None and cuuid.can_write)
@@ -770,6 +790,8 @@ class StateInfo (PackedAttr):
     can_write_then_return = bool(cuuid is not None
                                  and cuuid.can_write_then_return)
 
+    _wire_format = Struct('>BB')
+
     def __init__(self, State=None, SubState=None):
         super(StateInfo, self).__init__()
 
@@ -780,7 +802,7 @@ class StateInfo (PackedAttr):
     def from_wire_bytes(self, wire_bytes, arrival_time=None):
         super(StateInfo, self).from_wire_bytes(wire_bytes, arrival_time)
         # Even though "trivial", use of unpack checks against format
-        ( state, substate ) = unpack('>BB', wire_bytes)
+        ( state, substate ) = self._wire_format.unpack(wire_bytes)
         try:
             self._State = API_MachineStates(state)
         except ValueError:
@@ -870,6 +892,8 @@ class RequestedState (PackedAttr):
 
 class WaterLevels (PackedAttr):
 
+    __slots__ = ('_Level', '_StartFillLevel')
+
     cuuid = CUUID.WaterLevels
     can_read = bool(cuuid is not None and cuuid.can_read)
     can_write = bool(cuuid is not None and cuuid.can_write)
@@ -877,6 +901,8 @@ class WaterLevels (PackedAttr):
     can_write_then_return = bool(cuuid is not None
                                  and cuuid.can_write_then_return)
 
+    _wire_format = Struct('>HH')
+
     def __init__(self, Level=None, StartFillLevel=None):
         super(WaterLevels, self).__init__()
 
@@ -886,7 +912,7 @@ class WaterLevels (PackedAttr):
 
     def from_wire_bytes(self, wire_bytes, arrival_time=None):
         super(WaterLevels, self).from_wire_bytes(wire_bytes, arrival_time)
-        (level, start_fill_level) = unpack('>HH', wire_bytes)
+        (level, start_fill_level) = self._wire_format.unpack(wire_bytes)
         self._Level = level / 2**8
         self._StartFillLevel = start_fill_level / 2**8
 
@@ -899,7 +925,7 @@ class WaterLevels (PackedAttr):
         start_fill_level = self._StartFillLevel
         if start_fill_level is None:
             start_fill_level = 0
-        return pack('>HH',
+        return self._wire_format.pack(
                     u(level),
                     u(start_fill_level)
                     )
@@ -1636,6 +1662,13 @@ class FrameWrite_ShotTail(FrameWrite):
 
 class ShotState (PackedAttr):
 
+    __slots__ = ('_GroupPressure', '_GroupFlow', '_MixTemp', '_HeadTemp',
+                 '_SetMixTemp', '_SetHeadTemp',
+                 '_SetGroupPressure', '_SetGroupFlow',
+                 '_FrameNumber', '_SteamTemp')
+
+    _wire_format = Struct('>HHHBHHHBBBB')
+
     def __init__(self, GroupPressure=None, GroupFlow=None,
                  MixTemp=None, HeadTemp=None,
                  SetMixTemp=None, SetHeadTemp=None,
@@ -1657,7 +1690,15 @@ class ShotState (PackedAttr):
         super(ShotState, self).from_wire_bytes(wire_bytes, arrival_time)
         (
             gp, gf, mt, hth, htl, smt, sht, sgp, sgf, fn, st
-        ) = unpack('>HHHBHHHBBBB', wire_bytes)
+        ) = self._wire_format.unpack(wire_bytes)
+        self._set_from_unpacked(gp, gf, mt, hth, htl,
+                                smt, sht, sgp, sgf, fn, st)
+
+        return self
+
+    def _set_from_unpacked(self, gp, gf, mt, hth, htl,
+                           smt, sht, sgp, sgf, fn, st):
+        # Wire data is range-limited by its format, skip the setters
         self._GroupPressure = gp / 2 ** 12
         self._GroupFlow = gf / 2 ** 12
         self._MixTemp = mt / 2 ** 8
@@ -1669,8 +1710,6 @@ class ShotState (PackedAttr):
         self._FrameNumber = fn
         self._SteamTemp = st
 
-        return self
-
     def as_wire_bytes(self):
         raise NotImplementedError
 
@@ -1776,6 +1815,8 @@ class ShotState (PackedAttr):
 
 class ShotSample (PackedAttr):
 
+    __slots__ = ('_SampleTime', '_State')
+
     cuuid = CUUID.ShotSample
     can_read = bool(cuuid is not None and cuuid.can_read)
     can_write = bool(cuuid is not None and cuuid.can_write)
@@ -1783,6 +1824,9 @@ class ShotSample (PackedAttr):
     can_write_then_return = bool(cuuid is not None
                                  and cuuid.can_write_then_return)
 
+    # SampleTime followed by ShotState, unpacked in one call
+    _wire_format = Struct('>H' + ShotState._wire_format.format[1:])
+
     def __init__(self, SampleTime=None, State=None):
         super(ShotSample, self).__init__()
 
@@ -1791,8 +1835,12 @@ class ShotSample (PackedAttr):
 
     def from_wire_bytes(self, wire_bytes, arrival_time=None):
         super(ShotSample, self).from_wire_bytes(wire_bytes, arrival_time)
-        self.SampleTime = unpack('>H', wire_bytes[0:2])[0]
-        self.ShotState = ShotState().from_wire_bytes(wire_bytes[2:], arrival_time)
+        (sample_time, *state_fields) = self._wire_format.unpack(wire_bytes)
+        self._SampleTime = sample_time
+        state = ShotState.__new__(ShotState)
+        state._arrival_time = arrival_time
+        state._set_from_unpacked(*state_fields)
+        self._State = state
 
         return self
 
@@ -8,17 +8,20 @@ SPDX-License-Identifier: GPL-3.0-only
 import asyncio
 import hashlib
 import inspect
+import json
 import logging
 import time
+from array import array
 from copy import copy, deepcopy
 from typing import Union, Dict, Coroutine, Optional, List, Callable
 
 import aiosqlite
-import requests
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
+import pyDE1.database.firmware_catalog as firmware_catalog
 import pyDE1.database.insert as db_insert
+import pyDE1.database.profile_library as profile_library
 import pyDE1.de1.handlers
 from pyDE1.bledev.managed_bleak_device import ManagedBleakDevice
 from pyDE1.config import config
@@ -32,10 +35,13 @@ from pyDE1.de1.c_api import (
 )
 from pyDE1.de1.events import ShotSampleUpdate, ShotSampleWithVolumesUpdate
 from pyDE1.de1.firmware_file import FirmwareFile
+from pyDE1.de1.mmr_cache import MMRCache
 from pyDE1.de1.notifications import NotificationState, MMR0x80Data
 from pyDE1.de1.profile import (
     Profile, ProfileByFrames, DE1ProfileValidationError, SourceFormat
 )
+from pyDE1.de1.sample_clock import SampleClock
+from pyDE1.dispatcher.payloads import UploadedFile
 from pyDE1.dispatcher.resource import ConnectivityEnum, DE1ModeEnum
 from pyDE1.event_manager.event_manager import SubscribedEvent
 from pyDE1.event_manager.events import (
@@ -43,7 +49,9 @@ from pyDE1.event_manager.events import (
 )
 from pyDE1.exceptions import *
 from pyDE1.flow_sequencer import FlowSequencer
-from pyDE1.scanner import RegisteredPrefixes, find_first_matching
+from pyDE1.scanner import (
+    RegisteredPrefixes, capture_known_or_first_matching
+)
 
 from pyDE1.singleton import Singleton
 from pyDE1.utils import task_name_exists, cancel_tasks_by_name
@@ -52,6 +60,8 @@ import pyDE1.shutdown_manager as sm
 
 RegisteredPrefixes.add_to_role('DE1', DeviceRole.DE1)
 
+_NO_VOLUME_BY_FRAME = array('d', [0.0]) * MAX_FRAMES
+
 
 class DE1 (Singleton, ManagedBleakDevice):
 
@@ -69,6 +79,10 @@ class DE1 (Singleton, ManagedBleakDevice):
         self.logger = pyDE1.getLogger('DE1')
         self._role = DeviceRole.DE1
         self._name = ''
+        # Needed by _prepare_for_connection(), called from __init__()
+        self._mmr_cache = MMRCache(self)
+        self._sample_clock = SampleClock(config.de1.LINE_FREQUENCY,
+                                         window=config.de1.CLOCK_WINDOW)
         ManagedBleakDevice.__init__(self)
 
         self._handlers = pyDE1.de1.handlers.default_handler_map(self)
@@ -101,7 +115,10 @@ class DE1 (Singleton, ManagedBleakDevice):
         self._volume_dispensed_total = 0
         self._volume_dispensed_preinfuse = 0
         self._volume_dispensed_pour = 0
-        self._volume_dispensed_by_frame = []
+        # Updated in place, only the changed frame is in each update
+        self._volume_dispensed_by_frame = array('d', [0.0]) * MAX_FRAMES
+        self._volume_last_frame: Optional[int] = None
+        self._volume_was_tracking = False
         # TODO: Convince Ray to return substate and state
         #       in ShotSample so this isn't needed for volume tracking
         self._number_of_preinfuse_frames: int = 0
@@ -152,6 +169,9 @@ class DE1 (Singleton, ManagedBleakDevice):
         else:
             self.logger.debug(f"No running loop to _notify_not_ready(): {loop}")
 
+        self._mmr_cache.retain(self.address)
+        self._sample_clock.reset()
+
         self._cuuid_dict: Dict[CUUID, NotificationState] = dict()
         self._mmr_dict: Dict[Union[MMR0x80LowAddr, int], MMR0x80Data] = dict()
         for cuuid in CUUID:
@@ -171,7 +191,10 @@ class DE1 (Singleton, ManagedBleakDevice):
         self._volume_dispensed_total = 0
         self._volume_dispensed_preinfuse = 0
         self._volume_dispensed_pour = 0
-        self._volume_dispensed_by_frame = []
+        # Updated in place, only the changed frame is in each update
+        self._volume_dispensed_by_frame = array('d', [0.0]) * MAX_FRAMES
+        self._volume_last_frame: Optional[int] = None
+        self._volume_was_tracking = False
         # TODO: Convince Ray to return substate and state
         #       in ShotSample so this isn't needed for volume tracking
         self._number_of_preinfuse_frames: int = 0
@@ -187,21 +210,73 @@ class DE1 (Singleton, ManagedBleakDevice):
 
         self.logger.info("initialize_after_connection()")
 
-        await asyncio.gather(
-            self.start_standard_read_write_notifiers(),
-            self.start_standard_periodic_notifiers(),
-        )
+        self._mmr_cache.restore(self.address)
+
+        # The reads need the notifiers, as start_notifying() clears
+        # the ready event. MMR reads and calibration are writes and
+        # are run one at a time, with calibration able to proceed
+        # while the MMR responses are still arriving.
+
+        pipeline = self._new_init_pipeline()
+        pipeline.add('notify_read_write',
+                     self.start_standard_read_write_notifiers)
+        pipeline.add('notify_periodic',
+                     self.start_standard_periodic_notifiers)
+        pipeline.add('read_mmr',
+                     self.read_standard_mmr_registers,
+                     after=('notify_read_write',),
+                     gatt_write=True)
+        pipeline.add('read_cuuid',
+                     self._read_standard_cuuids,
+                     after=('notify_read_write', 'notify_periodic'))
+        pipeline.add('calibration',
+                     # Although generally not needed "immediately",
+                     # deferring to "ready" can result in timeouts
+                     # as ready can trigger multiple API requests
+                     self.fetch_calibration,
+                     after=('notify_read_write',),
+                     gatt_write=True)
+        pipeline.add('responses',
+                     lambda: self._wait_for_ready_events(
+                         *pipeline.result('read_mmr')),
+                     after=('read_mmr', 'read_cuuid'))
+        pipeline.add('user_present',
+                     self._set_app_feature_flags,
+                     after=('read_mmr',),
+                     gatt_write=True)
+        pipeline.add('nearly_ready',
+                     FlowSequencer().on_de1_nearly_ready,
+                     after=('responses', 'calibration', 'user_present'),
+                     gatt_write=True)
+
+        await pipeline.run()
+        pipeline.log_timeline()
+
+        self.logger.info(f"MMR cache: {self._mmr_cache.stats}")
 
-        t0 = time.time()
-        ((event_list, addr_low_list), ignore, ignore, ignore) \
-            = await asyncio.gather(
-            self.read_standard_mmr_registers(),
+        self._notify_ready()
+
+        # There's a Catch-22 here as the API needs is_ready
+        # but then this becomes yet another competitor for cycles
+        asyncio.get_running_loop().run_in_executor(None,
+                                                   self._patch_on_connect)
+        return
+
+    async def _read_standard_cuuids(self):
+        await asyncio.gather(
             self.read_cuuid(CUUID.StateInfo),
             self.read_cuuid(CUUID.Versions),
             self.read_cuuid(CUUID.ShotSettings),
         )
 
-        event_list.append(self._cuuid_dict[CUUID.StateInfo].ready_event)
+    async def _wait_for_ready_events(self, event_list: List[asyncio.Event],
+                                     addr_low_list: List[MMR0x80LowAddr]):
+        """
+        Wait for the MMR reads and StateInfo, re-requesting on timeout
+        """
+        t0 = time.time()
+        event_list = event_list + [
+            self._cuuid_dict[CUUID.StateInfo].ready_event]
 
         gather_list = [event.wait() for event in event_list]
 
@@ -238,26 +313,13 @@ class DE1 (Singleton, ManagedBleakDevice):
                 idx += 1
             self.logger.error("Stupidly continuing anyway after re-requesting")
 
+    async def _set_app_feature_flags(self):
         # "By definition" this version understands UserNotPresent substate
         # it is de1app that is broken and the reason the toggle exists
         if self.feature_flag.app_feature_flag_user_present:
             await self.write_and_read_back_mmr0x80(
                 MMR0x80LowAddr.APP_FEATURE_FLAGS, AppFeatureFlag.USER_PRESENT)
 
-        # Although generally not needed "immediately", deferring to "ready"
-        # can result in timeouts as ready can trigger multiple API requests
-        await self.fetch_calibration()
-
-        await FlowSequencer().on_de1_nearly_ready()
-
-        self._notify_ready()
-
-        # There's a Catch-22 here as the API needs is_ready
-        # but then this becomes yet another competitor for cycles
-        asyncio.get_running_loop().run_in_executor(None,
-                                                   self._patch_on_connect)
-        return
-
 
     def _patch_on_connect(self):
         poc = config.de1.PATCH_ON_CONNECT
@@ -272,6 +334,8 @@ class DE1 (Singleton, ManagedBleakDevice):
                 config.http.SERVER_ROOT
             )
             self.logger.info(f"Making request to {de1_url}")
+            # Only here, not worth importing for every Controller start
+            import requests
             # This ends up blocking as it doesn't release the thread
             req = requests.patch(
                 url=de1_url,
@@ -313,6 +377,10 @@ class DE1 (Singleton, ManagedBleakDevice):
     def feature_flags(self):
         return self._feature_flag.as_dict()
 
+    @property
+    def mmr_cache(self) -> MMRCache:
+        return self._mmr_cache
+
     @property
     def cal_factory(self):
         return copy(self._cal_factory)
@@ -346,10 +414,7 @@ class DE1 (Singleton, ManagedBleakDevice):
                 "'scan' requested, but already connected. "
                 "No action taken.")
         else:
-            device = await find_first_matching(DeviceRole.DE1)
-            if device:
-                await self.change_address(device)
-                await self.capture()
+            await capture_known_or_first_matching(self)
         return self.address
 
     @property
@@ -639,13 +704,20 @@ class DE1 (Singleton, ManagedBleakDevice):
 
         Read and wait for MMR0x80LowAddr.CPU_FIRMWARE_BUILD so that
         feature_flag can be used to determine "safe" reads
-        """
 
-        await self.read_one_mmr0x80_and_wait(MMR0x80LowAddr.CPU_FIRMWARE_BUILD)
+        Block 1 is contiguous with CPU_FIRMWARE_BUILD, so is read with it.
+        Its registers describe the hardware, so are not re-read
+        on reconnect to the same DE1 (see MMRCache).
+        """
 
         start_block_1 = MMR0x80LowAddr.HW_CONFIG
         end_block_1 = MMR0x80LowAddr.V13_MODEL
-        words_block_1 = int((end_block_1 - start_block_1) / 4)
+
+        # CPU_FIRMWARE_BUILD is not retained across connections
+        block_1 = list(range(start_block_1, end_block_1 + 4, 4))
+        event_list = await self._mmr_cache.request(
+            block_1 + [MMR0x80LowAddr.CPU_FIRMWARE_BUILD])
+        await event_list.pop().wait()
 
         # Always skip the debug log region
 
@@ -653,11 +725,9 @@ class DE1 (Singleton, ManagedBleakDevice):
 
             start_block_2 = MMR0x80LowAddr.FAN_THRESHOLD
             end_block_2 = self.feature_flag.last_mmr0x80
-            words_block_2 = int((end_block_2 - start_block_2) / 4)
 
             start_block_3 = None
             end_block_3 = None
-            words_block_3 = 0
 
         else:
 
@@ -666,37 +736,26 @@ class DE1 (Singleton, ManagedBleakDevice):
 
             start_block_2 = MMR0x80LowAddr.FAN_THRESHOLD
             end_block_2 = MMR0x80LowAddr.GHC_INFO
-            words_block_2 = int((end_block_2 - start_block_2) / 4)
 
             start_block_3 = MMR0x80LowAddr.TARGET_STEAM_FLOW
             end_block_3 = self.feature_flag.last_mmr0x80
-            words_block_3 = int((end_block_3 - start_block_3) / 4)
 
         # Generated "bleak.exc.BleakDBusError: org.bluez.Error.InProgress"
         # from assert_reply in write_gatt_char in block_3 write
         #
         # Not clear if this is by adapter, device, or characteristic
         #
-        # await asyncio.gather(
-        #     self.read_mmr(words_block_1 - 1, 0x80, start_block_1),
-        #     self.read_mmr(words_block_2 - 1, 0x80, start_block_2),
-        #     self.read_mmr(words_block_3 - 1, 0x80, start_block_3),
-        # )
-
-        event_list = await self.read_mmr(
-            words_block_1, 0x80, start_block_1)
-        event_list.extend(await self.read_mmr(
-            words_block_2, 0x80, start_block_2))
-        if words_block_3:
-            event_list.extend(await self.read_mmr(
-                words_block_3, 0x80, start_block_3))
-
-        addr_low_list = []
-        addr_low_list.extend(range(start_block_1, end_block_1 + 4, 4))
+        # MMRCache serializes the block reads and splits the request
+        # at the registers that are not safe to read on this firmware
+
+        addr_low_list = list(block_1)
         addr_low_list.extend(range(start_block_2, end_block_2 + 4, 4))
-        if words_block_3:
+        if start_block_3 is not None:
             addr_low_list.extend(range(start_block_3, end_block_3 + 4, 4))
 
+        event_list.extend(await self._mmr_cache.request(
+            addr_low_list[len(block_1):]))
+
         return event_list, addr_low_list
 
 
@@ -720,6 +779,55 @@ class DE1 (Singleton, ManagedBleakDevice):
                                                         upload_to_de1=False)
         return {'id': pbf.id, 'fingerprint': pbf.fingerprint}
 
+    async def store_json_v2_profiles(self, profiles: Union[bytes,
+                                                           bytearray,
+                                                           str,
+                                                           UploadedFile]) \
+            -> dict:
+        """
+        Bulk import to the database, but not the DE1, in one transaction
+
+        A JSON list, each entry either a profile, or a string with
+        the source of one. The source of a string is kept verbatim,
+        so its id is the same as from store_json_v2_profile()
+
+        A profile with the same fingerprint as one already stored
+        is not added again. The id returned is that of the stored one.
+        """
+        if isinstance(profiles, UploadedFile):
+            profiles = profiles.read()
+        try:
+            entries = json.loads(profiles)
+        except json.JSONDecodeError as e:
+            raise DE1APIValueError(f"Expected a JSON list of profiles: {e}")
+        if not isinstance(entries, list):
+            raise DE1APITypeError(
+                f"Expected a JSON list of profiles, not {type(entries)}")
+
+        pbf_list = []
+        for idx, entry in enumerate(entries):
+            if isinstance(entry, str):
+                entry = entry.encode('utf-8')
+            else:
+                entry = json.dumps(entry, indent=4).encode('utf-8')
+            try:
+                pbf = ProfileByFrames().from_json(entry)
+                self._fingerprint_profile_by_frames(pbf)
+            except (ValueError, KeyError, TypeError) as e:
+                raise DE1APIValueError(
+                    f"Profile at index {idx} not imported: {repr(e)}")
+            pbf_list.append(pbf)
+            # Parsing is CPU-bound, don't hold off the notifications
+            await asyncio.sleep(0)
+
+        async with aiosqlite.connect(config.database.FILENAME) as db:
+            results = await profile_library.import_profiles(
+                pbf_list, db, time.time())
+        return {
+            'added': len([r for r in results if r['added']]),
+            'profiles': results,
+        }
+
     async def _process_json_v2_profile_inner(
             self, profile: Union[bytes,
                            bytearray,
@@ -900,11 +1008,9 @@ class DE1 (Singleton, ManagedBleakDevice):
 
         mmr_record = self._mmr_dict[addr_low]
 
-        if mmr_record.last_requested is None:
-            await self.read_one_mmr0x80(addr_low)
-        if not mmr_record.ready_event.is_set():
+        if not self._mmr_cache.is_fresh(addr_low):
             self.logger.info(f"About to wait for {addr_low.__repr__()}")
-        await mmr_record.ready_event.wait()
+        await self._mmr_cache.request_and_wait((addr_low,))
 
         # old = mmr_record.data_decoded
         # value = (old + 0.1) % 20
@@ -913,12 +1019,9 @@ class DE1 (Singleton, ManagedBleakDevice):
         if value != mmr_record.data_decoded:
             pa = pack_one_mmr0x80_write(addr_low,
                                         value)
+            # write_packed_attr() reads back and waits for the new value
             await self.write_packed_attr(pa)
 
-            # Queue a read-back to update DE1
-            asyncio.create_task(
-                self.read_one_mmr0x80(addr_low))
-
     #
     # Firmware updating
     #
@@ -927,9 +1030,35 @@ class DE1 (Singleton, ManagedBleakDevice):
     #       or is the presence of the process "safe enough"?
 
     async def upload_firmware_from_content(self,
-                                           content: Union[bytes, bytearray]):
-        fw = FirmwareFile(content=content)
-        await self.upload_firmware(fw)
+                                           content: Union[bytes, bytearray,
+                                                          UploadedFile]):
+        """
+        Add to the firmware catalog, validating it in a worker thread,
+        then upload to the DE1 from there
+
+        Refused if the DE1 already has this version,
+        unless config.de1.FIRMWARE_REFUSE_INSTALLED is False
+        """
+        entry = await firmware_catalog.add_image(content)
+        installed = self.feature_flag.fw_version
+        if installed == entry.version \
+                and config.de1.FIRMWARE_REFUSE_INSTALLED:
+            raise DE1APIValueError(
+                f"Firmware {entry.version} is already installed")
+        fw = FirmwareFile(filename=entry.path)
+        try:
+            task = await self.upload_firmware(fw)
+        except Exception:
+            fw.close()
+            raise
+
+        def mark_uploaded(t: asyncio.Task):
+            if not t.cancelled() and t.exception() is None and t.result():
+                asyncio.create_task(
+                    firmware_catalog.mark_uploaded(entry.sha256),
+                    name='FirmwareMarkUploaded')
+
+        task.add_done_callback(mark_uploaded)
 
     @property
     def uploading_firmware(self):
@@ -969,6 +1098,12 @@ class DE1 (Singleton, ManagedBleakDevice):
                            total=0))
 
     async def _upload_firmware(self, fw: FirmwareFile, sleep=False):
+        try:
+            return await self._upload_firmware_inner(fw, sleep=sleep)
+        finally:
+            fw.close()
+
+    async def _upload_firmware_inner(self, fw: FirmwareFile, sleep=False):
         start_addr = 0x000000
         write_size = 0x10
         bytes_written = 0
@@ -1038,6 +1173,8 @@ class DE1 (Singleton, ManagedBleakDevice):
         )
 
         success =  fw_map_result.FirstError == FWErrorMapResponse.NoneFound
+        # Don't trust what is known about the DE1 after new firmware
+        self._mmr_cache.forget()
         if success:
             result = FirmwareUploadState.COMPLETED
         else:
@@ -1170,6 +1307,14 @@ class DE1 (Singleton, ManagedBleakDevice):
         if value not in [50, 60]:
             raise DE1APIValueError(f"Line frequency must be 50 or 60 ({value})")
         self._line_frequency = value
+        self._sample_clock.line_frequency = value
+
+    @property
+    def sample_clock(self) -> SampleClock:
+        """
+        The DE1's clock, recovered from ShotSample, see sample_clock.py
+        """
+        return self._sample_clock
 
     # Perhaps one day volume dispensed will be tracked by the firmware
 
@@ -1190,24 +1335,30 @@ class DE1 (Singleton, ManagedBleakDevice):
         """
         A list of estimated volume dispensed by frame
         """
-        return copy(self._volume_dispensed_by_frame)
+        return self._volume_dispensed_by_frame.tolist()
 
     def _reset_volume_dispensed(self):
         self._volume_dispensed_preinfuse = 0
         self._volume_dispensed_pour = 0
         self._volume_dispensed_total = 0
-        self._volume_dispensed_by_frame = [0] * MAX_FRAMES
+        self._volume_dispensed_by_frame[:] = _NO_VOLUME_BY_FRAME
+        self._volume_last_frame = None
 
     async def _shot_sample_update_subscriber(self, ssu: ShotSampleUpdate):
 
-        # Track volume dispensed
+        if config.de1.CLOCK_RECOVERY:
+            de1_time = self._sample_clock.de1_time(ssu.sample_time,
+                                                   ssu.arrival_time)
+        else:
+            de1_time = None
 
-        # TODO: Reconstruct original DE1 clock prior to EventPayload
+        # Track volume dispensed
 
         # sample time is counts of half-cycles in a 16-bit unsigned int
         # Expect 25 if nothing is missed, 4 per second on 50 Hz, ~5 on 60
+        volume_frame = None
         if self._ssus_start_up:
-            start_up = False
+            self._ssus_start_up = False
         else:
             t_inc = ssu.sample_time - self._ssus_last_sample_time
             if t_inc < 0:
@@ -1230,9 +1381,8 @@ class DE1 (Singleton, ManagedBleakDevice):
 
             if use_this and self._tracking_volume_dispensed:
                 v_inc = ssu.group_flow * t_inc / (self.line_frequency * 2)
-                # since de1.volume_dispensed creates a copy,
-                # and this should be the only "writer" other than clear
-                # don't use a lock
+                # This should be the only "writer" other than clear
+                # so don't use a lock
 
                 # TODO: Convince Ray to return substate and state
                 #       in ShotSample so don't need to use frame count
@@ -1247,16 +1397,34 @@ class DE1 (Singleton, ManagedBleakDevice):
                 else:
                     to_frame = 0
                 self._volume_dispensed_by_frame[to_frame] += v_inc
+                volume_frame = to_frame
 
         self._ssus_last_sample_time = ssu.sample_time
 
+        # The whole of volume_by_frame only when the frame changes
+        # and when tracking stops, otherwise the frame that changed
+        if volume_frame is not None:
+            materialize = volume_frame != self._volume_last_frame
+            self._volume_last_frame = volume_frame
+        else:
+            materialize = self._volume_was_tracking \
+                          and not self._tracking_volume_dispensed
+        self._volume_was_tracking = self._tracking_volume_dispensed
+
         await self._event_shot_sample_with_volumes_update.publish(
             ShotSampleWithVolumesUpdate(
                 ssu,
                 volume_preinfuse=self._volume_dispensed_preinfuse,
                 volume_pour=self._volume_dispensed_pour,
                 volume_total=self._volume_dispensed_total,
-                volume_by_frame=self._volume_dispensed_by_frame,
+                de1_time=de1_time,
+                volume_frame=volume_frame,
+                volume_frame_value=(
+                    None if volume_frame is None
+                    else self._volume_dispensed_by_frame[volume_frame]),
+                volume_by_frame=(
+                    self._volume_dispensed_by_frame.tolist() if materialize
+                    else None),
             )
         )
 
@@ -1428,7 +1596,7 @@ class DE1 (Singleton, ManagedBleakDevice):
         # Ensure GHC data has been read
         if self._mmr_dict[MMR0x80LowAddr.GHC_INFO].data_decoded is None:
             self.logger.info("GHC_INFO not present, reading now.")
-            await self.read_one_mmr0x80_and_wait(MMR0x80LowAddr.GHC_INFO)
+            await self._mmr_cache.request_and_wait((MMR0x80LowAddr.GHC_INFO,))
 
         cs = self.current_state
         if cs == API_MachineStates.NoRequest:
@@ -8,7 +8,6 @@ SPDX-License-Identifier: GPL-3.0-only
 Common events for the DE1 itself
 """
 
-from copy import copy
 from typing import Optional, List
 
 from pyDE1.de1.c_api import API_MachineStates, API_Substates
@@ -101,7 +100,13 @@ class ShotSampleWithVolumesUpdate (ShotSampleUpdate):
     Delivered after ShotSampleUpdate,
     includes calculated then tracked volumes
 
-    de1_time is preferred as it may eventually be time-base adjusted
+    volume_frame is the frame whose volume changed with this sample,
+    with its volume as volume_frame_value. All the frames are only in
+    volume_by_frames when the frame changes and when tracking stops,
+    otherwise it is None.
+
+    de1_time is preferred, it is from the DE1's clock, see sample_clock.py,
+    without the jitter of the arrival time
     """
     _internal_only = False
 
@@ -109,7 +114,10 @@ class ShotSampleWithVolumesUpdate (ShotSampleUpdate):
                  volume_preinfuse: float,
                  volume_pour: float,
                  volume_total: float,
-                 volume_by_frame: List[float],
+                 de1_time: Optional[float] = None,
+                 volume_frame: Optional[int] = None,
+                 volume_frame_value: Optional[float] = None,
+                 volume_by_frame: Optional[List[float]] = None,
                  ):
         # TODO: Is there a better way to do this?
         super(ShotSampleWithVolumesUpdate, self).__init__(
@@ -127,10 +135,13 @@ class ShotSampleWithVolumesUpdate (ShotSampleUpdate):
             steam_temp=shot_sample_update.steam_temp,
         )
         # NB: (Future) TODO: manage carefully as depends on super
-        self._version = "1.2.0"  # Major version incremented on breaking change
+        self._version = "2.1.0"  # Major version incremented on breaking change
 
-        self.de1_time = self.arrival_time
+        self.de1_time = self.arrival_time if de1_time is None else de1_time
         self.volume_preinfuse = volume_preinfuse
         self.volume_pour = volume_pour
         self.volume_total = volume_total
-        self.volume_by_frames = copy(volume_by_frame)
+        self.volume_frame = volume_frame
+        self.volume_frame_value = volume_frame_value
+        # Not copied, DE1 materializes it for each
+        self.volume_by_frames = volume_by_frame
@@ -1,16 +1,34 @@
 """
-Copyright © 2021 Jeff Kletsky. All Rights Reserved.
+Copyright © 2021, 2023 Jeff Kletsky. All Rights Reserved.
 
 License for this software, part of the pyDE1 package, is granted under
 GNU General Public License v3.0 only
 SPDX-License-Identifier: GPL-3.0-only
+
+A firmware image, from a file or from content
+
+A file is mmap()ed, rather than read, so that the image isn't copied
+into memory to validate it or to upload it. The header is checked,
+and the CRCs of the header and of what follows it are computed, in place.
+With sha256, such as of an upload streamed to a file, the image has to
+match it. close() when done, which removes the file if delete is set.
 """
 
 import binascii
-import zlib
+import hashlib
+import mmap
+import os
 from struct import unpack
+from typing import Optional
+
+import pyDE1
+from pyDE1.config import config
+from pyDE1.exceptions import DE1APIValueError, DE1ValueError
+
+logger = pyDE1.getLogger('DE1.Firmware')
 
-from pyDE1.exceptions import DE1ValueError
+BOARD_MARKER = 0xDE100001
+HEADER_LENGTH = 64
 
 
 # typedef struct {
@@ -29,7 +47,8 @@ from pyDE1.exceptions import DE1ValueError
 
 class FirmwareFile():
 
-    def __init__(self, content=None, filename=None):
+    def __init__(self, content=None, filename=None,
+                 sha256: Optional[str] = None, delete=False):
         if filename is not None and content is not None:
             raise ValueError(
                 "Only one of 'content' and 'filename' can be specified"
@@ -45,6 +64,11 @@ class FirmwareFile():
         self._initialization_vector = None
         self._header_checksum = None
         self._content = None
+        self._file = None
+        self._sha256 = sha256
+        self._delete = delete
+        self.header_crc = None
+        self.body_crc = None
 
         if filename is not None:
             self.filename = filename
@@ -62,6 +86,8 @@ class FirmwareFile():
         self._dc_sum = None
         self._initialization_vector = None
         self._header_checksum = None
+        self.header_crc = None
+        self.body_crc = None
 
     @property
     def filename(self):
@@ -83,9 +109,53 @@ class FirmwareFile():
         self._content = value
         self._populate_from_content()
 
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def crc_matches(self) -> bool:
+        return (self.header_crc == self._header_checksum
+                and self.body_crc == self._checksum)
+
     def _load_from_file(self):
-        with open(self._filename, 'rb') as fh:
-            self.content  = fh.read()
+        self._file = open(self._filename, 'rb')
+        try:
+            # mmap() of an empty file raises ValueError
+            if os.fstat(self._file.fileno()).st_size < HEADER_LENGTH:
+                raise DE1ValueError(
+                    "Firmware is shorter than its header, "
+                    f"{os.fstat(self._file.fileno()).st_size} bytes")
+            content = mmap.mmap(self._file.fileno(), 0,
+                                access=mmap.ACCESS_READ)
+            if self._sha256 is not None:
+                with memoryview(content) as view:
+                    sha256 = hashlib.sha256(view).hexdigest()
+                if sha256 != self._sha256:
+                    content.close()
+                    raise DE1APIValueError(
+                        f"Firmware does not match its SHA-256, {sha256} "
+                        f"rather than {self._sha256}")
+            self.content = content
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Unmap and close the file, removing it if delete was set
+        """
+        if isinstance(self._content, mmap.mmap):
+            self._content.close()
+            self._content = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if self._delete:
+                try:
+                    os.unlink(self._filename)
+                except FileNotFoundError:
+                    pass
 
     def _populate_from_content(self):
         # See T_FirmwareHeader
@@ -93,7 +163,11 @@ class FirmwareFile():
         #   7, 32-bit words (28 bytes)
         #   32-byte initialization vector
         #   1, 32-bit word of checksum (4 bytes)
-        header = self._content[0:64]
+        if len(self._content) < HEADER_LENGTH:
+            raise DE1ValueError(
+                "Firmware is shorter than its header, "
+                f"{len(self._content)} bytes")
+        header = bytes(self._content[0:HEADER_LENGTH])
         (
             self._checksum,     # Excludes "Header"
             self._board_marker, # 0xDE100001
@@ -106,35 +180,49 @@ class FirmwareFile():
             self._header_checksum,  # Checksum of header itself
         ) = unpack('IIIIIII32sI', header)
         self._header = header
-        remainder = self._content[64:]
-        self._bytes_following = len(remainder)
-        if self._board_marker != 0xDE100001:
+        self._bytes_following = len(self._content) - HEADER_LENGTH
+        if self._board_marker != BOARD_MARKER:
             raise DE1ValueError(
                 "Firmware board marker not found, likely not valid firmware.")
+        if self._byte_count > self._bytes_following:
+            raise DE1ValueError(
+                f"Firmware truncated, {self._bytes_following} bytes "
+                f"follow the header, rather than {self._byte_count}")
+
+        # In place, without a copy of what follows the header
+        self.header_crc = binascii.crc32(header[0:60])
+        with memoryview(self._content) as view:
+            self.body_crc = binascii.crc32(view[HEADER_LENGTH:])
+        if not self.crc_matches:
+            message = (
+                f"Firmware {self._version} CRCs don't match, "
+                f"header 0x{self.header_crc:08x} "
+                f"reported 0x{self._header_checksum:08x}, "
+                f"body 0x{self.body_crc:08x} "
+                f"reported 0x{self._checksum:08x}")
+            if config.de1.FIRMWARE_REQUIRE_CRC:
+                raise DE1ValueError(message)
+            logger.warning(message)
 
 
 if __name__ == '__main__':
-    ff = FirmwareFile(filename='/home/jeff/fw/bootfwupdate.dat.1265')
-
-    # Not clear why
-    print()
-    print(f"version:  {ff._version}")
-    print(f"binascii: {binascii.crc32(ff._header[0:60]):08x}")
-    print(f"zlib:     {zlib.crc32(ff._header[0:60]):08x}")
-    print(f"reported: {ff._header_checksum:08x}")
-    remainder = ff._content[64:]
-    remainder_checksum = binascii.crc32(remainder)
-    print()
-    print(f"File:   {len(ff._content)}")
-    print(f"length: {len(remainder)}")
-    print(f"bcount: {ff._byte_count}, "
-          f"diff: {len(remainder) - ff._byte_count}")
-    print()
-    print(f"evaluated: {remainder_checksum:08x}")
-    print(f"reported : {ff._checksum:08x}")
-
-    print()
-    print("done")
+    import sys
+
+    # python -m pyDE1.de1.firmware_file <image> ...
+    for filename in sys.argv[1:]:
+        ff = FirmwareFile(filename=filename)
+        print()
+        print(filename)
+        print(f"version:   {ff.version}")
+        print(f"length:    {ff._bytes_following}, "
+              f"byte count: {ff._byte_count}, "
+              f"diff: {ff._bytes_following - ff._byte_count}")
+        print(f"header:    0x{ff.header_crc:08x} "
+              f"reported 0x{ff._header_checksum:08x}")
+        print(f"body:      0x{ff.body_crc:08x} "
+              f"reported 0x{ff._checksum:08x}")
+        print(f"CRCs match: {ff.crc_matches}")
+        ff.close()
 
 """
 Firmware update process:
@@ -25,7 +25,8 @@ from pyDE1.exceptions import DE1ErrorStateReported, MMRAddressOffsetError
 from pyDE1.utils import data_as_readable_or_hex, data_as_hex
 
 # Logging is set to DEBUG by default. This effectively disables them
-# with independent control. (The evaluation of the f-string is still done)
+# with independent control. The loggers are fetched once per handler
+# and log_string() is only evaluated if DEBUG is enabled
 for cuuid in CUUID:
     pyDE1.getLogger(
         f"DE1.{cuuid.__str__()}.Notify").setLevel(logging.INFO)
@@ -76,55 +77,65 @@ GO WITH THAT ASSUMPTION
 
 def create_Versions_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.Versions.__str__()}.Notify")
+
     async def Versions_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = Versions().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.Versions].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.Versions.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return Versions_callback
 
 
 def create_RequestedState_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.RequestedState.__str__()}.Notify")
+
     async def RequestedState_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = RequestedState().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.RequestedState].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.RequestedState.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return RequestedState_callback
 
 
 def create_SetTime_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.SetTime.__str__()}.Notify")
+
     async def SetTime_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = SetTime().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.SetTime].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.SetTime.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return SetTime_callback
 
 
 def create_ShotDirectory_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.ShotDirectory.__str__()}.Notify")
+
     async def ShotDirectory_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         # obj = ShotDirectory().from_wire_bytes(data, arrival_time)
         # logger.debug(obj.log_string())
         de1._cuuid_dict[CUUID.ShotDirectory].mark_updated(data, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.ShotDirectory.__str__()}.Notify")
-        logger.debug(f"{data_as_readable_or_hex(data)} ({len(data)})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{data_as_readable_or_hex(data)} ({len(data)})")
     return ShotDirectory_callback
 
 
 def create_ReadFromMMR_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.ReadFromMMR.__str__()}.Notify")
+
     async def ReadFromMMR_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
@@ -142,8 +153,8 @@ def create_ReadFromMMR_callback(de1: de1):
                                             from_response=True)
         # Logging of the full response is intentionally
         # early as MMR may contain multiple registers
-        logger = pyDE1.getLogger(f"DE1.{CUUID.ReadFromMMR.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
         if obj.addr_high != 0x80:
             # Can't write these to de1._mmr_dict as it assumes 0x80
             logger.error(
@@ -185,6 +196,8 @@ def create_ReadFromMMR_callback(de1: de1):
 
 def create_WriteToMMR_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.WriteToMMR.__str__()}.Notify")
+
     async def WriteToMMR_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
@@ -194,92 +207,105 @@ def create_WriteToMMR_callback(de1: de1):
 
         obj = WriteToMMR().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.WriteToMMR].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.WriteToMMR.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return WriteToMMR_callback
 
 
 def create_ShotMapRequest_callback(de1:de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.ShotMapRequest.__str__()}.Notify")
+
     async def ShotMapRequest_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         # obj = ShotMapRequest().from_wire_bytes(data, arrival_time)
         # logger.debug(obj.log_string())
         de1._cuuid_dict[CUUID.ShotMapRequest].mark_updated(data, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.ShotMapRequest.__str__()}.Notify")
-        logger.debug(f"{data_as_readable_or_hex(data)} ({len(data)})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{data_as_readable_or_hex(data)} ({len(data)})")
     return ShotMapRequest_callback
 
 
 def create_DeleteShotRange_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.DeleteShotRange.__str__()}.Notify")
+
     async def DeleteShotRange_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         # obj = DeleteShotRange().from_wire_bytes(data, arrival_time)
         # logger.debug(obj.log_string())
         de1._cuuid_dict[CUUID.DeleteShotRange].mark_updated(data, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.DeleteShotRange.__str__()}.Notify")
-        logger.debug(f"{data_as_readable_or_hex(data)} ({len(data)})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{data_as_readable_or_hex(data)} ({len(data)})")
     return DeleteShotRange_callback
 
 
 def create_FWMapRequest_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.FWMapRequest.__str__()}.Notify")
+
     async def FWMapRequest_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = FWMapRequest().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.FWMapRequest].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.FWMapRequest.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return FWMapRequest_callback
 
 
 def create_Temperatures_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.Temperatures.__str__()}.Notify")
+
     async def Temperatures_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = Temperatures().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.Temperatures].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.Temperatures.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return Temperatures_callback
 
 
 def create_ShotSettings_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.ShotSettings.__str__()}.Notify")
+
     async def ShotSettings_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = ShotSettings().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.ShotSettings].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.ShotSettings.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return ShotSettings_callback
 
 
 def create_Deprecated_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.Deprecated.__str__()}.Notify")
+
     async def Deprecated_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         # obj = Deprecated().from_wire_bytes(data, arrival_time)
         # logger.debug(obj.log_string())
         de1._cuuid_dict[CUUID.Deprecated].mark_updated(data, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.Deprecated.__str__()}.Notify")
         logger.error(f"{data_as_readable_or_hex(data)} ({len(data)})")
     return Deprecated_callback
 
 
 def create_ShotSample_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.ShotSample.__str__()}.Notify")
+
     async def ShotSample_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
-        obj = ShotSample().from_wire_bytes(data, arrival_time)
+        obj = ShotSample.from_notification(data, arrival_time)
         de1._cuuid_dict[CUUID.ShotSample].mark_updated(obj, arrival_time)
         await de1._event_shot_sample.publish(
             ShotSampleUpdate(
@@ -296,8 +322,8 @@ def create_ShotSample_callback(de1: de1):
                 frame_number=obj.FrameNumber,
                 steam_temp=obj.SteamTemp,
             ))
-        logger = pyDE1.getLogger(f"DE1.{CUUID.ShotSample.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return ShotSample_callback
 
 
@@ -309,6 +335,8 @@ def create_StateInfo_callback(de1: de1):
     and that the "fairness" of the lock will keep things in order
     """
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.StateInfo.__str__()}.Notify")
+
     previous_state = API_MachineStates.NoRequest
     previous_substate = API_Substates.NoState
     previous_lock = asyncio.Lock()
@@ -317,12 +345,11 @@ def create_StateInfo_callback(de1: de1):
         nonlocal de1, previous_state, previous_substate, previous_lock
 
         arrival_time = time.time()
-        obj = StateInfo().from_wire_bytes(data, arrival_time)
+        obj = StateInfo.from_notification(data, arrival_time)
         de1._cuuid_dict[CUUID.StateInfo].mark_updated(obj, arrival_time)
 
         if obj.State == API_MachineStates.FatalError or obj.SubState.is_error:
             details = f"DE1 reported error condition: {obj.log_string()}"
-            logger = pyDE1.getLogger(f"DE1.{CUUID.StateInfo.__str__()}.Notify")
             logger.error(details)
             raise DE1ErrorStateReported(details)
 
@@ -343,41 +370,47 @@ def create_StateInfo_callback(de1: de1):
             previous_state = obj.State
             previous_substate = obj.SubState
 
-        logger = pyDE1.getLogger(f"DE1.{CUUID.StateInfo.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return StateInfo_callback
 
 
 def create_HeaderWrite_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.HeaderWrite.__str__()}.Notify")
+
     async def HeaderWrite_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = HeaderWrite().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.HeaderWrite].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.HeaderWrite.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return HeaderWrite_callback
 
 
 def create_FrameWrite_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.FrameWrite.__str__()}.Notify")
+
     async def FrameWrite_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = FrameWrite().from_wire_bytes(data, arrival_time)
         de1._cuuid_dict[CUUID.FrameWrite].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.FrameWrite.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return FrameWrite_callback
 
 
 def create_WaterLevels_callback(de1: de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.WaterLevels.__str__()}.Notify")
+
     async def WaterLevels_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
-        obj = WaterLevels().from_wire_bytes(data, arrival_time)
+        obj = WaterLevels.from_notification(data, arrival_time)
         de1._cuuid_dict[CUUID.WaterLevels].mark_updated(obj, arrival_time)
         await de1._event_water_levels.publish(
             WaterLevelUpdate(
@@ -385,20 +418,21 @@ def create_WaterLevels_callback(de1: de1):
                 level=obj.Level,
                 start_fill_level=obj.StartFillLevel,
             ))
-        logger = pyDE1.getLogger(f"DE1.{CUUID.WaterLevels.__str__()}.Notify")
-        logger.debug(obj.log_string())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(obj.log_string())
     return WaterLevels_callback
 
 
 def create_Calibration_callback(de1:de1):
 
+    logger = pyDE1.getLogger(f"DE1.{CUUID.Calibration.__str__()}.Notify")
+
     async def Calibration_callback(sender: int, data: Union[bytes, bytearray]):
         nonlocal de1
         arrival_time = time.time()
         obj = Calibration().from_wire_bytes(data, arrival_time)
         # TODO: This notifies multiple values from the same CUUID
         de1._cuuid_dict[CUUID.Calibration].mark_updated(obj, arrival_time)
-        logger = pyDE1.getLogger(f"DE1.{CUUID.Calibration.__str__()}.Notify")
         cal_set = None
         setter = None
 
@@ -0,0 +1,291 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Cache and read coalescing for the 0x80 MMR registers
+
+The values themselves remain in DE1._mmr_dict (MMR0x80Data),
+this layer decides if they are still usable and, if not,
+merges the pending requests into as few block reads as possible.
+If a block read fails, all waiting for its registers, or those of the
+reads after it, are released and request_and_wait() raises its error.
+
+Staleness policy:
+  * Registers that describe the hardware never change for a given DE1
+    and are retained across reconnects to the same address
+  * CPU_FIRMWARE_BUILD doesn't change while connected, but is re-read
+    on connect as another app may have updated the firmware
+  * read_always registers (USER_PRESENT and the like) are never fresh
+  * Everything else is kept current by the read-back after a write,
+    optionally limited by config.de1.MMR_CACHE_TTL
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pyDE1
+from pyDE1.config import config
+from pyDE1.de1.c_api import MMR0x80LowAddr
+from pyDE1.de1.notifications import MMR0x80Data
+
+logger = pyDE1.getLogger('DE1.MMRCache')
+
+# Hardware description, retained across reconnects to the same DE1
+NEVER_CHANGES = frozenset((
+    MMR0x80LowAddr.HW_CONFIG,
+    MMR0x80LowAddr.MODEL,
+    MMR0x80LowAddr.CPU_BOARD_MODEL,
+    MMR0x80LowAddr.V13_MODEL,
+    MMR0x80LowAddr.SERIAL_NUMBER,
+))
+
+# Fixed while connected, re-read on connect
+FIXED_WHILE_CONNECTED = NEVER_CHANGES | frozenset((
+    MMR0x80LowAddr.CPU_FIRMWARE_BUILD,
+))
+
+# Reading a couple of unneeded registers is cheaper than a round trip
+MAX_GAP_WORDS = 2
+
+
+class MMRCache:
+
+    def __init__(self, de1):
+        self._de1 = de1
+        self._pending: set = set()
+        # Why the last read of each of these wasn't made
+        self._failed: Dict[int, BaseException] = {}
+        self._flush_waiting = False
+        # Only one block read in flight, parallel writes can result in
+        # bleak.exc.BleakDBusError: org.bluez.Error.InProgress
+        self._read_lock = asyncio.Lock()
+        self._retained_address: Optional[str] = None
+        self._retained: Dict[int, Union[bytes, bytearray]] = {}
+        # What is in DE1._mmr_dict is no longer to be trusted
+        self._skip_retain = False
+
+        self.requests = 0
+        self.hits = 0
+        self.in_flight = 0
+        self.ble_reads = 0
+        self.registers_read = 0
+
+    @property
+    def ble_reads_avoided(self) -> int:
+        """
+        Compared to one read per requested register
+        """
+        return self.requests - self.ble_reads
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'hits': self.hits,
+            'in_flight': self.in_flight,
+            'ble_reads': self.ble_reads,
+            'registers_read': self.registers_read,
+            'ble_reads_avoided': self.ble_reads_avoided,
+        }
+
+    @staticmethod
+    def ttl(addr_low: int) -> Optional[float]:
+        """
+        Seconds a value can be used, None if it doesn't expire
+        """
+        try:
+            mmr = MMR0x80LowAddr(addr_low)
+        except ValueError:
+            return 0
+        if mmr in FIXED_WHILE_CONNECTED:
+            return None
+        if mmr.read_always:
+            return 0
+        return config.de1.MMR_CACHE_TTL
+
+    def _mmr_data(self, addr_low: int) -> MMR0x80Data:
+        mmr_dict = self._de1._mmr_dict
+        if addr_low not in mmr_dict:
+            mmr_dict[addr_low] = MMR0x80Data(addr_low)
+        return mmr_dict[addr_low]
+
+    def is_fresh(self, addr_low: int, now: Optional[float] = None) -> bool:
+        mmr_data = self._mmr_data(addr_low)
+        if mmr_data.data_decoded is None or mmr_data.last_updated is None:
+            return False
+        if not mmr_data.ready_event.is_set():
+            return False
+        ttl = self.ttl(addr_low)
+        if ttl is None:
+            return True
+        if now is None:
+            now = time.time()
+        return (now - mmr_data.last_updated) < ttl
+
+    def _is_in_flight(self, mmr_data: MMR0x80Data, now: float) -> bool:
+        return (mmr_data.last_requested is not None
+                and not mmr_data.ready_event.is_set()
+                and (now - mmr_data.last_requested)
+                    < config.de1.MAX_WAIT_FOR_READY_EVENTS)
+
+    async def request(self, addr_list: Iterable[int]) -> List[asyncio.Event]:
+        """
+        Returns the ready events for the registers, in order,
+        issuing block reads for any that are not fresh or already requested
+
+        Requests made by other tasks before the reads are issued
+        are merged into the same block reads.
+        """
+        now = time.time()
+        events = []
+        for addr_low in addr_list:
+            self.requests += 1
+            mmr_data = self._mmr_data(addr_low)
+            if self.is_fresh(addr_low, now):
+                self.hits += 1
+            elif self._is_in_flight(mmr_data, now):
+                self.in_flight += 1
+            else:
+                # Clear the event now so a stale value isn't taken as ready
+                mmr_data.mark_requested(now)
+                self._pending.add(addr_low)
+                self._failed.pop(addr_low, None)
+            events.append(mmr_data.ready_event)
+
+        if self._pending and not self._flush_waiting:
+            await self._flush()
+        return events
+
+    async def request_and_wait(self, addr_list: Iterable[int]):
+        """
+        Raises what prevented any of the registers from being read
+        """
+        addr_list = list(addr_list)
+        events = await self.request(addr_list)
+        await asyncio.gather(*[event.wait() for event in events])
+        for addr_low in addr_list:
+            if (e := self._failed.get(addr_low)) is not None:
+                raise e
+
+    async def _flush(self):
+        self._flush_waiting = True
+        try:
+            # Let any other requesters on this pass of the loop add theirs
+            await asyncio.sleep(0)
+        finally:
+            self._flush_waiting = False
+        async with self._read_lock:
+            addr_list = sorted(self._pending)
+            self._pending.clear()
+            for (start, words) in self.spans(addr_list):
+                self.ble_reads += 1
+                self.registers_read += words
+                try:
+                    await self._de1.read_mmr(words - 1, 0x80, start)
+                except BaseException as e:
+                    self._fail([a for a in addr_list if a >= start], e)
+                    raise
+
+    def _fail(self, addr_list: List[int], e: BaseException):
+        """
+        Release those waiting for registers that weren't read,
+        they are requested again the next time
+        """
+        logger.error(f"Unable to read {len(addr_list)} registers: {repr(e)}")
+        for addr_low in addr_list:
+            mmr_data = self._mmr_data(addr_low)
+            mmr_data.last_requested = None
+            self._failed[addr_low] = e
+            mmr_data.ready_event.set()
+
+    def _gap_is_readable(self, addr_low: int) -> bool:
+        try:
+            mmr = MMR0x80LowAddr(addr_low)
+        except ValueError:
+            return False
+        if MMR0x80LowAddr.in_debug_buffer(addr_low) \
+                or mmr in (MMR0x80LowAddr.DEBUG_LEN,
+                           MMR0x80LowAddr.DEBUG_CONFIG):
+            return False
+        if mmr.can_read:
+            return True
+        # PREF_GHC_MCI and MAX_SHOT_PRESS can hang older firmware
+        return bool(self._de1.feature_flag.safe_to_read_mmr_continuous)
+
+    def spans(self, addr_list: List[int]) -> List[Tuple[int, int]]:
+        """
+        Sorted addresses to a list of (start, words) block reads
+        """
+        spans = []
+        start = None
+        last = None
+        for addr_low in addr_list:
+            if start is not None:
+                gap = range(last + 4, addr_low, 4)
+                if (len(gap) <= MAX_GAP_WORDS
+                        and all(map(self._gap_is_readable, gap))):
+                    last = addr_low
+                    continue
+                spans.append((start, (last - start) // 4 + 1))
+            start = addr_low
+            last = addr_low
+        if start is not None:
+            spans.append((start, (last - start) // 4 + 1))
+        return spans
+
+    #
+    # Retention of the hardware description across reconnects
+    #
+
+    def retain(self, address: Optional[str]):
+        """
+        Call before DE1._mmr_dict is wiped
+        """
+        if self._skip_retain:
+            self._skip_retain = False
+            return
+        if not address:
+            return
+        retained = {}
+        for addr_low in NEVER_CHANGES:
+            mmr_data = self._de1._mmr_dict.get(addr_low)
+            if mmr_data is not None and mmr_data.data_raw is not None:
+                retained[addr_low] = mmr_data.data_raw
+        if len(retained):
+            self._retained_address = address
+            self._retained = retained
+
+    def restore(self, address: Optional[str]) -> int:
+        """
+        Populate the registers retained for this address,
+        returning how many were restored
+        """
+        if not address or address != self._retained_address:
+            self._clear()
+            return 0
+        now = time.time()
+        for addr_low, data_raw in self._retained.items():
+            mmr_data = self._mmr_data(addr_low)
+            mmr_data.mark_requested(now)
+            mmr_data.data_raw = data_raw
+            mmr_data.mark_updated(data_raw, now)
+        logger.info(
+            f"Restored {len(self._retained)} registers for {address}")
+        return len(self._retained)
+
+    def forget(self):
+        """
+        Drop what is retained, as after a firmware upload. What was read
+        before it isn't to be trusted either, so the next retain(),
+        on the disconnect that follows, is skipped
+        """
+        self._clear()
+        self._skip_retain = True
+
+    def _clear(self):
+        self._retained_address = None
+        self._retained = {}
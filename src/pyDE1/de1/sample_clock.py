@@ -0,0 +1,231 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Recover the DE1's clock from ShotSample.SampleTime
+
+SampleTime counts half-cycles of the AC in a 16-bit unsigned int,
+so wraps every 546 seconds on 60 Hz. It is unwrapped into a count
+that doesn't, which, at twice the line frequency, is the DE1's time.
+Each ShotSample arrives some time after that, with the BLE delay that
+varies from one packet to the next.
+
+A least-squares line of arrival time against the DE1's time, over a
+sliding window of recent samples, gives the arrival that would be
+expected for each sample, without the jitter of any one packet.
+Its slope tracks the drift of the line frequency against the clock
+of this host. That expected arrival is de1_time.
+
+If the arrivals are too far apart to know how many times the counter
+wrapped, or a sample arrives far from the line, as when the DE1 has
+restarted, the fit starts over. de1_time doesn't step back across that,
+only across reset(), on reconnecting or a change of line frequency.
+
+Only the delay beyond that of the fastest packet can be known from
+the arrivals. stats() reports that as the latency, along with
+the jitter and drift, for the process metrics.
+"""
+
+from collections import deque
+from math import sqrt
+from typing import Optional
+
+import pyDE1
+
+logger = pyDE1.getLogger('DE1.Clock')
+
+_COUNTER_MODULUS = 1 << 16
+
+
+class SampleClock:
+
+    def __init__(self, line_frequency: int,
+                 window: int = 1200,
+                 min_samples: int = 10,
+                 restart_error: float = 1.0,
+                 max_drift: float = 0.01):
+
+        self._line_frequency = line_frequency
+        self._window = window   # samples, about four minutes
+        self._min_samples = min_samples
+        self._restart_error = restart_error     # seconds from the line
+        self._max_drift = max_drift     # fraction, otherwise the slope is 1
+
+        self.restarts = 0
+
+        # (count, arrival)
+        self._samples: deque = deque()
+        self.reset()
+
+    def reset(self):
+        self._samples.clear()
+        self._count = 0
+        self._last_sample_time: Optional[int] = None
+        self._last_arrival: Optional[float] = None
+        self._last_de1_time: Optional[float] = None
+        self._since_rebase = 0
+        # Relative to an origin, so that the sums keep their precision
+        self._x0 = 0
+        self._y0 = 0.0
+        self._n = 0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    @property
+    def line_frequency(self) -> int:
+        return self._line_frequency
+
+    @line_frequency.setter
+    def line_frequency(self, value: int):
+        if value != self._line_frequency:
+            self._line_frequency = value
+            self.reset()
+
+    @property
+    def count(self) -> int:
+        """
+        Half-cycles since the fit started, SampleTime unwrapped
+        """
+        return self._count
+
+    def _add(self, count: int, arrival: float):
+        x = count - self._x0
+        y = arrival - self._y0
+        self._n += 1
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._sxy += x * y
+
+    def _remove(self, count: int, arrival: float):
+        x = count - self._x0
+        y = arrival - self._y0
+        self._n -= 1
+        self._sx -= x
+        self._sy -= y
+        self._sxx -= x * x
+        self._sxy -= x * y
+
+    def _rebase(self):
+        """
+        Move the origin to the oldest sample and recompute the sums,
+        which also drops what has accumulated from add and remove
+        """
+        (self._x0, self._y0) = self._samples[0]
+        self._n = 0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        for (count, arrival) in self._samples:
+            self._add(count, arrival)
+        self._since_rebase = 0
+
+    @property
+    def period(self) -> float:
+        """
+        Seconds of arrival time per half-cycle, nominal until there are
+        enough samples, or if the fit drifts further than is credible
+        """
+        nominal = 1 / (2 * self._line_frequency)
+        if self._n < self._min_samples:
+            return nominal
+        denominator = self._n * self._sxx - self._sx * self._sx
+        if denominator <= 0:
+            return nominal
+        slope = (self._n * self._sxy - self._sx * self._sy) / denominator
+        if abs(slope / nominal - 1) > self._max_drift:
+            return nominal
+        return slope
+
+    def expected_arrival(self, count: Optional[int] = None) -> Optional[float]:
+        """
+        Arrival time on the line for the count, the latest if None
+        """
+        if count is None:
+            count = self._count
+        if not self._n:
+            return None
+        slope = self.period
+        intercept = (self._sy - slope * self._sx) / self._n
+        return self._y0 + intercept + slope * (count - self._x0)
+
+    def _restart(self, reason: str):
+        logger.info(f"Restarting, {reason}")
+        self.restarts += 1
+        # Still the same DE1, so de1_time doesn't step back
+        last_de1_time = self._last_de1_time
+        self.reset()
+        self._last_de1_time = last_de1_time
+
+    def de1_time(self, sample_time: int, arrival_time: float) -> float:
+        """
+        Call once per ShotSample, returns its expected arrival time,
+        never earlier than that of the sample before
+        """
+        if self._last_sample_time is not None:
+            dt = arrival_time - self._last_arrival
+            # Half the wrap, beyond that the number of wraps isn't known
+            if not 0 <= dt < _COUNTER_MODULUS / (4 * self._line_frequency):
+                self._restart(f"{dt:.3f} sec since the last sample")
+            else:
+                count = self._count + (
+                    (sample_time - self._last_sample_time) % _COUNTER_MODULUS)
+                error = arrival_time - self.expected_arrival(count)
+                if abs(error) > self._restart_error:
+                    self._restart(f"{error:.3f} sec from the fit")
+                else:
+                    self._count = count
+
+        if not self._samples:
+            self._x0 = self._count
+            self._y0 = arrival_time
+        self._samples.append((self._count, arrival_time))
+        self._add(self._count, arrival_time)
+        self._last_sample_time = sample_time
+        self._last_arrival = arrival_time
+
+        # By time as well, as samples may have been lost
+        while self._samples[0][0] <= self._count - self._window * 25:
+            self._remove(*self._samples.popleft())
+        while len(self._samples) > self._window:
+            self._remove(*self._samples.popleft())
+
+        self._since_rebase += 1
+        if self._since_rebase >= self._window:
+            self._rebase()
+
+        de1_time = self.expected_arrival()
+        if self._last_de1_time is not None and de1_time < self._last_de1_time:
+            de1_time = self._last_de1_time
+        self._last_de1_time = de1_time
+        return de1_time
+
+    def stats(self) -> Optional[dict]:
+        """
+        Of the samples in the window, None without enough of them
+
+        latency     mean seconds each arrived after the fastest
+        jitter      standard deviation of the arrivals about the fit
+        drift_ppm   seconds here per second of the DE1, less one,
+                    positive when the line frequency is low
+        """
+        if self._n < self._min_samples:
+            return None
+        slope = self.period
+        intercept = (self._sy - slope * self._sx) / self._n
+        residuals = [arrival - self._y0 - intercept - slope * (count - self._x0)
+                     for (count, arrival) in self._samples]
+        fastest = min(residuals)
+        mean = sum(residuals) / len(residuals)
+        jitter = sqrt(sum((r - mean) ** 2 for r in residuals) / len(residuals))
+        return {
+            'samples': len(residuals),
+            'latency': round(mean - fastest, 4),
+            'jitter': round(jitter, 4),
+            'drift_ppm': round(
+                (slope * 2 * self._line_frequency - 1) * 1e6, 1),
+            'restarts': self.restarts,
+        }
@@ -0,0 +1,164 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Several GET and PATCH operations in one round trip to the controller
+
+POST batch takes a list of operations:
+
+    [
+        {"method": "GET", "resource": "de1/setting"},
+        {"method": "PATCH", "resource": "de1/control/espresso",
+         "body": {"stop_at_weight": 51}},
+        {"method": "GET", "resource": "de1/profiles",
+         "query": {"title": "allonge"}}
+    ]
+
+Each is validated in the inbound process, as it would be if requested
+on its own. Those that are valid are sent together as the payload of
+a single APIRequest. An operation that fails validation is sent as the
+APIResponse with its exception, in its place, so that the order is kept.
+
+The controller runs consecutive GETs concurrently. A PATCH waits for
+those before it, and those after it wait for the PATCH, so that a GET
+after a PATCH sees the change. The APIResponse of each is returned,
+in order, as the payload of the response to the batch.
+
+Resources served by the inbound process itself, such as logs and
+metrics, can't be in a batch.
+"""
+
+import asyncio
+import time
+from traceback import TracebackException
+from typing import Awaitable, Callable, List, Union
+
+from pyDE1.dispatcher.payloads import APIRequest, APIResponse, HTTPMethod
+from pyDE1.dispatcher.plan import plan_for
+from pyDE1.dispatcher.resource import Resource
+from pyDE1.dispatcher.validate import validate_patch_return_targets
+from pyDE1.exceptions import DE1APITypeError, DE1APIValueError
+
+BATCH_METHODS = (HTTPMethod.GET, HTTPMethod.PATCH)
+
+# Served by the inbound process, not the controller
+NOT_IN_BATCH = (
+    Resource.BATCH,
+    Resource.LOG,
+    Resource.LOGS,
+    Resource.METRICS,
+)
+
+
+def _failed(timestamp: float, exception: Exception) -> APIResponse:
+    return APIResponse(original_timestamp=timestamp,
+                       timestamp=time.time(),
+                       payload=None,
+                       exception=exception,
+                       tbe=TracebackException.from_exception(exception))
+
+
+def _request_for(timestamp: float, operation) -> APIRequest:
+    if not isinstance(operation, dict):
+        raise DE1APITypeError(
+            f"Each operation must be an object, not {type(operation)}")
+    try:
+        method = HTTPMethod(operation.get('method'))
+    except ValueError:
+        method = None
+    if method not in BATCH_METHODS:
+        raise DE1APIValueError(
+            f"Method of {operation.get('method')} is not one of "
+            f"{[m.value for m in BATCH_METHODS]}")
+    try:
+        resource = Resource(operation.get('resource'))
+    except ValueError:
+        raise DE1APIValueError(
+            f"Unrecognized resource {operation.get('resource')}")
+    if resource in NOT_IN_BATCH \
+            or (method is HTTPMethod.GET and not resource.can_get) \
+            or (method is HTTPMethod.PATCH and not resource.can_patch):
+        raise DE1APIValueError(
+            f"{method.value} {resource.value} is not permitted in a batch")
+
+    if method is HTTPMethod.GET:
+        if resource is Resource.DE1_PROFILES:
+            payload = operation.get('query', {})
+            if not isinstance(payload, dict):
+                raise DE1APITypeError(
+                    f"query must be an object, not {type(payload)}")
+        else:
+            payload = None
+        # Not actionable here as connectivity is unknown
+        requires = dict(plan_for(resource).requires)
+    else:
+        if 'body' not in operation:
+            raise DE1APIValueError(
+                f"No body provided for PATCH {resource.value}")
+        payload = operation['body']
+        requires = validate_patch_return_targets(resource=resource,
+                                                 patch=payload)
+
+    return APIRequest(timestamp=timestamp,
+                      method=method,
+                      resource=resource,
+                      connectivity_required=requires,
+                      payload=payload)
+
+
+def batch_requests(timestamp: float, operations: list,
+                   limit: int) -> List[Union[APIRequest, APIResponse]]:
+    """
+    The APIRequest for each operation, or, if it isn't valid,
+    the APIResponse with why
+
+    Raises DE1APITypeError or DE1APIValueError if the batch itself isn't
+    """
+    if not isinstance(operations, list):
+        raise DE1APITypeError(
+            f"A batch must be a list of operations, not {type(operations)}")
+    if len(operations) > limit:
+        raise DE1APIValueError(
+            f"A batch of {len(operations)} operations is over "
+            f"the limit of {limit}")
+    items = []
+    for operation in operations:
+        try:
+            items.append(_request_for(timestamp, operation))
+        except Exception as e:
+            items.append(_failed(timestamp, e))
+    return items
+
+
+async def run_batch(items: List[Union[APIRequest, APIResponse]],
+                    respond: Callable[[APIRequest], Awaitable[APIResponse]]) \
+        -> List[APIResponse]:
+    """
+    respond() to each APIRequest, consecutive GETs concurrently,
+    see module docstring
+
+    respond() is expected to return an APIResponse with the exception,
+    rather than raise
+    """
+    responses: List[APIResponse] = [None] * len(items)
+    gets = []
+
+    async def run_gets():
+        results = await asyncio.gather(*[respond(items[i]) for i in gets])
+        for (i, response) in zip(gets, results):
+            responses[i] = response
+        gets.clear()
+
+    for (i, item) in enumerate(items):
+        if isinstance(item, APIResponse):
+            responses[i] = item
+        elif item.method is HTTPMethod.GET:
+            gets.append(i)
+        else:
+            await run_gets()
+            responses[i] = await respond(item)
+    await run_gets()
+    return responses
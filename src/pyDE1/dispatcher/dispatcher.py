@@ -18,7 +18,10 @@ import traceback
 from traceback import TracebackException
 
 import pyDE1
+from pyDE1.database.firmware_catalog import list_firmware
+from pyDE1.database.profile_library import list_profiles_from_api
 from pyDE1.de1 import DE1
+from pyDE1.dispatcher.batch import run_batch
 from pyDE1.dispatcher.implementation import (
     get_resource_to_dict, patch_resource_from_dict, generate_mqtt_push
 )
@@ -104,8 +107,7 @@ async def _request_queue_processor(request_queue: asyncio.Queue,
             elif not scale_processor.scale.is_ready:
                 raise DE1NotConnectedError("Scale not ready")
 
-    while True:
-        got: APIRequest = await request_queue.get()
+    async def respond(got: APIRequest) -> APIResponse:
         logger.debug(f"{got.method.name} {got.resource.name} requires "
                      f"{got.connectivity_required}")
         resource_dict = {}
@@ -118,7 +120,13 @@ async def _request_queue_processor(request_queue: asyncio.Queue,
 
             try:
                 _check_connectivity(got)
-                resource_dict = await get_resource_to_dict(got.resource)
+                if got.resource is Resource.DE1_PROFILES:
+                    # From the database, the payload is the query parameters
+                    resource_dict = await list_profiles_from_api(got.payload)
+                elif got.resource is Resource.DE1_FIRMWARES:
+                    resource_dict = await list_firmware()
+                else:
+                    resource_dict = await get_resource_to_dict(got.resource)
             except Exception as e:
                 exception = e
                 tbe = TracebackException.from_exception(exception)
@@ -193,6 +201,7 @@ async def _request_queue_processor(request_queue: asyncio.Queue,
                 if got.resource not in (Resource.DE1_PROFILE,
                                         Resource.DE1_PROFILE_ID,
                                         Resource.DE1_PROFILE_STORE,
+                                        Resource.DE1_PROFILES,
                                         Resource.DE1_FIRMWARE,
                                         Resource.DE1_FIRMWARE_CANCEL,
                                         Resource.SCAN):
@@ -202,7 +211,8 @@ async def _request_queue_processor(request_queue: asyncio.Queue,
                     # is a complete replacement.
 
                 # Profile store to database needs no device connectivity
-                if got.resource == Resource.DE1_PROFILE_STORE:
+                if got.resource in (Resource.DE1_PROFILE_STORE,
+                                    Resource.DE1_PROFILES):
                     check_de1 = False
                 else:
                     check_de1 = True
@@ -232,6 +242,26 @@ async def _request_queue_processor(request_queue: asyncio.Queue,
                                        f"{got.method} is not supported"
                                    ))
 
+        return response
+
+    async def respond_to_batch(got: APIRequest) -> APIResponse:
+        logger.debug(f"Batch of {len(got.payload)}")
+        responses = await run_batch(got.payload, respond)
+        return APIResponse(original_timestamp=got.timestamp,
+                           timestamp=time.time(),
+                           payload=responses)
+
+    while True:
+        got: APIRequest = await request_queue.get()
+        if got.method is HTTPMethod.POST \
+                and got.resource is Resource.BATCH:
+            response = await respond_to_batch(got)
+            requests = [item for item in got.payload
+                        if isinstance(item, APIRequest)]
+        else:
+            response = await respond(got)
+            requests = [got]
+
         response_queue.put_nowait(response)
         if (qd := response_queue.qsize()) > QUEUE_TOO_DEEP:
             logger.error(
@@ -239,7 +269,8 @@ async def _request_queue_processor(request_queue: asyncio.Queue,
                 f"{qd} > {QUEUE_TOO_DEEP}")
 
         # Not all are implemented methods
-        if got.method in (HTTPMethod.PUT, HTTPMethod.PATCH,
-                          HTTPMethod.POST, HTTPMethod.DELETE):
-            await generate_mqtt_push(req=got)
+        for req in requests:
+            if req.method in (HTTPMethod.PUT, HTTPMethod.PATCH,
+                              HTTPMethod.POST, HTTPMethod.DELETE):
+                await generate_mqtt_push(req=req)
 
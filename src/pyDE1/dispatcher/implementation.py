@@ -15,7 +15,7 @@ import json
 import math  # for nan to be uniquely math.nan
 import time
 from functools import reduce
-from typing import Union, Dict, Set
+from typing import Union, Dict, FrozenSet
 
 import pyDE1.scanner
 from pyDE1 import scanner
@@ -23,8 +23,11 @@ from pyDE1.config import config
 from pyDE1.de1 import DE1
 from pyDE1.de1.c_api import PackedAttr, MMR0x80LowAddr, pack_one_mmr0x80_write
 from pyDE1.de1.notifications import MMR0x80Data
-from pyDE1.dispatcher.mapping import MAPPING, TO, IsAt
-from pyDE1.dispatcher.payloads import APIRequest
+from pyDE1.dispatcher.mapping import TO, IsAt
+from pyDE1.dispatcher.payloads import APIRequest, UploadedFile
+from pyDE1.dispatcher.plan import (
+    Accessor, Branch, Kind, ResourcePlan, plan_for
+)
 from pyDE1.dispatcher.resource import Resource
 from pyDE1.event_manager.event_manager import SubscribedEvent
 from pyDE1.exceptions import (
@@ -35,7 +38,6 @@ from pyDE1.flow_sequencer import FlowSequencer
 from pyDE1.scale.processor import ScaleProcessor
 from pyDE1.scanner import scan_from_api
 from pyDE1.utils import prep_for_json
-from pyDE1.utils_public import rgetattr, rsetattr
 
 logger = pyDE1.getLogger('Inbound.Implementation')
 
@@ -101,6 +103,9 @@ def get_timeout(prop, value):
     elif name in ('set_profile_by_id', 'upload_json_v2_profile'):
         timeout = config.http.PROFILE_TIMEOUT
 
+    elif name == 'store_json_v2_profiles':
+        timeout = config.http.PROFILE_IMPORT_TIMEOUT
+
     elif name == 'stop_at_time_set_async':
         timeout = config.http.ASYNC_TIMEOUT * 2
 
@@ -141,59 +146,88 @@ async def _prop_value_getter(prop):
     return retval
 
 
-# NB: This assumes that the MMR and CUUID are kept up to date
-#     and that those that are read don't change on their own
+class _Targets (dict):
+    """
+    The objects that TO names, looked up once in a request, when needed
+    """
 
-async def _get_isat_value(isat: IsAt):
+    def __missing__(self, to: TO):
+        obj = self[to] = _TARGET_LOOKUP[to]()
+        return obj
 
-    # TODO: if IsAt.use_getter is implemented in the future, change here
 
-    target = isat.target
-    attr_path = isat.attr_path
-    if attr_path is None:
-        raise DE1APIAttributeError(f"Write-only attribute {isat.__repr__()}")
+_TARGET_LOOKUP = {
+    TO.DE1: DE1,
+    TO.FlowSequencer: FlowSequencer,
+    TO.Scale: lambda: ScaleProcessor().scale,
+    TO.ScaleProcessor: ScaleProcessor,
+    TO.Thermometer:
+        lambda: FlowSequencer()._steam_temp_controller._thermometer,
+    TO.Scanner: lambda: scanner,
+}
 
-    de1 = DE1()
-    flow_sequencer = FlowSequencer()
-    scale_processor = ScaleProcessor()
-    scale = scale_processor.scale
-    thermometer = flow_sequencer._steam_temp_controller._thermometer
 
-    retval = None
+# NB: This assumes that the MMR and CUUID are kept up to date
+#     and that those that are read don't change on their own
 
-    # For any attribute or property with a getter, getattr() "just works"
-    # If possibly a callable, need to
-    #     await _prop_value_getter(rgetattr(target, attr_path))
+async def _read_plan_mmrs(plan: ResourcePlan,
+                          targets: _Targets) -> FrozenSet[MMR0x80LowAddr]:
+    """
+    Request every MMR of the plan that isn't fresh, at once, so that
+    the MMRCache reads them in as few block reads as it can,
+    returning those read
+    """
+    if not plan.mmr_targets:
+        return frozenset()
+    de1 = targets[TO.DE1]
+    if not de1.is_ready:
+        # Raised for each, as before
+        return frozenset()
+    last_mmr0x80 = de1.feature_flag.last_mmr0x80
+    now = time.time()
+    to_read = [mmr for mmr in plan.mmr_targets
+               if mmr.value <= last_mmr0x80
+               and not de1.mmr_cache.is_fresh(mmr, now)]
+    if to_read:
+        t0 = time.time()
+        await de1.mmr_cache.request_and_wait(to_read)
+        t1 = time.time()
+        logger.debug(
+            f"Read of {len(to_read)} MMRs for {plan.resource} took \t"
+            f"{(t1 - t0) * 1000:6.1f} ms"
+        )
+    return frozenset(to_read)
 
-    if target == TO.DE1:
-        retval = rgetattr(de1, attr_path)
 
-    elif target == TO.FlowSequencer:
-        retval = rgetattr(flow_sequencer, attr_path)
+async def _get_accessor_value(accessor: Accessor, targets: _Targets,
+                              mmrs_read: FrozenSet = frozenset()):
 
-    elif target == TO.Scale:
-        retval = rgetattr(scale, attr_path)
+    # TODO: if IsAt.use_getter is implemented in the future, change here
 
-    elif target == TO.ScaleProcessor:
-        retval = rgetattr(scale_processor, attr_path)
+    if accessor.get is None:
+        raise DE1APIAttributeError(
+            f"Write-only attribute {accessor.isat.__repr__()}")
 
-    elif target == TO.Thermometer:
-        retval = rgetattr(thermometer, attr_path)
+    kind = accessor.kind
+    target = accessor.target
 
-    elif isinstance(target, MMR0x80LowAddr):
+    # For any attribute or property with a getter, getattr() "just works"
+    # If possibly a callable, need to
+    #     await _prop_value_getter(accessor.get(obj))
+
+    if kind is Kind.OBJECT:
+        retval = accessor.get(targets[target])
+
+    elif kind is Kind.MMR:
         # NB: This assumes that the MMR and CUUID are kept up to date
         #     and that those that are read don't change on their own
         # 2022-08: .read_always attribute added to handle self-changing MMRs
 
+        de1 = targets[TO.DE1]
         if not de1.is_ready:
             raise DE1NotConnectedError(
                 "DE1 is not connected at last-chance check")
 
-        if attr_path != '':
-            raise DE1APIAttributeError(
-                "MMR reads do not support attr_path "
-                f"{isat}")
-
         # For now, assume everything is kept current
 
         # TODO: Unify with replication in PATCH operation
@@ -204,26 +238,23 @@ async def _get_isat_value(isat: IsAt):
                 f"Skipping (not in FW) {target.name}, "
                 f"0x{target.value:04x} > 0x{de1.feature_flag.last_mmr0x80:04x}")
         else:
-            try:
-                retval = de1._mmr_dict[target].data_decoded
-            except KeyError:
-                retval = None
-            if retval is None or target.read_always:
+            # read_always MMRs are never fresh, even when just read
+            if target not in mmrs_read \
+                    and not de1.mmr_cache.is_fresh(target):
                 t0 = time.time()
-                # TODO: Can this be simplified/clarified?
-                ready = await de1.read_one_mmr0x80(target)
-                await ready.wait()
-                retval = de1._mmr_dict[target].data_decoded
+                await de1.mmr_cache.request_and_wait((target,))
                 t1 = time.time()
                 logger.debug(
                     f"Read of {target.__repr__()} took \t"
                     f"{(t1 - t0) * 1000:6.1f} ms"
                 )
+            retval = de1._mmr_dict[target].data_decoded
 
-    elif inspect.isclass(target) and issubclass(target, PackedAttr):
+    elif kind is Kind.PACKED_ATTR:
         # NB: This assumes that the MMR and CUUID are kept up to date
         #     and that those that are read don't change on their own
 
+        de1 = targets[TO.DE1]
         if not de1.is_ready:
             raise DE1NotConnectedError(
                 "DE1 is not connected at last-chance check")
@@ -242,7 +273,7 @@ async def _get_isat_value(isat: IsAt):
             logger.debug(
                 f"Read of {target} took \t{(t1 - t0) * 1000:6.1f} ms"
             )
-        retval = rgetattr(obj, attr_path)
+        retval = accessor.get(obj)
 
     else:
         raise DE1APITypeError(
@@ -252,112 +283,51 @@ async def _get_isat_value(isat: IsAt):
     return prep_for_json(retval)
 
 
-async def _get_mapping_to_dict(partial_dict: dict) -> dict:
+async def _get_plan_to_dict(plan: ResourcePlan) -> dict:
     """
-    Takes a "branch" of a mapping and
-      * Fills in any IsAt values
-      * Recursively calls itself if a dict
-      * Passes any other values unmodified
+    Fills in each Accessor, in the order of the mapping
     """
 
-    if isinstance(partial_dict, IsAt):
-        partial_dict = { None: partial_dict }
-
-    if not isinstance(partial_dict, dict):
-        raise DE1APITypeError(f"Expected a dict, not {type(partial_dict)}")
-
+    prune = config.http.PRUNE_EMPTY_NODES
+    targets = _Targets()
     retval = {}
-
-    for k, v in partial_dict.items():
-        if isinstance(v, IsAt):
+    branches = [None] * len(plan.branches)
+    branches[0] = retval
+    mmrs_read = await _read_plan_mmrs(plan, targets)
+
+    def branch_at(index: int) -> dict:
+        # With pruning, a branch is only created when something is put in it
+        if (this_dict := branches[index]) is None:
+            (parent, key) = plan.branches[index]
+            this_dict = branches[index] = branch_at(parent)[key] = {}
+        return this_dict
+
+    for (parent, key, node) in plan.entries:
+        if isinstance(node, Accessor):
             try:
-                this_val = await _get_isat_value(v)
+                this_val = await _get_accessor_value(node, targets,
+                                                     mmrs_read)
             except AttributeError:
-                if config.http.PRUNE_EMPTY_NODES:
-                    continue # Don't write the key's entry
+                if prune:
+                    continue  # Don't write the key's entry
                 else:
                     this_val = math.nan
-        elif isinstance(v, dict):
-            this_val = await _get_mapping_to_dict(v)
+        elif isinstance(node, Branch):
             # Suppress aggregates with nothing to aggregate
-            if len(this_val) == 0 and config.http.PRUNE_EMPTY_NODES:
-                continue
+            if not prune:
+                branch_at(node.index)
+            continue
         else:
-            this_val = v
-        retval[k] = this_val
+            this_val = node.value
+        branch_at(parent)[key] = this_val
 
     return retval
 
 # TODO: set and get versions (no recollection of what this means)
 
-def _get_target_sets_inner(partial_dict: dict,
-                           dict_of_sets: Dict[
-                               str, Set[Union[PackedAttr, MMR0x80LowAddr]]],
-                           include_can_read: bool,
-                           include_can_write: bool):
-    """
-    Takes a "branch" of a mapping and returns a dict with two keys,
-    'PacketAttr' and 'MMR0x80LowAddr', each with a set of targets.
-    The dict_of_sets is modified in-place.
-    """
-
-    # See also validate.py
-    # Valid: dict with dict
-    #        IsAt with byte, bytearray (profile or firmware)
-    if isinstance(partial_dict, IsAt):
-        partial_dict = { None: partial_dict }
-
-    if not isinstance(partial_dict, dict):
-        raise DE1APITypeError(f"Expected a dict, not {type(partial_dict)}")
-
-    for k, isat in partial_dict.items():
-
-        if isinstance(isat, IsAt):
-            target = isat.target
-            if not ((inspect.isclass(target) and issubclass(target, PackedAttr))
-                    or isinstance(target, MMR0x80LowAddr)):
-                continue
-            writable = target.can_write \
-                       and not (isat.read_only
-                                or (isat.attr_path is None
-                                    and isat.setter_path is None))
-            readable = target.can_read and isat.attr_path is not None
-            if ((include_can_read and readable)
-                    or (include_can_write and writable)):
-                if isinstance(target, MMR0x80LowAddr):
-                    dict_of_sets['MMR0x80LowAddr'].add(target)
-                elif inspect.isclass(target) and issubclass(target, PackedAttr):
-                    dict_of_sets['PackedAttr'].add(target)
-            else:
-                if not readable and not writable:
-                    logger.error(
-                        "IsAt should have either or both "
-                        f"attr_path or setter_path not None: {isat.__repr__()}"
-                    )
-
-        elif isinstance(isat, dict):
-            _get_target_sets_inner(isat, dict_of_sets,
-                                   include_can_read, include_can_write)
-
-
-def get_target_sets(mapping: dict,
-                    include_can_read=False, include_can_write=False) \
-        -> Dict[str, Set[Union[MMR0x80LowAddr, PackedAttr]]]:
-
-    retval = {
-        'MMR0x80LowAddr': set(),
-        'PackedAttr': set()
-    }
-
-    _get_target_sets_inner(mapping, retval,
-                           include_can_read, include_can_write)
-    return retval
-
-
 async def get_resource_to_dict(resource: Resource) -> dict:
 
-    mapping = MAPPING[resource]
-    return await _get_mapping_to_dict(mapping)
+    return await _get_plan_to_dict(plan_for(resource))
 
 
 # PATCH and PUT are related, but have slightly different requirements
@@ -373,7 +343,7 @@ async def get_resource_to_dict(resource: Resource) -> dict:
 
 async def patch_resource_from_dict(resource: Resource, values_dict: dict):
 
-    mapping = MAPPING[resource]
+    plan = plan_for(resource)
 
     # Get the list of PackedAttrs that need to be patched (properties and
     # MMRs are handled one at a time, as they are atomic), lock from changes,
@@ -383,20 +353,16 @@ async def patch_resource_from_dict(resource: Resource, values_dict: dict):
     # TODO: PackedAttr "getter" that will wait on a pending update, if one is
     #       in flight, as well as unify the retrieval if not present
 
-    # target_sets = get_target_sets(values_dict, include_can_write=True)
-
-    # TODO: Optimize this -- this needs a mapping, the way it is written now
-    #       It really should only retrieve those that are being changed
-    #       in the case of a PATCH
-
-    target_sets = get_target_sets(mapping, include_can_write=True)
+    # TODO: Optimize this -- this is all in the mapping, the way it is
+    #       written now. It really should only retrieve those that are
+    #       being changed in the case of a PATCH
 
     # Lock here
-    de1 = DE1()
-    flow_sequencer = FlowSequencer()
+    targets = _Targets()
 
-    for pa in target_sets['PackedAttr']:
+    for pa in plan.writable_packed_attrs:
         pa: PackedAttr
+        de1 = targets[TO.DE1]
         cuuid = pa.cuuid
         try:
             last_value = de1._cuuid_dict[cuuid]._last_value
@@ -419,50 +385,59 @@ async def patch_resource_from_dict(resource: Resource, values_dict: dict):
 
     # Valid: dict with dict
     #        IsAt with byte, bytearray (profile or firmware)
-    if isinstance(mapping, dict) \
-            and isinstance(values_dict, dict):
+    if not plan.is_isat and isinstance(values_dict, dict):
         pass
-    elif isinstance(mapping, IsAt) \
-        and isinstance(values_dict, (bytes, bytearray, str)):
+    elif plan.is_isat \
+            and isinstance(values_dict, (bytes, bytearray, str,
+                                         UploadedFile)):
         # TODO: Unify this with validate.py
         # This can be None (firmware, profile,...)
-        if ((t := mapping.internal_type) is not None
+        if ((t := plan.nodes[(None,)].internal_type) is not None
                 and issubclass(t, enum.Enum)):
             values_dict = t(values_dict)
         # coerce into "standard form"
-        mapping = { None: mapping }
         values_dict = { None: values_dict }
     else:
         raise DE1APITypeError(
             "Implementation: Mapping and patch inconsistent, "
             "dict with dict, IsAt with raw/str value "
-            f"not {type(mapping)} with {type(values_dict)}"
+            f"not {'IsAt' if plan.is_isat else 'dict'} "
+            f"with {type(values_dict)}"
         )
 
     results_list = list()
-    await _patch_dict_to_mapping_inner(values_dict,
-                                       mapping,
-                                       pending_packed_attrs,
-                                       list(),
-                                       results_list)
+    await _patch_dict_to_plan_inner(values_dict,
+                                    plan,
+                                    (),
+                                    targets,
+                                    pending_packed_attrs,
+                                    results_list)
 
     # if there are pending_packed_attrs, send them
 
     # Potentially gather, but may not be faster
     for pa in pending_packed_attrs.values():
-        await de1.write_packed_attr(pa)
+        await targets[TO.DE1].write_packed_attr(pa)
 
     # release locks
 
     return results_list
 
 
-async def _patch_dict_to_mapping_inner(partial_value_dict: dict,
-                                       partial_mapping_dict: dict,
-                                       pending_packed_attrs: Dict[
-                                           type(PackedAttr), PackedAttr],
-                                       running_path: list,
-                                       results_list: list):
+def _result_at(accessor: Accessor, retval):
+    # Within the dicts enclosing the accessor,
+    # reduce(lambda a, b: {b: a}, [5,4,3,2,1], 'val')
+    #     {1: {2: {3: {4: {5: 'val'}}}}}
+    return reduce(lambda a, b: {b: a}, reversed(accessor.path[:-1]), retval)
+
+
+async def _patch_dict_to_plan_inner(partial_value_dict: dict,
+                                    plan: ResourcePlan,
+                                    path: tuple,
+                                    targets: _Targets,
+                                    pending_packed_attrs: Dict[
+                                        type(PackedAttr), PackedAttr],
+                                    results_list: list):
 
     """
     This assumes that everything has been determined as "valid"
@@ -490,138 +465,100 @@ async def _patch_dict_to_mapping_inner(partial_value_dict: dict,
     #
     #           The merge patch format is not appropriate for all JSON syntaxes.
 
-    de1 = DE1()
-    flow_sequencer = FlowSequencer()
-    scale_processor = ScaleProcessor()
-    scale = scale_processor.scale
-    thermometer = flow_sequencer._steam_temp_controller._thermometer
-
     for key, new_value in partial_value_dict.items():
 
+        this_path = path + (key,)
         try:
-            mapping_isat = partial_mapping_dict[key]
+            node = plan.nodes[this_path]
         except KeyError:
             raise DE1APIKeyError(
                 f"Unable to find mapping for {key} on the specified path"
             )
 
-        if isinstance(mapping_isat, IsAt):
-            target = mapping_isat.target
-            attr_path = mapping_isat.attr_path
-            setter_path = mapping_isat.setter_path
+        if isinstance(node, Branch):
+            await _patch_dict_to_plan_inner(new_value,
+                                            plan,
+                                            this_path,
+                                            targets,
+                                            pending_packed_attrs,
+                                            results_list)
+            continue
+
+        if not isinstance(node, Accessor):
+            continue
+
+        accessor = node
+        kind = accessor.kind
+        target = accessor.target
+
+        if not accessor.writable:
+            raise DE1APIValueError(
+                f"Mapping for '{key}': {accessor.isat} is not writable"
+            )
 
-            if mapping_isat.read_only or attr_path is None and setter_path is None:
-                raise DE1APIValueError(
-                    f"Mapping for '{key}': {mapping_isat} is not writable"
-                )
+        if kind is Kind.OBJECT:
+            this_target = targets[target]
 
-            if isinstance(target, TO):
-                if target == TO.DE1:
-                    this_target = de1
-                elif target == TO.FlowSequencer:
-                    this_target = flow_sequencer
-                elif target == TO.Scale:
-                    this_target = scale
-                elif target == TO.ScaleProcessor:
-                    this_target = scale_processor
-                elif target == TO.Thermometer:
-                    this_target = thermometer
-                elif target == TO.Scanner:
-                    this_target = scanner
-                else:
-                    raise DE1APITypeError(
-                        f"Unsupported target for '{key}': {mapping_isat}")
-
-                if setter_path is not None:
-                    # Allow for a non-property setter to return a value
-                    setter = rgetattr(this_target, setter_path)
-                    retval = await _prop_value_setter(setter, new_value)
-                    if retval is not None:
-                        # reduce(lambda a, b: {b: a}, [5,4,3,2,1], 'val')
-                        #     {1: {2: {3: {4: {5: 'val'}}}}}
-                        result_dict = reduce(lambda a, b: {b: a},
-                                             running_path,
-                                             retval)
-                        results_list.append(result_dict)
+            if accessor.get_setter is not None:
+                # Allow for a non-property setter to return a value
+                setter = accessor.get_setter(this_target)
+                retval = await _prop_value_setter(setter, new_value)
+                if retval is not None:
+                    results_list.append(_result_at(accessor, retval))
 
-                else:
-                    rsetattr(this_target, attr_path, new_value)
-
-            # TODO: Is there a better way to work with an unbound function?
-            #       Maybe attach it to a module, rathern than a special case?
-            elif target is None:
-                if setter_path == 'scan_from_api':
-                    retval = await scan_from_api(new_value)
-                    if retval is not None:
-                        # reduce(lambda a, b: {b: a}, [5,4,3,2,1], 'val')
-                        #     {1: {2: {3: {4: {5: 'val'}}}}}
-                        result_dict = reduce(lambda a, b: {b: a},
-                                             running_path,
-                                             retval)
-                        results_list.append(result_dict)
-
-            elif isinstance(target, MMR0x80LowAddr):
-
-                # MMR writes need to be serial and are atomic in that
-                # each writable MMR is a single value.
-                # As a result, just write it here and now.
-
-                if attr_path != '':
-                    raise DE1APIValueError(
-                        "MMR writes do not support attr_path "
-                        f"{target} {mapping_isat}")
-
-                if setter_path is not None:
-                    raise DE1APIValueError(
-                        "MMR writes do not support setter_path "
-                        f"{target} {mapping_isat}")
-
-                mmr_write = pack_one_mmr0x80_write(
-                    addr_low= target,
-                    value= new_value,
-                )
+            else:
+                accessor.set_attr(this_target, new_value)
+
+        # TODO: Is there a better way to work with an unbound function?
+        #       Maybe attach it to a module, rathern than a special case?
+        elif kind is Kind.FUNCTION:
+            if accessor.isat.setter_path == 'scan_from_api':
+                retval = await scan_from_api(new_value)
+                if retval is not None:
+                    results_list.append(_result_at(accessor, retval))
+
+        elif kind is Kind.MMR:
+
+            # MMR writes need to be serial and are atomic in that
+            # each writable MMR is a single value.
+            # As a result, just write it here and now.
+
+            de1 = targets[TO.DE1]
+            mmr_write = pack_one_mmr0x80_write(
+                addr_low= target,
+                value= new_value,
+            )
 
-                logger.debug(f"MMR to be written: {mmr_write.as_wire_bytes()}")
+            logger.debug(f"MMR to be written: {mmr_write.as_wire_bytes()}")
 
-                await de1.write_packed_attr(mmr_write)
+            await de1.write_packed_attr(mmr_write)
 
-                # TODO: Should this wait on ready.wait() ??
-                #       Or is there a way to collect them all for later
-                #       as a speed optimization?
-                ns: MMR0x80Data = de1._mmr_dict[target]
-                await ns.ready_event.wait()
+            # TODO: Should this wait on ready.wait() ??
+            #       Or is there a way to collect them all for later
+            #       as a speed optimization?
+            ns: MMR0x80Data = de1._mmr_dict[target]
+            await ns.ready_event.wait()
 
-            elif inspect.isclass(target) and issubclass(target, PackedAttr):
-                # NB: This assumes that the CUUIDs are kept up to date
-                #     and that those that are read don't change on their own
+        elif kind is Kind.PACKED_ATTR:
+            # NB: This assumes that the CUUIDs are kept up to date
+            #     and that those that are read don't change on their own
 
-                packed_attr = (de1._cuuid_dict[target.cuuid]).last_value
-                # TODO: Can this be sped up reliably?
-                if packed_attr is None:
-                    packed_attr = await de1.read_cuuid(target.cuuid)
-                old_value = rgetattr(packed_attr, attr_path)
-                if new_value != old_value:
-                    if not target in pending_packed_attrs:
-                        pending_packed_attrs[target] = copy.deepcopy(packed_attr)
-                    rsetattr(pending_packed_attrs[target], attr_path, new_value)
+            de1 = targets[TO.DE1]
+            packed_attr = (de1._cuuid_dict[target.cuuid]).last_value
+            # TODO: Can this be sped up reliably?
+            if packed_attr is None:
+                packed_attr = await de1.read_cuuid(target.cuuid)
+            old_value = accessor.get(packed_attr)
+            if new_value != old_value:
+                if not target in pending_packed_attrs:
+                    pending_packed_attrs[target] = copy.deepcopy(packed_attr)
+                accessor.set_attr(pending_packed_attrs[target], new_value)
 
-                # Send in outer method once all nodes are visited
+            # Send in outer method once all nodes are visited
 
-            else:
-                raise DE1APITypeError(
-                    f"Mapping target of {target} is not recognized")
-
-        elif isinstance(mapping_isat, dict):
-            # TODO: Where did "this_val" (unused) come from?
-            this_val = await _patch_dict_to_mapping_inner(
-                partial_value_dict[key],
-                partial_mapping_dict[key],
-                pending_packed_attrs,
-                # Prepend as reduce needs "reversed" list and need copy anyway
-                running_path=[mapping_isat] + running_path,
-                results_list=results_list)
         else:
-            this_val = new_value
+            raise DE1APITypeError(
+                f"Mapping target of {target} is not recognized")
 
 
 async def generate_mqtt_push(req: APIRequest):
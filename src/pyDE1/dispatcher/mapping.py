@@ -25,12 +25,13 @@ from pyDE1.de1.c_api import (
     PackedAttr, MMR0x80LowAddr,
     SetTime, ShotSettings, Versions, WaterLevels,
 )
+from pyDE1.dispatcher.payloads import UploadedFile
 from pyDE1.dispatcher.resource import (
     Resource, RESOURCE_VERSION, DE1ModeEnum, ConnectivityEnum
 )
 
 from pyDE1.event_manager.events import DeviceRole
-from pyDE1.bledev.managed_bleak_device import CaptureRequest
+from pyDE1.bledev.capture_queue import CaptureRequest
 
 
 try:
@@ -38,7 +39,7 @@ try:
 except ImportError:
     source_data = None
 
-MAPPING_VERSION = "7.0.0"
+MAPPING_VERSION = "7.2.0"
 
 logger = pyDE1.getLogger('Inbound.Mapping')
 
@@ -96,32 +97,6 @@ class IsAt(NamedTuple):
         return retval
 
 
-def mapping_requires(mapping: dict) -> dict:
-    results = {
-        'DE1': False,
-        'Scale': False
-    }
-    return _mapping_requires_inner(mapping, results)
-
-
-def _mapping_requires_inner(mapping: dict, results: dict) -> dict:
-    for val in mapping.values():
-        if isinstance(val, IsAt):
-            if val.requires_connected_de1:
-                results['DE1'] = True
-            if val.requires_connected_scale:
-                results['Scale'] = True
-
-        if isinstance(val, dict):
-            _mapping_requires_inner(val, results)
-
-        # TODO: Maybe one day generify this
-        if results['DE1'] and results['Scale']:
-            break
-
-    return results
-
-
 # Helper to populate an IsAt for a PackedAttr
 def from_packed_attr(packed_attr: PackedAttr, attr_path: str, v_type: type,
                      setter_path: Optional[str] = None):
@@ -198,6 +173,7 @@ MAPPING[Resource.VERSION] = {
 }
 
 # "Specials" -- content-only
+# Firmware and bulk profiles may be streamed to a file, see UploadedFile
 
 MAPPING[Resource.DE1_PROFILE] = IsAt(target=TO.DE1, attr_path=None,
                                      setter_path='upload_json_v2_profile',
@@ -207,9 +183,17 @@ MAPPING[Resource.DE1_PROFILE_STORE] = IsAt(target=TO.DE1, attr_path=None,
                                      setter_path='store_json_v2_profile',
                                      v_type=Union[bytes, bytearray])
 
+# GET is a query of the database, see database/profile_library.py
+MAPPING[Resource.DE1_PROFILES] = IsAt(target=TO.DE1, attr_path=None,
+                                      setter_path='store_json_v2_profiles',
+                                      v_type=Union[bytes, bytearray,
+                                                   UploadedFile],
+                                      if_not_ready=True)
+
 MAPPING[Resource.DE1_FIRMWARE] = IsAt(target=TO.DE1, attr_path=None,
                                       setter_path='upload_firmware_from_content',
-                                      v_type=Union[bytes, bytearray])
+                                      v_type=Union[bytes, bytearray,
+                                                   UploadedFile])
 
 MAPPING[Resource.DE1_FIRMWARE_CANCEL] = IsAt(target=TO.DE1, attr_path=None,
                                              setter_path='cancel_firmware_api',
@@ -222,12 +206,17 @@ MAPPING[Resource.SCAN] = IsAt(target=TO.Scanner, attr_path=None,
                               v_type=str,
                               internal_type=DeviceRole)
 
-# Note: This is an async getter because of the lock
-# MAPPING[Resource.SCAN_DEVICES] = {
-#     'devices': IsAt(target=TO.DiscoveredDevices, attr_path='devices_for_json',
-#                     read_only=True,
-#                     v_type=dict)
-# }
+# Devices seen in scans or connected, from the device registry
+MAPPING[Resource.SCAN_DEVICES] = {
+    'devices': IsAt(target=TO.Scanner,
+                    attr_path='device_registry.devices_for_json',
+                    read_only=True,
+                    v_type=list),
+    'connect_metrics': IsAt(target=TO.Scanner,
+                            attr_path='device_registry.metrics_for_json',
+                            read_only=True,
+                            v_type=dict),
+}
 
 # Work from leaves back, so can be "included" by reference
 
@@ -272,7 +261,12 @@ MAPPING[Resource.DE1_PROFILE_ID] = {
 }
 
 # DE1_FIRMWARE = 'de1/firmware'
-# DE1_FIRMWARES = 'de1/firmwares'
+
+# GET is a query of the database, see database/firmware_catalog.py
+MAPPING[Resource.DE1_FIRMWARES] = IsAt(target=TO.DE1, attr_path=None,
+                                       v_type=list,
+                                       read_only=True,
+                                       if_not_ready=True)
 
 MAPPING[Resource.DE1_FIRMWARE_ID] = {
     'id': IsAt(target=MMR0x80LowAddr.CPU_FIRMWARE_BUILD,
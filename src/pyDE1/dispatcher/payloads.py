@@ -11,10 +11,13 @@ These should be pickle-able so can be passed between processes
 """
 
 import enum
+import hashlib
+import os
 from traceback import TracebackException
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from pyDE1.dispatcher.resource import Resource
+from pyDE1.exceptions import DE1APIValueError
 
 
 class HTTPMethod (enum.Enum):
@@ -73,6 +76,38 @@ class APIRequest:
         return self._payload
 
 
+class UploadedFile (NamedTuple):
+    """
+    The body of a PUT, streamed to a file by the inbound process
+    so that only this, rather than the content, is sent to the controller
+
+    Whatever uses it is responsible for removing the file
+    """
+    path: str
+    size: int
+    sha256: str     # hexdigest
+
+    def read(self) -> bytes:
+        """
+        The content, once its SHA-256 has been confirmed, removing the file
+        """
+        try:
+            with open(self.path, 'rb') as fh:
+                content = fh.read()
+        finally:
+            self.remove()
+        if hashlib.sha256(content).hexdigest() != self.sha256:
+            raise DE1APIValueError(
+                f"Uploaded content does not match its SHA-256, {self.path}")
+        return content
+
+    def remove(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
 class APIResponse:
 
     def __init__(self,
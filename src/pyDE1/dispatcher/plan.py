@@ -0,0 +1,217 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+MAPPING, compiled once into a plan for each Resource
+
+Rather than walk the nested dicts of MAPPING on each request,
+GET, PATCH, and the validation of a PATCH use the ResourcePlan
+from plan_for(). Each IsAt is compiled into an Accessor, with
+  * the path of keys to it
+  * the kind of target
+  * attrgetter()s for attr_path and setter_path
+  * the tuple of types accepted for a PATCH
+  * whether a connected DE1 or scale is required
+
+A resource that is an IsAt, such as de1/profile, is at the path (None,),
+as it has been in the dicts for GET, PATCH, and PUT.
+
+The objects that TO names are looked up for each request,
+as the scale and thermometer change, see implementation.py
+"""
+
+import enum
+import inspect
+import operator
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple, \
+    Union, get_args
+
+from pyDE1.de1.c_api import MMR0x80LowAddr, PackedAttr
+from pyDE1.dispatcher.mapping import MAPPING, TO, IsAt
+from pyDE1.dispatcher.resource import Resource
+from pyDE1.exceptions import DE1APIValueError
+
+
+class Kind (enum.Enum):
+    OBJECT = enum.auto()        # One of TO
+    MMR = enum.auto()
+    PACKED_ATTR = enum.auto()
+    FUNCTION = enum.auto()      # Target of None, setter_path is the function
+    UNKNOWN = enum.auto()
+
+
+def _attr_setter(attr_path: str) -> Callable:
+    # As rsetattr()
+    (pre, _, post) = attr_path.rpartition('.')
+    if not pre:
+        return lambda obj, value: setattr(obj, post, value)
+    get_parent = operator.attrgetter(pre)
+    return lambda obj, value: setattr(get_parent(obj), post, value)
+
+
+def _patch_types(v_type) -> tuple:
+    # get_args() of a simple type is (), of Union[int, float] (int, float)
+    types = get_args(v_type)
+    if len(types) == 0:
+        types = (v_type,)
+    if float in types and int not in types:
+        # Accept an int for a float
+        types = (*types, int)
+    return types
+
+
+class Accessor:
+    """
+    An IsAt, compiled, see module docstring
+    """
+
+    __slots__ = ('path', 'isat', 'kind', 'target', 'get', 'set_attr',
+                 'get_setter', 'writable', 'types', 'type_name',
+                 'requires_de1', 'requires_scale', 'internal_type')
+
+    def __init__(self, path: tuple, isat: IsAt):
+        self.path = path
+        self.isat = isat
+        self.target = target = isat.target
+        if isinstance(target, TO):
+            self.kind = Kind.OBJECT
+        elif isinstance(target, MMR0x80LowAddr):
+            self.kind = Kind.MMR
+        elif inspect.isclass(target) and issubclass(target, PackedAttr):
+            self.kind = Kind.PACKED_ATTR
+        elif target is None:
+            self.kind = Kind.FUNCTION
+        else:
+            self.kind = Kind.UNKNOWN
+
+        if self.kind is Kind.MMR and (isat.attr_path != ''
+                                      or isat.setter_path is not None):
+            raise DE1APIValueError(
+                "MMR access does not support attr_path or setter_path "
+                f"{path} {isat}")
+
+        attr_path = isat.attr_path
+        setter_path = isat.setter_path
+        self.get: Optional[Callable] = None \
+            if attr_path is None else operator.attrgetter(attr_path)
+        self.set_attr: Optional[Callable] = None \
+            if attr_path is None else _attr_setter(attr_path)
+        self.get_setter: Optional[Callable] = None \
+            if setter_path is None else operator.attrgetter(setter_path)
+        self.writable = not (isat.read_only
+                             or (attr_path is None and setter_path is None))
+
+        self.types = _patch_types(isat.v_type)
+        try:
+            self.type_name = isat.v_type.__name__
+        except AttributeError:
+            self.type_name = repr(isat.v_type)
+        self.requires_de1 = isat.requires_connected_de1
+        self.requires_scale = isat.requires_connected_scale
+        self.internal_type = isat.internal_type
+
+    def __repr__(self):
+        return f"Accessor({self.path}, {self.isat})"
+
+
+class Constant (NamedTuple):
+    # A value in MAPPING that isn't an IsAt, such as the versions
+    value: object
+
+
+class Branch (NamedTuple):
+    # A dict in MAPPING, index into ResourcePlan.branches
+    index: int
+
+
+class Entry (NamedTuple):
+    # In ResourcePlan.entries, the order of MAPPING
+    parent: int     # index into ResourcePlan.branches, 0 is the resource
+    key: object
+    node: Union[Accessor, Constant, Branch]
+
+
+class ResourcePlan:
+    """
+    For GET, entries are in the order of MAPPING. A branch precedes what
+    is within it, and is created as it is reached, or, if empty nodes are
+    pruned, as something is put into it.
+
+    For PATCH, nodes has each path of keys in MAPPING.
+
+    mmr_targets are the MMRs that a GET reads, in address order.
+    """
+
+    __slots__ = ('resource', 'is_isat', 'entries', 'branches', 'nodes',
+                 'requires', 'writable_packed_attrs', 'mmr_targets')
+
+    def __init__(self, resource: Resource, mapping: Union[dict, IsAt]):
+        self.resource = resource
+        # The resource is an IsAt, rather than a dict
+        self.is_isat = isinstance(mapping, IsAt)
+        self.entries: Tuple[Entry, ...] = ()
+        # (parent, key) of each, other than the resource itself
+        self.branches: Tuple[Optional[Tuple[int, object]], ...] = (None,)
+        self.nodes: Dict[tuple, Union[Accessor, Constant, Branch]] = {}
+
+        entries = []
+        branches = [None]
+        if isinstance(mapping, IsAt):
+            mapping = {None: mapping}
+        self._compile(mapping, (), 0, entries, branches)
+        self.entries = tuple(entries)
+        self.branches = tuple(branches)
+
+        accessors = self.accessors
+        self.requires = {
+            'DE1': any(a.requires_de1 for a in accessors),
+            'Scale': any(a.requires_scale for a in accessors),
+        }
+        self.writable_packed_attrs: FrozenSet[PackedAttr] = frozenset(
+            a.target for a in accessors
+            if a.kind is Kind.PACKED_ATTR
+            and a.target.can_write and a.writable)
+        # To be read together for GET
+        self.mmr_targets: Tuple[MMR0x80LowAddr, ...] = tuple(sorted(
+            {a.target for a in accessors
+             if a.kind is Kind.MMR and a.get is not None}))
+
+    def _compile(self, mapping: dict, path: tuple, index: int,
+                 entries: list, branches: list):
+        for (key, value) in mapping.items():
+            this_path = path + (key,)
+            if isinstance(value, IsAt):
+                node = Accessor(this_path, value)
+            elif isinstance(value, dict):
+                node = Branch(len(branches))
+                branches.append((index, key))
+            else:
+                node = Constant(value)
+            self.nodes[this_path] = node
+            entries.append(Entry(index, key, node))
+            if isinstance(node, Branch):
+                self._compile(value, this_path, node.index, entries, branches)
+
+    @property
+    def accessors(self) -> Tuple[Accessor, ...]:
+        return tuple(e.node for e in self.entries
+                     if isinstance(e.node, Accessor))
+
+
+def compile_mapping(mapping: Dict[Resource, Union[dict, IsAt]]) \
+        -> Dict[Resource, ResourcePlan]:
+    return {resource: ResourcePlan(resource, resource_mapping)
+            for (resource, resource_mapping) in mapping.items()}
+
+
+PLANS = compile_mapping(MAPPING)
+
+
+def plan_for(resource: Resource) -> ResourcePlan:
+    """
+    Raises KeyError, as MAPPING[resource] does
+    """
+    return PLANS[resource]
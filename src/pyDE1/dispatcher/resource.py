@@ -10,7 +10,7 @@ Enum that defines the recognized resources that the Dispatcher can access
 
 import enum
 
-RESOURCE_VERSION = '5.0.0'
+RESOURCE_VERSION = '5.4.0'
 
 
 class Resource (enum.Enum):
@@ -21,6 +21,10 @@ class Resource (enum.Enum):
     LOG = 'log/{id}'
     LOGS = 'logs'
 
+    METRICS = 'metrics'   # Resource use of each process
+
+    BATCH = 'batch'     # POST several GET and PATCH operations
+
     DE1 = 'de1'
 
     DE1_ID = 'de1/id'
@@ -102,15 +106,14 @@ class Resource (enum.Enum):
         # is FALSE
         if self in (
                 self.SCAN,
+                self.BATCH,
                 self.DE1_MODE,
                 self.SCALE_TARE,
                 self.SCALE_DISPLAY,
                 # unimplemented
                 self.DE1_PROFILE,
                 self.DE1_PROFILE_STORE,
-                self.DE1_PROFILES,
                 self.DE1_FIRMWARE,
-                self.DE1_FIRMWARES,
                 self.DE1_DEPRECATED,
         ):
             retval = False
@@ -128,8 +131,9 @@ class Resource (enum.Enum):
                 self.VERSION,
                 self.LOG,
                 self.LOGS,
+                self.METRICS,
+                self.BATCH,
                 self.DE1_STATE,
-                self.DE1_PROFILES,
                 self.DE1_FIRMWARES,
                 # unimplemented
                 self.DE1_DEPRECATED,
@@ -150,6 +154,7 @@ class Resource (enum.Enum):
                 self.DE1_PROFILE,
                 self.DE1_PROFILE_ID,
                 self.DE1_PROFILE_STORE,
+                self.DE1_PROFILES,
                 self.SCAN,
         ):
             retval = False
@@ -158,8 +163,8 @@ class Resource (enum.Enum):
 
     @property
     def can_post(self):
-        retval = False
-        # No POST implemented
+        # Only a batch of other operations
+        retval = self is self.BATCH
         return retval
 
     @property
@@ -168,6 +173,16 @@ class Resource (enum.Enum):
         # No DELETE implemented
         return retval
 
+    @property
+    def query_parameters(self) -> tuple:
+        # Taken from the query string of a GET, any others are ignored
+        retval = ()
+        if self is self.LOG:
+            retval = ('tail', 'start', 'end', 'sequence_id')
+        elif self is self.DE1_PROFILES:
+            retval = ('q', 'title', 'author', 'fingerprint', 'limit', 'offset')
+        return retval
+
 
 class ConnectivityEnum (enum.Enum):
 
@@ -15,9 +15,10 @@ For PUT (if implemented)
   * All entries in MAPPING[resource] are present in the supplied data
 """
 
-from typing import Union, get_args  # get_origin, get_type_hints
+from typing import Union
 
-from pyDE1.dispatcher.mapping import MAPPING, IsAt
+from pyDE1.dispatcher.payloads import UploadedFile
+from pyDE1.dispatcher.plan import Accessor, Branch, plan_for
 from pyDE1.dispatcher.resource import Resource
 from pyDE1.exceptions import (
     DE1APIAttributeError, DE1APITypeError, DE1APIValueError
@@ -26,36 +27,29 @@ from pyDE1.exceptions import (
 import pyDE1
 logger = pyDE1.getLogger('Validate')
 
-# t = Union[int, float]
-# isinstance(2, t)
-#   TypeError: Subscripted generics cannot be used with class and instance checks
-# get_args(t)
-#   (<class 'int'>, <class 'float'>)
-# get_origin(t)
-#   typing.Union
-# isinstance(2, get_args(t))
-#   True
+# The types accepted for each IsAt are those of Accessor.types, see plan.py
 
 
 def validate_patch_return_targets(resource: Resource,
                                   patch: Union[dict,
-                                               bytes, bytearray]) -> dict:
-    mapping = MAPPING[resource]
+                                               bytes, bytearray,
+                                               UploadedFile]) -> dict:
+    plan = plan_for(resource)
 
     # Valid: dict with dict
     #        IsAt with byte, bytearray (profile or firmware)
-    if isinstance(mapping, dict) and isinstance(patch, dict):
+    if not plan.is_isat and isinstance(patch, dict):
         pass
-    elif (isinstance(mapping, IsAt)
-        and isinstance(patch, (bytes, bytearray, str))):
+    elif plan.is_isat and isinstance(patch, (bytes, bytearray, str,
+                                          UploadedFile)):
         # coerce into "standard form"
-        logger.debug(f"Converting to dict form for {mapping}")
+        logger.debug(f"Converting to dict form for {resource}")
         patch = { None: patch }
     else:
         raise DE1APITypeError(
             "Validate: Mapping and patch inconsistent, "
             "dict with dict, IsAt with bytes/str value "
-            f"not {type(mapping)} with {type(patch)}"
+            f"not {'IsAt' if plan.is_isat else 'dict'} with {type(patch)}"
         )
 
     results = {
@@ -63,82 +57,71 @@ def validate_patch_return_targets(resource: Resource,
         'Scale': False
     }
     _validate_patch_inner(patch=patch,
-                          mapping=mapping,
-                          path='',
+                          nodes=plan.nodes,
+                          path=(),
                           targets=results)
     return results
 
 
-def _validate_patch_inner(patch: dict, mapping: dict, path: str, targets: dict):
+def _validate_patch_inner(patch: dict, nodes: dict, path: tuple,
+                          targets: dict):
 
     for key, new_value in patch.items():
 
-        if path and len(path):
-            this_path = f"{path}:{key}"
-        else:
-            this_path = key
+        this_path = path + (key,)
 
         try:
-            if key is not None:
-                mapping_value = mapping[key]
-            else:
-                mapping_value = mapping
+            node = nodes[this_path]
         except KeyError:
-            raise DE1APIAttributeError(f"No mapping found for {this_path}")
+            raise DE1APIAttributeError(
+                f"No mapping found for {_path_str(this_path)}")
 
-        if isinstance(mapping_value, dict):
+        if isinstance(node, Branch):
+            if not isinstance(new_value, dict):
+                raise DE1APITypeError(
+                    f"Expected a dict at {_path_str(this_path)}, "
+                    f"not {new_value} {type(new_value)}")
             _validate_patch_inner(
-                patch=patch[key],
-                mapping=mapping_value,
+                patch=new_value,
+                nodes=nodes,
                 path=this_path,
                 targets=targets,
             )
+            continue
 
-        else:
-            if not isinstance(mapping_value, IsAt):
-                raise DE1APITypeError(
-                    f"Expected an IsAt for {this_path}:, not {mapping_value}")
-
-            if mapping_value.read_only:
-                raise DE1APIAttributeError(f"Unable to write {this_path}:")
-
-            # Check the value type
-            # This will be a simple type, or something like Union, Optional
-            # https://docs.python.org/3/library/typing.html#typing.get_args
-            # get_args(a_simple_type) -> None
-
-            # TODO: typing.ForwardRef -- For example, List["SomeClass"]
-            #       NB: generic types such as list["SomeClass"]
-            #       will not be implicitly transformed
-
-            type_tuple = get_args(mapping_value.v_type)
-            if len(type_tuple) == 0:
-                type_tuple = (mapping_value.v_type,)
-            if float in type_tuple and int not in type_tuple:
-                # Accept an int for a float
-                type_tuple = (*type_tuple, int,)
-
-            if not isinstance(new_value, type_tuple):
-                try:
-                    type_str = mapping_value.v_type.__name__
-                except AttributeError:
-                    type_str = repr(mapping_value.v_type)
-                raise DE1APITypeError(
-                    f"Expected {type_str} value at {this_path}, "
-                    f"not {new_value} {type(new_value)}"
-                )
-
-            if mapping_value.requires_connected_de1:
-                targets['DE1'] = True
-            if mapping_value.requires_connected_scale:
-                targets['Scale'] = True
-
-            # Not really "validate", but this is a good place to do it
-            # TODO: Unify this with repetition implementation.py
-            #       This does not modify the overall patch
-            #       Also many other repetitions of special cases there
-            if (t := mapping_value.internal_type) is not None:
-                try:
-                    patch[key] = t(new_value)
-                except ValueError as e:
-                    raise DE1APIValueError(*e.args)
+        if not isinstance(node, Accessor):
+            raise DE1APITypeError(
+                f"Expected an IsAt for {_path_str(this_path)}:, not {node}")
+
+        if node.isat.read_only:
+            raise DE1APIAttributeError(
+                f"Unable to write {_path_str(this_path)}:")
+
+        # TODO: typing.ForwardRef -- For example, List["SomeClass"]
+        #       NB: generic types such as list["SomeClass"]
+        #       will not be implicitly transformed
+
+        if not isinstance(new_value, node.types):
+            raise DE1APITypeError(
+                f"Expected {node.type_name} value at {_path_str(this_path)}, "
+                f"not {new_value} {type(new_value)}"
+            )
+
+        if node.requires_de1:
+            targets['DE1'] = True
+        if node.requires_scale:
+            targets['Scale'] = True
+
+        # Not really "validate", but this is a good place to do it
+        # TODO: Unify this with repetition implementation.py
+        #       This does not modify the overall patch
+        #       Also many other repetitions of special cases there
+        if (t := node.internal_type) is not None:
+            try:
+                patch[key] = t(new_value)
+            except ValueError as e:
+                raise DE1APIValueError(*e.args)
+
+
+def _path_str(path: tuple) -> str:
+    return ':'.join(str(key) for key in path)
@@ -166,7 +166,7 @@ async def send_to_outbound_pipes(payload: EventPayload):
     #     if SubscribedEvent.outbound_pipe is not None:
     #         pipe.send(q_payload)
     SubscribedEvent.outbound_pipe.send(q_payload)
-    # Will raise queue.Full
+    # A SpillingQueue in the Controller, so only a plain Queue raises
     try:
         SubscribedEvent.database_queue.put_nowait(q_payload)
     except queue.Full:
@@ -13,7 +13,7 @@ See also:
 """
 
 import enum
-from typing import Optional
+from typing import List, Optional
 
 from pyDE1.event_manager.payloads import EventPayload
 
@@ -65,6 +65,12 @@ class DeviceAvailabilityState (enum.Enum):
 
 
 class DeviceAvailability (EventPayload):
+    """
+    reconnect_attempts      connection attempts while not connected,
+                            or those of the last reconnect once connected
+    reconnect_latency       seconds from the first of those attempts
+                            to connected, for the last reconnect
+    """
     def __init__(self,
                  arrival_time: float,
                  state: DeviceAvailabilityState \
@@ -72,13 +78,77 @@ class DeviceAvailability (EventPayload):
                  role: DeviceRole = DeviceRole.UNKNOWN,
                  id: Optional[str] = None,
                  name: Optional[str] = None,
+                 reconnect_attempts: Optional[int] = None,
+                 reconnect_latency: Optional[float] = None,
                  ):
         super(DeviceAvailability, self).__init__(arrival_time=arrival_time)
-        self._version = "1.1.0"
+        self._version = "1.2.0"
         self.state = state
         self.role = role
         self.id = id
         self.name = name
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_latency = reconnect_latency
+
+
+class ReconnectStatus (EventPayload):
+    """
+    Sent after each attempt to connect, from the device's history
+        attempts, failures, successes     all time, for this address
+        consecutive_failures
+        outage_time             seconds since the first attempt while
+                                not connected, None once connected
+        outage_attempts         attempts since then
+        last_reconnect_latency  seconds the last reconnect took
+        last_reconnect_attempts and the attempts it needed
+        typical_latency         weighted average of reconnect times
+        last_adapter_wait       seconds waiting for other devices' attempts
+        next_delay              hold-off before the next attempt
+    """
+    def __init__(self,
+                 arrival_time: float,
+                 role: DeviceRole = DeviceRole.UNKNOWN,
+                 id: Optional[str] = None,
+                 name: Optional[str] = None,
+                 history: Optional[dict] = None,
+                 ):
+        super(ReconnectStatus, self).__init__(arrival_time=arrival_time)
+        self._version = "1.0.0"
+        self.role = role
+        self.id = id
+        self.name = name
+        if history is not None:
+            for key, val in history.items():
+                setattr(self, key, val)
+
+
+class DeviceReadyTiming (EventPayload):
+    """
+    Sent when a device becomes ready, seconds spent
+        connect_time        from connecting to connected, if seen
+        initialize_time     from connected to ready
+        time_to_ready       the sum of the two
+        steps               timeline of the initialization steps, if any
+    """
+    def __init__(self,
+                 arrival_time: float,
+                 role: DeviceRole = DeviceRole.UNKNOWN,
+                 id: Optional[str] = None,
+                 name: Optional[str] = None,
+                 connect_time: Optional[float] = None,
+                 initialize_time: Optional[float] = None,
+                 time_to_ready: Optional[float] = None,
+                 steps: Optional[List[dict]] = None,
+                 ):
+        super(DeviceReadyTiming, self).__init__(arrival_time=arrival_time)
+        self._version = "1.0.0"
+        self.role = role
+        self.id = id
+        self.name = name
+        self.connect_time = connect_time
+        self.initialize_time = initialize_time
+        self.time_to_ready = time_to_ready
+        self.steps = steps if steps is not None else []
 
 
 class FirmwareUploadState (enum.Enum):
@@ -0,0 +1,407 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Log files with built-in rotation, compression, and a time index
+
+ArchivingFileHandler writes the log file as WatchedFileHandler does.
+It also keeps, alongside it, an index of the byte offset of the first
+record at least index_seconds after the last one indexed:
+
+    pyde1.log
+    pyde1.log.idx       t <created> <offset>
+
+If rotate_bytes or rotate_seconds is set, the log file is renamed
+with the time of rotation, then compressed in the background.
+Each block of about MEMBER_BYTES is compressed as its own gzip member.
+That is still one valid .gz file, but reading can start at any member:
+
+    pyde1.log.20230205-101500.gz
+    pyde1.log.20230205-101500.gz.idx    t <created> <offset>
+                                        m <offset> <compressed offset>
+
+Offsets are always into the uncompressed log.
+
+With an external rotation utility, such as logrotate, the handler
+reopens the file when it is moved, and starts a new index.
+The index of the file that was moved is discarded.
+
+Not dependent on pyDE1.config, so it can be used in any process
+"""
+
+import collections
+import contextlib
+import gzip
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+import pyDE1
+from pyDE1.exceptions import DE1DBNoMatchingRecord
+
+logger = pyDE1.getLogger('Logging.Archive')
+
+INDEX_SUFFIX = '.idx'
+COMPRESSED_SUFFIX = '.gz'
+
+# Uncompressed size of each gzip member
+MEMBER_BYTES = 256 * 1024
+
+# Suffix of rotated files, as named by ArchivingFileHandler.rotate()
+_ARCHIVE_SUFFIX = re.compile(r'^\.(\d{8}-\d{6})(?:-(\d+))?(?:\.gz)?$')
+
+
+class LogIndex (NamedTuple):
+    # (created, offset), in order written
+    times: List[Tuple[float, int]]
+    # (offset, compressed offset) of each gzip member
+    members: List[Tuple[int, int]]
+
+
+def index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def log_path(directory: str, name: str) -> str:
+    """
+    Path of the log file name, which has to be within directory
+    """
+    path = os.path.join(directory, name)
+    root = os.path.realpath(directory)
+    real = os.path.realpath(path)
+    if real == root or os.path.commonpath((root, real)) != root:
+        raise FileNotFoundError(f"No log file {name} in {directory}")
+    return path
+
+
+def read_index(path: str) -> LogIndex:
+    """
+    The index of the log file at path, empty if there is none
+    """
+    times = []
+    members = []
+    try:
+        with open(index_path(path), 'r') as index_file:
+            for line in index_file:
+                try:
+                    (kind, first, second) = line.split()
+                    if kind == 't':
+                        times.append((float(first), int(second)))
+                    elif kind == 'm':
+                        members.append((int(first), int(second)))
+                except ValueError:
+                    # Partial line from an interrupted write
+                    pass
+    except FileNotFoundError:
+        pass
+    return LogIndex(times=times, members=members)
+
+
+def index_time_range(path: str) -> Tuple[Optional[float], Optional[float]]:
+    """
+    First and last times in the index, without reading all of it
+    """
+    try:
+        with open(index_path(path), 'rb') as index_file:
+            first = index_file.readline().split()
+            index_file.seek(0, os.SEEK_END)
+            index_file.seek(max(0, index_file.tell() - 256))
+            last = index_file.read().splitlines()
+    except FileNotFoundError:
+        return None, None
+    first_time = None
+    last_time = None
+    if len(first) == 3 and first[0] == b't':
+        first_time = float(first[1])
+    for line in reversed(last):
+        fields = line.split()
+        if len(fields) == 3 and fields[0] == b't':
+            last_time = float(fields[1])
+            break
+    return first_time, last_time
+
+
+def offsets_for_window(index: LogIndex, start: Optional[float],
+                       end: Optional[float]) -> Tuple[int, Optional[int]]:
+    """
+    Byte offsets, [begin, finish), covering records from start to end,
+    and up to the index interval on either side
+
+    finish is None for through the end of the file
+    """
+    begin = 0
+    finish = None
+    for (created, offset) in index.times:
+        if start is not None and created <= start:
+            begin = offset
+        elif end is not None and created > end:
+            finish = offset
+            break
+    return begin, finish
+
+
+def read_range(path: str, begin: int, finish: Optional[int] = None,
+               index: Optional[LogIndex] = None) -> bytes:
+    """
+    Bytes of the uncompressed log, from begin up to finish
+    """
+    length = -1 if finish is None else max(0, finish - begin)
+    if not path.endswith(COMPRESSED_SUFFIX):
+        with open(path, 'rb') as log_file:
+            log_file.seek(begin)
+            return log_file.read(length)
+
+    if index is None:
+        index = read_index(path)
+    member_offset = 0
+    compressed_offset = 0
+    for (offset, compressed) in index.members:
+        if offset > begin:
+            break
+        member_offset = offset
+        compressed_offset = compressed
+    with open(path, 'rb') as log_file:
+        log_file.seek(compressed_offset)
+        with gzip.GzipFile(fileobj=log_file) as gz_file:
+            gz_file.read(begin - member_offset)
+            return gz_file.read(length)
+
+
+def read_window(path: str, start: Optional[float],
+                end: Optional[float]) -> bytes:
+    index = read_index(path)
+    (begin, finish) = offsets_for_window(index, start, end)
+    return read_range(path, begin, finish, index)
+
+
+def read_tail(path: str, lines: int) -> bytes:
+    """
+    The last lines of the log, reading only as much as needed
+    """
+    if lines <= 0:
+        return b''
+    if path.endswith(COMPRESSED_SUFFIX):
+        index = read_index(path)
+        starts = [offset for (offset, compressed) in index.members] or [0]
+        for begin in reversed(starts):
+            found = read_range(path, begin, index=index)
+            if found.count(b'\n') > lines or begin == 0:
+                break
+    else:
+        block = 8192
+        with open(path, 'rb') as log_file:
+            log_file.seek(0, os.SEEK_END)
+            size = log_file.tell()
+            begin = size
+            found = b''
+            while begin > 0 and found.count(b'\n') <= lines:
+                begin = max(0, begin - block)
+                log_file.seek(begin)
+                found = log_file.read(size - begin)
+                block *= 2
+    tail = collections.deque(found.splitlines(keepends=True), maxlen=lines)
+    return b''.join(tail)
+
+
+def sequence_window(db_filename: str, sequence_id: str) \
+        -> Tuple[float, Optional[float]]:
+    """
+    start_sequence and end_sequence of a sequence, from the database
+    """
+    with contextlib.closing(sqlite3.connect(f"file:{db_filename}?mode=ro",
+                                            uri=True)) as db:
+        row = db.execute(
+            'SELECT start_sequence, end_sequence FROM sequence WHERE id = ?',
+            (sequence_id,)).fetchone()
+    if row is None or row[0] is None:
+        raise DE1DBNoMatchingRecord(f"No sequence with id '{sequence_id}'")
+    return row[0], row[1]
+
+
+def compress_archive(path: str, member_bytes: Optional[int] = None) -> str:
+    """
+    Compress the rotated log at path, and its index,
+    to path + '.gz', one gzip member per block of lines
+    """
+    if member_bytes is None:
+        member_bytes = MEMBER_BYTES
+    gz_path = path + COMPRESSED_SUFFIX
+    index = read_index(path)
+    members = []
+    with open(path, 'rb') as src, open(gz_path + '.tmp', 'wb') as dst:
+        offset = 0
+        while block := src.read(member_bytes):
+            # Members start at the start of a line
+            if not block.endswith(b'\n'):
+                block += src.readline()
+            members.append((offset, dst.tell()))
+            dst.write(gzip.compress(block, mtime=0))
+            offset += len(block)
+    with open(index_path(gz_path) + '.tmp', 'w') as index_file:
+        for (created, offset) in index.times:
+            index_file.write(f"t {created:.3f} {offset}\n")
+        for (offset, compressed) in members:
+            index_file.write(f"m {offset} {compressed}\n")
+    os.replace(index_path(gz_path) + '.tmp', index_path(gz_path))
+    os.replace(gz_path + '.tmp', gz_path)
+    os.remove(path)
+    try:
+        os.remove(index_path(path))
+    except FileNotFoundError:
+        pass
+    return gz_path
+
+
+class ArchivingFileHandler (logging.handlers.WatchedFileHandler):
+    """
+    See module docstring
+    """
+
+    def __init__(self, filename: str,
+                 rotate_bytes: Optional[int] = None,
+                 rotate_seconds: Optional[float] = None,
+                 keep: int = 30,
+                 compress: bool = True,
+                 index_seconds: Optional[float] = 10.0):
+        super(ArchivingFileHandler, self).__init__(filename)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.keep = keep
+        self.compress = compress
+        self.index_seconds = index_seconds
+        self._index_file = None
+        self._last_indexed: Optional[float] = None
+        self._rotate_at: Optional[float] = None
+        self._compressing: Optional[threading.Thread] = None
+        # One at a time, then prune
+        self._compress_lock = threading.Lock()
+        self._open_index()
+
+    def _open_index(self, truncate=False):
+        (first, last) = (None, None) if truncate else index_time_range(
+            self.baseFilename)
+        if self.rotate_seconds:
+            started = first if first is not None else time.time()
+            self._rotate_at = started + self.rotate_seconds
+        if self.index_seconds is None:
+            return
+        self._index_file = open(index_path(self.baseFilename),
+                                'w' if truncate else 'a', buffering=1)
+        self._last_indexed = last
+
+    def _close_index(self):
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+    def close(self):
+        self.acquire()
+        try:
+            self._close_index()
+        finally:
+            self.release()
+        super(ArchivingFileHandler, self).close()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            stream = self.stream
+            self.reopenIfNeeded()
+            if stream is not None and self.stream is not stream:
+                # Moved by something else, the old index no longer applies
+                self._close_index()
+                self._open_index(truncate=True)
+            if self._should_rotate(record):
+                self.rotate()
+            if self.stream is None:
+                self.stream = self._open()
+            if self._index_file is not None and (
+                    self._last_indexed is None
+                    or record.created >= self._last_indexed
+                    + self.index_seconds):
+                self._index_file.write(
+                    f"t {record.created:.3f} {self.stream.tell()}\n")
+                self._last_indexed = record.created
+        except Exception:
+            self.handleError(record)
+            return
+        logging.FileHandler.emit(self, record)
+
+    def _should_rotate(self, record: logging.LogRecord) -> bool:
+        if self._rotate_at is not None and record.created >= self._rotate_at:
+            return True
+        return bool(self.rotate_bytes and self.stream is not None
+                    and self.stream.tell() >= self.rotate_bytes)
+
+    def rotate(self):
+        """
+        Rename the log file and its index, then start new ones
+        """
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self._close_index()
+
+        stamped = '{}.{}'.format(self.baseFilename,
+                                 time.strftime('%Y%m%d-%H%M%S'))
+        archive = stamped
+        n = 0
+        while os.path.exists(archive) or os.path.exists(
+                archive + COMPRESSED_SUFFIX):
+            n += 1
+            archive = f"{stamped}-{n}"
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, archive)
+        if os.path.exists(index_path(self.baseFilename)):
+            os.rename(index_path(self.baseFilename), index_path(archive))
+
+        self.stream = self._open()
+        self._statstream()
+        self._open_index(truncate=True)
+
+        if self.compress and os.path.exists(archive):
+            self._compressing = threading.Thread(
+                target=self._compress_and_prune, args=(archive,),
+                name='LogCompress', daemon=True)
+            self._compressing.start()
+        else:
+            self._prune()
+
+    def _compress_and_prune(self, archive: str):
+        with self._compress_lock:
+            try:
+                compress_archive(archive)
+            except Exception as e:
+                # Not holding the handler's lock, so can log
+                logger.error(f"Unable to compress {archive}: {repr(e)}")
+            self._prune()
+
+    def archives(self) -> List[str]:
+        """
+        Rotated files of this log, oldest first
+        """
+        (dirname, basename) = os.path.split(self.baseFilename)
+        found = []
+        for name in os.listdir(dirname):
+            if name.startswith(basename) and (
+                    m := _ARCHIVE_SUFFIX.match(name[len(basename):])):
+                # Time of rotation, then count within that second
+                found.append(((m.group(1), int(m.group(2) or 0)),
+                              os.path.join(dirname, name)))
+        return [path for (key, path) in sorted(found)]
+
+    def _prune(self):
+        archives = self.archives()
+        for path in archives[:max(0, len(archives) - self.keep)]:
+            for remove in (path, index_path(path)):
+                try:
+                    os.remove(remove)
+                except FileNotFoundError:
+                    pass
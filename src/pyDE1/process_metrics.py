@@ -0,0 +1,310 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Resource use of each process
+
+Every config.runtime.METRICS_INTERVAL seconds, each process samples
+its memory, CPU time, event-loop lag, task count, and the depth of
+the queues and pipes it uses. The sample is published, as compact JSON,
+under <status topic>/metrics and put on metrics_queue, which
+SupervisedProcess carries from run.py:
+
+    {"process":"Controller","pid":1234,"time":1675619184.85,
+     "rss":48332800,"cpu_user":12.5,"cpu_system":1.9,"cpu_percent":3.1,
+     "threads":6,"tasks":41,"loop_lag":{"p99":0.0124,"max":0.0611,"slow":1},
+     "queues":{"database_queue":0,"inbound_pipe":0,"outbound_pipe":0}}
+
+rss is in bytes, CPU times in seconds. cpu_percent is since the last
+sample, of one core. Queue depths are items in a Queue and bytes not yet
+read from a pipe. loop_lag is from the LoopMonitor, so is None
+in the debug profile.
+
+A process may add its own under a name with sources, a callable for each
+that returns something that can be made into JSON, such as the Controller
+with de1_clock, from the DE1's SampleClock.
+
+In run.py, MetricsCollector keeps the latest sample from each process.
+Its snapshot() reads memory and CPU time from /proc for each process
+as it is asked, so a process that is stuck still shows up, along with
+restarts from its SupervisedProcess. The InboundAPI process asks for
+a snapshot over a pipe, for GET metrics.
+"""
+
+import asyncio
+import fcntl
+import json
+import multiprocessing
+import multiprocessing.connection as mpc
+import os
+import queue
+import resource
+import struct
+import termios
+import threading
+import time
+from typing import Callable, Dict, Iterable, Mapping, Optional
+
+import pyDE1
+from pyDE1.config import config
+from pyDE1.runtime_profile import LoopMonitor
+
+logger = pyDE1.getLogger('Runtime.Metrics')
+
+# Set in each process by SupervisedProcess, and in run.py
+metrics_queue: Optional[multiprocessing.Queue] = None
+
+_PAGE_SIZE = resource.getpagesize()
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+_LOOP_LAG_KEYS = ('samples', 'p99', 'max', 'slow')
+
+
+def proc_stats(pid: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """
+    rss, cpu_user, cpu_system, and threads of a process,
+    from /proc/<pid>/stat, or for this process, where there isn't /proc
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/stat", 'rb') as stat_file:
+            stat = stat_file.read()
+        # After the command name, which may contain spaces, in parentheses
+        fields = stat[stat.rindex(b')') + 2:].split()
+        return {
+            'rss': int(fields[21]) * _PAGE_SIZE,
+            'cpu_user': round(int(fields[11]) / _CLOCK_TICKS, 2),
+            'cpu_system': round(int(fields[12]) / _CLOCK_TICKS, 2),
+            'threads': int(fields[17]),
+        }
+    except (OSError, ValueError, IndexError):
+        if pid is not None and pid != os.getpid():
+            return {}
+    times = os.times()
+    return {
+        'rss': None,
+        'cpu_user': round(times.user, 2),
+        'cpu_system': round(times.system, 2),
+        'threads': threading.active_count(),
+    }
+
+
+def pipe_backlog(conn: mpc.Connection) -> Optional[int]:
+    """
+    Bytes waiting to be read, from either end of a pipe
+    """
+    try:
+        buf = fcntl.ioctl(conn.fileno(), termios.FIONREAD, b'\0\0\0\0')
+    except (OSError, ValueError):
+        # Closed
+        return None
+    return struct.unpack('i', buf)[0]
+
+
+def queue_depth(q) -> Optional[int]:
+    """
+    Items in a multiprocessing or asyncio Queue, bytes in a pipe
+    """
+    if isinstance(q, mpc.Connection):
+        return pipe_backlog(q)
+    try:
+        return q.qsize()
+    except (NotImplementedError, OSError, ValueError):
+        # NotImplementedError on macOS
+        return None
+
+
+class ProcessMetrics:
+    """
+    Samples this process, see module docstring
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 queues: Optional[Mapping[str, object]] = None,
+                 monitor: Optional[LoopMonitor] = None,
+                 process_name: Optional[str] = None,
+                 sources: Optional[Mapping[str, Callable[[], object]]] = None):
+        if process_name is None:
+            process_name = multiprocessing.current_process().name
+        self._loop = loop
+        self._queues = dict(queues) if queues else {}
+        self._monitor = monitor
+        self._sources = dict(sources) if sources else {}
+        self._process_name = process_name
+        self._last_time: Optional[float] = None
+        self._last_cpu: Optional[float] = None
+
+    def sample(self) -> dict:
+        now = time.time()
+        stats = proc_stats()
+        cpu = stats['cpu_user'] + stats['cpu_system']
+        cpu_percent = None
+        if self._last_time is not None and now > self._last_time:
+            cpu_percent = round(
+                100 * (cpu - self._last_cpu) / (now - self._last_time), 1)
+        self._last_time = now
+        self._last_cpu = cpu
+
+        loop_lag = None
+        if self._monitor is not None:
+            lag_stats = self._monitor.stats()
+            loop_lag = {k: lag_stats.get(k) for k in _LOOP_LAG_KEYS
+                        if k in lag_stats}
+
+        sample = {
+            'process': self._process_name,
+            'pid': os.getpid(),
+            'time': round(now, 3),
+            **stats,
+            'cpu_percent': cpu_percent,
+            'tasks': len(asyncio.all_tasks(self._loop)),
+            'loop_lag': loop_lag,
+            'queues': {name: queue_depth(q)
+                       for (name, q) in self._queues.items()},
+        }
+        for (name, source) in self._sources.items():
+            try:
+                sample[name] = source()
+            except Exception as e:
+                logger.error(f"Unable to sample {name}: {repr(e)}")
+                sample[name] = None
+        return sample
+
+
+def start_process_metrics(loop: asyncio.AbstractEventLoop,
+                          queues: Optional[Mapping[str, object]] = None,
+                          monitor: Optional[LoopMonitor] = None,
+                          process_name: Optional[str] = None,
+                          send: Optional[Callable[[str], bool]] = None,
+                          sources: Optional[
+                              Mapping[str, Callable[[], object]]] = None) \
+        -> Optional[ProcessMetrics]:
+    """
+    Sample every config.runtime.METRICS_INTERVAL and report
+    with send(json_str), by default through status_reporter,
+    and on metrics_queue, if set
+    """
+    interval = config.runtime.METRICS_INTERVAL
+    if not interval:
+        return None
+
+    if send is None:
+        import pyDE1.status_reporter as status_reporter
+
+        def send(payload: str) -> bool:
+            return status_reporter.publish('metrics', payload)
+
+    metrics = ProcessMetrics(loop, queues=queues, monitor=monitor,
+                             process_name=process_name, sources=sources)
+
+    def publish():
+        try:
+            sample = metrics.sample()
+            send(json.dumps(sample, separators=(',', ':')))
+            if metrics_queue is not None:
+                metrics_queue.put_nowait(sample)
+        except queue.Full:
+            # The collector isn't keeping up, the next one will do
+            pass
+        except Exception as e:
+            logger.error(f"Unable to report metrics: {repr(e)}")
+        loop.call_later(interval, publish)
+
+    loop.call_soon(publish)
+    return metrics
+
+
+class MetricsCollector:
+    """
+    In run.py, the latest sample from each process, see module docstring
+
+    watch() each SupervisedProcess, as restarts come from there
+    """
+
+    def __init__(self, maxsize: int = 100):
+        self.queue = multiprocessing.Queue(maxsize=maxsize)
+        self._latest: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._supervised = []
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, supervised: Iterable):
+        self._supervised.extend(supervised)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._read_queue,
+                                        name='MetricsCollector',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.queue.put(None)
+
+    def _read_queue(self):
+        try:
+            while (sample := self.queue.get()) is not None:
+                with self._lock:
+                    self._latest[sample['process']] = sample
+        except (EOFError, OSError):
+            # Closed on exit
+            pass
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            latest = dict(self._latest)
+        processes = {}
+
+        this_process = multiprocessing.current_process().name
+        if this_process in latest:
+            processes[this_process] = self._current(
+                latest[this_process], os.getpid(), now)
+
+        for sp in self._supervised:
+            process = sp.process
+            pid = process.pid if process is not None else None
+            alive = process is not None and process.is_alive()
+            entry = self._current(latest.get(sp.name), pid if alive else None,
+                                  now)
+            entry['process'] = sp.name
+            entry['alive'] = alive
+            entry['restarts'] = sp.restarts
+            processes[sp.name] = entry
+
+        return {
+            'time': round(now, 3),
+            'interval': config.runtime.METRICS_INTERVAL,
+            'processes': processes,
+        }
+
+    @staticmethod
+    def _current(sample: Optional[dict], pid: Optional[int],
+                 now: float) -> dict:
+        """
+        The last sample, if from this pid, updated from /proc
+        """
+        if sample is None or sample.get('pid') != pid:
+            entry = {'pid': pid, 'sampled': None}
+        else:
+            entry = dict(sample)
+            entry['sampled'] = round(now - sample['time'], 1)
+        if pid is not None:
+            entry.update(proc_stats(pid))
+        return entry
+
+    def serve(self, loop: asyncio.AbstractEventLoop, conn: mpc.Connection):
+        """
+        Respond to each request on conn with snapshot()
+        """
+        def respond():
+            try:
+                conn.recv()
+                conn.send(self.snapshot())
+            except EOFError:
+                loop.remove_reader(conn.fileno())
+            except Exception as e:
+                logger.error(f"Unable to send metrics: {repr(e)}")
+
+        loop.add_reader(conn.fileno(), respond)
@@ -93,16 +93,19 @@ Note: Can't 'from import pyDE1.config import config'
 # Get all instantiated loggers: logging.root.manager.loggerDict
 
 import copy
+import fnmatch
 import logging
 import multiprocessing
 import multiprocessing.connection as mpc
 import os
+import time
 import warnings
-from logging.handlers import QueueHandler, MemoryHandler
-from typing import Optional, Union
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
+from typing import Dict, Optional, Union
 
 import pyDE1
 from pyDE1.config_load import ConfigLoadable
+from pyDE1.log_archive import ArchivingFileHandler
 
 
 def setup_initial_logger():
@@ -183,6 +186,13 @@ class ConfigLogging (ConfigLoadable):
         self.LOG_DIRECTORY = '/var/log/pyde1/'
         # NB: The log file name is matched against [a-zA-Z0-9._-]
         self.LOG_FILENAME = None    # Needs to be overridden
+        # Built-in rotation, see log_archive.py, None to leave to logrotate
+        self.ROTATE_BYTES = None
+        self.ROTATE_SECONDS = None
+        self.ROTATE_KEEP = 30   # Rotated files
+        self.ROTATE_COMPRESS = True
+        # Time index for fetching part of a log, None to not keep one
+        self.INDEX_SECONDS = 10
         self.formatters = ConfigLoggingFormatters()
         self.handlers = ConfigLoggingHandlers()
         self.LOGGERS = {
@@ -190,6 +200,14 @@ class ConfigLogging (ConfigLoadable):
             'root.asyncio':     'INFO',
             'root.bleak':       'INFO',
         }
+        # Records per second below WARNING, by pattern of the logger name
+        self.RATE_LIMIT = {
+            'DE1.*.Notify':     10,
+            'Inbound.HTTP':     10,
+        }
+        # Send a tuple of the fields used, rather than the LogRecord,
+        # between processes
+        self.COMPACT_RECORDS = True
 
 
 class ConfigLoggingFormatters (ConfigLoadable):
@@ -276,7 +294,9 @@ def _setup_logging_internal(config_logging: ConfigLogging,
         f"Configured stderr_handler: {stderr_handler}")
 
     if mqtt_connection:
-        mqtt_handler = PipeHandler(pipe_connection=mqtt_connection)
+        mqtt_handler = PipeHandler(
+            pipe_connection=mqtt_connection,
+            compact=config_logging.COMPACT_RECORDS)
         # This formatter is intentionally *not* set here to allow
         # the unformatted logrecord to be sent over MQTT
         # mqtt_formatter = Formatter(fmt=config_logging.formatters.MQTT)
@@ -309,7 +329,13 @@ def _setup_logging_internal(config_logging: ConfigLogging,
     else:
         fq_logfile = os.path.join(config_logging.LOG_DIRECTORY,
                                   config_logging.LOG_FILENAME)
-        logfile_handler = logging.handlers.WatchedFileHandler(fq_logfile)
+        logfile_handler = ArchivingFileHandler(
+            fq_logfile,
+            rotate_bytes=config_logging.ROTATE_BYTES,
+            rotate_seconds=config_logging.ROTATE_SECONDS,
+            keep=config_logging.ROTATE_KEEP,
+            compress=config_logging.ROTATE_COMPRESS,
+            index_seconds=config_logging.INDEX_SECONDS)
 
     logfile_formatter = Formatter(fmt=config_logging.formatters.LOGFILE)
     logfile_handler.setFormatter(logfile_formatter)
@@ -321,7 +347,7 @@ def _setup_logging_internal(config_logging: ConfigLogging,
 
     if log_queue is not None:
 
-        log_queue_listener = logging.handlers.QueueListener(
+        log_queue_listener = CompactQueueListener(
             log_queue,
             stderr_handler,
             mqtt_handler,
@@ -393,8 +419,11 @@ def setup_queue_logging(config_logging: ConfigLogging,
 
     # Configure the QueueHandler first, so that messages aren't lost
 
-    queue_handler = QueueHandler(queue)
+    queue_handler = CompactQueueHandler(
+        queue, compact=config_logging.COMPACT_RECORDS)
     queue_handler.name = 'queue_handler'
+    if config_logging.RATE_LIMIT:
+        queue_handler.addFilter(RateLimitFilter(config_logging.RATE_LIMIT))
     root_logger = logging.getLogger()
     root_logger.addHandler(queue_handler)
 
@@ -440,20 +469,135 @@ def log_record_to_json(record: logging.LogRecord):
     return json.dumps(to_send)
 
 
-class PipeHandler (QueueHandler):
+# What is needed of a LogRecord once the message has been formatted
+
+_COMPACT_FIELDS = (
+    'name', 'levelno', 'levelname', 'msg',
+    'created', 'msecs', 'relativeCreated',
+    'pathname', 'filename', 'module', 'lineno', 'funcName',
+    'process', 'processName', 'thread', 'threadName',
+)
+
+
+def compact_record(record: logging.LogRecord) -> tuple:
+    return tuple(getattr(record, field) for field in _COMPACT_FIELDS)
+
+
+def as_log_record(item: Union[logging.LogRecord, tuple]) \
+        -> logging.LogRecord:
+    """
+    A LogRecord, whether sent as one or from compact_record()
+    """
+    if isinstance(item, tuple):
+        return logging.makeLogRecord(dict(zip(_COMPACT_FIELDS, item)))
+    return item
+
+
+class CompactQueueHandler (QueueHandler):
+    """
+    Formats the message in this process, as QueueHandler does,
+    then sends just the fields in _COMPACT_FIELDS
+
+    The args, exception, and stack info are in the formatted message
+    """
+
+    def __init__(self, queue, compact=True):
+        super(CompactQueueHandler, self).__init__(queue)
+        self.compact = compact
+
+    def prepare(self, record: logging.LogRecord):
+        if not self.compact:
+            return super(CompactQueueHandler, self).prepare(record)
+        compact = compact_record(record)
+        # Index of 'msg' in _COMPACT_FIELDS
+        return compact[:3] + (self.format(record),) + compact[4:]
+
+
+class CompactQueueListener (QueueListener):
+
+    def prepare(self, record):
+        return as_log_record(record)
+
+
+class PipeHandler (CompactQueueHandler):
     """
     Just like a QueueHandler, except it uses a multiprocessing.Pipe's
     connection to .send() to instead of Queue.put_nowait()
+
+    The receiver uses as_log_record() on what is sent
     """
 
-    def __init__(self, pipe_connection: mpc.Connection):
+    def __init__(self, pipe_connection: mpc.Connection, compact=True):
         logging.Handler.__init__(self)
         self.pipe_connection = pipe_connection
+        self.compact = compact
 
     def enqueue(self, record):
         self.pipe_connection.send(record)
 
 
+class _Bucket:
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.suppressed = 0
+
+
+class RateLimitFilter (logging.Filter):
+    """
+    Lets through up to `rate` records per second below WARNING
+    from each logger with a name matching a pattern, such as
+    {'DE1.*.Notify': 10}, named as for pyDE1.getLogger()
+
+    The first record let through after some are dropped says how many
+    """
+
+    def __init__(self, limits: Dict[str, float]):
+        super(RateLimitFilter, self).__init__()
+        self._limits = limits
+        # None if not limited
+        self._buckets: Dict[str, Optional[_Bucket]] = {}
+
+    def _bucket_for(self, name: str) -> Optional[_Bucket]:
+        if name.startswith(pyDE1._ROOT_LOGGER_PREFIX):
+            name = name[pyDE1._ROOT_LOGGER_PREFIX_LEN:]
+        else:
+            name = 'root.' + name
+        for (pattern, rate) in self._limits.items():
+            if fnmatch.fnmatchcase(name, pattern):
+                return _Bucket(rate)
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        try:
+            bucket = self._buckets[record.name]
+        except KeyError:
+            bucket = self._buckets.setdefault(record.name,
+                                              self._bucket_for(record.name))
+        if bucket is None:
+            return True
+
+        now = time.monotonic()
+        bucket.tokens = min(bucket.capacity,
+                            bucket.tokens + (now - bucket.last) * bucket.rate)
+        bucket.last = now
+        if bucket.tokens < 1:
+            bucket.suppressed += 1
+            return False
+        bucket.tokens -= 1
+        if bucket.suppressed:
+            record.msg = (f"{record.getMessage()} "
+                          f"({bucket.suppressed} suppressed)")
+            record.args = None
+            bucket.suppressed = 0
+        return True
+
+
 class MemoryHandlerMulti (MemoryHandler):
     """
     Like a MemoryHandler, but uses an iterable list of targets
@@ -30,7 +30,8 @@ def run():
     # TODO: Replace this rather ugly hack on set_start_method, if possible
 
     import multiprocessing
-    multiprocessing.set_start_method('spawn', force=True)
+    import pyDE1.runtime_profile as runtime_profile
+    runtime_profile.set_start_method()
 
     import asyncio
     import atexit
@@ -40,6 +41,7 @@ def run():
     import time
     from types import FrameType
 
+    import pyDE1.process_metrics as process_metrics
     import pyDE1.shutdown_manager as sm
     from pyDE1.api.outbound.mqtt import run_mqtt_outbound, OutboundMode
     from pyDE1.api.inbound.http import run_api_inbound
@@ -61,9 +63,8 @@ def run():
 
     # With Python 3.11: DeprecationWarning: There is no current event loop
     # loop = asyncio.get_event_loop()
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.set_debug(True)
+    runtime_profile.mark_imported()
+    loop = runtime_profile.new_event_loop()
 
     def _sigchild_handler(signum: signal.Signals, frame: FrameType):
         ac = multiprocessing.active_children()
@@ -122,6 +123,12 @@ def run():
 
     inbound_pipe_controller, inbound_pipe_server = multiprocessing.Pipe()
 
+    # Samples from each process, a snapshot of all of them to InboundAPI
+    metrics_collector = process_metrics.MetricsCollector()
+    metrics_collector.start()
+    process_metrics.metrics_queue = metrics_collector.queue
+    metrics_pipe_main, metrics_pipe_server = multiprocessing.Pipe()
+
     # read, write, for simplex
     outbound_pipe_read, outbound_pipe_write = multiprocessing.Pipe(
         duplex=False)
@@ -136,7 +143,8 @@ def run():
             'mode': OutboundMode.LogRecord,
         },
         name='LogMQTT',
-        daemon=False)
+        daemon=False,
+        metrics_queue=metrics_collector.queue)
     supervised_process_set.add(supervised_outbound_log_process)
     supervised_outbound_log_process.start()
 
@@ -150,7 +158,8 @@ def run():
             'mode': OutboundMode.EventPayload,
         },
         name='OutboundAPI',
-        daemon=False)
+        daemon=False,
+        metrics_queue=metrics_collector.queue)
     supervised_process_set.add(supervised_outbound_api_process)
     supervised_outbound_api_process.start()
 
@@ -161,14 +170,16 @@ def run():
             'master_config': config,
             'log_queue': log_queue,
             'api_pipe': inbound_pipe_server,
+            'metrics_pipe': metrics_pipe_server,
         },
         name='InboundAPI',
-        daemon=False)
+        daemon=False,
+        metrics_queue=metrics_collector.queue)
     supervised_process_set.add(supervised_inbound_api_process)
     supervised_inbound_api_process.start()
 
-    # 20 packets per second, 20 seconds ~ 400
-    database_queue = multiprocessing.Queue(maxsize=400)
+    database_queue = multiprocessing.Queue(
+        maxsize=config.database.QUEUE_SIZE)
 
     # Database logging
     supervised_database_logger_process = SupervisedProcess(
@@ -179,7 +190,8 @@ def run():
             'notification_queue': database_queue,
         },
         name='DatabaseLogger',
-        daemon=False)
+        daemon=False,
+        metrics_queue=metrics_collector.queue)
     supervised_process_set.add(supervised_database_logger_process)
     supervised_database_logger_process.start()
 
@@ -198,11 +210,24 @@ def run():
         },
         name="Controller",
         will_subtopic='status/controller',
-        daemon=False
+        daemon=False,
+        metrics_queue=metrics_collector.queue,
     )
     supervised_process_set.add(supervised_controller_process)
     supervised_controller_process.start()
 
+    metrics_collector.watch(supervised_process_set)
+    metrics_collector.serve(loop, metrics_pipe_main)
+
+    monitor = runtime_profile.start_loop_monitor(loop, log=logger)
+    runtime_profile.report_startup(loop, log=logger)
+    # Not connected to MQTT, so only for GET metrics
+    process_metrics.start_process_metrics(loop, queues={
+        'log_queue': log_queue,
+        'log_mqtt_pipe': log_mqtt_pipe_write,
+        'metrics_queue': metrics_collector.queue,
+    }, monitor=monitor, send=lambda payload: False)
+
     logger.info('About to start loop')
 
     loop.run_forever()
@@ -237,6 +262,7 @@ def run():
             ev_str = 'os.EX_SOFTWARE'
 
     logger.info(f"Will exit with {sm.exit_value} {ev_str}")
+    metrics_collector.stop()
     pyde1_logging.log_queue_listener.stop()
     # Thread needs a bit to shut down
     # TODO: Can/should this thread be joined?
@@ -251,6 +277,9 @@ def pyde1_run():
 
     import argparse
 
+    import pyDE1.runtime_profile as runtime_profile
+    runtime_profile.mark_started()
+
     pyde1_logging.setup_initial_logger()
 
     ap = argparse.ArgumentParser(
@@ -0,0 +1,288 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Event-loop settings for each process, from config.runtime
+
+'debug' is asyncio debug mode, which checks and times every callback.
+That costs enough on a Pi to show up as jitter during a shot.
+
+'production' leaves debug mode off and samples how late the loop
+runs a timer instead. A callback that blocks the loop shows up as lag,
+so the percentiles of the lag, and the count of samples over
+LOOP_LAG_SLOW, are reported every LOOP_MONITOR_REPORT seconds
+through status_reporter, as <status topic>/loop
+
+Each process also reports how long its imports took and when its loop
+started, measured from when pyde1_run() started and from when the process
+was started, as <status topic>/startup
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from typing import Callable, List, Optional
+
+import pyDE1
+from pyDE1.config import config
+
+logger = pyDE1.getLogger('Runtime')
+
+PROFILES = ('production', 'debug')
+
+START_METHODS = ('spawn', 'forkserver')
+
+# time.time() when pyde1_run() started and when this process was started,
+# carried to the other processes by SupervisedProcess
+run_started: Optional[float] = None
+process_started: Optional[float] = None
+
+
+def profile_for(process_name: Optional[str] = None) -> str:
+    if process_name is None:
+        process_name = multiprocessing.current_process().name
+    profile = config.runtime.PROCESS_PROFILE.get(process_name,
+                                                 config.runtime.PROFILE)
+    if profile not in PROFILES:
+        logger.error(
+            f"Unrecognized runtime profile '{profile}' for {process_name}, "
+            f"expected one of {PROFILES}, using 'debug'")
+        profile = 'debug'
+    return profile
+
+
+def _install_uvloop() -> bool:
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def new_event_loop(process_name: Optional[str] = None) \
+        -> asyncio.AbstractEventLoop:
+    """
+    Create and set the event loop for this process,
+    configured for its profile
+    """
+    if process_name is None:
+        process_name = multiprocessing.current_process().name
+    profile = profile_for(process_name)
+
+    using_uvloop = config.runtime.USE_UVLOOP and _install_uvloop()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    if profile == 'debug':
+        loop.set_debug(True)
+        loop.slow_callback_duration = config.runtime.SLOW_CALLBACK_DURATION
+    else:
+        loop.set_debug(False)
+
+    logger.info(
+        f"{process_name}: {profile} profile, "
+        f"{'uvloop' if using_uvloop else 'asyncio'} event loop")
+    return loop
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LoopMonitor:
+    """
+    Samples the lag of a repeating timer, see module docstring
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 publish: Callable[[dict], None],
+                 interval: Optional[float] = None,
+                 report_interval: Optional[float] = None,
+                 slow: Optional[float] = None):
+        self._loop = loop
+        self._publish = publish
+        self._interval = interval if interval is not None \
+            else config.runtime.LOOP_MONITOR_INTERVAL
+        self._report_interval = report_interval \
+            if report_interval is not None \
+            else config.runtime.LOOP_MONITOR_REPORT
+        self._slow = slow if slow is not None \
+            else config.runtime.LOOP_LAG_SLOW
+        self._lags: List[float] = []
+        self._expected: Optional[float] = None
+        self._next_report: Optional[float] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self):
+        now = self._loop.time()
+        self._next_report = now + self._report_interval
+        self._schedule(now)
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self, now: float):
+        self._expected = now + self._interval
+        self._handle = self._loop.call_at(self._expected, self._sample)
+
+    def _sample(self):
+        now = self._loop.time()
+        self._lags.append(now - self._expected)
+        if now >= self._next_report:
+            self._next_report = now + self._report_interval
+            self._report()
+        self._schedule(now)
+
+    def stats(self) -> dict:
+        ordered = sorted(self._lags)
+        if not ordered:
+            return {'samples': 0}
+        return {
+            'samples': len(ordered),
+            'interval': self._interval,
+            'p50': round(_percentile(ordered, 0.50), 4),
+            'p90': round(_percentile(ordered, 0.90), 4),
+            'p99': round(_percentile(ordered, 0.99), 4),
+            'max': round(ordered[-1], 4),
+            'slow': sum(1 for lag in ordered if lag >= self._slow),
+            'slow_threshold': self._slow,
+        }
+
+    def _report(self):
+        stats = self.stats()
+        stats['time'] = time.time()
+        self._lags = []
+        try:
+            self._publish(stats)
+        except Exception as e:
+            logger.error(f"Unable to report loop stats: {repr(e)}")
+
+
+def start_loop_monitor(loop: asyncio.AbstractEventLoop,
+                       process_name: Optional[str] = None,
+                       log: Optional[logging.Logger] = None,
+                       send: Optional[Callable[[str], bool]] = None) \
+        -> Optional[LoopMonitor]:
+    """
+    In the production profile, start a LoopMonitor that reports
+    with send(json_str), by default through status_reporter,
+    or to the log if that returns False
+    """
+    if profile_for(process_name) != 'production':
+        return None
+    if log is None:
+        log = logger
+
+    if send is None:
+        import pyDE1.status_reporter as status_reporter
+
+        def send(payload: str) -> bool:
+            return status_reporter.publish('loop', payload)
+
+    def publish(stats: dict):
+        if not send(json.dumps(stats)):
+            log.info(f"Loop lag: {stats}")
+
+    monitor = LoopMonitor(loop, publish)
+    monitor.start()
+    return monitor
+
+
+def set_start_method() -> str:
+    """
+    From config.runtime, for run.py before any process is started
+    """
+    method = config.runtime.START_METHOD
+    if method not in START_METHODS:
+        logger.error(
+            f"Unrecognized START_METHOD '{method}', "
+            f"expected one of {START_METHODS}, using 'spawn'")
+        method = 'spawn'
+    multiprocessing.set_start_method(method, force=True)
+    if method == 'forkserver':
+        multiprocessing.set_forkserver_preload(
+            list(config.runtime.FORKSERVER_PRELOAD))
+    return method
+
+
+def mark_started(run: Optional[float] = None,
+                 process: Optional[float] = None):
+    global run_started, process_started
+    now = time.time()
+    run_started = run if run is not None else now
+    process_started = process if process is not None else now
+
+
+_imported: Optional[dict] = None
+
+
+def mark_imported():
+    """
+    Call once the process has imported what it needs
+    """
+    global _imported
+    _imported = startup_report('imported')
+
+
+def _since(t0: Optional[float], now: float) -> Optional[float]:
+    return round(now - t0, 3) if t0 is not None else None
+
+
+def startup_report(stage: str,
+                   process_name: Optional[str] = None) -> dict:
+    if process_name is None:
+        process_name = multiprocessing.current_process().name
+    now = time.time()
+    return {
+        'process': process_name,
+        'stage': stage,
+        'since_run': _since(run_started, now),
+        'since_process': _since(process_started, now),
+        'modules': len(sys.modules),
+        'time': now,
+    }
+
+
+def report_startup(loop: asyncio.AbstractEventLoop,
+                   process_name: Optional[str] = None,
+                   log: Optional[logging.Logger] = None,
+                   send: Optional[Callable[[str], bool]] = None):
+    """
+    Report once the loop is running, along with when mark_imported()
+    was called, by send(json_str), by default through status_reporter
+    """
+    if process_name is None:
+        process_name = multiprocessing.current_process().name
+    if log is None:
+        log = logger
+
+    if send is None:
+        import pyDE1.status_reporter as status_reporter
+
+        def send(payload: str) -> bool:
+            return status_reporter.publish('startup', payload)
+
+    def publish():
+        report = startup_report('ready', process_name)
+        report['imported'] = _imported
+        imported = ''
+        if _imported is not None:
+            imported = (f"imports {_imported['since_process']} sec, "
+                        f"{_imported['modules']} modules, ")
+        log.info(
+            f"Startup: {process_name} {imported}"
+            f"ready {report['since_process']} sec after process start, "
+            f"{report['since_run']} sec after run")
+        send(json.dumps(report))
+
+    loop.call_soon(publish)
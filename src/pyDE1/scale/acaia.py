@@ -96,6 +96,7 @@ import pyDE1
 import pyDE1.event_manager
 from pyDE1.scale.generic_scale import GenericScale, register_scale_class
 from pyDE1.scale.events import ScaleWeightUpdate
+from pyDE1.scale.framer import Framer
 from pyDE1.supervise import SupervisedTask
 
 from pyDE1.config import config
@@ -333,8 +334,23 @@ NONSTANDARD_MESSAGES = (
     bytes.fromhex('efdd 200a 0a00'),    # ?
 )
 
+NONSTANDARD_TYPE = 0x20
+NONSTANDARD_LENGTH = 6
 
-def hex_logstr(message: Union[bytes, bytearray]) -> str:
+
+def frame_length(buffer: bytearray, start: int, end: int) -> Optional[int]:
+    """
+    For Framer, the length of the message with HEADER at buffer[start],
+    or None if the length byte hasn't arrived
+    """
+    if end - start < 4:
+        return None
+    if buffer[start + 2] == NONSTANDARD_TYPE:
+        return NONSTANDARD_LENGTH
+    return buffer[start + 3] + 5
+
+
+def hex_logstr(message: Union[bytes, bytearray, memoryview]) -> str:
     """
     Utility to render as groups of 4 nibbles, from the left
     """
@@ -378,7 +394,7 @@ class AcaiaGeneric (GenericScale):
 
         # logger = pyDE1.getLogger(self.__class__.__name__)
         # logger_notify = logger.getChild('notify')
-        self._packet_buffer = bytearray()
+        self._framer = Framer(HEADER, frame_length, logger=logger)
         self._packet_buffer_lock = asyncio.Lock()
 
         self._heartbeat: Optional[SupervisedTask] = None
@@ -410,7 +426,7 @@ class AcaiaGeneric (GenericScale):
             # '_requires_heartbeat',
             # '_heartbeat_period',
             '_info',
-            '_packet_buffer',
+            '_framer',
             '_packet_buffer_lock',
             '_heartbeat',
             '_control_lock',
@@ -576,62 +592,8 @@ class AcaiaGeneric (GenericScale):
         Seen with Lunar and perhaps not with Lunar 2001
             Scale.Acaia: Waiting for more bytes, 3 < 5 bytes ef:dd:0c
         """
-        self._packet_buffer.extend(tsd.data)
-
-        while (lpb := len(self._packet_buffer)):
-
-            if lpb < 5:
-                break
-
-            # Check for the troublesome 'efdd 2008 0800' 'efdd ...'
-            # for nsm in NONSTANDARD_MESSAGES:
-            #     if self._packet_buffer.startswith(nsm):
-            #         self._process_message(nsm)
-            #         self._packet_buffer \
-            #             = self._packet_buffer[len(nsm):]
-            #         break
-
-            if self._packet_buffer.startswith(b'\xef\xdd\x20'):
-                await self._process_message(self._packet_buffer[0:6])
-                self._packet_buffer = self._packet_buffer[6:]
-                continue
-
-            idx = self._packet_buffer.find(HEADER)
-            if idx == 0:  # HEADER at start of buffer
-                try:
-                    len_byte = self._packet_buffer[3]
-                except IndexError:
-                    logger.debug(
-                        f"Waiting for more bytes, no length byte yet")
-                    break
-                if lpb >= (loa := len_byte + 5):
-                    if lpb > 26:  # 26 seen with ACK and TIMER
-                        logger.warning(
-                            f"Packet buffer getting long, at bytes: {lpb}")
-                    await self._process_message(self._packet_buffer[0:loa],
-                                                timestamp=tsd.timestamp)
-                    self._packet_buffer = self._packet_buffer[loa:]
-                else:
-                    logger.debug(
-                        f"Waiting for {loa - lpb} more bytes")
-                    break
-            else:
-                if idx == -1:
-                    if lpb == 1 \
-                            and self._packet_buffer[0] == HEADER[0]:
-                        logger.info(
-                            "Packet buffer is just first HEADER byte")
-                        break
-                    if lpb >= 2:
-                        discarded = self._packet_buffer
-                        self._packet_buffer = bytearray()
-                else:
-                    discarded = self._packet_buffer[0:idx]
-                    self._packet_buffer \
-                        = self._packet_buffer[idx:]
-                logger.warning(
-                    "Packet buffer does not start with header, discarding "
-                    + hex_logstr(discarded))
+        for message in self._framer.frames(tsd.data):
+            await self._process_message(message, timestamp=tsd.timestamp)
 
 
 
@@ -647,8 +609,12 @@ class AcaiaGeneric (GenericScale):
 #           Should a disconnect be called if already reconnecting?
 #           When should the _reconnect_task be cleared?
 
-    async def _process_message(self, message: Union[bytearray, bytes],
+    async def _process_message(self,
+                               message: Union[bytearray, bytes, memoryview],
                                timestamp: Optional[float] = None):
+        """
+        A single, complete message, passed to its handler in _dispatch
+        """
         if not timestamp:
             timestamp = time.time()
 
@@ -658,15 +624,16 @@ class AcaiaGeneric (GenericScale):
             # Strange, sometimes this continues without issue. Watch it
             # await self.disconnect(for_reconnect=True)
 
-        if message == b'\xef\xdd\x20\x08\x08\x00':
-            logger_notify.info("Acaia 0x2008 = power up?")
-            return
-        elif message == b'\xef\xdd\x20\x0a\x0a\x00':
-            logger_notify.info("Acaia 0x200a = power down?")
-            return
-        elif message == b'\xef\xdd\x20\x0c\x0c\x00':
-            logger_notify.info("Acaia 0x200c = power down?")
-            return
+        if message[2] == NONSTANDARD_TYPE:
+            if message == b'\xef\xdd\x20\x08\x08\x00':
+                logger_notify.info("Acaia 0x2008 = power up?")
+                return
+            elif message == b'\xef\xdd\x20\x0a\x0a\x00':
+                logger_notify.info("Acaia 0x200a = power down?")
+                return
+            elif message == b'\xef\xdd\x20\x0c\x0c\x00':
+                logger_notify.info("Acaia 0x200c = power down?")
+                return
 
         try:
             length_byte = message[3]
@@ -685,212 +652,213 @@ class AcaiaGeneric (GenericScale):
             logger_notify.error(f"Short packet: {hex_logstr(message)}")
             return
 
+        # The IntEnum members hash as their int values
+        if message[2] == MessageType.EVENT:
+            key = (message[2], message[4])
+        else:
+            key = (message[2], None)
         try:
-            message_type = MessageType(message[2])
-        except ValueError as e:
-            logger_notify.error(
-                f"0x{message[2]:02x} {e}: {hex_logstr(message)}")
+            handler = self._dispatch[key]
+        except KeyError:
+            self._process_unrecognized(message)
             return
+        await handler(self, message, timestamp)
 
-        if message_type == MessageType.EVENT:
-            try:
-                event_type = EventType(message[4])
-            except ValueError as e:
-                logger_notify.error(f"{e}: {hex_logstr(message)}")
-                return
+    async def _process_weight(self, message: memoryview, timestamp: float):
+
+        length_byte = message[3]
+
+        # Common for all three variants
+
+        # 6 bytes or more bytes before checksum
+        mantissa = message[5] + message[6] * 256 + message[7] * 65536
+        scale_by = 10 ** message[9]  # Production do this faster
+        if message[10] & 0x02:
+            sign = -1
         else:
-            event_type = None  # Not really needed, but keeps pyCharm happy
+            sign = 1
+        weight = sign * mantissa / scale_by
 
-        #
+        if logger_notify.isEnabledFor(logging.DEBUG) \
+                or length_byte not in (0x08, 0x0a, 0x0c, 0x0e):
 
-        if message_type == MessageType.EVENT:
+            if (message[10] & 0x01):  # Weight unsettled if & 0x01
+                other = '~'
+            else:
+                other = ''
 
-            if event_type == EventType.WEIGHT:
-
-                # Common for all three variants
-
-                # 6 bytes or more bytes before checksum
-                mantissa = message[5] + message[6] * 256 + message[7] * 65536
-                scale_by = 10 ** message[9]  # Production do this faster
-                if message[10] & 0x02:
-                    sign = -1
-                else:
-                    sign = 1
-                weight = sign * mantissa / scale_by
-
-                if (message[10] & 0x01):  # Weight unsettled if & 0x01
-                    other = '~'
-                else:
-                    other = ''
-
-                if length_byte == 0x08:
-                    pass
-
-                elif length_byte == 0x0a:
-                    # Seen on Lunar but not Lunar 2021
-                    unknown11 = message[11]
-                    battery = message[12]
-                    unknown13 = message[13]
-                    other = f"{other} {battery}% {unknown11}[11] {unknown13}[13]"
-                    logger_notify.debug(
-                        f"0x0a length: {weight}g {other} {hex_logstr(message)}")
-
-                elif length_byte == 0x0c:
-                    # it is a status, weight notification, "long version"
-
-                    unk11 = message[11]
-                    minutes = message[12]
-                    seconds = message[13]
-                    tenths = message[14]  # Seemingly, though why "2" at start?
-
-                    other = f"{other} {unk11} {minutes}:{seconds:02.0f},{tenths:01.0f}"
-
-                elif length_byte == 0x0e:
-                    # it is a status, weight notification, "longer version"
-
-                    unk11 = message[11]
-                    battery = message[12]  # Guessing, 0x64 at 100%
-                    unknown = message[13]
-                    minutes = message[14]
-                    seconds = message[15]
-                    tenths = message[16]  # Seemingly, though why "2" at start?
-
-                    other = f"{other} {unknown} " \
-                            f"{minutes}:{seconds:02.0f},{tenths:01.0f} " \
-                            f"- {unk11} {battery}%"
-
-                else:
-                    logger_notify.error(
-                        f"{message_type.name}, {event_type.name} "
-                        f"0x{len(message) - 4:02x} bytes unexpected: "
-                        f"{hex_logstr(message)}")
-
-                # asyncio.get_running_loop().create_task(
-                await self.event_weight_update.publish(
-                        ScaleWeightUpdate(
-                            arrival_time=timestamp,
-                            scale_time=self._scale_time_from_latest_arrival(
-                                timestamp),
-                            weight=weight
-                        ))
-                # )
-
-            elif event_type == EventType.REPLY_06:
-                logger_notify.info(
-                    f"{message_type.name}, {event_type.name}: "
-                    f"{hex_logstr(message)}")
+            if length_byte == 0x08:
+                pass
 
-            elif event_type == EventType.TIMER:
-                logger_notify.info(
-                    f"{message_type.name}, {event_type.name}: "
-                    f"{hex_logstr(message)}")
+            elif length_byte == 0x0a:
+                # Seen on Lunar but not Lunar 2021
+                unknown11 = message[11]
+                battery = message[12]
+                unknown13 = message[13]
+                other = f"{other} {battery}% {unknown11}[11] {unknown13}[13]"
+                logger_notify.debug(
+                    f"0x0a length: {weight}g {other} {hex_logstr(message)}")
 
-            elif event_type == EventType.KEY:
-                logger_notify.info(
-                    f"{message_type.name}, {event_type.name}: "
-                    f"{hex_logstr(message)}")
+            elif length_byte == 0x0c:
+                # it is a status, weight notification, "long version"
+
+                unk11 = message[11]
+                minutes = message[12]
+                seconds = message[13]
+                tenths = message[14]  # Seemingly, though why "2" at start?
 
-                # KEY: 0c: 0a 08 08 05 09 00 00 00 02 03 1d
-                # KEY: 0c: 0a 08 08 05 14 00 00 00 02 01 28
-                # KEY: 0c: 0a 08 08 05 15 00 00 00 02 03 29
-                # KEY: 0c: 0a 08 08 05 16 00 00 00 02 03 2a
-                # KEY: 0c: 0a 08 08 05 17 00 00 00 02 03 2b
-                # KEY: 0c: 0a 08 08 05 18 00 00 00 02 03 2c
-                # KEY: 0c: 0a 08 08 05 19 00 00 00 02 03 2d
-                # KEY: 0c: 0a 08 09 05 14 00 00 00 02 03 29
-                # KEY: 0c: 0a 08 09 05 17 00 00 00 02 03 2c
-                # KEY: 0c: 0a 08 09 05 17 00 00 00 02 03 2c
-                # KEY: 0c: 0a 08 09 05 18 00 00 00 02 03 2d
-                # KEY: 0c: 0a 08 09 05 39 00 00 00 02 03 4e
-                # KEY: 0c: 0a 08 0a 05 00 00 00 00 02 01 16
-                # KEY: 0c: 0a 08 0a 05 12 00 00 00 02 01 28
-                # KEY: 0c: 0e 08 08 05 17 00 00 00 02 03 07
-                # KEY: 0c: 0e 08 08 05 18 00 00 00 02 03 07
-                # KEY: 0c: 0e 08 09 05 17 00 00 00 02 03 07
-                # KEY: 0c: 0e 08 09 05 17 00 00 00 02 03 07
-
-            elif event_type == EventType.ACK:
-                logger_notify.info(
-                    f"{message_type.name}, {event_type.name}: "
+                other = f"{other} {unk11} {minutes}:{seconds:02.0f},{tenths:01.0f}"
+
+            elif length_byte == 0x0e:
+                # it is a status, weight notification, "longer version"
+
+                unk11 = message[11]
+                battery = message[12]  # Guessing, 0x64 at 100%
+                unknown = message[13]
+                minutes = message[14]
+                seconds = message[15]
+                tenths = message[16]  # Seemingly, though why "2" at start?
+
+                other = f"{other} {unknown} " \
+                        f"{minutes}:{seconds:02.0f},{tenths:01.0f} " \
+                        f"- {unk11} {battery}%"
+
+            else:
+                logger_notify.error(
+                    f"{MessageType.EVENT.name}, {EventType.WEIGHT.name} "
+                    f"0x{len(message) - 4:02x} bytes unexpected: "
                     f"{hex_logstr(message)}")
 
-        elif message_type == MessageType.TARE:
-            logger_notify.info(
-                f"{message_type.name}: {hex_logstr(message)}")
+        self._update_scale_time_estimator(timestamp)
 
-        elif message_type == MessageType.INFO:
+        # asyncio.get_running_loop().create_task(
+        await self.event_weight_update.publish(
+                ScaleWeightUpdate(
+                    arrival_time=timestamp,
+                    scale_time=self._scale_time_from_latest_arrival(
+                        timestamp),
+                    weight=weight
+                ))
+        # )
+
+    async def _process_logged(self, message: memoryview, timestamp: float):
+        message_type = MessageType(message[2])
+        if message_type == MessageType.EVENT:
+            logger_notify.info(
+                f"{message_type.name}, {EventType(message[4]).name}: "
+                f"{hex_logstr(message)}")
+        else:
             # Not connected? WARNING Notify: INFO: 07: 07 02 19 01 00 01
             logger_notify.info(
                 f"{message_type.name}: {hex_logstr(message)}")
 
-        # Clues to status-message byte assignments from
-        # https://github.com/oscar-b/scales/blob/master/src/acaia/scale.ts#L160
-        elif message_type == MessageType.STATUS:
-            payload = message[4:-2]
-            battery = payload[0]
-            try:
-                units = ConfigUnits(payload[1])
-            except ValueError as e:
-                logger.error(f"In processing STATUS, {e}")
-                units = '?'
-            unk2 = payload[2]
-            try:
-                auto_off = ConfigAutoOff(payload[3])
-            except ValueError as e:
-                logger.error(f"In processing STATUS, {e}")
-                auto_off = '?'
-            unk4 = payload[4]
-            try:
-                beep = ConfigBeep(payload[5])
-            except ValueError as e:
-                logger.error(f"In processing STATUS, {e}")
-                beep = '?'
-            try:
-                range = ConfigRange(payload[7])
-            except ValueError as e:
-                logger.error(f"In processing STATUS, {e}")
-                range = '?'
+        # KEY: 0c: 0a 08 08 05 09 00 00 00 02 03 1d
+        # KEY: 0c: 0a 08 08 05 14 00 00 00 02 01 28
+        # KEY: 0c: 0a 08 08 05 15 00 00 00 02 03 29
+        # KEY: 0c: 0a 08 08 05 16 00 00 00 02 03 2a
+        # KEY: 0c: 0a 08 08 05 17 00 00 00 02 03 2b
+        # KEY: 0c: 0a 08 08 05 18 00 00 00 02 03 2c
+        # KEY: 0c: 0a 08 08 05 19 00 00 00 02 03 2d
+        # KEY: 0c: 0a 08 09 05 14 00 00 00 02 03 29
+        # KEY: 0c: 0a 08 09 05 17 00 00 00 02 03 2c
+        # KEY: 0c: 0a 08 09 05 17 00 00 00 02 03 2c
+        # KEY: 0c: 0a 08 09 05 18 00 00 00 02 03 2d
+        # KEY: 0c: 0a 08 09 05 39 00 00 00 02 03 4e
+        # KEY: 0c: 0a 08 0a 05 00 00 00 00 02 01 16
+        # KEY: 0c: 0a 08 0a 05 12 00 00 00 02 01 28
+        # KEY: 0c: 0e 08 08 05 17 00 00 00 02 03 07
+        # KEY: 0c: 0e 08 08 05 18 00 00 00 02 03 07
+        # KEY: 0c: 0e 08 09 05 17 00 00 00 02 03 07
+        # KEY: 0c: 0e 08 09 05 17 00 00 00 02 03 07
+
+    # Clues to status-message byte assignments from
+    # https://github.com/oscar-b/scales/blob/master/src/acaia/scale.ts#L160
+    async def _process_status(self, message: memoryview, timestamp: float):
+        message_type = MessageType.STATUS
+        payload = message[4:-2]
+        battery = payload[0]
+        try:
+            units = ConfigUnits(payload[1])
+        except ValueError as e:
+            logger.error(f"In processing STATUS, {e}")
+            units = '?'
+        unk2 = payload[2]
+        try:
+            auto_off = ConfigAutoOff(payload[3])
+        except ValueError as e:
+            logger.error(f"In processing STATUS, {e}")
+            auto_off = '?'
+        unk4 = payload[4]
+        try:
+            beep = ConfigBeep(payload[5])
+        except ValueError as e:
+            logger.error(f"In processing STATUS, {e}")
+            beep = '?'
+        try:
+            range = ConfigRange(payload[7])
+        except ValueError as e:
+            logger.error(f"In processing STATUS, {e}")
+            range = '?'
 
+        level = logging.INFO
+        try:
+            self._info = Info(
+                battery=battery,
+                units=units,
+                unk2=unk2,
+                auto_off=auto_off,
+                unk4=unk4,
+                beep=beep,
+                range=ConfigRange(range),
+            )
+        except ValueError as e:
             level = logging.INFO
+            logger_notify.error(f"Error saving info data {e}")
+
+        if battery > 100:
+            level = logging.ERROR
+        logger_notify.log(level,
+                          "{}: {}% {} ({}) {} ({}) {} {}".format(
+                              message_type.name,
+                              battery,
+                              units.name,
+                              unk2,
+                              auto_off.name,
+                              unk4,
+                              beep.name,
+                              range.name,
+                          ))
+
+    @staticmethod
+    def _process_unrecognized(message: memoryview):
+        try:
+            message_type = MessageType(message[2])
+        except ValueError as e:
+            logger_notify.error(
+                f"0x{message[2]:02x} {e}: {hex_logstr(message)}")
+            return
+        if message_type == MessageType.EVENT:
             try:
-                self._info = Info(
-                    battery=battery,
-                    units=units,
-                    unk2=unk2,
-                    auto_off=auto_off,
-                    unk4=unk4,
-                    beep=beep,
-                    range=ConfigRange(range),
-                )
+                EventType(message[4])
             except ValueError as e:
-                level = logging.INFO
-                logger_notify.error(f"Error saving info data {e}")
-
-            if battery > 100:
-                level = logging.ERROR
-            logger_notify.log(level,
-                              "{}: {}% {} ({}) {} ({}) {} {}".format(
-                                  message_type.name,
-                                  battery,
-                                  units.name,
-                                  unk2,
-                                  auto_off.name,
-                                  unk4,
-                                  beep.name,
-                                  range.name,
-                              ))
-
-        elif message_type == MessageType.IDENTIFY:
-            logger_notify.info(
-                f"{message_type.name}: {hex_logstr(message)}")
-
-        elif message_type == MessageType.TIMER:
-            logger_notify.info(
-                f"{message_type.name}: {hex_logstr(message)}")
-
-        else:
-            logger_notify.warning(
-                f"Unrecognized message type: {hex_logstr(message)}")
+                logger_notify.error(f"{e}: {hex_logstr(message)}")
+                return
+        logger_notify.warning(
+            f"Unrecognized message type: {hex_logstr(message)}")
+
+    # (message[2], message[4] if an EVENT, else None) to its handler
+    _dispatch = {
+        (MessageType.EVENT, EventType.WEIGHT):      _process_weight,
+        (MessageType.EVENT, EventType.REPLY_06):    _process_logged,
+        (MessageType.EVENT, EventType.TIMER):       _process_logged,
+        (MessageType.EVENT, EventType.KEY):         _process_logged,
+        (MessageType.EVENT, EventType.ACK):         _process_logged,
+        (MessageType.TARE, None):                   _process_logged,
+        (MessageType.INFO, None):                   _process_logged,
+        (MessageType.STATUS, None):                 _process_status,
+        (MessageType.IDENTIFY, None):               _process_logged,
+        (MessageType.TIMER, None):                  _process_logged,
+    }
 
 
 # Register later to not conflict with ACAIAL1
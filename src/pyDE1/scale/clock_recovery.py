@@ -0,0 +1,177 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Recover the sample clock of a scale from the arrival times of its reports
+
+A scale samples on its own clock, one report per period. The arrival of
+each report is that sample time plus a delay that varies. The Skale II
+often holds two or more reports for the next of its 150-ms windows,
+Acaia reports wander by tens of ms. Taking the arrival time, less the
+sensor lag, as when the weight was on the scale carries all of that
+into scale_time and so into stop-at-weight.
+
+Each report is given the next sample index. A least-squares line of
+arrival time against index, over a sliding window of recent reports,
+then gives the arrival that would be expected for each sample, without
+the jitter of any one report.
+
+A report that arrives within a small fraction of a period of the one
+before is part of a burst. All but the last of a burst were held back,
+so are taken out of the fit. A gap of more than config.scale.CLOCK_GAP
+is taken as reports that were lost, the index advances by as many periods.
+A gap longer than the window restarts the fit.
+
+Until there are enough reports in the window for the line,
+the period of the scale's PeriodEstimator is used for its slope.
+"""
+
+from collections import deque
+from typing import Optional
+
+import pyDE1
+
+logger = pyDE1.getLogger('Scale.Clock')
+
+
+class ClockRecovery:
+
+    def __init__(self, my_scale,
+                 window: int = 600,
+                 min_samples: int = 10,
+                 gap: float = 1.0,
+                 burst_fraction: float = 0.25):
+
+        self._scale = my_scale
+
+        self._window = window   # reports, about a minute at 10 per second
+        self._min_samples = min_samples
+        self._gap = gap     # seconds, over this reports were lost
+        self._burst_fraction = burst_fraction   # of a period
+
+        # [index, arrival, in_fit]
+        self._reports: deque = deque()
+        self.reset()
+
+    def reset(self):
+        self._reports.clear()
+        self._index = 0
+        self._last_arrival: Optional[float] = None
+        self._since_rebase = 0
+        # Relative to an origin, so that the sums keep their precision
+        self._x0 = 0
+        self._y0 = 0.0
+        self._n = 0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    @property
+    def index(self):
+        return self._index
+
+    def _add(self, index: int, arrival: float):
+        x = index - self._x0
+        y = arrival - self._y0
+        self._n += 1
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._sxy += x * y
+
+    def _remove(self, index: int, arrival: float):
+        x = index - self._x0
+        y = arrival - self._y0
+        self._n -= 1
+        self._sx -= x
+        self._sy -= y
+        self._sxx -= x * x
+        self._sxy -= x * y
+
+    def _rebase(self):
+        """
+        Move the origin to the oldest report and recompute the sums,
+        which also drops what has accumulated from add and remove
+        """
+        (self._x0, self._y0, _) = self._reports[0]
+        self._n = 0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        for (index, arrival, in_fit) in self._reports:
+            if in_fit:
+                self._add(index, arrival)
+        self._since_rebase = 0
+
+    @property
+    def period(self) -> float:
+        """
+        Slope of the fit, or that from the PeriodEstimator
+        if there are too few reports or the fit isn't credible
+        """
+        prior = self._scale.estimated_period
+        if self._n < self._min_samples:
+            return prior
+        denominator = self._n * self._sxx - self._sx * self._sx
+        if denominator <= 0:
+            return prior
+        slope = (self._n * self._sxy - self._sx * self._sy) / denominator
+        if not 0.5 * prior < slope < 2 * prior:
+            return prior
+        return slope
+
+    def expected_arrival(self, index: Optional[int] = None) -> Optional[float]:
+        """
+        Arrival time on the line for the sample, the latest if None
+        """
+        if index is None:
+            index = self._index
+        if not self._n:
+            return None
+        slope = self.period
+        intercept = (self._sy - slope * self._sx) / self._n
+        return self._y0 + intercept + slope * (index - self._x0)
+
+    def arrival(self, arrival_time: float) -> float:
+        """
+        Call once per report, returns its expected arrival time,
+        which, less the sensor lag, is when it was sampled
+        """
+        if self._last_arrival is not None:
+            dt = arrival_time - self._last_arrival
+            period = self.period
+            if dt > self._window * period or dt < 0:
+                logger.info(f"Restarting after {dt:.3f} sec")
+                self.reset()
+            elif dt > self._gap:
+                lost = max(round(dt / period) - 1, 0)
+                self._index += lost + 1
+                logger.info(f"{lost} reports lost over {dt:.3f} sec")
+            else:
+                self._index += 1
+                if dt < self._burst_fraction * period:
+                    # Held back, only the last of a burst is on time
+                    previous = self._reports[-1]
+                    if previous[2]:
+                        previous[2] = False
+                        self._remove(previous[0], previous[1])
+
+        if not self._reports:
+            self._x0 = self._index
+            self._y0 = arrival_time
+        self._reports.append([self._index, arrival_time, True])
+        self._add(self._index, arrival_time)
+        self._last_arrival = arrival_time
+
+        while self._reports[0][0] <= self._index - self._window:
+            (index, arrival, in_fit) = self._reports.popleft()
+            if in_fit:
+                self._remove(index, arrival)
+
+        self._since_rebase += 1
+        if self._since_rebase >= self._window:
+            self._rebase()
+
+        return self.expected_arrival()
@@ -0,0 +1,153 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Split a stream of BLE packets into the messages of a scale
+
+A message may be split across packets and a packet may hold several
+messages. Packets are copied into a buffer of fixed size. A read offset
+is advanced over the messages found and each is returned as a memoryview
+into that buffer, rather than reslicing a bytearray for every message.
+What is left is moved to the front only when there isn't room for
+the next packet.
+
+Messages start with a header. frame_length(buffer, start, end) is called
+with the header at buffer[start] and returns the length of the message,
+including the header, or None if more bytes than buffer[start:end]
+are needed to know.
+Bytes before a header are discarded, with a warning.
+"""
+
+from typing import Callable, List, Optional, Union
+
+import pyDE1
+
+logger = pyDE1.getLogger('Scale.Framer')
+
+
+class Framer:
+
+    def __init__(self, header: Union[bytes, bytearray],
+                 frame_length: Callable[[bytearray, int, int], Optional[int]],
+                 capacity: int = 512,
+                 logger=logger):
+        if not header:
+            raise ValueError("A header is required to find a message")
+        self._header = bytes(header)
+        self._header_length = len(header)
+        self._frame_length = frame_length
+        self._capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._read = 0
+        self._write = 0
+        self._logger = logger
+
+    def __len__(self):
+        """
+        Bytes waiting for the rest of a message
+        """
+        return self._write - self._read
+
+    def clear(self):
+        self._read = 0
+        self._write = 0
+
+    def frames(self, data: Union[bytes, bytearray, memoryview]) \
+            -> List[Union[memoryview, bytes]]:
+        """
+        Add the packet and return the complete messages
+
+        A message is a view into the buffer, valid only until
+        the next call of frames(). Use bytes() to keep it.
+        """
+        if len(data) > self._capacity - self._write:
+            self._compact()
+            if len(data) > self._capacity - self._write:
+                return self._frames_in_chunks(data)
+        return self._add(data)
+
+    def _frames_in_chunks(self, data) -> List[bytes]:
+        """
+        For a packet larger than the free space, rare,
+        so the messages are copied as the buffer is reused
+        """
+        frames = []
+        data = memoryview(data)
+        while len(data):
+            self._compact()
+            n = self._capacity - self._write
+            if not n:
+                # frame_length() needs more than will fit
+                self._logger.error(
+                    f"No message found in {self._capacity} bytes, discarding")
+                self.clear()
+                continue
+            frames.extend(bytes(frame) for frame in self._add(data[:n]))
+            data = data[n:]
+        return frames
+
+    def _add(self, data) -> List[memoryview]:
+        buffer = self._buffer
+        header = self._header
+        header_length = self._header_length
+        read = self._read
+        write = self._write + len(data)
+        buffer[self._write:write] = data
+        self._write = write
+
+        frames = []
+        while write - read >= header_length:
+            if not buffer.startswith(header, read):
+                self._read = read
+                self._discard(buffer.find(header, read, write))
+                read = self._read
+                continue
+            length = self._frame_length(buffer, read, write)
+            if length is None:
+                break
+            if not header_length < length <= self._capacity:
+                self._logger.error(
+                    f"Length of {length} not possible, discarding "
+                    + self._view[read:write].hex(sep=' ', bytes_per_sep=-2))
+                # Look for the next header after this one
+                read += 1
+                continue
+            if length > write - read:
+                break
+            frames.append(self._view[read:read + length])
+            read += length
+
+        if read == write:
+            self._write = 0
+            read = 0
+        self._read = read
+        return frames
+
+    def _compact(self):
+        if not self._read:
+            return
+        pending = self._write - self._read
+        self._view[0:pending] = self._view[self._read:self._write]
+        self._read = 0
+        self._write = pending
+
+    def _discard(self, start: int):
+        if start == -1:
+            # Keep a partial header at the end
+            end = self._write
+            header = self._header
+            for keep in range(len(header) - 1, 0, -1):
+                if self._buffer.endswith(header[:keep], self._read,
+                                         self._write):
+                    end -= keep
+                    break
+        else:
+            end = start
+        self._logger.warning(
+            "Packet buffer does not start with header, discarding "
+            + self._view[self._read:end].hex(sep=' ', bytes_per_sep=-2))
+        self._read = end
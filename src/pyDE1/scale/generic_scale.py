@@ -10,12 +10,13 @@ import asyncio
 import pprint
 import time
 import warnings
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 
 import aiosqlite
 from bleak.backends.device import BLEDevice
 
 import pyDE1
+from pyDE1.bledev.device_registry import device_registry
 from pyDE1.bledev.managed_bleak_device import (
     ManagedBleakDevice, ClassChanger, class_changer_generic_class,
 )
@@ -28,6 +29,7 @@ from pyDE1.exceptions import (
     DE1RuntimeError, DE1NotConnectedError,
     DE1UnsupportedDeviceError,
 )
+from pyDE1.scale.clock_recovery import ClockRecovery
 from pyDE1.scale.events import ScaleWeightUpdate, ScaleTareSeen, ScaleChange
 from pyDE1.scanner import RegisteredPrefixes
 
@@ -112,6 +114,14 @@ class GenericScale (ClassChanger, ManagedBleakDevice):
 
         self._adopt_sync()
         self._period_estimator = PeriodEstimator(self)
+        # A subclass' _adopt_sync() may not have set _estimated_period
+        self._period_estimator.reset(self._nominal_period)
+        self._clock_recovery = ClockRecovery(
+            self,
+            window=config.scale.CLOCK_WINDOW,
+            gap=config.scale.CLOCK_GAP)
+        # (arrival, expected arrival) of the latest report
+        self._latest_expected_arrival: Optional[Tuple[float, float]] = None
 
         # Don't need to await this on instantiation
         asyncio.get_event_loop().create_task(
@@ -147,6 +157,8 @@ class GenericScale (ClassChanger, ManagedBleakDevice):
 
         try:
             self._period_estimator.reset(self._nominal_period)
+            self._clock_recovery.reset()
+            self._latest_expected_arrival = None
         except AttributeError:
             pass
 
@@ -178,6 +190,33 @@ class GenericScale (ClassChanger, ManagedBleakDevice):
         asyncio.create_task(self._event_scale_changed.publish(sc))
 
     async def _initialize_after_connection(self, hold_ready=False):
+        # The methods are looked up when the step starts (lambda)
+        # as the class may change in the first step.
+        # Changing class resets the period, so restore it after,
+        # though the database read doesn't need to wait on the scale
+        pipeline = self._new_init_pipeline()
+        pipeline.add('class', self._confirm_class)
+        pipeline.add('display_on',
+                     lambda: self.display_on(),
+                     after=('class',),
+                     gatt_write=True)
+        pipeline.add('weight_updates',
+                     lambda: self.start_sending_weight_updates(),
+                     after=('class',),
+                     gatt_write=True)
+        pipeline.add('button_updates',
+                     lambda: self._start_sending_button_updates_if_supported(),
+                     after=('class',),
+                     gatt_write=True)
+        pipeline.add('restore_period',
+                     self._restore_period_from_db,
+                     after=('class',))
+        await pipeline.run()
+        pipeline.log_timeline()
+        if not hold_ready:
+            self._notify_ready()
+
+    async def _confirm_class(self):
         # Check that this is the right class to service the connected device
         self._adjust_name_send_scale_change()
         ble_name = self._bleak_client._backend._device_info['Name']
@@ -188,13 +227,10 @@ class GenericScale (ClassChanger, ManagedBleakDevice):
                     self._name, type(self), cls))
             await self._change_class(cls)
             self._adjust_name_send_scale_change()
-        await self.display_on()
-        await self.start_sending_weight_updates()
+
+    async def _start_sending_button_updates_if_supported(self):
         if self.supports_button_press:
             await self.start_sending_button_updates()
-        await self._restore_period_from_db()
-        if not hold_ready:
-            self._notify_ready()
 
     async def connect(self):
         """
@@ -300,12 +336,22 @@ class GenericScale (ClassChanger, ManagedBleakDevice):
     async def change_address(self, address: Optional[Union[BLEDevice, str]]):
         """
         Change address, including changing type if passed a BLEDevice
+        or the address of a scale in the device registry
 
         Raises DE1UnsupportedDeviceError if BLEDevice.name is not recognized
         """
-        if isinstance(address, BLEDevice) or address in (None, ''):
+        if isinstance(address, str) \
+                and (known := device_registry.get(address)) is not None \
+                and known.role == DeviceRole.SCALE and known.name:
+            known_name = known.name
+        else:
+            known_name = None
+        if isinstance(address, BLEDevice) or address in (None, '') \
+                or known_name is not None:
             if address in (None, ''):
                 cls = prefix_to_class('')
+            elif known_name is not None:
+                cls = prefix_to_class(known_name)
             else:
                 # This call potentially raises DE1UnsupportedDeviceError
                 cls = prefix_to_class(address.name)
@@ -330,17 +376,27 @@ class GenericScale (ClassChanger, ManagedBleakDevice):
         Given the latest arrival, provide "best" estimate
         of when that weight was on the scale
 
-        At present, just compensates for scale._scale_delay
-        which should include transit delays and the like
+        Compensates for scale._sensor_lag, which should include
+        transit delays and the like. If _update_scale_time_estimator()
+        was called with this arrival, from the fit of the scale's
+        sample clock, rather than the arrival itself.
         """
+        if self._latest_expected_arrival is not None:
+            (arrival, expected) = self._latest_expected_arrival
+            if arrival == latest_arrival:
+                return expected - self._sensor_lag
         return latest_arrival - self._sensor_lag
 
     def _update_scale_time_estimator(self,
                                      latest_arrival:float):
         """
-        Call once per arrival to update any "fancy" algorithms such as PLL
+        Call once per arrival to update the fit of the scale's
+        sample clock, see clock_recovery.py
         """
-        pass
+        if config.scale.CLOCK_RECOVERY:
+            self._latest_expected_arrival = (
+                latest_arrival,
+                self._clock_recovery.arrival(latest_arrival))
 
     async def _self_callback(self, swu: ScaleWeightUpdate) -> None:
         dt = swu.arrival_time - self._last_weight_update_received
@@ -377,6 +433,7 @@ class GenericScale (ClassChanger, ManagedBleakDevice):
     def nominal_period(self, value):
         self._nominal_period = value
         self._period_estimator.reset(value)
+        self._clock_recovery.reset()
 
     async def _persist_period_to_db(self):
         if not self.address:
@@ -28,7 +28,7 @@ from pyDE1.scale.events import (
     ScaleWeightUpdate, ScaleTareSeen, WeightAndFlowUpdate
 )
 from pyDE1.scanner import (
-    find_first_matching,
+    capture_known_or_first_matching,
     RegisteredPrefixes,
 )
 from pyDE1.singleton import Singleton
@@ -182,10 +182,7 @@ class ScaleProcessor (Singleton):
                 "'scan' requested, but already connected. "
                 "No action taken.")
         else:
-            device = await find_first_matching(DeviceRole.SCALE)
-            if device:
-                await self.scale.change_address(device)
-                await self.scale.capture()
+            await capture_known_or_first_matching(self.scale)
         return self.scale_address
 
 
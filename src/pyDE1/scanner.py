@@ -22,12 +22,14 @@ import asyncio
 import queue
 import time
 
-from typing import Iterable, Tuple, Optional
+from typing import Iterable, Tuple, Optional, Dict
 
 import bleak
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
+from pyDE1.bledev.connection_scheduler import connection_scheduler
+from pyDE1.bledev.device_registry import device_registry
 from pyDE1.event_manager.event_manager import SubscribedEvent
 from pyDE1.event_manager.events import DeviceRole
 
@@ -53,6 +55,10 @@ class _RegisteredPrefixes:
         self._prefixes = dict()
         for role in DeviceRole:
             self._prefixes[role]: set[str] = set()
+        # str.startswith() takes a tuple, built once per role
+        self._as_tuple: Dict[DeviceRole, Tuple[str, ...]] = {}
+        # Advertisements repeat, so names do as well
+        self._match_cache: Dict[Tuple[str, DeviceRole], Optional[str]] = {}
         self.add_to_role('', DeviceRole.UNKNOWN)
 
     def get_for_role(self, role: DeviceRole):
@@ -63,6 +69,41 @@ class _RegisteredPrefixes:
 
     def add_to_role(self, prefix: str, role: DeviceRole):
         self._prefixes[role].add(prefix)
+        # Longest first, so match() returns the most specific
+        self._as_tuple[role] = tuple(
+            sorted(self._prefixes[role], key=len, reverse=True))
+        self._match_cache = {}
+
+    def match(self, name: Optional[str],
+              role: Optional[DeviceRole]) -> Optional[str]:
+        """
+        The registered prefix for the role that name starts with, if any
+        """
+        if not name or role is None:
+            return None
+        try:
+            return self._match_cache[(name, role)]
+        except KeyError:
+            pass
+        prefixes = self._as_tuple.get(role, ())
+        retval = None
+        if name.startswith(prefixes):
+            for prefix in prefixes:
+                if name.startswith(prefix):
+                    retval = prefix
+                    break
+        self._match_cache[(name, role)] = retval
+        return retval
+
+    def role_for_name(self, name: Optional[str]) -> Optional[DeviceRole]:
+        """
+        The role with a non-empty prefix that name starts with, if any
+        """
+        for role in (DeviceRole.DE1, DeviceRole.SCALE,
+                     DeviceRole.THERMOMETER, DeviceRole.OTHER):
+            if self.match(name, role):
+                return role
+        return None
 
 
 RegisteredPrefixes = _RegisteredPrefixes()
@@ -79,7 +120,9 @@ class _Wrapper:
         self.scanner: Optional[bleak.BleakScanner] = None
         self.role: Optional[DeviceRole] = None
         self.found: list[BLEDevice] = list()
+        self.found_addresses: set[str] = set()
         self.timeout_task: Optional[asyncio.Task] = None
+        self._publish_handle: Optional[asyncio.TimerHandle] = None
 
     async def new_run(self,
                 scanner: bleak.BleakScanner,
@@ -90,13 +133,18 @@ class _Wrapper:
         self.scanner = None
         self.role = None
         self.found = list()
+        self.found_addresses = set()
         self.timeout_task = None
         scan_complete.clear()
+        # So that devices seen update those already known
+        await device_registry.load()
         self.scanner = scanner
         self.role = role
         await _scan_results_event.publish(
                     ScanResults(_wrapper.found, role))
-        await self.scanner.start()
+        # Starting discovery while connecting can fail with InProgress
+        async with connection_scheduler.adapter_operation(role):
+            await self.scanner.start()
         self.timeout_task = asyncio.create_task(self._stop_later(timeout))
         # self.timeout_task.add_done_callback(
         #     lambda t: not t.cancelled()
@@ -105,14 +153,44 @@ class _Wrapper:
             role, timeout, self.timeout_task.get_name()
         ))
 
+    def add_found(self, device: BLEDevice) -> bool:
+        """
+        Returns True if the device wasn't already found in this run
+        """
+        if device.address in self.found_addresses:
+            return False
+        self.found_addresses.add(device.address)
+        self.found.append(device)
+        return True
+
+    def publish_soon(self):
+        """
+        Coalesce the ScanResults from a burst of detections into one
+        """
+        if self._publish_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._publish_handle = loop.call_later(
+            config.bluetooth.SCAN_RESULTS_HOLDOFF, self._publish_now)
+
+    def _publish_now(self):
+        self._publish_handle = None
+        asyncio.get_running_loop().create_task(_scan_results_event.publish(
+            ScanResults(self.found, self.role)))
+
     async def end_run(self):
         # Cancel first, as was not seeming to cancel when done second.
         try:
             self.timeout_task.cancel()
         except AttributeError:
             pass
+        # The final ScanResults supersedes any pending
+        if self._publish_handle is not None:
+            self._publish_handle.cancel()
+            self._publish_handle = None
         try:
-            await self.scanner.stop()
+            async with connection_scheduler.adapter_operation(self.role):
+                await self.scanner.stop()
             self.scanner = None
             await _scan_results_event.publish(
                 ScanResults(self.found, self.role, scanning=False))
@@ -121,6 +199,7 @@ class _Wrapper:
                 f"Scan ended for {self.role}, {len(self.found)} found")
         except AttributeError:
             pass
+        await device_registry.flush()
 
     async def _stop_later(self, after: float):
         my_scanner = self.scanner
@@ -146,21 +225,18 @@ async def scan_until_timeout(role: DeviceRole = None,
     if timeout is None:
         timeout = config.bluetooth.SCAN_TIME
 
-    loop = asyncio.get_running_loop()
-
-    prefix_set = RegisteredPrefixes.get_for_role(role)
-
     def check_match(device: BLEDevice, adv: AdvertisementData):
-        for prefix in prefix_set:
-            if adv.local_name and adv.local_name.startswith(prefix):
-                logger.info(
-                    f"'{prefix}' matched at {device.address} by {adv}")
-                # Can get called more than once if the device data changes
-                if device.address not in [d.address
-                                          for d in _wrapper.found]:
-                    _wrapper.found.append(device)
-                loop.create_task(_scan_results_event.publish(
-                    ScanResults(_wrapper.found, role)))
+        prefix = RegisteredPrefixes.match(adv.local_name, role)
+        if prefix is None:
+            return
+        device_registry.seen(device.address, adv.local_name, adv.rssi,
+                             RegisteredPrefixes.role_for_name(adv.local_name)
+                             or role)
+        # Can get called more than once if the device data changes
+        if _wrapper.add_found(device):
+            logger.info(
+                f"'{prefix}' matched at {device.address} by {adv}")
+            _wrapper.publish_soon()
 
     # Cancel any already running
     await _wrapper.end_run()
@@ -185,19 +261,18 @@ async def find_first_matching(role: DeviceRole,
     if timeout is None:
         timeout = config.bluetooth.SCAN_TIME
 
-    loop = asyncio.get_running_loop()
-
-    prefix_set = RegisteredPrefixes.get_for_role(role)
-
     found_event = asyncio.Event()
 
     def check_match(device: BLEDevice, adv: AdvertisementData):
-        for prefix in prefix_set:
-            if adv.local_name and adv.local_name.startswith(prefix):
-                logger.info(
-                    f"'{prefix}' matched at {device.address} by {adv}")
-                _wrapper.found = [device]
-                found_event.set()
+        prefix = RegisteredPrefixes.match(adv.local_name, role)
+        if prefix is None:
+            return
+        device_registry.seen(device.address, adv.local_name, adv.rssi, role)
+        if not found_event.is_set():
+            logger.info(
+                f"'{prefix}' matched at {device.address} by {adv}")
+        _wrapper.found = [device]
+        found_event.set()
 
     async def found_waiter():
         await found_event.wait()
@@ -228,6 +303,51 @@ async def find_first_matching(role: DeviceRole,
 
 
 
+async def capture_known_or_first_matching(device: 'ManagedBleakDevice'):
+    """
+    For a 'scan' request, first try the device last connected for the role
+    by its address. Only if it can't be captured in KNOWN_DEVICE_TIMEOUT
+    is a scan run, capturing the first device found.
+
+    Methods are looked up on device each time as it may change class.
+    """
+    role = device.role
+    metrics = device_registry.metrics_for_role(role)
+    t0 = time.time()
+
+    for known in (await device_registry.known_for_role(role))[:1]:
+        logger.info(f"Trying {role.value} last connected at {known.address}")
+        await device.change_address(known.address)
+        try:
+            if await device.capture(
+                    timeout=config.bluetooth.KNOWN_DEVICE_TIMEOUT):
+                metrics.record(time.time() - t0, 'known')
+                logger.info(
+                    f"Connected {role.value} at {known.address} "
+                    f"without a scan in {time.time() - t0:.3f} sec")
+                return
+        except asyncio.TimeoutError:
+            pass
+        metrics.known_failed += 1
+        logger.info(
+            f"No connection to {known.address} after "
+            f"{time.time() - t0:.3f} sec, scanning")
+        # Release so that the pending connect doesn't hold up the scan
+        try:
+            await device.release(timeout=config.bluetooth.DISCONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout releasing {known.address}")
+
+    found = await find_first_matching(role)
+    if found:
+        await device.change_address(found)
+        if await device.capture():
+            metrics.record(time.time() - t0, 'scan')
+            logger.info(
+                f"Connected {role.value} at {found.address} "
+                f"after scan in {time.time() - t0:.3f} sec")
+
+
 async def scan_from_api(role: DeviceRole):
     await scan_until_timeout(role)
 
@@ -13,6 +13,10 @@ are not present in this implementation.
 
 Known limitations include:
   * No braces permitted in "text" fields (brace-quoted strings are OK)
+
+A directory or archive of profiles can be converted with --bulk,
+using a pool of processes. Inputs that are unchanged since the last run,
+by content hash, are skipped.
 """
 
 VERSION = {
@@ -21,9 +25,17 @@ VERSION = {
 }
 
 import datetime
+import hashlib
+import json
+import logging
 import os.path
 import re
-from pathlib import PurePath
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePath
+from typing import Dict, Iterator, Optional, Tuple
 
 import pyparsing
 from pyparsing import (
@@ -101,6 +113,156 @@ profile_dict = dict_of(valid_key, valid_profile_value)
 
 ### End of Grammar ###
 
+### Fast path ###
+
+# The profiles that de1app writes are a flat list of key-value pairs,
+# with the shot frames being the only place braces nest two deep.
+# This scanner handles only that subset, exactly as the grammar does.
+# Anything else raises FastPathUnsupported so that the caller can fall back
+# to the grammar, which remains the reference for what is accepted.
+
+class FastPathUnsupported (ValueError):
+    pass
+
+
+# pyparsing default whitespace and printables, less the braces for word_nb
+_fp_space = re.compile(r'[ \n\t\r]*')
+_fp_word = re.compile(r'[!-z|~]+')
+_fp_identifier = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+# As common.number, sci_real | real | signed_integer, first match wins
+_fp_number = re.compile(
+    r'(?P<float>[+-]?(?:\d+(?:[eE][+-]?\d+)'
+    r'|(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?)'
+    r'|[+-]?(?:\d+\.\d*|\.\d+))'
+    r'|[+-]?\d+')
+
+
+class _FastScanner:
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def _skip(self) -> str:
+        self.pos = _fp_space.match(self.text, self.pos).end()
+        return self.text[self.pos:self.pos + 1]
+
+    def _word(self) -> str:
+        m = _fp_word.match(self.text, self.pos)
+        if m is None:
+            raise FastPathUnsupported(
+                f"Unexpected {self.text[self.pos:self.pos + 10]!r} "
+                f"at {self.pos}")
+        self.pos = m.end()
+        return m.group()
+
+    def _key(self) -> str:
+        key = self._word()
+        if not _fp_identifier.fullmatch(key):
+            raise FastPathUnsupported(f"Key {key!r} at {self.pos}")
+        return key
+
+    @staticmethod
+    def _word_value(word: str, rounded: bool):
+        m = _fp_number.match(word)
+        if m is None:
+            return word
+        if m.end() != len(word):
+            # The grammar would split the word after the number
+            raise FastPathUnsupported(f"Number prefix in {word!r}")
+        if m.group('float') is not None:
+            val = float(word)
+        else:
+            val = int(word)
+        return round2four(val) if rounded else val
+
+    def _braced_text(self) -> str:
+        # Opening brace already consumed, as original_text_for()
+        start = None
+        end = None
+        while (c := self._skip()) != '}':
+            if c in ('{', ''):
+                raise FastPathUnsupported(f"Nested brace at {self.pos}")
+            if start is None:
+                start = self.pos
+            self._word()
+            end = self.pos
+        self.pos += 1
+        return '' if start is None else self.text[start:end]
+
+    def _simple_value(self, rounded: bool):
+        if self._skip() == '{':
+            self.pos += 1
+            return self._braced_text()
+        return self._word_value(self._word(), rounded)
+
+    def _shot_frame(self) -> dict:
+        # Opening brace already consumed
+        frame = {}
+        while (c := self._skip()) != '}':
+            if c == '':
+                raise FastPathUnsupported("Unterminated shot frame")
+            key = self._key()
+            frame[key] = self._simple_value(rounded=True)
+        if not frame:
+            raise FastPathUnsupported(f"Empty shot frame at {self.pos}")
+        self.pos += 1
+        return frame
+
+    def _profile_value(self):
+        if self._skip() != '{':
+            return self._word_value(self._word(), rounded=False)
+        self.pos += 1
+        if self._skip() != '{':
+            return self._braced_text()
+        frames = []
+        while (c := self._skip()) != '}':
+            if c != '{':
+                raise FastPathUnsupported(
+                    f"Expected shot frame at {self.pos}")
+            self.pos += 1
+            frames.append(self._shot_frame())
+        self.pos += 1
+        return frames
+
+    def profile(self) -> dict:
+        parsed = {}
+        while self._skip():
+            key = self._key()
+            parsed[key] = self._profile_value()
+        if not parsed:
+            raise FastPathUnsupported("No profile description found")
+        return parsed
+
+
+def parse_profile_text_fast(source_data: str) -> dict:
+    """
+    Raises FastPathUnsupported if not in the subset of Tcl handled
+    """
+    return _FastScanner(source_data).profile()
+
+
+def parse_profile_text_pyparsing(source_data: str) -> dict:
+    pd_result = profile_dict.search_string(source_data)
+
+    if len(pd_result) == 0:
+        raise ValueError("No profile description found")
+    elif len(pd_result) > 1:
+        logging.error(
+            "Multiple profile descriptions found. Ignoring all except first")
+    return dict(pd_result[0])
+
+
+def parse_profile_text(source_data: str, use_fast_path=True) -> dict:
+    if use_fast_path:
+        try:
+            return parse_profile_text_fast(source_data)
+        except FastPathUnsupported:
+            pass
+    return parse_profile_text_pyparsing(source_data)
+
+### End of fast path ###
+
 def parsed_step_to_dict_v2(p_step: dict) -> dict:
 
     # p16 representation is 1/16 = 0.0625
@@ -414,15 +576,216 @@ def sanitize_filename(fname: str):
     return re.sub('[^\w._-]', '_', fname)
 
 
+def tcl_to_dict_v2(source_data: str,
+                   author: Optional[str] = None,
+                   reference_file: Optional[str] = None,
+                   use_fast_path=True) -> dict:
+    dv2 = parsed_dict_to_dict_v2(
+        parse_profile_text(source_data, use_fast_path=use_fast_path))
+    if author is not None:
+        dict_v2_set_author(dv2, author)
+    if reference_file is not None:
+        dict_v2_set_reference_file(dv2, reference_file)
+    return dv2
+
+
+### Bulk conversion ###
+
+MANIFEST_FILENAME = '.de1-profile-as-json.manifest'
+
+# Below this, starting the pool takes longer than the conversion
+BULK_INLINE_LIMIT = 8
+
+
+def bulk_sources(source: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    (name, content) of the Tcl files in a directory, zip, or tar archive
+    """
+    if os.path.isdir(source):
+        for path in sorted(Path(source).rglob('*')):
+            if path.is_file() and path.suffix.lower() == '.tcl':
+                yield str(path.relative_to(source)), path.read_bytes()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if (not info.is_dir()
+                        and info.filename.lower().endswith('.tcl')):
+                    yield info.filename, zf.read(info)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as tf:
+            for member in tf:
+                if member.isfile() and member.name.lower().endswith('.tcl'):
+                    yield member.name, tf.extractfile(member).read()
+    else:
+        raise ValueError(
+            f"{source} is not a directory, zip, or tar archive")
+
+
+def _bulk_convert_one(args: Tuple[str, bytes, Optional[str], bool]) \
+        -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+    """
+    Runs in the pool, returns (name, JSON, parser used, error)
+    """
+    name, data, author, use_fast_path = args
+    try:
+        source_data = data.decode('utf-8')
+        try:
+            if not use_fast_path:
+                raise FastPathUnsupported
+            parsed = parse_profile_text_fast(source_data)
+            parser = 'fast'
+        except FastPathUnsupported:
+            parsed = parse_profile_text_pyparsing(source_data)
+            parser = 'pyparsing'
+        dv2 = parsed_dict_to_dict_v2(parsed)
+        if author is not None:
+            dict_v2_set_author(dv2, author)
+        dict_v2_set_reference_file(dv2, name)
+        return name, json.dumps(dv2, indent=2), parser, None
+    except Exception as e:
+        return name, None, None, f"{e.__class__.__name__}: {e}"
+
+
+def _output_path(out_dir: str, name: str) -> Optional[str]:
+    """
+    Where the JSON for an input goes, or None if that would be outside
+    out_dir, as from an archive member named /etc/x.tcl or ../x.tcl
+    """
+    path = PurePath(name)
+    if path.is_absolute() or '..' in path.parts:
+        return None
+    outpath = os.path.join(out_dir, str(path.with_suffix('.json')))
+    real_out_dir = os.path.realpath(out_dir)
+    if os.path.commonpath(
+            (real_out_dir, os.path.realpath(outpath))) != real_out_dir:
+        return None
+    return outpath
+
+
+def _read_manifest(out_dir: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILENAME), 'r') as fh:
+            manifest = json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get('version') != VERSION['app']:
+        return {}
+    return manifest.get('files', {})
+
+
+def _write_manifest(out_dir: str, files: Dict[str, dict]):
+    fname = os.path.join(out_dir, MANIFEST_FILENAME)
+    with open(fname + '.tmp', 'w') as fh:
+        json.dump({'version': VERSION['app'], 'files': files}, fh,
+                  indent=1, sort_keys=True)
+    os.replace(fname + '.tmp', fname)
+
+
+def convert_bulk(source: str, out_dir: str,
+                 author: Optional[str] = None,
+                 force=False,
+                 jobs: Optional[int] = None,
+                 use_fast_path=True,
+                 logger: Optional[logging.Logger] = None) -> dict:
+    """
+    Convert the Tcl profiles in a directory or archive into out_dir,
+    keeping any subdirectories, and return the counts and timing
+
+    Inputs with the same content hash as the last run are skipped,
+    unless force is set. An existing output not written by a previous run
+    is only overwritten if force is set.
+    """
+    if logger is None:
+        logger = logging.getLogger()
+    t0 = time.perf_counter()
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    stats = {
+        'files': 0,
+        'bytes': 0,
+        'unchanged': 0,
+        'fast': 0,
+        'pyparsing': 0,
+        'failed': 0,
+        'exists': 0,
+    }
+
+    work = []
+    digests = {}
+    for name, data in bulk_sources(source):
+        stats['files'] += 1
+        outpath = _output_path(out_dir, name)
+        if outpath is None:
+            logger.error(f"Not converting {name}, outside of {out_dir}")
+            stats['failed'] += 1
+            continue
+        digest = hashlib.sha256(data).hexdigest()
+        outname = str(PurePath(name).with_suffix('.json'))
+        entry = manifest.get(name)
+        if (not force and entry is not None
+                and entry['sha256'] == digest
+                and entry['output'] == outname
+                and os.path.exists(outpath)):
+            stats['unchanged'] += 1
+            continue
+        if not force and entry is None and os.path.exists(outpath):
+            logger.warning(f"Not overwriting {outpath}, use --force")
+            stats['exists'] += 1
+            continue
+        digests[name] = digest
+        stats['bytes'] += len(data)
+        work.append((name, data, author, use_fast_path))
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if len(work) <= BULK_INLINE_LIMIT or jobs == 1:
+        results = map(_bulk_convert_one, work)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = executor.map(_bulk_convert_one, work,
+                               chunksize=max(1, len(work) // (jobs * 4)))
+    try:
+        for name, as_json, parser, error in results:
+            if error is not None:
+                logger.error(f"Unable to convert {name}: {error}")
+                stats['failed'] += 1
+                manifest.pop(name, None)
+                continue
+            outname = str(PurePath(name).with_suffix('.json'))
+            outpath = _output_path(out_dir, name)
+            os.makedirs(os.path.dirname(outpath), exist_ok=True)
+            with open(outpath, 'w') as fh:
+                print(as_json, file=fh)
+            stats[parser] += 1
+            manifest[name] = {'sha256': digests[name], 'output': outname}
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        _write_manifest(out_dir, manifest)
+
+    elapsed = time.perf_counter() - t0
+    converted = stats['fast'] + stats['pyparsing']
+    stats['seconds'] = elapsed
+    stats['files_per_second'] = converted / elapsed if elapsed else 0
+    stats['mb_per_second'] = (stats['bytes'] / 1e6 / elapsed
+                              if elapsed else 0)
+    logger.info(
+        f"{converted} converted ({stats['fast']} fast path, "
+        f"{stats['pyparsing']} pyparsing), {stats['unchanged']} unchanged, "
+        f"{stats['exists']} not overwritten, {stats['failed']} failed "
+        f"in {elapsed:.3f} sec, {stats['files_per_second']:.1f} files/sec, "
+        f"{stats['mb_per_second']:.2f} MB/sec")
+    return stats
+
+
 def run_as_script():
 
     import argparse
-    import json
-    import logging
     import sys
 
     from os.path import basename
-    from pathlib import PurePath
 
     import requests
 
@@ -437,12 +800,22 @@ def run_as_script():
     input_group.add_argument('-i', '--input', help='Input file')
     input_group.add_argument('-v', '--visualizer',
                              help='Visualizer short code or profile URL')
+    input_group.add_argument('-b', '--bulk',
+                             help='Directory, zip, or tar archive '
+                                  'of Tcl files, requires --dir')
     ap.add_argument('-o', '--output', help='Output file')
     ap.add_argument('-d', '--dir', help='Output directory')
     ap.add_argument('-f', '--force', action='store_true',
                     help='Overwrite if output exists')
+    ap.add_argument('-j', '--jobs', type=int,
+                    help='Processes for --bulk, default is the CPU count')
+    ap.add_argument('--no-fast-path', action='store_true',
+                    help='Parse only with the pyparsing grammar')
     args = ap.parse_args()
 
+    if args.bulk is not None and args.dir is None:
+        ap.error("--bulk requires --dir")
+
     logger = logging.getLogger()
 
     formatter = logging.Formatter(
@@ -456,6 +829,14 @@ def run_as_script():
     logger.addHandler(initial_handler)
     logger.setLevel(logging.DEBUG)
 
+    if args.bulk is not None:
+        stats = convert_bulk(args.bulk, args.dir,
+                             author=args.author,
+                             force=args.force,
+                             jobs=args.jobs,
+                             use_fast_path=not args.no_fast_path,
+                             logger=logger)
+        sys.exit(1 if stats['failed'] else 0)
 
     ref_file = None
 
@@ -486,21 +867,10 @@ def run_as_script():
         ref_file = None
         source_data = sys.stdin.read()
 
-    pd_result = profile_dict.search_string(source_data)
-
-    if len(pd_result) == 0:
-        raise ValueError("No profile description found")
-    elif len(pd_result) > 1:
-        logging.error(
-            "Multiple profile descriptions found. Ignoring all except first")
-    pdd = dict(pd_result[0])
-    dv2 = parsed_dict_to_dict_v2(pdd)
-
-    if args.author is not None:
-        dict_v2_set_author(dv2, args.author)
-
-    if ref_file is not None:
-        dict_v2_set_reference_file(dv2, ref_file)
+    dv2 = tcl_to_dict_v2(source_data,
+                         author=args.author,
+                         reference_file=ref_file,
+                         use_fast_path=not args.no_fast_path)
 
     # Output file names:
     #
@@ -10,6 +10,7 @@ import logging
 import multiprocessing
 import os
 from socket import gethostname
+from typing import Optional
 
 import paho.mqtt.client as mqtt
 from paho.mqtt.client import MQTTv5, MQTT_CLEAN_START_FIRST_ONLY
@@ -19,6 +20,26 @@ import pyDE1.shutdown_manager as sm
 from pyDE1.config import config
 from pyDE1.api.outbound.mqtt.run import MQTTStatusText
 
+# Set by attach(), for publish()
+_mqtt_client: Optional[mqtt.Client] = None
+_status_topic: Optional[str] = None
+
+
+def publish(subtopic: str, payload: str) -> bool:
+    """
+    Publish under the status topic of this process, not retained
+
+    Returns False if attach() hasn't been called or not connected
+    """
+    if _mqtt_client is None or not _mqtt_client.is_connected():
+        return False
+    _mqtt_client.publish(topic=f"{_status_topic}/{subtopic}",
+                         payload=payload,
+                         qos=0,
+                         retain=False)
+    return True
+
+
 def attach(subtopic: str,
            loop: asyncio.AbstractEventLoop,
            logger: logging.Logger = None):
@@ -145,4 +166,8 @@ def attach(subtopic: str,
 
     mqtt_client.loop_start()
 
+    global _mqtt_client, _status_topic
+    _mqtt_client = mqtt_client
+    _status_topic = will_topic
+
 
@@ -15,6 +15,7 @@ from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import Union, Awaitable, Callable, Optional, Mapping
 
 import pyDE1
+import pyDE1.config
 import pyDE1.shutdown_manager as sm
 from pyDE1.api.outbound.mqtt.run import MQTTStatusText
 from pyDE1.send_single_message import send_single_message
@@ -199,7 +200,8 @@ class SupervisedProcess:
                  args: Optional[tuple] = (), kwargs: Optional[Mapping] = None,
                  daemon: Optional[bool] = None,
                  do_not_restart=False,
-                 will_subtopic: Optional[str] = None):
+                 will_subtopic: Optional[str] = None,
+                 metrics_queue: Optional[multiprocessing.Queue] = None):
         self._target = target
         self._name = name
         self._args = args
@@ -212,6 +214,11 @@ class SupervisedProcess:
         self._start_time_list = []
         self._restart_count_limit = 2  # No more than 2 restarts in
         self._restart_count_window = 20  # seconds
+        # Carried to the process for runtime_profile.report_startup()
+        self._run_started: Optional[float] = None
+        self._process_started: Optional[float] = None
+        # For process_metrics, in the process
+        self._metrics_queue = metrics_queue
 
     def _too_many_restarts(self):
         retval = False
@@ -230,6 +237,16 @@ class SupervisedProcess:
                 f"Start-time list seems long: {len(self._start_time_list)}")
 
     def _wrap_target(self, *args, **kwargs):
+        # This module is imported in the new process to unpickle this,
+        # before the target sets config, so import these once it is set
+        if (master_config := kwargs.get('master_config')) is not None:
+            pyDE1.config.config = master_config
+        import pyDE1.process_metrics as process_metrics
+        import pyDE1.runtime_profile as runtime_profile
+
+        runtime_profile.mark_started(self._run_started,
+                                     self._process_started)
+        process_metrics.metrics_queue = self._metrics_queue
         try:
             self._target(*args, **kwargs)
         except Exception as exc:
@@ -285,6 +302,9 @@ class SupervisedProcess:
             else:
                 self._logger.info(f"Restarting")
 
+        import pyDE1.runtime_profile as runtime_profile
+        self._run_started = runtime_profile.run_started
+        self._process_started = time.time()
         self._create_process()
         self._process.start()
         self._record_start()
@@ -310,6 +330,14 @@ class SupervisedProcess:
     def process(self):
         return self._process
 
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def restarts(self) -> int:
+        return max(0, len(self._start_time_list) - 1)
+
     @property
     def do_not_restart(self):
         return self._do_not_restart
@@ -22,7 +22,9 @@ from pyDE1.event_manager.event_manager import SubscribedEvent
 from pyDE1.event_manager.events import DeviceRole
 from pyDE1.event_manager.payloads import EventPayload
 from pyDE1.lock_logger import LockLogger
-from pyDE1.scanner import find_first_matching, RegisteredPrefixes
+from pyDE1.scanner import (
+    capture_known_or_first_matching, RegisteredPrefixes
+)
 
 
 TIMEOUT_FIRST_UPDATE = 2.5 # seconds after connect
@@ -200,10 +202,7 @@ class BlueDOT (ManagedBleakDevice):
                 "'scan' requested, but already connected. "
                 "No action taken.")
         else:
-            device = await find_first_matching(DeviceRole.THERMOMETER)
-            if device:
-                await self.change_address(device)
-                await self.capture()
+            await capture_known_or_first_matching(self)
         return self.address
 
     # From managed_bleak_device, used by external API
@@ -222,30 +221,57 @@ class BlueDOT (ManagedBleakDevice):
     async def _initialize_after_connection(self, hold_ready=False):
         self._have_high_alarm.clear()
         self._last_update = None
-        await self.set_updates_on()
-        # await asyncio.sleep(1)  # Is this needed, and, if so, when?
-        await self.sample_fast()
+        # The sample rate for the DE1 state is set during the beep
+        pipeline = self._new_init_pipeline()
+        pipeline.add('updates_on', self.set_updates_on, gatt_write=True)
+        pipeline.add('sample_fast', self.sample_fast, gatt_write=True)
+        pipeline.add('first_update',
+                     self._wait_for_first_update,
+                     after=('updates_on',))
+        pipeline.add('beep',
+                     lambda: self._beep_on_connect(
+                         pipeline.result('first_update'),
+                         pipeline.gatt_write_lock),
+                     after=('first_update',))
+        pipeline.add('sample_rate',
+                     self._sample_for_de1_state,
+                     after=('sample_fast', 'first_update'),
+                     gatt_write=True)
+        await pipeline.run()
+        pipeline.log_timeline()
+        self._notify_ready()
+
+    async def _wait_for_first_update(self) -> bool:
         try:
             await asyncio.wait_for(
                 self._have_high_alarm.wait(),
                 timeout=TIMEOUT_FIRST_UPDATE)
-            # Beep the alarm on getting the update
-            old_ha = self._last_update.high_alarm
-            new_ha = self._last_update.units.freezing
-            await self.set_high_alarm(new_ha)
-            await asyncio.sleep(1.0)  # beep time
-            await self.set_high_alarm(old_ha)
+            return True
         except asyncio.TimeoutError:
             self.logger.warning(
                 f"Did not get update within {TIMEOUT_FIRST_UPDATE:.1f} sec, "
                 "no beep for connection.")
-            pass
+            return False
+
+    async def _beep_on_connect(self, have_update: bool,
+                               gatt_write_lock: asyncio.Lock):
+        if not have_update:
+            return
+        # Beep the alarm on getting the update
+        old_ha = self._last_update.high_alarm
+        new_ha = self._last_update.units.freezing
+        async with gatt_write_lock:
+            await self.set_high_alarm(new_ha)
+        await asyncio.sleep(1.0)  # beep time
+        async with gatt_write_lock:
+            await self.set_high_alarm(old_ha)
+
+    async def _sample_for_de1_state(self):
         if (self._de1.is_ready
                 and self._de1.current_state == API_MachineStates.Steam):
             await self.sample_fast()
         else:
             await self.sample_normal()
-        self._notify_ready()
 
     async def _notification_callback(self, sender: int, data: bytearray):
 
@@ -0,0 +1,213 @@
+"""
+Copyright © 2021-2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Estimate when a rising temperature will reach the target
+
+A least-squares fit of temperature against time over the latest
+config.steam.MAX_SAMPLES_FOR_ESTIMATE samples. The samples are kept
+in a ring buffer with the sums of the fit, so each sample adds its
+terms and takes away those of the one it replaces, rather than
+summing over the history again.
+
+With config.steam.CURVATURE, the fit is a quadratic, as the rate of rise
+slows as the milk heats and loses more to the air. The crossing is then
+the first root ahead of the latest sample, or from the slope there
+if the curve doesn't reach the target.
+"""
+
+import asyncio
+from collections import deque
+from math import sqrt
+from typing import Optional, Union
+
+import pyDE1
+
+from pyDE1.config import config
+
+
+class TimeAtTargetEstimator:
+    """
+    Class that encapsulates being able to estimate
+    when the rate of rise will reach the target
+    """
+
+    logger = pyDE1.getLogger('SteamTemp.TAT')
+
+    def __init__(self):
+        # (time, temperature) relative to the origin
+        self._history = deque(maxlen=config.steam.MAX_SAMPLES_FOR_ESTIMATE)
+        self._history_lock = asyncio.Lock()
+        self.big_gap = 2.1  # seconds, if gap exceeds, reset estimator
+        self.target = None
+        self._bhat = None
+        self._mhat = None
+        self._reset_sums()
+
+    async def reset(self):
+        async with self._history_lock:
+            self._reset_have_lock()
+
+    async def new_sample(self, sample_time: float,
+                         temperature: Union[int, float]) -> Optional[float]:
+        """
+        Call when a new sample arrives
+
+        Returns the time at target estimate as absolute time.time() reference
+        """
+        async with self._history_lock:
+            if self._history:
+                last_time = self._t0 + self._history[-1][0]
+                if (dt := sample_time - last_time) > self.big_gap:
+                    self.logger.warning(
+                        f"Resetting history after {dt:.1f} sec gap")
+                    self._reset_have_lock()
+            if not self._history:
+                self._t0 = sample_time
+            if len(self._history) == self._history.maxlen:
+                self._accumulate(*self._history[0], -1)
+                self._since_rebase += 1
+            x = sample_time - self._t0
+            self._history.append((x, temperature))
+            self._accumulate(x, temperature, 1)
+            if self._since_rebase >= self._history.maxlen:
+                self._rebase()
+
+            return self._estimate_time_at_target_have_lock()
+
+    async def estimate_time_at_target(self) -> Optional[float]:
+        """
+        Returns the time at target estimate as reference
+        on same timescale as samples are reported
+        """
+        async with self._history_lock:
+            return self._estimate_time_at_target_have_lock()
+
+    @property
+    def rate_of_rise(self):
+        return self._mhat
+
+    @property
+    def current_est(self):
+        return self._bhat
+
+    def _reset_have_lock(self):
+        if self._history.maxlen != config.steam.MAX_SAMPLES_FOR_ESTIMATE:
+            self._history = deque(
+                maxlen=config.steam.MAX_SAMPLES_FOR_ESTIMATE)
+        self._history.clear()
+        self._reset_sums()
+        self._mhat = None
+        self._bhat = None
+        self.logger.info("Reset history")
+
+    def _reset_sums(self):
+        self._t0 = 0.0
+        self._since_rebase = 0
+        self._n = 0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._sx3 = self._sx4 = self._sxxy = 0.0
+
+    def _accumulate(self, x: float, y: float, sign: int):
+        xx = x * x
+        self._n += sign
+        self._sx += sign * x
+        self._sy += sign * y
+        self._sxx += sign * xx
+        self._sxy += sign * x * y
+        self._sx3 += sign * xx * x
+        self._sx4 += sign * xx * xx
+        self._sxxy += sign * xx * y
+
+    def _rebase(self):
+        """
+        Move the origin to the oldest sample and recompute the sums,
+        which also drops what has accumulated from adding and removing
+        """
+        shift = self._history[0][0]
+        history = [(x - shift, y) for (x, y) in self._history]
+        self._history.clear()
+        self._history.extend(history)
+        t0 = self._t0 + shift
+        self._reset_sums()
+        self._t0 = t0
+        for (x, y) in history:
+            self._accumulate(x, y, 1)
+
+    def _linear(self) -> Optional[tuple]:
+        """
+        (intercept, slope), at the origin
+        """
+        n = self._n
+        d = n * self._sxx - self._sx * self._sx
+        if d <= 0:
+            return None
+        m = (n * self._sxy - self._sx * self._sy) / d
+        return (self._sy - m * self._sx) / n, m
+
+    def _quadratic(self) -> Optional[tuple]:
+        """
+        (a, b, c) of a + b x + c x², at the origin, by Cramer's rule
+        """
+        n, sx, sxx, sx3, sx4 = \
+            self._n, self._sx, self._sxx, self._sx3, self._sx4
+        sy, sxy, sxxy = self._sy, self._sxy, self._sxxy
+        d = (n * (sxx * sx4 - sx3 * sx3)
+             - sx * (sx * sx4 - sx3 * sxx)
+             + sxx * (sx * sx3 - sxx * sxx))
+        if abs(d) < 1e-12:
+            return None
+        a = (sy * (sxx * sx4 - sx3 * sx3)
+             - sx * (sxy * sx4 - sx3 * sxxy)
+             + sxx * (sxy * sx3 - sxx * sxxy)) / d
+        b = (n * (sxy * sx4 - sx3 * sxxy)
+             - sy * (sx * sx4 - sx3 * sxx)
+             + sxx * (sx * sxxy - sxy * sxx)) / d
+        c = (n * (sxx * sxxy - sxy * sx3)
+             - sx * (sx * sxxy - sxy * sxx)
+             + sy * (sx * sx3 - sxx * sxx)) / d
+        return a, b, c
+
+    def _estimate_time_at_target_have_lock(self) -> Optional[float]:
+        # Use a least-squares estimator
+        if self._n < 2 or self.target is None:
+            return None
+
+        x_last = self._history[-1][0]
+        t_last = self._t0 + x_last
+
+        fit = None
+        if config.steam.CURVATURE and self._n >= 3:
+            fit = self._quadratic()
+        if fit is not None:
+            (a, b, c) = fit
+            self._bhat = a + (b + c * x_last) * x_last
+            self._mhat = b + 2 * c * x_last
+            # Ahead of the latest sample, c u² + mhat u + (bhat - target),
+            # if not already past it
+            discriminant = (self._mhat * self._mhat
+                            - 4 * c * (self._bhat - self.target))
+            if c and discriminant >= 0 and self._bhat < self.target:
+                root = sqrt(discriminant)
+                ahead = [u for u in ((-self._mhat - root) / (2 * c),
+                                     (-self._mhat + root) / (2 * c))
+                         if u >= 0]
+                if ahead:
+                    return t_last + min(ahead)
+        else:
+            fit = self._linear()
+            if fit is None:
+                self._mhat = None
+                self._bhat = None
+                return None
+            (b, m) = fit
+            self._mhat = m
+            self._bhat = b + m * x_last
+
+        if self._mhat:
+            return t_last + (self.target - self._bhat) / self._mhat
+        self._bhat = None
+        return None
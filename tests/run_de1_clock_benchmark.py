@@ -0,0 +1,115 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Offline timing error of de1_time, from ShotSample traces
+
+"before" is the arrival time, as used for de1_time before,
+"after" is that from SampleClock
+
+The BLE delay has a part that doesn't change, so the error is taken
+about its median. Reported are the mean, 95th percentile, and largest
+of that, then again once the fit has the first 100 samples.
+
+The synthetic trace is ten minutes of ShotSamples at 60 Hz, the DE1's
+second 100 ppm long, with an exponential BLE delay, an occasional stall
+that then delivers several at once, and samples lost partway.
+
+Given a pyDE1 database, the sample_time and arrival_time of
+shot_sample_with_volume_update for each sequence is used as a recorded
+trace. How far each interval of de1_time is from that of sample_time
+is reported, which is zero for a sample-accurate de1_time.
+
+    PYTHONPATH=src python tests/run_de1_clock_benchmark.py [pyde1.sqlite3]
+"""
+
+import random
+import sqlite3
+import sys
+import time
+from statistics import mean, median
+
+from pyDE1.de1.sample_clock import SampleClock
+
+LINE_FREQUENCY = 60
+N_SAMPLES = 2880    # Ten minutes
+LOST = range(1500, 1510)
+SETTLED = 100
+
+
+def de1_trace(seed=1):
+    rng = random.Random(seed)
+    start = 1_700_000_000.0
+    trace = []
+    stalled_until = 0
+    for i in range(N_SAMPLES):
+        if i in LOST:
+            continue
+        sampled = start + (25 * i) / (2 * LINE_FREQUENCY) * (1 + 100e-6)
+        if rng.random() < 0.01:
+            stalled_until = sampled + rng.uniform(0.2, 0.6)
+        arrival = max(sampled + 0.03 + rng.expovariate(1 / 0.015),
+                      stalled_until + 0.03)
+        if trace:
+            arrival = max(arrival, trace[-1][2])
+        trace.append((sampled, (25 * i) % 65536, arrival))
+    return trace
+
+
+def fitted(sample_times, arrivals, line_frequency=LINE_FREQUENCY):
+    clock = SampleClock(line_frequency)
+    t0 = time.perf_counter()
+    de1_times = [clock.de1_time(s, a)
+                 for (s, a) in zip(sample_times, arrivals)]
+    dt = time.perf_counter() - t0
+    return de1_times, dt / len(arrivals), clock
+
+
+def summary(errors):
+    m = median(errors)
+    about = sorted(abs(e - m) * 1000 for e in errors)
+    return (f"mean {mean(about):6.1f}  p95 {about[int(0.95 * len(about))]:6.1f}"
+            f"  max {about[-1]:6.1f} ms")
+
+
+def traces_from_database(path):
+    with sqlite3.connect(path) as db:
+        rows = db.execute(
+            "SELECT sequence_id, sample_time, arrival_time "
+            "FROM shot_sample_with_volume_update "
+            "ORDER BY sequence_id, arrival_time").fetchall()
+    traces = {}
+    for (sequence_id, sample_time, arrival) in rows:
+        traces.setdefault(sequence_id, []).append((sample_time, arrival))
+    return {k: v for (k, v) in traces.items() if len(v) > 50}
+
+
+if __name__ == '__main__':
+    trace = de1_trace()
+    (sampled, sample_times, arrivals) = zip(*trace)
+    (de1_times, per_sample, clock) = fitted(sample_times, arrivals)
+    print(f"{len(trace)} ShotSamples, {per_sample * 1e6:.1f} us per sample")
+    print(f"  before: {summary([a - s for (s, _, a) in trace])}")
+    errors = [t - s for (s, t) in zip(sampled, de1_times)]
+    print(f"   after: {summary(errors)}")
+    print(f" settled: {summary(errors[SETTLED:])}")
+    print(f"   stats: {clock.stats()}")
+
+    if len(sys.argv) > 1:
+        before = []
+        after = []
+        for (sequence_id, samples) in traces_from_database(
+                sys.argv[1]).items():
+            (sample_times, arrivals) = zip(*samples)
+            (de1_times, _, _) = fitted(sample_times, arrivals)
+            for i in range(1, len(samples)):
+                dt = ((sample_times[i] - sample_times[i - 1]) % 65536) \
+                     / (2 * LINE_FREQUENCY)
+                before.append(arrivals[i] - arrivals[i - 1] - dt)
+                after.append(de1_times[i] - de1_times[i - 1] - dt)
+        print(f"{sys.argv[1]}, {len(before)} intervals from sample_time")
+        print(f"  before: {summary(before)}")
+        print(f"   after: {summary(after)}")
@@ -0,0 +1,104 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Cost of logging a ShotSample notification, as the handler does,
+at DEBUG and at INFO, through to the bytes that go between processes
+
+"LogRecord" is a plain QueueHandler, pickling the whole record
+
+"compact" is CompactQueueHandler, pickling the fields in _COMPACT_FIELDS
+
+"limited" adds RateLimitFilter at the default 10 per second.
+The samples here arrive far faster than the ~5 Hz of a shot,
+so most are dropped, as they would be in a burst
+
+Pickling is done here, rather than in the Queue's feeder thread,
+to count it
+
+    python tests/run_logging_benchmark.py
+"""
+
+import logging
+import pickle
+import queue
+import random
+import time
+from logging.handlers import QueueHandler
+from struct import pack
+
+import pyDE1
+from pyDE1.de1.ble import CUUID
+from pyDE1.de1.c_api import ShotSample
+from pyDE1.pyde1_logging import CompactQueueHandler, RateLimitFilter
+
+
+def make_corpus(n_samples=3000, seed=1):
+    rng = random.Random(seed)
+    corpus = []
+    sample_time = 0
+    for i in range(n_samples):
+        sample_time = (sample_time + 25) % 65536
+        corpus.append(pack(
+            '>HHHHBHHHBBBB',
+            sample_time,
+            rng.randrange(0, 12 * 4096), rng.randrange(0, 8 * 4096),
+            rng.randrange(80 * 256, 95 * 256),
+            rng.randrange(80, 95), rng.randrange(0, 65536),
+            90 * 256, 92 * 256, 9 * 16, 2 * 16,
+            rng.randrange(0, 20), 160))
+    return corpus
+
+
+class PicklingQueue (queue.SimpleQueue):
+
+    def __init__(self):
+        self.sent_bytes = 0
+
+    def put_nowait(self, item):
+        self.sent_bytes += len(pickle.dumps(item))
+
+
+def measure(handler: logging.Handler, level: int, corpus, repeat=5):
+    logger = pyDE1.getLogger(f"DE1.{CUUID.ShotSample.__str__()}.Notify")
+    logger.propagate = False
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    best = None
+    try:
+        for _ in range(repeat):
+            handler.queue.sent_bytes = 0
+            t0 = time.perf_counter()
+            for data in corpus:
+                obj = ShotSample.from_notification(data, 0.0)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(obj.log_string())
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+    n = len(corpus)
+    return best / n * 1e6, handler.queue.sent_bytes / n
+
+
+if __name__ == '__main__':
+    corpus = make_corpus()
+    print(f"{len(corpus)} ShotSample")
+
+    def limited():
+        handler = CompactQueueHandler(PicklingQueue())
+        handler.addFilter(RateLimitFilter({'DE1.*.Notify': 10}))
+        return handler
+
+    for level in (logging.DEBUG, logging.INFO):
+        for (name, make_handler) in (
+                ('LogRecord', lambda: QueueHandler(PicklingQueue())),
+                ('compact', lambda: CompactQueueHandler(PicklingQueue())),
+                ('limited', limited)):
+            (us, nbytes) = measure(make_handler(), level, corpus)
+            print(f"{logging.getLevelName(level):>5} {name:>9}: "
+                  f"{us:6.2f} us/sample  {nbytes:5.0f} bytes/sample")
@@ -0,0 +1,116 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+GET of the resources with several MMRs, with none of them cached,
+against a stand-in DE1 that answers each block read after a simulated
+BLE round trip
+
+"each" requests the MMRs one at a time, as each value is filled in,
+as before
+
+"together" requests them all before filling in the values,
+so that MMRCache can read them in as few block reads as it can
+
+    python tests/run_mmr_get_benchmark.py [round trip, ms]
+"""
+
+import asyncio
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pyDE1.dispatcher.implementation as implementation
+from pyDE1.de1.c_api import MMR0x80LowAddr
+from pyDE1.de1.mmr_cache import MMRCache
+from pyDE1.de1.notifications import MMR0x80Data
+from pyDE1.dispatcher.implementation import get_resource_to_dict
+from pyDE1.dispatcher.mapping import TO
+from pyDE1.dispatcher.plan import plan_for
+from pyDE1.dispatcher.resource import Resource
+
+RESOURCES = (
+    Resource.DE1_CALIBRATION,
+    Resource.DE1_CONTROL,
+    Resource.DE1_SETTING,
+    Resource.DE1_READ_ONCE,
+    Resource.DE1,
+)
+
+
+class StandIn:
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return 1
+
+
+class StandInDE1 (StandIn):
+
+    def __init__(self, round_trip: float):
+        self.round_trip = round_trip
+        self.is_ready = True
+        self.feature_flag = SimpleNamespace(
+            last_mmr0x80=MMR0x80LowAddr.LAST_KNOWN,
+            safe_to_read_mmr_continuous=True)
+        self._mmr_dict = {}
+        self._cuuid_dict = defaultdict(
+            lambda: SimpleNamespace(last_value=StandIn()))
+        self.mmr_cache = MMRCache(self)
+        self.block_reads = 0
+
+    async def read_mmr(self, length, addr_high, addr_low):
+        self.block_reads += 1
+        await asyncio.sleep(self.round_trip)
+        for addr in range(addr_low, addr_low + (length + 1) * 4, 4):
+            # Keyed by MMR0x80LowAddr, as DE1 creates them
+            mmr_data = self._mmr_dict.setdefault(
+                addr, MMR0x80Data(MMR0x80LowAddr(addr)))
+            mmr_data.mark_requested()
+            mmr_data.data_raw = b'\x01\x00\x00\x00'
+            mmr_data.mark_updated(mmr_data.data_raw)
+        return []
+
+
+async def measure(resource: Resource, round_trip: float, repeat=5):
+    de1 = StandInDE1(round_trip)
+    implementation._TARGET_LOOKUP[TO.DE1] = lambda: de1
+    for to in (TO.FlowSequencer, TO.ScaleProcessor, TO.Thermometer):
+        implementation._TARGET_LOOKUP[to] = StandIn
+    best = None
+    for _ in range(repeat):
+        de1._mmr_dict.clear()
+        de1.block_reads = 0
+        t0 = time.perf_counter()
+        await get_resource_to_dict(resource)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best * 1000, de1.block_reads
+
+
+async def main(round_trip: float):
+    read_together = implementation._read_plan_mmrs
+
+    async def read_none(plan, targets):
+        return frozenset()
+
+    print(f"{'resource':24} {'MMRs':>4}   {'each':>16}   {'together':>16}")
+    for resource in RESOURCES:
+        implementation._read_plan_mmrs = read_none
+        (each_ms, each_reads) = await measure(resource, round_trip)
+        implementation._read_plan_mmrs = read_together
+        (together_ms, together_reads) = await measure(resource, round_trip)
+        print(f"{resource.value:24} {len(plan_for(resource).mmr_targets):4}   "
+              f"{each_ms:6.1f} ms {each_reads:2} reads   "
+              f"{together_ms:6.1f} ms {together_reads:2} reads")
+
+
+if __name__ == '__main__':
+    round_trip = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.030
+    print(f"Round trip of {round_trip * 1000:.0f} ms")
+    asyncio.run(main(round_trip))
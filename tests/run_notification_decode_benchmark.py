@@ -0,0 +1,126 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Microbenchmark of the decode of ShotSample, StateInfo, and WaterLevels
+notifications, as done in the handlers.
+
+"before" reproduces the previous path: construct with the validating
+setters, slice and unpack, then getLogger() with an f-string
+and an unconditional log_string()
+
+"after" is from_notification() with a logger cached in the closure
+
+The corpus is synthetic, but follows the mix and rates of a shot,
+ShotSample at ~5 Hz, StateInfo on change, WaterLevels at ~1 Hz
+
+    python tests/run_notification_decode_benchmark.py
+"""
+
+import logging
+import random
+import time
+import tracemalloc
+from struct import pack, unpack
+
+import pyDE1
+from pyDE1.de1.ble import CUUID
+from pyDE1.de1.c_api import (
+    ShotSample, ShotState, StateInfo, WaterLevels,
+    API_MachineStates, API_Substates,
+)
+
+for cuuid in CUUID:
+    pyDE1.getLogger(f"DE1.{cuuid.__str__()}.Notify").setLevel(logging.INFO)
+
+
+def make_corpus(n_samples=3000, seed=1):
+    rng = random.Random(seed)
+    corpus = []
+    sample_time = 0
+    for i in range(n_samples):
+        sample_time = (sample_time + 25) % 65536
+        corpus.append((CUUID.ShotSample, pack(
+            '>HHHHBHHHBBBB',
+            sample_time,
+            rng.randrange(0, 12 * 4096), rng.randrange(0, 8 * 4096),
+            rng.randrange(80 * 256, 95 * 256),
+            rng.randrange(80, 95), rng.randrange(0, 65536),
+            90 * 256, 92 * 256, 9 * 16, 2 * 16,
+            rng.randrange(0, 20), 160)))
+        if i % 5 == 0:
+            corpus.append((CUUID.WaterLevels, pack(
+                '>HH', rng.randrange(5 * 256, 40 * 256), 5 * 256)))
+        if i % 50 == 0:
+            corpus.append((CUUID.StateInfo, pack(
+                '>BB', API_MachineStates.Espresso, API_Substates.Pour)))
+    return corpus
+
+
+def decode_before(cuuid, data, arrival_time):
+    if cuuid is CUUID.ShotSample:
+        obj = ShotSample()
+        obj.SampleTime = unpack('>H', data[0:2])[0]
+        obj.ShotState = ShotState().from_wire_bytes(data[2:], arrival_time)
+    elif cuuid is CUUID.StateInfo:
+        obj = StateInfo().from_wire_bytes(data, arrival_time)
+    else:
+        obj = WaterLevels().from_wire_bytes(data, arrival_time)
+    logger = pyDE1.getLogger(f"DE1.{cuuid.__str__()}.Notify")
+    logger.debug(obj.log_string())
+    return obj
+
+
+_cls_by_cuuid = {
+    CUUID.ShotSample: ShotSample,
+    CUUID.StateInfo: StateInfo,
+    CUUID.WaterLevels: WaterLevels,
+}
+_logger_by_cuuid = {
+    cuuid: pyDE1.getLogger(f"DE1.{cuuid.__str__()}.Notify")
+    for cuuid in _cls_by_cuuid
+}
+
+
+def decode_after(cuuid, data, arrival_time):
+    obj = _cls_by_cuuid[cuuid].from_notification(data, arrival_time)
+    logger = _logger_by_cuuid[cuuid]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(obj.log_string())
+    return obj
+
+
+def measure(decode, corpus, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for (cuuid, data) in corpus:
+            decode(cuuid, data, 0.0)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    keep = [decode(cuuid, data, 0.0) for (cuuid, data) in corpus]
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snap1.compare_to(snap0, 'filename')
+    n_blocks = sum(s.count_diff for s in stats if s.count_diff > 0)
+    n_bytes = sum(s.size_diff for s in stats if s.size_diff > 0)
+    del keep
+
+    n = len(corpus)
+    return best / n * 1e6, n_blocks / n, n_bytes / n
+
+
+if __name__ == '__main__':
+    corpus = make_corpus()
+    print(f"{len(corpus)} packets")
+    for name, decode in (('before', decode_before), ('after', decode_after)):
+        (us, blocks, nbytes) = measure(decode, corpus)
+        print(f"{name:>7}: {us:6.2f} us/packet  "
+              f"{blocks:5.1f} retained blocks/packet  "
+              f"{nbytes:6.0f} retained bytes/packet")
@@ -0,0 +1,135 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+GET and PATCH of each resource, through get_resource_to_dict()
+and validate_patch_return_targets() then patch_resource_from_dict(),
+against stand-ins for the DE1, FlowSequencer, ScaleProcessor, and scale,
+so without Bluetooth
+
+PATCH sets each writable value of the resource that is an attribute,
+MMR, or PackedAttr. Those with a setter_path, such as a profile upload
+or a change of scale, are not run, so some resources have no PATCH.
+
+    python tests/run_resource_plan_benchmark.py
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pyDE1.dispatcher.implementation as implementation
+from pyDE1.dispatcher.implementation import (
+    get_resource_to_dict, patch_resource_from_dict
+)
+from pyDE1.dispatcher.mapping import TO
+from pyDE1.dispatcher.plan import PLANS, Accessor, Kind
+from pyDE1.dispatcher.resource import Resource
+from pyDE1.dispatcher.validate import validate_patch_return_targets
+from pyDE1.exceptions import DE1APIError
+
+
+class StandIn:
+    """
+    Any attribute is another StandIn, once read, it stays
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = StandIn()
+        setattr(self, name, value)
+        return value
+
+
+class StandInDE1 (StandIn):
+
+    def __init__(self):
+        self.is_ready = True
+        self.uploading_firmware = False
+        self.feature_flag = SimpleNamespace(last_mmr0x80=0xffffff)
+        self.mmr_cache = SimpleNamespace(is_fresh=lambda target: True)
+        ready = asyncio.Event()
+        ready.set()
+        self._mmr_dict = defaultdict(
+            lambda: SimpleNamespace(data_decoded=1.0, ready_event=ready))
+        self._cuuid_dict = defaultdict(
+            lambda: SimpleNamespace(last_value=StandIn(),
+                                    _last_value=StandIn()))
+
+    async def write_packed_attr(self, packed_attr):
+        pass
+
+
+def value_for(accessor: Accessor):
+    for t in accessor.types:
+        for (candidate, value) in ((bool, True), (int, 1), (float, 1.0),
+                                   (str, 'x'), (type(None), None)):
+            if t is candidate:
+                return value
+    return None
+
+
+def patch_for(resource: Resource):
+    patch = {}
+    for accessor in PLANS[resource].accessors:
+        if (not accessor.writable or accessor.isat.read_only
+                or accessor.isat.setter_path is not None
+                or accessor.internal_type is not None
+                or accessor.kind is Kind.FUNCTION
+                or (accessor.kind is Kind.MMR
+                    and not accessor.target.can_write)
+                or accessor.path == (None,)):
+            continue
+        this_dict = patch
+        for key in accessor.path[:-1]:
+            this_dict = this_dict.setdefault(key, {})
+        this_dict[accessor.path[-1]] = value_for(accessor)
+    return patch
+
+
+async def measure(repeat=200):
+    stand_ins = {
+        TO.DE1: StandInDE1(),
+        TO.FlowSequencer: StandIn(),
+        TO.ScaleProcessor: StandIn(),
+        TO.Scale: StandIn(),
+        TO.Thermometer: StandIn(),
+    }
+    for (to, stand_in) in stand_ins.items():
+        implementation._TARGET_LOOKUP[to] = lambda stand_in=stand_in: stand_in
+
+    for resource in PLANS:
+        if resource in (Resource.DE1_PROFILES, Resource.SCAN_DEVICES):
+            # From the database and the device registry
+            continue
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            await get_resource_to_dict(resource)
+        get_us = (time.perf_counter() - t0) / repeat * 1e6
+
+        patch_us = None
+        if patch := patch_for(resource):
+            try:
+                await patch_resource_from_dict(resource, patch)
+            except DE1APIError as e:
+                # Such as an MMR that can't be encoded
+                print(f"{resource.value:40} {get_us:8.1f}  {repr(e)}")
+                continue
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                validate_patch_return_targets(resource, patch)
+                await patch_resource_from_dict(resource, patch)
+            patch_us = (time.perf_counter() - t0) / repeat * 1e6
+
+        patch_str = '' if patch_us is None else f"{patch_us:8.1f}"
+        print(f"{resource.value:40} {get_us:8.1f} {patch_str:>8}")
+
+
+if __name__ == '__main__':
+    print(f"{'resource':40} {'GET us':>8} {'PATCH us':>8}")
+    asyncio.run(measure())
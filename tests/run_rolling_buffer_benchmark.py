@@ -0,0 +1,119 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Recording the rolling buffers at the start of a sequence,
+with full buffers of every class
+
+"dicts" is as it was, a deepcopy() of buffers of dicts,
+then an INSERT for each
+
+"rows" is RollingBuffers.snapshot(), then an executemany() for each table
+
+"first" is the time from the start until the first notification
+of the sequence is recorded, inserted as the recorder does,
+while the buffers are being recorded
+
+    python tests/run_rolling_buffer_benchmark.py [database directory]
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import deque
+from copy import deepcopy
+from pathlib import Path
+
+import aiosqlite
+
+import pyDE1.database.insert as db_insert
+import pyDE1.database.manage as manage
+from pyDE1.database.write_notifications import (
+    ROLLING_BUFFER_SIZE, RollingBuffers, dump_rolling_buffers_to_database
+)
+
+
+def make_database(directory: str) -> str:
+    path = os.path.join(directory, 'benchmark.sqlite3')
+    schema_path = Path(manage.__file__).resolve().parent.joinpath(
+        manage.CURRENT_SCHEMA_RELPATH)
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(schema_path):
+            db.execute(sql)
+        db.commit()
+    return path
+
+
+def notification(class_name: str, i: int) -> dict:
+    columns = db_insert.NOTIFICATION_COLUMNS[class_name][1]
+    notification = {column: float(i) for column in columns}
+    notification.update({'class': class_name, 'version': '1.0.0',
+                         'sender': 'Benchmark', 'sequence_id': 'seq'})
+    if 'volume_by_frames' in notification:
+        notification['volume_by_frames'] = [float(i)] * 20
+    return notification
+
+
+async def dump_dicts(buffers, sequence_id, db):
+    snapshot = deepcopy(buffers)
+    async with db.cursor() as cur:
+        for rb_class, rb in snapshot.items():
+            for notification in rb:
+                await db_insert.dict_notification_cursor_only(
+                    notification=notification,
+                    sequence_id=sequence_id,
+                    cur=cur)
+    await db.commit()
+
+
+async def measure(path: str, use_rows: bool, repeat=10):
+    dicts = {}
+    rows = RollingBuffers(ROLLING_BUFFER_SIZE)
+    for (class_name, size) in ROLLING_BUFFER_SIZE.items():
+        dicts[class_name] = deque(
+            (notification(class_name, i) for i in range(size)), size)
+        for i in range(size):
+            row = db_insert.notification_row(notification(class_name, i))
+            if class_name == 'SequencerGateNotification':
+                row = ('seq', row)
+            rows.append(class_name, row)
+
+    start_times = []
+    first_times = []
+    async with aiosqlite.connect(path) as db:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            if use_rows:
+                task = asyncio.create_task(dump_rolling_buffers_to_database(
+                    rolling_buffers=rows, snapshot=rows.snapshot(),
+                    sequence_id='seq', db=db))
+            else:
+                task = asyncio.create_task(dump_dicts(dicts, 'seq', db))
+            await asyncio.sleep(0)
+            await db_insert.dict_notification(
+                notification=notification('ShotSampleWithVolumesUpdate', 0),
+                sequence_id='seq', db=db)
+            t1 = time.perf_counter()
+            await task
+            t2 = time.perf_counter()
+            first_times.append(t1 - t0)
+            start_times.append(t2 - t0)
+    return min(start_times) * 1000, min(first_times) * 1000
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    total = sum(ROLLING_BUFFER_SIZE.values())
+    print(f"{total} notifications in full rolling buffers")
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        path = make_database(tmp)
+        for (name, use_rows) in (('dicts', False), ('rows', True)):
+            (dump_ms, first_ms) = asyncio.run(measure(path, use_rows))
+            print(f"{name:>5}: {dump_ms:7.2f} ms to record  "
+                  f"first: {first_ms:7.2f} ms")
@@ -0,0 +1,134 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Offline timing error of scale_time, from arrival traces
+
+"before" is the arrival time, as used for scale_time before,
+"after" is the expected arrival from ClockRecovery
+
+The sensor lag is a constant offset, so the error is taken about its
+median. Reported are the mean, 95th percentile, and largest of that,
+then again once the fit has the first ten seconds of reports.
+
+Traces with a known sample time follow a Skale II, with reports held
+for its 150-ms windows, and an Acaia, with exponential jitter and an
+occasional stall that then delivers a burst. Each runs ten minutes
+with its clock 0.3% off nominal, with reports lost partway.
+
+Given a pyDE1 database, the arrival_time of weight_and_flow_update for
+each sequence is used as a recorded trace. As the sample times aren't
+known, what is reported is how far each interval of scale_time is from
+the period, which is zero for a sample-accurate scale_time.
+
+    python tests/run_scale_clock_benchmark.py [pyde1.sqlite3]
+"""
+
+import math
+import random
+import sqlite3
+import sys
+import time
+from statistics import mean, median
+from types import SimpleNamespace
+
+from pyDE1.scale.clock_recovery import ClockRecovery
+
+PERIOD = 0.1003
+N_SAMPLES = 6000    # Ten minutes
+LOST = range(3000, 3020)
+SETTLED = 100   # Reports, once the fit has enough to go on
+
+
+def skale_trace(seed=1):
+    rng = random.Random(seed)
+    start = 1_700_000_000.0
+    trace = []
+    for i in range(N_SAMPLES):
+        if i in LOST:
+            continue
+        sampled = start + i * PERIOD
+        window = math.floor((sampled - start) / 0.15) + 1
+        if rng.random() < 0.05:
+            window += 1
+        arrival = start + window * 0.15 + 0.02 + rng.uniform(0, 0.005)
+        if trace:
+            arrival = max(arrival, trace[-1][1])
+        trace.append((sampled, arrival))
+    return trace
+
+
+def acaia_trace(seed=2):
+    rng = random.Random(seed)
+    start = 1_700_000_000.0
+    trace = []
+    stalled_until = 0
+    for i in range(N_SAMPLES):
+        if i in LOST:
+            continue
+        sampled = start + i * PERIOD
+        if rng.random() < 0.01:
+            stalled_until = sampled + rng.uniform(0.1, 0.4)
+        arrival = max(sampled + 0.05 + rng.expovariate(1 / 0.015),
+                      stalled_until + 0.05)
+        if trace:
+            arrival = max(arrival, trace[-1][1])
+        trace.append((sampled, arrival))
+    return trace
+
+
+def fitted(arrivals):
+    clock = ClockRecovery(SimpleNamespace(estimated_period=0.1))
+    t0 = time.perf_counter()
+    expected = [clock.arrival(a) for a in arrivals]
+    dt = time.perf_counter() - t0
+    return expected, dt / len(arrivals)
+
+
+def summary(errors):
+    m = median(errors)
+    about = sorted(abs(e - m) * 1000 for e in errors)
+    return (f"mean {mean(about):6.1f}  p95 {about[int(0.95 * len(about))]:6.1f}"
+            f"  max {about[-1]:6.1f} ms")
+
+
+def traces_from_database(path):
+    with sqlite3.connect(path) as db:
+        rows = db.execute(
+            "SELECT sequence_id, arrival_time FROM weight_and_flow_update "
+            "ORDER BY sequence_id, arrival_time").fetchall()
+    traces = {}
+    for (sequence_id, arrival) in rows:
+        traces.setdefault(sequence_id, []).append(arrival)
+    return {k: v for (k, v) in traces.items() if len(v) > 50}
+
+
+if __name__ == '__main__':
+    for (name, trace) in (('Skale II', skale_trace()),
+                          ('Acaia', acaia_trace())):
+        (sampled, arrivals) = zip(*trace)
+        (expected, per_report) = fitted(arrivals)
+        print(f"{name}, {len(trace)} reports, "
+              f"{per_report * 1e6:.1f} us per report")
+        print(f"  before: {summary([a - s for (s, a) in trace])}")
+        errors = [e - s for (s, e) in zip(sampled, expected)]
+        print(f"   after: {summary(errors)}")
+        print(f" settled: {summary(errors[SETTLED:])}")
+
+    if len(sys.argv) > 1:
+        before = []
+        after = []
+        for (sequence_id, arrivals) in traces_from_database(
+                sys.argv[1]).items():
+            (expected, _) = fitted(arrivals)
+            period = (arrivals[-1] - arrivals[0]) / (len(arrivals) - 1)
+            before.extend(b - a - period
+                          for (a, b) in zip(arrivals, arrivals[1:]))
+            after.extend(b - a - period
+                         for (a, b) in zip(expected, expected[1:]))
+        print(f"{sys.argv[1]}, {len(before)} intervals from the period")
+        print(f"  before: {summary(before)}")
+        print(f"   after: {summary(after)}")
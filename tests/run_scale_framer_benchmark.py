@@ -0,0 +1,148 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Throughput of splitting Acaia packets into messages
+
+"before" reproduces the previous path: extend a bytearray, find HEADER,
+then reslice the bytearray after each message, with its logging
+
+"after" is Framer, with a read offset into a fixed buffer
+
+"dispatch" is AcaiaAcaia._notification_handler(), framing and decoding
+through the table of handlers, without subscribers
+
+The packets follow a Lunar 2021 capture, weight at ~10 Hz with
+the occasional STATUS, TIMER, and KEY message, as they arrive,
+two messages often sharing a packet and some split across two
+
+    python tests/run_scale_framer_benchmark.py
+"""
+
+import asyncio
+import logging
+import random
+import time
+
+import pyDE1
+from pyDE1.scale.acaia import (
+    AcaiaAcaia, HEADER, MessageType, frame_length, pack_message,
+)
+from pyDE1.scale.framer import Framer
+
+# Quiet the warnings of the previous path for long buffers
+pyDE1.getLogger('Scale.Acaia').setLevel(logging.ERROR)
+
+# Shaped as those in the capture, weight of 0x08 and 0x0c lengths,
+# STATUS, TIMER, and KEY
+WEIGHT_08 = bytes(pack_message(MessageType.EVENT,
+                               bytes.fromhex('0593 0100 0001 00')))
+WEIGHT_0C = bytes(pack_message(MessageType.EVENT,
+                               bytes.fromhex('0593 0100 0001 0000 0102 02')))
+STATUS = bytes(pack_message(MessageType.STATUS,
+                            bytes.fromhex('6402 0001 0001 0100 0000 0000')))
+TIMER = bytes(pack_message(MessageType.EVENT, bytes.fromhex('0700 0102')))
+KEY = bytes(pack_message(MessageType.EVENT,
+                         bytes.fromhex('0805 0900 0000 0203 1d')))
+
+
+def make_packets(n_messages=10000, seed=1, mtu=20):
+    rng = random.Random(seed)
+    stream = bytearray()
+    for i in range(n_messages):
+        if i % 50 == 0:
+            stream.extend(STATUS)
+        elif i % 97 == 0:
+            stream.extend(rng.choice((TIMER, KEY)))
+        else:
+            stream.extend(rng.choice((WEIGHT_08, WEIGHT_0C)))
+    packets = []
+    while stream:
+        n = rng.randrange(mtu // 2, mtu + 1)
+        packets.append(bytes(stream[:n]))
+        stream = stream[n:]
+    return packets
+
+
+def frame_before(packets):
+    logger = pyDE1.getLogger('Scale.Acaia')
+    buffer = bytearray()
+    n = 0
+    for packet in packets:
+        buffer.extend(packet)
+        while (lpb := len(buffer)):
+            if lpb < 5:
+                break
+            if buffer.startswith(b'\xef\xdd\x20'):
+                message = buffer[0:6]
+                buffer = buffer[6:]
+                n += 1
+                continue
+            idx = buffer.find(HEADER)
+            if idx == 0:
+                try:
+                    len_byte = buffer[3]
+                except IndexError:
+                    logger.debug(
+                        f"Waiting for more bytes, no length byte yet")
+                    break
+                if lpb >= (loa := len_byte + 5):
+                    if lpb > 26:
+                        logger.warning(
+                            f"Packet buffer getting long, at bytes: {lpb}")
+                    message = buffer[0:loa]
+                    buffer = buffer[loa:]
+                    n += 1
+                else:
+                    logger.debug(
+                        f"Waiting for {loa - lpb} more bytes")
+                    break
+            elif idx == -1:
+                buffer = bytearray()
+            else:
+                buffer = buffer[idx:]
+    return n
+
+
+def frame_after(packets):
+    framer = Framer(HEADER, frame_length)
+    n = 0
+    for packet in packets:
+        for message in framer.frames(packet):
+            n += 1
+    return n
+
+
+def measure(frame, packets, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = frame(packets)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return n, best
+
+
+async def dispatch(packets):
+    scale = AcaiaAcaia()
+    t0 = time.perf_counter()
+    for packet in packets:
+        await scale._notification_handler(0, bytearray(packet))
+    return time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    # 20 bytes is the default ATT MTU, less overhead, longer if negotiated
+    for mtu in (20, 64, 244):
+        packets = make_packets(mtu=mtu)
+        n_bytes = sum(len(p) for p in packets)
+        print(f"{len(packets)} packets of up to {mtu} bytes, {n_bytes} bytes")
+        for name, frame in (('before', frame_before), ('after', frame_after)):
+            (n, dt) = measure(frame, packets)
+            print(f"{name:>8}: {n} messages  {dt / n * 1e6:6.2f} us/message  "
+                  f"{n_bytes / dt / 1e6:6.1f} MB/s")
+        dt = asyncio.run(dispatch(packets))
+        print(f"{'dispatch':>8}: {dt / len(packets) * 1e6:6.2f} us/packet")
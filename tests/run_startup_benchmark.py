@@ -0,0 +1,126 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Import time of each process that run.py starts, each in a fresh
+interpreter, as it is with the 'spawn' start method, then with
+config.runtime.FORKSERVER_PRELOAD already imported, as with 'forkserver'
+
+The imports are those at the top of each run_...() function.
+The slowest modules, by cumulative time, come from -X importtime
+
+    python tests/run_startup_benchmark.py [--top N] [--repeat N]
+
+At runtime, each process logs its own "Startup:" line,
+see runtime_profile.report_startup()
+"""
+
+import argparse
+import subprocess
+import sys
+
+from pyDE1.config import config
+
+PROCESS_IMPORTS = {
+    'MainProcess': """
+import pyDE1.config
+import pyDE1.runtime_profile
+import pyDE1.shutdown_manager
+from pyDE1.api.outbound.mqtt import run_mqtt_outbound
+from pyDE1.api.inbound.http import run_api_inbound
+from pyDE1.controller import run_controller
+from pyDE1.database.run import run_database_recorder
+from pyDE1.database.manage import check_schema
+from pyDE1.supervise import SupervisedProcess
+""",
+    'Controller': """
+import pyDE1.controller
+import pyDE1.runtime_profile
+import pyDE1.status_reporter
+from pyDE1.de1 import DE1
+from pyDE1.dispatcher.dispatcher import register_read_pipe_to_queue
+from pyDE1.flow_sequencer import FlowSequencer
+from pyDE1.scale.processor import ScaleProcessor
+""",
+    'InboundAPI': """
+import pyDE1.api.inbound.http.run
+import pyDE1.runtime_profile
+import pyDE1.status_reporter
+from pyDE1.dispatcher.mapping import MAPPING
+from pyDE1.dispatcher.validate import validate_patch_return_targets
+from pyDE1.supervise import SupervisedTask, SupervisedExecutor
+""",
+    'OutboundAPI': """
+import pyDE1.api.outbound.mqtt.run
+import pyDE1.runtime_profile
+import paho.mqtt.client
+""",
+    'DatabaseLogger': """
+import pyDE1.database.run
+import pyDE1.runtime_profile
+import pyDE1.status_reporter
+from pyDE1.database.write_notifications import record_data
+from pyDE1.supervise import SupervisedTask
+""",
+}
+
+MEASURE = """
+import sys, time
+{preload}
+n0 = len(sys.modules)
+t0 = time.perf_counter()
+{imports}
+print(time.perf_counter() - t0, len(sys.modules) - n0)
+"""
+
+
+def measure(imports: str, preload=(), repeat=3):
+    code = MEASURE.format(
+        preload='\n'.join(f"import {m}" for m in preload),
+        imports=imports)
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code],
+                             capture_output=True, text=True, check=True)
+        dt, n = out.stdout.split()
+        best = float(dt) if best is None else min(best, float(dt))
+    return best, int(n)
+
+
+def slowest(imports: str, top: int):
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', imports],
+                         capture_output=True, text=True, check=True)
+    timed = []
+    for line in out.stderr.splitlines():
+        try:
+            (_, cumulative, name) = line.split('|')
+            if name.strip() != 'site':
+                timed.append((int(cumulative), name.strip()))
+        except ValueError:
+            pass
+    return sorted(timed, reverse=True)[:top]
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--top', type=int, default=5)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    preload = config.runtime.FORKSERVER_PRELOAD
+    total_spawn = 0
+    total_forkserver = 0
+    for (process, imports) in PROCESS_IMPORTS.items():
+        (dt, n) = measure(imports, repeat=args.repeat)
+        (dt_fs, n_fs) = measure(imports, preload, repeat=args.repeat)
+        total_spawn += dt
+        total_forkserver += dt_fs
+        print(f"{process:>15}: spawn {dt * 1000:6.1f} ms {n:4d} modules  "
+              f"forkserver {dt_fs * 1000:6.1f} ms {n_fs:4d} modules")
+        for (us, name) in slowest(imports, args.top):
+            print(f"{'':>17}{us / 1000:6.1f} ms  {name}")
+    print(f"{'total':>15}: spawn {total_spawn * 1000:6.1f} ms        "
+          f"       forkserver {total_forkserver * 1000:6.1f} ms")
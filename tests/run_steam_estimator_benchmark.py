@@ -0,0 +1,170 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Steam-to-temperature, cost of the estimate and how close the stop is
+
+"before" sums over the history for each sample, as the estimator was,
+and is checked every 100 ms, with 5 samples, as it was by default.
+"after" is TimeAtTargetEstimator with a timer for the estimated time,
+with the defaults of 15 samples and config.steam.CURVATURE. The others
+are the same, linear and with curvature, with 5 samples and with 15.
+A linear fit lags as the rate of rise slows, more so the more samples.
+
+Each run heats a pitcher at 1 Hz from the thermometer, with a rate of
+rise that slows as the milk loses more to the air, and noise in each
+reading. The steam stops config.steam.STOP_LAG after the trigger.
+Reported is how far the temperature is from the target when it stops,
+and the wakeups to check the trigger.
+
+    PYTHONPATH=src python tests/run_steam_estimator_benchmark.py
+"""
+
+import asyncio
+import math
+import random
+import time
+from statistics import mean
+
+from pyDE1.config import config
+from pyDE1.thermometer.time_at_target import TimeAtTargetEstimator
+
+RUNS = 200
+TARGET = 65.0
+POLL = 0.1
+
+
+def heating(rng):
+    """
+    Temperature at t, for a pitcher of a random size
+    """
+    rate = rng.uniform(1.2, 3.0)   # °C/s at the start
+    k = rng.uniform(0.004, 0.012)   # 1/s, heat loss
+    start = rng.uniform(4, 8)
+    # dT/dt = rate - k (T - start), levels off at t_inf
+    t_inf = start + rate / k
+
+    def temperature(t):
+        return t_inf - (t_inf - start) * math.exp(-k * t)
+
+    return temperature
+
+
+class Before:
+    """
+    As TimeAtTargetEstimator was
+    """
+
+    def __init__(self):
+        self.times = []
+        self.temperatures = []
+        self.target = None
+
+    async def new_sample(self, sample_time, temperature):
+        self.times.append(sample_time)
+        while len(self.times) > config.steam.MAX_SAMPLES_FOR_ESTIMATE:
+            self.times.pop(0)
+        self.temperatures.append(temperature)
+        while len(self.temperatures) > config.steam.MAX_SAMPLES_FOR_ESTIMATE:
+            self.temperatures.pop(0)
+        ns = min(len(self.times), len(self.temperatures))
+        if ns < 2:
+            return None
+        t0 = self.times[-1]
+        t_norm = [t - t0 for t in self.times[-ns:]]
+        s_x = sum(t_norm)
+        s_y = sum(self.temperatures[-ns:])
+        s_xx = sum([x * x for x in t_norm])
+        s_xy = sum(map(lambda a, b: a * b, t_norm, self.temperatures[-ns:]))
+        mhat = (ns * s_xy - (s_x * s_y)) / (ns * s_xx - (s_x * s_x))
+        if not mhat:
+            return None
+        bhat = (s_y / ns) - mhat * (s_x / ns)
+        return t0 + (self.target - bhat) / mhat
+
+
+async def stop_error(estimator, temperature, rng, poll):
+    """
+    Temperature less the target when the steam stops, and wakeups
+    """
+    estimator.target = TARGET
+    lag = config.steam.STOP_LAG
+    skip = config.steam.SKIP_INITIAL_SECONDS
+    trigger = None
+    wakeups = 0
+    next_poll = skip
+    t = 0
+    while True:
+        # Readings of the thermometer are to 0.1°, with some noise
+        reading = round(temperature(t) + rng.gauss(0, 0.15), 1)
+        trigger = await estimator.new_sample(t, reading)
+        if not poll:
+            wakeups += 1
+        fired = None
+        if trigger is not None:
+            fire_at = max(trigger - lag, skip)
+            if poll:
+                while next_poll < t + 1:
+                    wakeups += 1
+                    if next_poll >= fire_at:
+                        fired = next_poll
+                        break
+                    next_poll += POLL
+            elif fire_at < t + 1:
+                fired = max(fire_at, t)
+        elif poll:
+            while next_poll < t + 1:
+                wakeups += 1
+                next_poll += POLL
+        if fired is not None:
+            return temperature(fired + lag) - TARGET, wakeups
+        t += 1
+
+
+async def per_sample(estimator, n=10_000):
+    estimator.target = TARGET
+    t0 = time.perf_counter()
+    for i in range(n):
+        await estimator.new_sample(i * 0.5, 20 + i * 0.01)
+    return (time.perf_counter() - t0) / n
+
+
+async def main():
+    for size in (5, 20):
+        config.steam.MAX_SAMPLES_FOR_ESTIMATE = size
+        config.steam.CURVATURE = False
+        before = await per_sample(Before())
+        after = await per_sample(TimeAtTargetEstimator())
+        config.steam.CURVATURE = True
+        curved = await per_sample(TimeAtTargetEstimator())
+        print(f"{size:2d} samples: before {before * 1e6:5.1f}  "
+              f"after {after * 1e6:5.1f}  curvature {curved * 1e6:5.1f} "
+              f"us per sample")
+
+    for (name, make, size, curvature, poll) in (
+            ('before', Before, 5, False, True),
+            ('linear 5', TimeAtTargetEstimator, 5, False, False),
+            ('curved 5', TimeAtTargetEstimator, 5, True, False),
+            ('linear 15', TimeAtTargetEstimator, 15, False, False),
+            ('after', TimeAtTargetEstimator, 15, True, False)):
+        config.steam.MAX_SAMPLES_FOR_ESTIMATE = size
+        config.steam.CURVATURE = curvature
+        rng = random.Random(1)
+        errors = []
+        wakeups = []
+        for _ in range(RUNS):
+            temperature = heating(rng)
+            (error, n) = await stop_error(make(), temperature, rng, poll)
+            errors.append(error)
+            wakeups.append(n)
+        about = sorted(abs(e) for e in errors)
+        print(f"{name:>10}: stop {mean(errors):+5.2f} °C mean, "
+              f"|error| p95 {about[int(0.95 * len(about))]:4.2f} "
+              f"max {about[-1]:4.2f}, {mean(wakeups):5.1f} wakeups")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Cost per ShotSample of volume tracking, and what it leaves in the database
+
+"before" copies the list of volumes by frame into every update and
+then formats it into every row, "after" updates the frame in an array,
+with the whole of it only when the frame changes and when tracking stops
+
+A synthetic shot at 60 Hz, a ShotSample every 25 half-cycles,
+a frame every 40 samples, and the tracking stopping at the end
+
+    PYTHONPATH=src python tests/run_volume_tracking_benchmark.py
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from copy import copy
+from types import SimpleNamespace
+
+from pyDE1.de1.c_api import API_MachineStates, MAX_FRAMES
+from pyDE1.de1.de1 import DE1
+from pyDE1.de1.events import ShotSampleUpdate
+from pyDE1.de1.sample_clock import SampleClock
+
+N_SAMPLES = 600     # Two minutes
+PER_FRAME = 40
+REPEAT = 20
+
+
+def samples():
+    return [ShotSampleUpdate(
+        arrival_time=i / 4.8, sample_time=(i * 25) % 65536,
+        group_pressure=9.0, group_flow=2.0, mix_temp=92.0, head_temp=91.0,
+        set_mix_temp=92.0, set_head_temp=92.0, set_group_pressure=9.0,
+        set_group_flow=0.0, frame_number=min(i // PER_FRAME, MAX_FRAMES - 1),
+        steam_temp=150) for i in range(N_SAMPLES)]
+
+
+def fake_de1(rows: list):
+
+    async def publish(sswvu):
+        # As database.insert.shot_sample_with_volume_update()
+        v = sswvu.volume_by_frames
+        rows.append(None if v is None else str(v))
+
+    return SimpleNamespace(
+        logger=logging.getLogger('benchmark'),
+        line_frequency=60,
+        current_state=API_MachineStates.Espresso,
+        _event_shot_sample_with_volumes_update=SimpleNamespace(
+            publish=publish),
+        _sample_clock=SampleClock(60),
+        _ssus_start_up=True,
+        _ssus_last_sample_time=0,
+        _tracking_volume_dispensed=True,
+        _number_of_preinfuse_frames=2,
+        _volume_dispensed_preinfuse=0,
+        _volume_dispensed_pour=0,
+        _volume_dispensed_total=0,
+        _volume_dispensed_by_frame=array('d', [0.0]) * MAX_FRAMES,
+        _volume_last_frame=None,
+        _volume_was_tracking=False,
+    )
+
+
+async def before(ssus, rows):
+    """
+    The accumulation as it was, a list copied into each update
+    """
+    by_frame = [0] * MAX_FRAMES
+    last_sample_time = None
+    for ssu in ssus:
+        if last_sample_time is not None:
+            t_inc = ssu.sample_time - last_sample_time
+            if t_inc < 0:
+                t_inc += 65536
+            v_inc = ssu.group_flow * t_inc / 120
+            by_frame[ssu.frame_number] += v_inc
+        last_sample_time = ssu.sample_time
+        volume_by_frames = copy(by_frame)
+        rows.append(str(volume_by_frames))
+
+
+async def after(ssus, rows):
+    de1 = fake_de1(rows)
+    for ssu in ssus[:-1]:
+        await DE1._shot_sample_update_subscriber(de1, ssu)
+    de1._tracking_volume_dispensed = False
+    await DE1._shot_sample_update_subscriber(de1, ssus[-1])
+
+
+def run(method):
+    ssus = samples()
+    best = None
+    for _ in range(REPEAT):
+        rows = []
+        t0 = time.perf_counter()
+        asyncio.run(method(ssus, rows))
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    stored = sum(len(r) for r in rows if r is not None)
+    return best / N_SAMPLES, stored, rows
+
+
+if __name__ == '__main__':
+    (t_before, stored_before, _) = run(before)
+    (t_after, stored_after, rows) = run(after)
+    print(f"{N_SAMPLES} samples, a frame every {PER_FRAME}")
+    print(f"  before: {t_before * 1e6:6.1f} us per sample, "
+          f"{stored_before:8,d} bytes of volume_by_frames")
+    print(f"   after: {t_after * 1e6:6.1f} us per sample, "
+          f"{stored_after:8,d} bytes of volume_by_frames, "
+          f"{sum(r is not None for r in rows)} rows with it")
+    print("(after includes the whole of the subscriber and the update)")
@@ -0,0 +1,108 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from pyDE1.dispatcher.batch import batch_requests, run_batch
+from pyDE1.dispatcher.payloads import APIRequest, APIResponse, HTTPMethod
+from pyDE1.dispatcher.resource import Resource
+from pyDE1.exceptions import (
+    DE1APIAttributeError, DE1APITypeError, DE1APIValueError
+)
+
+
+def test_batch_requests():
+    items = batch_requests(timestamp=1.0, limit=10, operations=[
+        {'method': 'GET', 'resource': 'de1/setting'},
+        {'method': 'PATCH', 'resource': 'de1/control/espresso',
+         'body': {'stop_at_weight': 51}},
+        {'method': 'GET', 'resource': 'de1/profiles',
+         'query': {'title': 'allonge'}},
+        {'method': 'PUT', 'resource': 'de1/profile'},
+        {'method': 'GET', 'resource': 'not/a/resource'},
+        {'method': 'GET', 'resource': 'metrics'},
+        {'method': 'PATCH', 'resource': 'de1/control/espresso',
+         'body': {'no_such_key': 1}},
+        {'method': 'PATCH', 'resource': 'de1/control/espresso'},
+        'de1',
+    ])
+    (setting, espresso, profiles) = items[:3]
+    assert setting.method is HTTPMethod.GET
+    assert setting.resource is Resource.DE1_SETTING
+    assert setting.payload is None
+    assert setting.connectivity_required['DE1']
+    assert espresso.method is HTTPMethod.PATCH
+    assert espresso.payload == {'stop_at_weight': 51}
+    assert profiles.payload == {'title': 'allonge'}
+
+    failed = items[3:]
+    assert all(isinstance(item, APIResponse) for item in failed)
+    assert [type(item.exception) for item in failed] == [
+        DE1APIValueError,
+        DE1APIValueError,
+        DE1APIValueError,
+        DE1APIAttributeError,
+        DE1APIValueError,
+        DE1APITypeError,
+    ]
+    assert failed[0].original_timestamp == 1.0
+
+
+def test_batch_itself_invalid():
+    with pytest.raises(DE1APITypeError):
+        batch_requests(timestamp=1.0, limit=10, operations={})
+    with pytest.raises(DE1APIValueError):
+        batch_requests(timestamp=1.0, limit=2, operations=[
+            {'method': 'GET', 'resource': 'de1'}] * 3)
+
+
+@pytest.mark.asyncio
+async def test_run_batch_gets_together_patch_in_order():
+    events = []
+
+    async def respond(req: APIRequest) -> APIResponse:
+        events.append(('start', req.payload))
+        await asyncio.sleep(0.05)
+        events.append(('end', req.payload))
+        return APIResponse(original_timestamp=req.timestamp,
+                           timestamp=time.time(),
+                           payload=req.payload)
+
+    def request(method: HTTPMethod, n: int) -> APIRequest:
+        return APIRequest(timestamp=0, method=method, resource=Resource.DE1,
+                          connectivity_required={}, payload=n)
+
+    already_failed = APIResponse(original_timestamp=0, timestamp=0,
+                                 payload=None, exception=DE1APIValueError())
+    items = [
+        request(HTTPMethod.GET, 0),
+        request(HTTPMethod.GET, 1),
+        already_failed,
+        request(HTTPMethod.GET, 2),
+        request(HTTPMethod.PATCH, 3),
+        request(HTTPMethod.GET, 4),
+        request(HTTPMethod.GET, 5),
+    ]
+    t0 = time.perf_counter()
+    responses = await run_batch(items, respond)
+    dt = time.perf_counter() - t0
+
+    assert [r.payload for r in responses] == [0, 1, None, 2, 3, 4, 5]
+    assert responses[2] is already_failed
+    # Three GETs, the PATCH, then two GETs
+    assert dt < 0.05 * 4
+    assert events == [
+        ('start', 0), ('start', 1), ('start', 2),
+        ('end', 0), ('end', 1), ('end', 2),
+        ('start', 3), ('end', 3),
+        ('start', 4), ('start', 5),
+        ('end', 4), ('end', 5),
+    ]
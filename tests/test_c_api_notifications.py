@@ -0,0 +1,76 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+
+Decoding of the high-rate notifications through from_notification()
+needs to give the same results as the validating, constructor path
+"""
+
+from copy import deepcopy
+from struct import pack
+
+import pytest
+
+from pyDE1.de1.c_api import (
+    ShotSample, ShotState, StateInfo, WaterLevels,
+    API_MachineStates, API_Substates,
+)
+
+SHOT_SAMPLE_FIELDS = (
+    'SampleTime', 'GroupPressure', 'GroupFlow', 'MixTemp', 'HeadTemp',
+    'SetMixTemp', 'SetHeadTemp', 'SetGroupPressure', 'SetGroupFlow',
+    'FrameNumber', 'SteamTemp',
+)
+
+
+def shot_sample_wire_bytes(sample_time, frame):
+    return pack('>HHHHBHHHBBBB',
+                sample_time,
+                int(8.9 * 4096), int(2.1 * 4096), int(91.3 * 256),
+                92, int(0.45 * 65536),
+                int(91.5 * 256), int(92.0 * 256),
+                int(9.0 * 16), int(2.0 * 16),
+                frame, 160)
+
+
+@pytest.mark.parametrize('sample_time,frame',
+                         ((0, 0), (25, 2), (65535, 19)))
+def test_shot_sample_from_notification(sample_time, frame):
+    wire_bytes = shot_sample_wire_bytes(sample_time, frame)
+    slow = ShotSample().from_wire_bytes(wire_bytes, 1234.5)
+    fast = ShotSample.from_notification(wire_bytes, 1234.5)
+    for field in SHOT_SAMPLE_FIELDS:
+        assert getattr(fast, field) == getattr(slow, field), field
+    assert fast.arrival_time == 1234.5
+    assert fast.ShotState.arrival_time == 1234.5
+    assert fast.log_string() == slow.log_string()
+
+
+def test_shot_sample_is_slotted():
+    obj = ShotSample.from_notification(shot_sample_wire_bytes(25, 1))
+    assert not hasattr(obj, '__dict__')
+    assert not hasattr(obj.ShotState, '__dict__')
+    with pytest.raises(AttributeError):
+        obj.not_a_field = 1
+    # NotifyState.last_value relies on deepcopy
+    copied = deepcopy(obj)
+    assert copied.GroupPressure == obj.GroupPressure
+    assert isinstance(copied.ShotState, ShotState)
+
+
+def test_state_info_from_notification():
+    wire_bytes = pack('>BB', API_MachineStates.Espresso, API_Substates.Pour)
+    obj = StateInfo.from_notification(wire_bytes, 1.0)
+    assert obj.State is API_MachineStates.Espresso
+    assert obj.SubState is API_Substates.Pour
+    assert obj.log_string() == 'Espresso,Pour'
+
+
+def test_water_levels_from_notification():
+    wire_bytes = pack('>HH', int(12.5 * 256), int(5.25 * 256))
+    decoded = WaterLevels.from_notification(wire_bytes, 2.0)
+    assert decoded.Level == 12.5
+    assert decoded.StartFillLevel == 5.25
@@ -0,0 +1,107 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import math
+import random
+from statistics import median
+from types import SimpleNamespace
+
+import pytest
+
+from pyDE1.config import config
+from pyDE1.scale.clock_recovery import ClockRecovery
+from pyDE1.scale.generic_scale import GenericScale
+
+
+def skale_trace(n=600, period=0.1003, seed=1):
+    """
+    (sample time, arrival) with reports held for the next 150-ms window,
+    sometimes for one more
+    """
+    rng = random.Random(seed)
+    start = 1_700_000_000.0
+    trace = []
+    for i in range(n):
+        sampled = start + i * period
+        window = math.floor((sampled - start) / 0.15) + 1
+        if rng.random() < 0.05:
+            window += 1
+        trace.append((sampled,
+                      start + window * 0.15 + 0.02 + rng.uniform(0, 0.005)))
+    # One report can't be seen before the one sampled before it
+    for i in range(1, n):
+        if trace[i][1] < trace[i - 1][1]:
+            trace[i] = (trace[i][0], trace[i - 1][1])
+    return trace
+
+
+def spread(errors):
+    """
+    Largest error about the median, as the sensor lag takes up the rest
+    """
+    m = median(errors)
+    return max(abs(e - m) for e in errors)
+
+
+def run(trace, warmup=20):
+    scale = SimpleNamespace(estimated_period=0.1)
+    clock = ClockRecovery(scale)
+    fitted = []
+    raw = []
+    for (sampled, arrival) in trace:
+        expected = clock.arrival(arrival)
+        fitted.append(expected - sampled)
+        raw.append(arrival - sampled)
+    return clock, spread(raw[warmup:]), spread(fitted[warmup:])
+
+
+def test_skale_bursts():
+    (clock, raw, fitted) = run(skale_trace(n=1200), warmup=100)
+    assert raw > 0.15
+    assert fitted < raw / 5
+    assert clock.period == pytest.approx(0.1003, abs=0.0005)
+
+
+def test_jitter():
+    rng = random.Random(2)
+    trace = [(i * 0.1, i * 0.1 + 0.05 + rng.expovariate(1 / 0.015))
+             for i in range(600)]
+    (_, raw, fitted) = run(trace)
+    assert fitted < raw / 3
+
+
+def test_lost_reports_and_restart():
+    trace = [(i * 0.1, i * 0.1 + 0.05) for i in range(100)]
+    # 15 reports lost
+    trace += [(i * 0.1, i * 0.1 + 0.05) for i in range(115, 200)]
+    (clock, _, fitted) = run(trace)
+    assert clock.index == 199 - 15 + 15
+    assert fitted < 0.001
+
+    # Longer than the window, starts over
+    clock.arrival(200 * 0.1 + 60)
+    assert clock.index == 0
+
+
+@pytest.mark.asyncio
+async def test_scale_time_from_fit(monkeypatch):
+    scale = GenericScale()
+    trace = skale_trace(n=100)
+    for (sampled, arrival) in trace:
+        scale._update_scale_time_estimator(arrival)
+    (sampled, arrival) = trace[-1]
+    scale_time = scale._scale_time_from_latest_arrival(arrival)
+    assert scale_time != arrival - scale.sensor_lag
+    # Not the latest, or not enabled, just less the lag
+    assert scale._scale_time_from_latest_arrival(arrival + 1) \
+           == arrival + 1 - scale.sensor_lag
+    monkeypatch.setattr(config.scale, 'CLOCK_RECOVERY', False)
+    scale._latest_expected_arrival = None
+    scale._update_scale_time_estimator(arrival + 0.1)
+    assert scale._scale_time_from_latest_arrival(arrival + 0.1) \
+           == arrival + 0.1 - scale.sensor_lag
@@ -0,0 +1,93 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+
+import pytest
+
+from pyDE1.bledev.connection_scheduler import (
+    ConnectionHistory, ConnectionScheduler
+)
+from pyDE1.config import config
+from pyDE1.event_manager.events import DeviceRole
+
+
+def test_backoff_after_fast_window():
+    history = ConnectionHistory('AA:01', DeviceRole.SCALE)
+    history.outage_start()
+    assert history.schedule_next() == 0
+
+    history.outage_since -= config.bluetooth.RECONNECT_FAST_WINDOW + 1
+    initial = config.bluetooth.RECONNECT_BACKOFF_INITIAL
+    delays = [history.schedule_next() for _ in range(5)]
+    assert delays[:2] == [initial, 2 * initial]
+    assert max(delays) == config.bluetooth.RECONNECT_BACKOFF_MAX
+
+    # Connected, so the next outage starts over
+    history.attempt_started(adapter_wait=0)
+    history.attempt_ended(connected=True)
+    history.outage_start()
+    assert history.schedule_next() == 0
+
+
+def test_fast_window_follows_reconnect_history():
+    history = ConnectionHistory('AA:01', DeviceRole.SCALE)
+    assert history.fast_window == config.bluetooth.RECONNECT_FAST_WINDOW
+
+    for _ in range(3):
+        history.outage_start()
+        history.outage_since -= 5
+        for connected in (False, False, True):
+            history.attempt_started(adapter_wait=0)
+            history.attempt_ended(connected=connected)
+
+    assert history.last_reconnect_attempts == 3
+    assert history.last_reconnect_latency == pytest.approx(5, abs=0.1)
+    assert history.fast_window == config.bluetooth.RECONNECT_FAST_WINDOW_MIN
+    assert history.as_dict()['failures'] == 6
+
+
+@pytest.mark.asyncio
+async def test_adapter_one_at_a_time_de1_first():
+    scheduler = ConnectionScheduler()
+    log = []
+
+    async def attempt(name: str, role: DeviceRole, delay: float):
+        await asyncio.sleep(delay)
+        async with scheduler.adapter_operation(role):
+            log.append(('start', name))
+            await asyncio.sleep(0.02)
+            log.append(('end', name))
+
+    await asyncio.gather(
+        attempt('scale', DeviceRole.SCALE, 0),
+        attempt('thermometer', DeviceRole.THERMOMETER, 0.005),
+        attempt('de1', DeviceRole.DE1, 0.01),
+    )
+    assert log == [('start', 'scale'), ('end', 'scale'),
+                   ('start', 'de1'), ('end', 'de1'),
+                   ('start', 'thermometer'), ('end', 'thermometer')]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_hold_adapter():
+    scheduler = ConnectionScheduler()
+
+    async def hold(duration: float):
+        async with scheduler.adapter_operation(DeviceRole.SCALE):
+            await asyncio.sleep(duration)
+
+    holder = asyncio.create_task(hold(0.02))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold(1.0))
+    await asyncio.sleep(0)
+    assert scheduler.adapter_waiting == 1
+    waiter.cancel()
+    await holder
+
+    await asyncio.wait_for(hold(0), timeout=0.1)
@@ -0,0 +1,245 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+import pyDE1.database.manage as manage
+from pyDE1.config import config
+from pyDE1.database.recorder_control import (
+    RecorderControl, SpilledNotifications
+)
+import pyDE1.database.spill as spill
+from pyDE1.database.spill import SpillingQueue, read_journal
+from pyDE1.database.write_notifications import record_data
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    path = str(tmp_path / 'pyde1.sqlite3')
+    schema_path = Path(manage.__file__).resolve().parent.joinpath(
+        manage.CURRENT_SCHEMA_RELPATH)
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(schema_path):
+            db.execute(sql)
+        db.commit()
+    return path
+
+
+def weight_and_flow(i: int) -> str:
+    t = 1000 + i * 0.1
+    return json.dumps({
+        'class': 'WeightAndFlowUpdate', 'version': '1.1.0', 'sender': 'Test',
+        'arrival_time': t, 'create_time': t, 'event_time': t,
+        'scale_time': t,
+        'current_weight': i, 'current_weight_time': t,
+        'average_flow': 1.0, 'average_flow_time': t,
+        'median_weight': i, 'median_weight_time': t,
+        'median_flow': 1.0, 'median_flow_time': t,
+    })
+
+
+def test_spill_keeps_order(tmp_path):
+    mp_queue = multiprocessing.Queue(maxsize=10)
+    statuses = []
+    spill_dir = str(tmp_path / 'spill')
+    dbq = SpillingQueue(mp_queue, spill_dir, resume_below=5,
+                        on_change=statuses.append)
+    for i in range(25):
+        dbq.put_nowait(i)
+    assert dbq.spilling
+    assert [s['spilling'] for s in statuses] == [True]
+
+    received = []
+    for i in range(8):
+        received.append(mp_queue.get(timeout=1))
+    # Has room, so the journal is handed off before this is queued
+    dbq.put_nowait(25)
+    assert not dbq.spilling
+    assert [s['spilling'] for s in statuses] == [True, False]
+    assert statuses[-1]['count'] == 15
+
+    while len(received) < 26 - 15 + 1:
+        received.append(mp_queue.get(timeout=1))
+    expanded = []
+    for item in received:
+        if isinstance(item, SpilledNotifications):
+            expanded.extend(read_journal(item.path))
+        else:
+            expanded.append(item)
+    assert expanded == list(range(26))
+
+
+def test_leftover_journal_queued(tmp_path):
+    spill_dir = str(tmp_path / 'spill')
+    first = SpillingQueue(multiprocessing.Queue(maxsize=1), spill_dir,
+                          on_change=lambda status: None)
+    first.put_nowait('a')
+    first.put_nowait('b')
+    assert first.spilling
+    # As if the Controller exited here, then was restarted
+    mp_queue = multiprocessing.Queue(maxsize=10)
+    SpillingQueue(mp_queue, spill_dir, on_change=lambda status: None)
+    leftover = mp_queue.get(timeout=1)
+    assert leftover.count is None
+    assert list(read_journal(leftover.path)) == ['b']
+
+
+@pytest.mark.asyncio
+async def test_stalled_recorder_loses_nothing(db_path, tmp_path,
+                                              monkeypatch):
+    monkeypatch.setattr(config.database, 'FILENAME', db_path)
+    spill_dir = str(tmp_path / 'spill')
+    mp_queue = multiprocessing.Queue(maxsize=20)
+    statuses = []
+    dbq = SpillingQueue(mp_queue, spill_dir, resume_below=10,
+                        retry_interval=0.05,
+                        loop=asyncio.get_running_loop(),
+                        on_change=statuses.append)
+    n = 600
+
+    # The recorder isn't running, as if stalled
+    dbq.put_nowait(RecorderControl(recording=True, sequence_id='seq'))
+    for i in range(n // 2):
+        dbq.put_nowait(weight_and_flow(i))
+    assert dbq.spilling
+
+    recorder = asyncio.create_task(record_data(mp_queue))
+    try:
+        # More arrive while it catches up
+        for i in range(n // 2, n):
+            dbq.put_nowait(weight_and_flow(i))
+            if i % 20 == 0:
+                await asyncio.sleep(0.01)
+        dbq.put_nowait(RecorderControl(recording=False, sequence_id='seq'))
+
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            await asyncio.sleep(0.1)
+            with sqlite3.connect(db_path) as db:
+                weights = [row[0] for row in db.execute(
+                    'SELECT current_weight FROM weight_and_flow_update '
+                    "WHERE sequence_id = 'seq' ORDER BY rowid")]
+            if len(weights) >= n and not dbq.spilling:
+                break
+    finally:
+        recorder.cancel()
+        try:
+            await recorder
+        except asyncio.CancelledError:
+            pass
+
+    assert weights == list(range(n))
+    assert dbq.total_spilled > 0
+    assert statuses[0]['spilling'] and not statuses[-1]['spilling']
+    assert os.listdir(spill_dir) == []
+
+
+@pytest.mark.asyncio
+async def test_restarts_replay_once(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(config.database, 'FILENAME', db_path)
+    spill_dir = str(tmp_path / 'spill')
+    first = SpillingQueue(multiprocessing.Queue(maxsize=1), spill_dir,
+                          on_change=lambda status: None)
+    first.put_nowait('not recorded')
+    for i in range(5):
+        first.put_nowait(weight_and_flow(i))
+    assert first.spilling
+
+    # The Controller restarted twice before the recorder got to it
+    mp_queue = multiprocessing.Queue(maxsize=20)
+    mp_queue.put(RecorderControl(recording=True, sequence_id='seq'))
+    SpillingQueue(mp_queue, spill_dir, on_change=lambda status: None)
+    SpillingQueue(mp_queue, spill_dir, on_change=lambda status: None)
+    mp_queue.put(RecorderControl(recording=False, sequence_id='seq'))
+    assert len([p for p in os.listdir(spill_dir)
+                if p.endswith('.queued')]) == 1
+
+    recorder = asyncio.create_task(record_data(mp_queue))
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            await asyncio.sleep(0.1)
+            if not os.listdir(spill_dir) and mp_queue.empty():
+                break
+        await asyncio.sleep(0.2)
+    finally:
+        recorder.cancel()
+        try:
+            await recorder
+        except asyncio.CancelledError:
+            pass
+
+    with sqlite3.connect(db_path) as db:
+        weights = [row[0] for row in db.execute(
+            'SELECT current_weight FROM weight_and_flow_update '
+            "WHERE sequence_id = 'seq' ORDER BY rowid")]
+    assert weights == list(range(5))
+    assert os.listdir(spill_dir) == []
+
+
+@pytest.mark.asyncio
+async def test_interrupted_replay_resumes(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(config.database, 'FILENAME', db_path)
+    spill_dir = str(tmp_path / 'spill')
+    monkeypatch.setattr(config.database, 'SPILL_DIRECTORY', spill_dir)
+    os.makedirs(spill_dir)
+    path = os.path.join(spill_dir, 'spill-1-1.queued')
+    with open(path, 'wb') as journal:
+        spill.write_record(journal, RecorderControl(recording=True,
+                                                    sequence_id='seq'))
+        for i in range(10):
+            spill.write_record(journal, weight_and_flow(i))
+        spill.write_record(journal, RecorderControl(recording=False,
+                                                    sequence_id='seq'))
+
+    def weights():
+        with sqlite3.connect(db_path) as db:
+            return [row[0] for row in db.execute(
+                'SELECT current_weight FROM weight_and_flow_update '
+                "WHERE sequence_id = 'seq' ORDER BY rowid")]
+
+    # The recorder stops just after the sixth record
+    update = spill.ReplayProgress.update
+
+    def update_then_stop(progress, offset):
+        update(progress, offset)
+        if progress.offset and len(weights()) == 5:
+            raise RuntimeError('Stopped')
+
+    monkeypatch.setattr(spill.ReplayProgress, 'update', update_then_stop)
+    mp_queue = multiprocessing.Queue()
+    mp_queue.put(SpilledNotifications(path=path, count=12))
+    with pytest.raises(RuntimeError, match='Stopped'):
+        await asyncio.wait_for(record_data(mp_queue), 10)
+    assert weights() == list(range(5))
+    assert sorted(os.listdir(spill_dir)) \
+           == ['spill-1-1.replaying', 'spill-1-1.replaying.offset']
+
+    # Resumed when the recorder next starts, in the same sequence
+    monkeypatch.setattr(spill.ReplayProgress, 'update', update)
+    recorder = asyncio.create_task(record_data(mp_queue))
+    try:
+        deadline = time.time() + 10
+        while os.listdir(spill_dir) and time.time() < deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        recorder.cancel()
+        try:
+            await recorder
+        except asyncio.CancelledError:
+            pass
+    assert weights() == list(range(10))
+    assert os.listdir(spill_dir) == []
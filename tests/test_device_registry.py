@@ -0,0 +1,98 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+import pyDE1.database.manage as manage
+from pyDE1.bledev.device_registry import DeviceRegistry
+from pyDE1.config import config
+from pyDE1.event_manager.events import DeviceRole
+from pyDE1.scanner import _RegisteredPrefixes
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch) -> str:
+    path = str(tmp_path / 'pyde1.sqlite3')
+    schema_path = Path(manage.__file__).resolve().parent.joinpath(
+        manage.CURRENT_SCHEMA_RELPATH)
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(schema_path):
+            db.execute(sql)
+        db.commit()
+    monkeypatch.setattr(config.database, 'FILENAME', path)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_connected_device_is_known_after_restart(db_path):
+    registry = DeviceRegistry()
+    await registry.load()
+    registry.seen('AA:01', 'PROCHBT001', -70, DeviceRole.SCALE)
+    registry.seen('AA:02', 'Skale', -50, DeviceRole.SCALE)
+    registry.connected('AA:01', None, DeviceRole.SCALE, 'AcaiaAcaia')
+    await registry.flush()
+
+    restarted = DeviceRegistry()
+    known = await restarted.known_for_role(DeviceRole.SCALE)
+    # Only those that have connected
+    assert [kd.address for kd in known] == ['AA:01']
+    assert known[0].name == 'PROCHBT001'
+    assert known[0].vendor_class == 'AcaiaAcaia'
+    assert known[0].connect_count == 1
+    assert await restarted.known_for_role(DeviceRole.DE1) == []
+    assert restarted.get('AA:02').rssi == -50
+
+
+@pytest.mark.asyncio
+async def test_most_recent_first_and_expiry(db_path, monkeypatch):
+    registry = DeviceRegistry()
+    await registry.load()
+    for address in ('DE:01', 'DE:02', 'DE:03'):
+        registry.connected(address, 'DE1', DeviceRole.DE1, 'DE1')
+    await registry.flush()
+    # Last connected long ago
+    registry._devices['DE:01'] = registry._devices['DE:01']._replace(
+        last_connected=time.time() - config.bluetooth.REGISTRY_EXPIRY - 1)
+    known = await registry.known_for_role(DeviceRole.DE1)
+    assert [kd.address for kd in known] == ['DE:03', 'DE:02']
+
+
+@pytest.mark.asyncio
+async def test_load_keeps_devices_seen_before(db_path):
+    registry = DeviceRegistry()
+    await registry.load()
+    registry.connected('DE:01', 'DE1', DeviceRole.DE1, 'DE1')
+    await registry.flush()
+
+    restarted = DeviceRegistry()
+    restarted.seen('DE:01', 'DE1', -40, DeviceRole.DE1)
+    await restarted.load()
+    kd = restarted.get('DE:01')
+    assert kd.rssi == -40
+    assert kd.last_connected is not None
+    assert kd.connect_count == 1
+
+
+def test_prefix_match_most_specific():
+    prefixes = _RegisteredPrefixes()
+    prefixes.add_to_role('DE1', DeviceRole.DE1)
+    prefixes.add_to_role('PROCH', DeviceRole.SCALE)
+    prefixes.add_to_role('PROCHBT', DeviceRole.SCALE)
+    assert prefixes.match('PROCHBT001', DeviceRole.SCALE) == 'PROCHBT'
+    assert prefixes.match('PROCHBT001', DeviceRole.DE1) is None
+    assert prefixes.match(None, DeviceRole.SCALE) is None
+    assert prefixes.role_for_name('DE1') == DeviceRole.DE1
+    assert prefixes.role_for_name('Unknown') is None
+    # Adding a prefix is seen by names already matched
+    assert prefixes.match('Skale', DeviceRole.SCALE) is None
+    prefixes.add_to_role('Skale', DeviceRole.SCALE)
+    assert prefixes.match('Skale', DeviceRole.SCALE) == 'Skale'
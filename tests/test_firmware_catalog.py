@@ -0,0 +1,133 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import binascii
+import hashlib
+import os
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import pyDE1.database.firmware_catalog as firmware_catalog
+import pyDE1.database.manage as manage
+from pyDE1.config import config
+from pyDE1.de1.de1 import DE1
+from pyDE1.de1.firmware_file import BOARD_MARKER
+from pyDE1.dispatcher.payloads import UploadedFile
+from pyDE1.exceptions import DE1APIValueError, DE1ValueError
+
+
+def firmware_image(version: int, body_length=4096) -> bytes:
+    body = bytes(i % 251 for i in range(body_length))
+    head = struct.pack('IIIIIII32s', binascii.crc32(body), BOARD_MARKER,
+                       version, body_length, body_length // 2, 0, 0,
+                       bytes(32))
+    return head + struct.pack('I', binascii.crc32(head)) + body
+
+
+def write_image(tmp_path, image: bytes) -> UploadedFile:
+    path = str(tmp_path / f"upload-{hashlib.sha256(image).hexdigest()}")
+    with open(path, 'wb') as fh:
+        fh.write(image)
+    return UploadedFile(path=path, size=len(image),
+                        sha256=hashlib.sha256(image).hexdigest())
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch) -> str:
+    path = str(tmp_path / 'pyde1.sqlite3')
+    schema_path = Path(manage.__file__).resolve().parent.joinpath(
+        manage.CURRENT_SCHEMA_RELPATH)
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(schema_path):
+            db.execute(sql)
+        db.commit()
+    monkeypatch.setattr(config.database, 'FILENAME', path)
+    monkeypatch.setattr(config.de1, 'FIRMWARE_DIRECTORY',
+                        str(tmp_path / 'firmware'))
+    return path
+
+
+@pytest.mark.asyncio
+async def test_add_and_list(db_path, tmp_path, monkeypatch):
+    threads = []
+    inspect_image = firmware_catalog.inspect_image
+
+    def recording_inspect_image(*args):
+        threads.append(threading.current_thread())
+        return inspect_image(*args)
+
+    monkeypatch.setattr(firmware_catalog, 'inspect_image',
+                        recording_inspect_image)
+
+    image = firmware_image(version=1333)
+    upload = write_image(tmp_path, image)
+    entry = await firmware_catalog.add_image(upload)
+    # Validated off the loop
+    assert threads[0] is not threading.main_thread()
+    assert entry.version == 1333
+    assert entry.sha256 == upload.sha256
+    assert entry.crc_matches
+    assert entry.size == len(image)
+    assert not os.path.exists(upload.path)
+    with open(entry.path, 'rb') as fh:
+        assert fh.read() == image
+
+    # Already present, as content
+    again = await firmware_catalog.add_image(image)
+    assert again == entry
+    assert os.listdir(config.de1.FIRMWARE_DIRECTORY) == [entry.filename]
+
+    await firmware_catalog.add_image(firmware_image(version=1335))
+    await firmware_catalog.mark_uploaded(entry.sha256, when=1234.5)
+    listed = await firmware_catalog.list_firmware()
+    assert [e['version'] for e in listed] == [1335, 1333]
+    assert listed[1]['last_uploaded'] == 1234.5
+    assert listed[1]['crc_matches'] is True
+
+
+@pytest.mark.asyncio
+async def test_not_firmware_not_added(db_path, tmp_path):
+    upload = write_image(tmp_path, b'x' * 100)
+    with pytest.raises(DE1ValueError):
+        await firmware_catalog.add_image(upload)
+    assert not os.path.exists(upload.path)
+    assert os.listdir(config.de1.FIRMWARE_DIRECTORY) == []
+    assert await firmware_catalog.list_firmware() == []
+
+
+@pytest.mark.asyncio
+async def test_installed_version_refused(db_path, tmp_path):
+    uploaded = []
+
+    async def upload_firmware(fw):
+        uploaded.append(fw.version)
+        fw.close()
+        return asyncio.create_task(asyncio.sleep(0, result=True))
+
+    de1 = SimpleNamespace(feature_flag=SimpleNamespace(fw_version=1333),
+                          upload_firmware=upload_firmware)
+    with pytest.raises(DE1APIValueError):
+        await DE1.upload_firmware_from_content(
+            de1, write_image(tmp_path, firmware_image(version=1333)))
+    assert uploaded == []
+    # Still in the catalog
+    assert len(await firmware_catalog.list_firmware()) == 1
+
+    await DE1.upload_firmware_from_content(
+        de1, write_image(tmp_path, firmware_image(version=1335)))
+    assert uploaded == [1335]
+    await asyncio.sleep(0.1)
+    listed = await firmware_catalog.list_firmware()
+    assert listed[0]['version'] == 1335
+    assert listed[0]['last_uploaded'] is not None
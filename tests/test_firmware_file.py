@@ -0,0 +1,105 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import binascii
+import hashlib
+import os
+import struct
+import tracemalloc
+
+import pytest
+
+from pyDE1.config import config
+from pyDE1.de1.firmware_file import BOARD_MARKER, FirmwareFile
+from pyDE1.dispatcher.payloads import UploadedFile
+from pyDE1.exceptions import DE1APIValueError, DE1ValueError
+
+
+def firmware_image(version=1333, body_length=512 * 1024, good_crc=True):
+    body = bytes(i % 251 for i in range(body_length))
+    body_crc = binascii.crc32(body) if good_crc else 0
+    head = struct.pack('IIIIIII32s', body_crc, BOARD_MARKER, version,
+                       body_length, body_length // 2, 0, 0, bytes(32))
+    return head + struct.pack('I', binascii.crc32(head)) + body
+
+
+def write_image(tmp_path, image) -> UploadedFile:
+    path = str(tmp_path / 'upload-firmware')
+    with open(path, 'wb') as fh:
+        fh.write(image)
+    return UploadedFile(path=path, size=len(image),
+                        sha256=hashlib.sha256(image).hexdigest())
+
+
+def test_from_file_in_place(tmp_path):
+    image = firmware_image()
+    upload = write_image(tmp_path, image)
+
+    tracemalloc.start()
+    fw = FirmwareFile(filename=upload.path, sha256=upload.sha256,
+                      delete=True)
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Not a copy of the image
+    assert peak < len(image) // 10
+
+    assert fw.version == 1333
+    assert fw.crc_matches
+    assert len(fw.content) == len(image)
+    assert fw.content[100:116] == image[100:116]
+    fw.close()
+    assert not os.path.exists(upload.path)
+
+
+def test_from_content():
+    fw = FirmwareFile(content=firmware_image(version=1260))
+    assert fw.version == 1260
+    assert fw.crc_matches
+    fw.close()
+
+
+def test_sha256_mismatch_removes(tmp_path):
+    upload = write_image(tmp_path, firmware_image())
+    with pytest.raises(DE1APIValueError):
+        FirmwareFile(filename=upload.path, sha256='0' * 64, delete=True)
+    assert not os.path.exists(upload.path)
+
+
+def test_not_firmware(tmp_path):
+    with pytest.raises(DE1ValueError):
+        FirmwareFile(content=b'{"not": "firmware"}')
+    image = bytearray(firmware_image())
+    image[4] = 0
+    with pytest.raises(DE1ValueError):
+        FirmwareFile(content=bytes(image))
+    # Truncated
+    with pytest.raises(DE1ValueError):
+        FirmwareFile(content=firmware_image()[:-100])
+    upload = write_image(tmp_path, b'')
+    with pytest.raises(DE1ValueError):
+        FirmwareFile(filename=upload.path)
+
+
+def test_crc_mismatch(monkeypatch):
+    image = firmware_image(good_crc=False)
+    fw = FirmwareFile(content=image)
+    assert not fw.crc_matches
+    monkeypatch.setattr(config.de1, 'FIRMWARE_REQUIRE_CRC', True)
+    with pytest.raises(DE1ValueError):
+        FirmwareFile(content=image)
+
+
+def test_uploaded_file_read(tmp_path):
+    upload = write_image(tmp_path, b'[]')
+    assert upload.read() == b'[]'
+    assert not os.path.exists(upload.path)
+
+    upload = write_image(tmp_path, b'[]')._replace(sha256='0' * 64)
+    with pytest.raises(DE1APIValueError):
+        upload.read()
+    assert not os.path.exists(upload.path)
@@ -0,0 +1,100 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+
+import pytest
+
+from pyDE1.bledev.init_pipeline import InitPipeline
+
+
+def make_step(log: list, name: str, duration: float, retval=None):
+    async def step():
+        log.append(('start', name))
+        await asyncio.sleep(duration)
+        log.append(('end', name))
+        return retval
+    return step
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_overlap():
+    log = []
+    pipeline = InitPipeline()
+    pipeline.add('a', make_step(log, 'a', 0.05))
+    pipeline.add('b', make_step(log, 'b', 0.05))
+    pipeline.add('c', make_step(log, 'c', 0.01), after=('a', 'b'))
+    await pipeline.run()
+
+    assert log[:2] == [('start', 'a'), ('start', 'b')]
+    assert log[-2:] == [('start', 'c'), ('end', 'c')]
+    # Run one after another would be 0.11
+    assert pipeline.elapsed < 0.09
+    assert {st.name for st in pipeline.timeline} == {'a', 'b', 'c'}
+
+
+@pytest.mark.asyncio
+async def test_gatt_writes_serialized_in_order_added():
+    log = []
+    pipeline = InitPipeline()
+    pipeline.add('notify', make_step(log, 'notify', 0.01))
+    pipeline.add('write_1', make_step(log, 'write_1', 0.02),
+                 after=('notify',), gatt_write=True)
+    pipeline.add('write_2', make_step(log, 'write_2', 0.02),
+                 after=('notify',), gatt_write=True)
+    pipeline.add('wait', make_step(log, 'wait', 0.03), after=('notify',))
+    await pipeline.run()
+
+    writes = [entry for entry in log if entry[1].startswith('write')]
+    assert writes == [('start', 'write_1'), ('end', 'write_1'),
+                      ('start', 'write_2'), ('end', 'write_2')]
+    # The non-write step didn't wait for the lock
+    assert log.index(('start', 'wait')) < log.index(('end', 'write_1'))
+
+    timing = {st.name: st for st in pipeline.timeline}
+    assert timing['write_2'].start - timing['write_2'].ready >= 0.01
+
+
+@pytest.mark.asyncio
+async def test_results_available_to_later_steps():
+    pipeline = InitPipeline()
+    pipeline.add('read', make_step([], 'read', 0, retval=(1, 2)))
+    pipeline.add('use',
+                 lambda: make_step([], 'use', 0,
+                                   retval=sum(pipeline.result('read')))(),
+                 after=('read',))
+    results = await pipeline.run()
+    assert results == {'read': (1, 2), 'use': 3}
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_remaining_steps():
+    log = []
+
+    async def fails():
+        raise RuntimeError('no response')
+
+    pipeline = InitPipeline()
+    pipeline.add('slow', make_step(log, 'slow', 1.0))
+    pipeline.add('fails', fails)
+    pipeline.add('after_fails', make_step(log, 'after_fails', 0),
+                 after=('fails',))
+    with pytest.raises(RuntimeError):
+        await pipeline.run()
+    await asyncio.sleep(0)
+    assert ('end', 'slow') not in log
+    assert ('start', 'after_fails') not in log
+
+
+def test_steps_must_follow_known_steps():
+    pipeline = InitPipeline()
+    pipeline.add('a', make_step([], 'a', 0))
+    with pytest.raises(ValueError):
+        pipeline.add('b', make_step([], 'b', 0), after=('c',))
+    with pytest.raises(ValueError):
+        pipeline.add('a', make_step([], 'a', 0))
@@ -6,12 +6,102 @@ GNU General Public License v3.0 only
 SPDX-License-Identifier: GPL-3.0-only
 """
 
+import json
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
 from pyDE1.services.runnable.legacy_to_json import (
     braced_string,
     valid_key, valid_simple_value, shot_frame, shot_frame_list,
+    FastPathUnsupported, MANIFEST_FILENAME,
+    convert_bulk, parse_profile_text_fast, parse_profile_text_pyparsing,
+    parsed_dict_to_dict_v2,
 )
 
 
+BRACED_STRING_DATA = """
+    {}
+    {one}
+    {two words}
+    { one }
+    { two words }
+    """
+
+SIMPLE_VALUE_DATA = """
+    word
+    {}
+    {one}
+    {two words}
+    {Extractamundo Tres!}
+    0
+    -1
+    1.2
+    {0}
+    {1.2}
+    { 1.2 }
+    {-3}
+    { -4.5}
+    """
+
+SHOT_FRAME_DATA = [
+    "{simple frame number 1}",
+    "{simple frame number 2}",
+
+    "{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
+    "transition fast exit_flow_under 0 temperature 85.5 name {temp comp} "
+    "pressure 8.0 sensor coffee pump pressure exit_type pressure_over "
+    "exit_flow_over 6 exit_pressure_over 5.00 max_flow_or_pressure 0 "
+    "exit_pressure_under 0 seconds 2.00}",
+
+    "{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
+    "transition fast exit_flow_under 0 temperature 80.5 weight 10.00 name "
+    "preinfusion pressure 8.0 pump pressure sensor coffee exit_type "
+    "pressure_over exit_flow_over 6 exit_pressure_over 5.00 "
+    "max_flow_or_pressure 0 exit_pressure_under 0 seconds 20.00}",
+]
+
+SHOT_FRAME_LIST_DATA = [
+    "{{simple frame number 1}}",
+    "{{simple frame number 1}{simple frame number 2}}",
+    "{{simple frame number 1} {simple frame number 2}}",
+
+    " {{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
+    "transition fast exit_flow_under 0 temperature 85.5 name {temp comp} "
+    "pressure 8.0 sensor coffee pump pressure exit_type pressure_over "
+    "exit_flow_over 6 exit_pressure_over 5.00 max_flow_or_pressure 0 "
+    "exit_pressure_under 0 seconds 2.00} {exit_if 1 flow 8.0 volume 100 "
+    "max_flow_or_pressure_range 3.0 transition fast exit_flow_under 0 "
+    "temperature 80.5 weight 10.00 name preinfusion pressure 8.0 pump "
+    "pressure sensor coffee exit_type pressure_over exit_flow_over 6 "
+    "exit_pressure_over 5.00 max_flow_or_pressure 0 exit_pressure_under "
+    "0 seconds 20.00} {exit_if 1 flow 0 volume 100 "
+    "max_flow_or_pressure_range 5.0 transition fast exit_flow_under 0 "
+    "temperature 60.5 name {dynamic bloom} pressure 6.0 sensor coffee pump "
+    "flow exit_type pressure_under exit_flow_over 6 max_flow_or_pressure 0 "
+    "exit_pressure_over 11 exit_pressure_under 2.20 seconds 40.00} "
+    "{exit_if 0 flow 6.0 volume 100 max_flow_or_pressure_range 5.0 "
+    "transition fast exit_flow_under 0 temperature 60.5 name {6 mlps} "
+    "pressure 6.0000000000000036 sensor coffee pump flow exit_type "
+    "flow_under exit_flow_over 6 max_flow_or_pressure 2.0 "
+    "exit_pressure_over 11 exit_pressure_under 0 seconds 60.00}}",
+]
+
+SHOT_FRAME_LIST_DATA_FAIL = [
+    "{}",
+    "{{}}",
+
+    "{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
+    "transition fast exit_flow_under 0 temperature 85.5 name {temp comp} "
+    "pressure 8.0 sensor coffee pump pressure exit_type pressure_over "
+    "exit_flow_over 6 exit_pressure_over 5.00 max_flow_or_pressure 0 "
+    "exit_pressure_under 0 seconds 2.00}",
+]
+
+
 def show_test_result(result):
     if result[0]:
         print("\n-------\nPASSED\n-------\n")
@@ -22,13 +112,7 @@ def show_test_result(result):
 
 def test_braced_string():
     result = braced_string.run_tests(
-        tests="""
-        {}
-        {one}
-        {two words}
-        { one }
-        { two words }
-        """
+        tests=BRACED_STRING_DATA
     )
     show_test_result(result)
 
@@ -68,21 +152,7 @@ def test_valid_key():
 
 def test_valid_simple_value():
     result = valid_simple_value.run_tests(
-        tests="""
-        word
-        {}
-        {one}
-        {two words}
-        {Extractamundo Tres!}
-        0
-        -1
-        1.2
-        {0}
-        {1.2}
-        { 1.2 }
-        {-3}
-        { -4.5}
-        """
+        tests=SIMPLE_VALUE_DATA
     )
     show_test_result(result)
 
@@ -98,22 +168,7 @@ def test_valid_simple_value():
 
 
 def test_valid_shot_frame():
-    test_data = [
-        "{simple frame number 1}",
-        "{simple frame number 2}",
-
-        "{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
-        "transition fast exit_flow_under 0 temperature 85.5 name {temp comp} "
-        "pressure 8.0 sensor coffee pump pressure exit_type pressure_over "
-        "exit_flow_over 6 exit_pressure_over 5.00 max_flow_or_pressure 0 "
-        "exit_pressure_under 0 seconds 2.00}",
-
-        "{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
-        "transition fast exit_flow_under 0 temperature 80.5 weight 10.00 name "
-        "preinfusion pressure 8.0 pump pressure sensor coffee exit_type "
-        "pressure_over exit_flow_over 6 exit_pressure_over 5.00 "
-        "max_flow_or_pressure 0 exit_pressure_under 0 seconds 20.00}",
-    ]
+    test_data = SHOT_FRAME_DATA
     result = shot_frame.run_tests(
         full_dump=False,
         tests=test_data,
@@ -132,41 +187,8 @@ def test_valid_shot_frame():
 
 
 def test_valid_shot_frame_list():
-    test_data = [
-        "{{simple frame number 1}}",
-        "{{simple frame number 1}{simple frame number 2}}",
-        "{{simple frame number 1} {simple frame number 2}}",
-
-        " {{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
-        "transition fast exit_flow_under 0 temperature 85.5 name {temp comp} "
-        "pressure 8.0 sensor coffee pump pressure exit_type pressure_over "
-        "exit_flow_over 6 exit_pressure_over 5.00 max_flow_or_pressure 0 "
-        "exit_pressure_under 0 seconds 2.00} {exit_if 1 flow 8.0 volume 100 "
-        "max_flow_or_pressure_range 3.0 transition fast exit_flow_under 0 "
-        "temperature 80.5 weight 10.00 name preinfusion pressure 8.0 pump "
-        "pressure sensor coffee exit_type pressure_over exit_flow_over 6 "
-        "exit_pressure_over 5.00 max_flow_or_pressure 0 exit_pressure_under "
-        "0 seconds 20.00} {exit_if 1 flow 0 volume 100 "
-        "max_flow_or_pressure_range 5.0 transition fast exit_flow_under 0 "
-        "temperature 60.5 name {dynamic bloom} pressure 6.0 sensor coffee pump "
-        "flow exit_type pressure_under exit_flow_over 6 max_flow_or_pressure 0 "
-        "exit_pressure_over 11 exit_pressure_under 2.20 seconds 40.00} "
-        "{exit_if 0 flow 6.0 volume 100 max_flow_or_pressure_range 5.0 "
-        "transition fast exit_flow_under 0 temperature 60.5 name {6 mlps} "
-        "pressure 6.0000000000000036 sensor coffee pump flow exit_type "
-        "flow_under exit_flow_over 6 max_flow_or_pressure 2.0 "
-        "exit_pressure_over 11 exit_pressure_under 0 seconds 60.00}}",
-    ]
-    test_data_fail = [
-        "{}",
-        "{{}}",
-
-        "{exit_if 1 flow 8.0 volume 100 max_flow_or_pressure_range 3.0 "
-        "transition fast exit_flow_under 0 temperature 85.5 name {temp comp} "
-        "pressure 8.0 sensor coffee pump pressure exit_type pressure_over "
-        "exit_flow_over 6 exit_pressure_over 5.00 max_flow_or_pressure 0 "
-        "exit_pressure_under 0 seconds 2.00}",
-    ]
+    test_data = SHOT_FRAME_LIST_DATA
+    test_data_fail = SHOT_FRAME_LIST_DATA_FAIL
     result = shot_frame_list.run_tests(
         # full_dump=False,
         tests=test_data,
@@ -181,4 +203,150 @@ def test_valid_shot_frame_list():
     show_test_result(result)
 
 
+#
+# The fast path has to give the same results as the grammar
+#
+
+ADVANCED_PROFILE = (
+    "advanced_shot " + SHOT_FRAME_LIST_DATA[-1].strip() + "\n"
+    "author Decent\n"
+    "beverage_type espresso\n"
+    "espresso_temperature_0 88.0\n"
+    "final_desired_shot_volume_advanced 0\n"
+    "final_desired_shot_volume_advanced_count_start 2\n"
+    "final_desired_shot_weight_advanced 36\n"
+    "profile_language en\n"
+    "profile_notes {A two-line note.\nSecond line, with \"quotes\".}\n"
+    "profile_title {Extractamundo Tres!}\n"
+    "settings_profile_type settings_2c\n"
+    "tank_desired_water_temperature 0\n"
+)
+
+
+def as_json_both_ways(text: str):
+    # JSON to distinguish 2 from 2.0
+    return (json.dumps(parse_profile_text_fast(text)),
+            json.dumps(parse_profile_text_pyparsing(text)))
+
+
+def simple_values(data: str):
+    return [line.strip() for line in data.splitlines() if line.strip()]
+
+
+@pytest.mark.parametrize('value', simple_values(BRACED_STRING_DATA)
+                         + simple_values(SIMPLE_VALUE_DATA))
+def test_fast_path_simple_values(value):
+    fast, reference = as_json_both_ways(f"key {value} other 1")
+    assert fast == reference
+    fast, reference = as_json_both_ways(f"key {{{{frame {value}}}}}")
+    assert fast == reference
+
+
+@pytest.mark.parametrize('frame', SHOT_FRAME_DATA)
+def test_fast_path_shot_frame(frame):
+    fast, reference = as_json_both_ways(f"advanced_shot {{{frame}}}")
+    assert fast == reference
+
+
+@pytest.mark.parametrize('frame_list', SHOT_FRAME_LIST_DATA)
+def test_fast_path_shot_frame_list(frame_list):
+    fast, reference = as_json_both_ways(f"advanced_shot {frame_list}")
+    assert fast == reference
+
+
+@pytest.mark.parametrize('frame_list', SHOT_FRAME_LIST_DATA_FAIL[1:])
+def test_fast_path_declines(frame_list):
+    # The grammar would only take the text before the failure
+    with pytest.raises(FastPathUnsupported):
+        parse_profile_text_fast(f"key 1 advanced_shot {frame_list} other 2")
+
+
+@pytest.mark.parametrize('text', [
+    "key 8x",                   # number then a key
+    "key max-flow",             # fine as a value
+    "max-flow 1",               # identifier then a value
+    "key {caf\u00e9}",           # not in printables
+    "key {word {nested} word}",
+    "key",
+    "",
+])
+def test_fast_path_unsupported_is_not_guessed(text):
+    try:
+        fast = json.dumps(parse_profile_text_fast(text))
+    except FastPathUnsupported:
+        return
+    assert fast == json.dumps(parse_profile_text_pyparsing(text))
+
+
+def test_fast_path_full_profile():
+    fast = parsed_dict_to_dict_v2(parse_profile_text_fast(ADVANCED_PROFILE))
+    reference = parsed_dict_to_dict_v2(
+        parse_profile_text_pyparsing(ADVANCED_PROFILE))
+    assert json.dumps(fast) == json.dumps(reference)
+    assert len(fast['steps']) == 4
+
+
+def test_bulk_skips_unchanged(tmp_path):
+    src = tmp_path / 'src'
+    out = tmp_path / 'out'
+    (src / 'more').mkdir(parents=True)
+    (src / 'one.tcl').write_text(ADVANCED_PROFILE)
+    (src / 'more' / 'two.tcl').write_text(
+        ADVANCED_PROFILE.replace('Tres!', 'Cuatro!'))
+    (src / 'bad.tcl').write_text("{not a profile}")
+
+    stats = convert_bulk(str(src), str(out), jobs=1)
+    assert stats['fast'] == 2
+    assert stats['failed'] == 1
+    assert json.loads((out / 'more' / 'two.json').read_text())['title'] \
+           == 'Extractamundo Cuatro!'
+    assert (out / MANIFEST_FILENAME).exists()
+
+    (src / 'one.tcl').write_text(ADVANCED_PROFILE.replace('36', '40'))
+    stats = convert_bulk(str(src), str(out), jobs=1)
+    assert stats['unchanged'] == 1
+    assert stats['fast'] == 1
+    assert json.loads((out / 'one.json').read_text())['target_weight'] == 40
+
+
+def test_bulk_from_zip(tmp_path):
+    archive = tmp_path / 'profiles.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for i in range(12):
+            zf.writestr(f"profiles/p{i}.tcl", ADVANCED_PROFILE.replace(
+                'Tres!', f"{i}"))
+        zf.writestr("profiles/readme.txt", "not a profile")
+    stats = convert_bulk(str(archive), str(tmp_path / 'out'), jobs=2)
+    assert stats['files'] == 12
+    assert stats['fast'] == 12
+    assert sorted(os.listdir(tmp_path / 'out' / 'profiles'))[0] == 'p0.json'
+
+
+def test_bulk_member_outside_out_dir(tmp_path):
+    out = tmp_path / 'a' / 'out'
+    archive = tmp_path / 'profiles.tar'
+    with tarfile.open(archive, 'w') as tf:
+        for name in ('../../escaped.tcl', '/tmp/absolute.tcl',
+                     'profiles/../../escaped.tcl', 'profiles/ok.tcl'):
+            data = ADVANCED_PROFILE.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    stats = convert_bulk(str(archive), str(out), jobs=1)
+    assert stats['files'] == 4
+    assert stats['failed'] == 3
+    assert stats['fast'] == 1
+    assert (out / 'profiles' / 'ok.json').exists()
+    assert not (tmp_path / 'escaped.json').exists()
+    assert not (tmp_path / 'a' / 'escaped.json').exists()
+    assert not os.path.exists('/tmp/absolute.json')
 
+    # Nor through a link out of it
+    (tmp_path / 'elsewhere').mkdir()
+    (out / 'linked').symlink_to(tmp_path / 'elsewhere')
+    zip_archive = tmp_path / 'linked.zip'
+    with zipfile.ZipFile(zip_archive, 'w') as zf:
+        zf.writestr('linked/p.tcl', ADVANCED_PROFILE)
+    stats = convert_bulk(str(zip_archive), str(out), jobs=1)
+    assert stats['failed'] == 1
+    assert not os.listdir(tmp_path / 'elsewhere')
@@ -0,0 +1,115 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import gzip
+import logging
+import os
+import sqlite3
+
+import pytest
+
+import pyDE1.log_archive as log_archive
+from pyDE1.api.inbound.http.run import request_parameters
+from pyDE1.dispatcher.resource import Resource
+from pyDE1.exceptions import DE1DBNoMatchingRecord
+from pyDE1.log_archive import ArchivingFileHandler
+
+
+def write_records(handler: ArchivingFileHandler, start: float, n: int,
+                  step: float = 1.0):
+    handler.setFormatter(logging.Formatter('%(created).1f %(message)s'))
+    for i in range(n):
+        record = logging.LogRecord('pyDE1.Test', logging.INFO, __file__, 0,
+                                   'line %d', (i,), None)
+        record.created = start + i * step
+        handler.handle(record)
+
+
+def test_window_from_index(tmp_path):
+    path = str(tmp_path / 'pyde1.log')
+    handler = ArchivingFileHandler(path, index_seconds=10)
+    write_records(handler, 1000, 100)
+    handler.close()
+
+    index = log_archive.read_index(path)
+    assert [t for (t, offset) in index.times] == \
+           [1000 + 10 * i for i in range(10)]
+
+    lines = log_archive.read_window(path, 1042, 1055).splitlines()
+    # To within the index interval
+    assert lines[0] == b'1040.0 line 40'
+    assert lines[-1] == b'1059.0 line 59'
+    assert log_archive.index_time_range(path) == (1000, 1090)
+    assert log_archive.read_tail(path, 2) == \
+           b'1098.0 line 98\n1099.0 line 99\n'
+
+
+def test_rotate_compress_and_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_archive, 'MEMBER_BYTES', 4096)
+    path = str(tmp_path / 'pyde1.log')
+    handler = ArchivingFileHandler(path, rotate_bytes=20_000,
+                                   keep=2, index_seconds=10)
+    write_records(handler, 1000, 3000)
+    # Wait for the background compression
+    handler._compressing.join()
+    handler.close()
+
+    archives = handler.archives()
+    assert len(archives) == 2
+    assert all(a.endswith('.gz') for a in archives)
+    assert not any(name.endswith('.tmp') for name in os.listdir(tmp_path))
+
+    archive = archives[-1]
+    index = log_archive.read_index(archive)
+    assert len(index.members) > 1
+    (first, last) = log_archive.index_time_range(archive)
+    whole = gzip.open(archive).read()
+
+    # Starting from a member part way through
+    start = first + (last - first) * 3 // 4
+    window = log_archive.read_window(archive, start, start + 5)
+    assert window in whole
+    times = [float(line.split()[0]) for line in window.splitlines()]
+    assert start - 10 < times[0] <= start
+    assert start + 5 <= times[-1] < start + 15
+    assert log_archive.read_tail(archive, 3) == \
+           b''.join(whole.splitlines(keepends=True)[-3:])
+
+    # The current file is indexed from its start
+    assert log_archive.read_index(path).times[0][1] == 0
+
+
+def test_sequence_window(tmp_path):
+    db_path = str(tmp_path / 'pyde1.sqlite3')
+    with sqlite3.connect(db_path) as db:
+        db.execute('CREATE TABLE sequence '
+                   '(id TEXT, start_sequence REAL, end_sequence REAL)')
+        db.execute("INSERT INTO sequence VALUES ('abc', 1000.5, 1042.0)")
+    assert log_archive.sequence_window(db_path, 'abc') == (1000.5, 1042.0)
+    with pytest.raises(DE1DBNoMatchingRecord):
+        log_archive.sequence_window(db_path, 'nope')
+
+
+def test_log_path(tmp_path):
+    log_dir = str(tmp_path / 'log')
+    os.makedirs(log_dir)
+    allowed = Resource.LOG.query_parameters
+    for query in ('id=../../../etc/passwd', 'id=/etc/passwd',
+                  'tail=10&id=/etc/passwd'):
+        parameters = request_parameters({'id': 'pyde1.log'}, query, allowed)
+        assert parameters['id'] == 'pyde1.log'
+    assert request_parameters({'id': 'pyde1.log'}, 'tail=10&other=1',
+                              allowed) == {'id': 'pyde1.log', 'tail': '10'}
+
+    assert log_archive.log_path(log_dir, 'pyde1.log') \
+           == os.path.join(log_dir, 'pyde1.log')
+    os.symlink('/etc/passwd', os.path.join(log_dir, 'linked.log'))
+    for name in ('../../../etc/passwd', '/etc/passwd', '..', '.',
+                 'linked.log'):
+        with pytest.raises(FileNotFoundError):
+            log_archive.log_path(log_dir, name)
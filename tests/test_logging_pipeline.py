@@ -0,0 +1,87 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import logging
+import pickle
+import queue
+
+import pyDE1
+from pyDE1.pyde1_logging import (
+    CompactQueueHandler, CompactQueueListener, Formatter, RateLimitFilter
+)
+
+
+class ListHandler (logging.Handler):
+
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_compact_record_formats_the_same():
+    q = queue.SimpleQueue()
+    handler = CompactQueueHandler(q)
+    logger = pyDE1.getLogger('Test.Compact')
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        logger.info("%s of %d", 'one', 2)
+        try:
+            raise ValueError('oops')
+        except ValueError:
+            logger.exception('Caught')
+    finally:
+        logger.removeHandler(handler)
+
+    received = ListHandler()
+    listener = CompactQueueListener(q, received)
+    sent = []
+    while not q.empty():
+        item = q.get()
+        assert isinstance(item, tuple)
+        sent.append(pickle.loads(pickle.dumps(item)))
+    for item in sent:
+        received.handle(listener.prepare(item))
+
+    formatter = Formatter('%(levelname)s [%(processName)s] %(name)s: '
+                          '%(message)s')
+    (info, error) = [formatter.format(r) for r in received.records]
+    assert info == 'INFO [MainProcess] Test.Compact: one of 2'
+    assert error.startswith('ERROR [MainProcess] Test.Compact: Caught\n')
+    assert 'ValueError: oops' in error
+
+
+def test_rate_limit_by_pattern(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('pyDE1.pyde1_logging.time.monotonic',
+                        lambda: now[0])
+    rate_filter = RateLimitFilter({'DE1.*.Notify': 2})
+
+    def record(name, level=logging.DEBUG):
+        return logging.LogRecord(f"pyDE1.{name}", level, __file__, 0,
+                                 'sample %d', (1,), None)
+
+    passed = [rate_filter.filter(record('DE1.ShotSample.Notify'))
+              for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    # Others aren't limited, nor are warnings
+    assert all(rate_filter.filter(record('DE1.Controller'))
+               for _ in range(5))
+    assert rate_filter.filter(
+        record('DE1.ShotSample.Notify', logging.WARNING))
+    # Each logger has its own limit
+    assert rate_filter.filter(record('DE1.StateInfo.Notify'))
+
+    now[0] += 0.5
+    r = record('DE1.ShotSample.Notify')
+    assert rate_filter.filter(r)
+    assert r.getMessage() == 'sample 1 (3 suppressed)'
+    assert not rate_filter.filter(record('DE1.ShotSample.Notify'))
@@ -0,0 +1,167 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from pyDE1.de1.c_api import MMR0x80LowAddr
+from pyDE1.de1.mmr_cache import MMRCache
+from pyDE1.de1.notifications import MMR0x80Data
+
+
+class FakeDE1:
+    """
+    Answers read_mmr() immediately, recording the block reads
+    """
+
+    def __init__(self, safe_to_read_mmr_continuous=True):
+        self._mmr_dict = {}
+        self.feature_flag = SimpleNamespace(
+            safe_to_read_mmr_continuous=safe_to_read_mmr_continuous)
+        self.block_reads = []
+
+    async def read_mmr(self, length, addr_high, addr_low):
+        self.block_reads.append((addr_low, length + 1))
+        for addr in range(addr_low, addr_low + (length + 1) * 4, 4):
+            mmr_data = self._mmr_dict.setdefault(addr, MMR0x80Data(addr))
+            mmr_data.mark_requested()
+            mmr_data.data_raw = b'\x01\x00\x00\x00'
+            mmr_data.mark_updated(mmr_data.data_raw)
+        return []
+
+
+def test_spans_merge_small_gaps():
+    cache = MMRCache(FakeDE1())
+    addrs = [MMR0x80LowAddr.FAN_THRESHOLD,
+             MMR0x80LowAddr.TANK_TEMP,
+             # Gap of two readable words
+             MMR0x80LowAddr.WATER_HEATER_IDLE_TEMP,
+             MMR0x80LowAddr.CAL_FLOW_EST]
+    assert cache.spans(addrs) == [
+        (MMR0x80LowAddr.FAN_THRESHOLD, 5),
+        (MMR0x80LowAddr.CAL_FLOW_EST, 1),
+    ]
+
+
+def test_spans_avoid_unsafe_registers():
+    addrs = list(range(MMR0x80LowAddr.FAN_THRESHOLD,
+                       MMR0x80LowAddr.GHC_INFO + 4, 4))
+    addrs += list(range(MMR0x80LowAddr.TARGET_STEAM_FLOW,
+                        MMR0x80LowAddr.LAST_KNOWN + 4, 4))
+
+    unsafe = MMRCache(FakeDE1(safe_to_read_mmr_continuous=False))
+    assert [s[0] for s in unsafe.spans(addrs)] == [
+        MMR0x80LowAddr.FAN_THRESHOLD, MMR0x80LowAddr.TARGET_STEAM_FLOW]
+
+    safe = MMRCache(FakeDE1(safe_to_read_mmr_continuous=True))
+    assert len(safe.spans(addrs)) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_coalesce():
+    de1 = FakeDE1()
+    cache = MMRCache(de1)
+    await asyncio.gather(
+        cache.request_and_wait((MMR0x80LowAddr.FAN_THRESHOLD,)),
+        cache.request_and_wait((MMR0x80LowAddr.TANK_TEMP,)),
+        cache.request_and_wait((MMR0x80LowAddr.HEATER_UP1_FLOW,)),
+    )
+    assert de1.block_reads == [(MMR0x80LowAddr.FAN_THRESHOLD, 3)]
+
+    # Writable settings are kept current by read-back, so are fresh
+    await cache.request_and_wait((MMR0x80LowAddr.TANK_TEMP,))
+    assert len(de1.block_reads) == 1
+    assert cache.hits == 1
+    assert cache.ble_reads_avoided == 3
+
+
+@pytest.mark.asyncio
+async def test_read_always_is_never_fresh():
+    de1 = FakeDE1()
+    cache = MMRCache(de1)
+    await cache.request_and_wait((MMR0x80LowAddr.USER_PRESENT,))
+    await cache.request_and_wait((MMR0x80LowAddr.USER_PRESENT,))
+    assert len(de1.block_reads) == 2
+
+
+@pytest.mark.asyncio
+async def test_hardware_registers_retained_by_address():
+    de1 = FakeDE1()
+    cache = MMRCache(de1)
+    await cache.request_and_wait((MMR0x80LowAddr.MODEL,
+                                  MMR0x80LowAddr.CPU_FIRMWARE_BUILD))
+    cache.retain('D9:B2:48:00:00:01')
+    de1._mmr_dict = {}
+
+    assert cache.restore('D9:B2:48:00:00:02') == 0
+    cache.retain('D9:B2:48:00:00:01')   # Nothing to retain, no change
+    de1._mmr_dict = {}
+
+    await cache.request_and_wait((MMR0x80LowAddr.MODEL,))
+    cache.retain('D9:B2:48:00:00:01')
+    de1._mmr_dict = {}
+    assert cache.restore('D9:B2:48:00:00:01') == 1
+    assert cache.is_fresh(MMR0x80LowAddr.MODEL)
+    # Firmware may have been changed by another app while disconnected
+    assert not cache.is_fresh(MMR0x80LowAddr.CPU_FIRMWARE_BUILD)
+
+
+@pytest.mark.asyncio
+async def test_nothing_retained_across_firmware_upload():
+    address = 'D9:B2:48:00:00:01'
+    de1 = FakeDE1()
+    cache = MMRCache(de1)
+    await cache.request_and_wait((MMR0x80LowAddr.MODEL,))
+    cache.retain(address)
+    de1._mmr_dict = {}
+    assert cache.restore(address) == 1
+
+    # The upload, then the disconnect that follows it
+    cache.forget()
+    cache.retain(address)
+    de1._mmr_dict = {}
+
+    # Reconnect, read from the DE1 again
+    assert cache.restore(address) == 0
+    assert not cache.is_fresh(MMR0x80LowAddr.MODEL)
+    await cache.request_and_wait((MMR0x80LowAddr.MODEL,))
+    assert len(de1.block_reads) == 2
+
+    # Only the one after the upload is skipped
+    cache.retain(address)
+    de1._mmr_dict = {}
+    assert cache.restore(address) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_read_releases_waiters():
+    de1 = FakeDE1()
+    answer = de1.read_mmr
+
+    async def disconnected(length, addr_high, addr_low):
+        de1.block_reads.append((addr_low, length + 1))
+        await asyncio.sleep(0)
+        raise ConnectionError('Disconnected')
+
+    de1.read_mmr = disconnected
+    cache = MMRCache(de1)
+    results = await asyncio.wait_for(asyncio.gather(
+        cache.request_and_wait((MMR0x80LowAddr.FAN_THRESHOLD,)),
+        cache.request_and_wait((MMR0x80LowAddr.TANK_TEMP,)),
+        return_exceptions=True), timeout=1)
+    assert [type(r) for r in results] == [ConnectionError] * 2
+    assert not cache.is_fresh(MMR0x80LowAddr.TANK_TEMP)
+
+    # Read again, not taken as in flight
+    de1.read_mmr = answer
+    await asyncio.wait_for(
+        cache.request_and_wait((MMR0x80LowAddr.TANK_TEMP,)), timeout=1)
+    assert de1.block_reads[-1] == (MMR0x80LowAddr.TANK_TEMP, 1)
+    assert cache.is_fresh(MMR0x80LowAddr.TANK_TEMP)
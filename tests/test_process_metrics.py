@@ -0,0 +1,109 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from pyDE1.process_metrics import (
+    MetricsCollector, ProcessMetrics, queue_depth
+)
+
+
+def test_queue_depth():
+    (read, write) = multiprocessing.Pipe(duplex=False)
+    assert queue_depth(write) == 0
+    write.send_bytes(b'x' * 100)
+    # Either end, including the length header
+    assert queue_depth(read) >= 100
+    assert queue_depth(write) == queue_depth(read)
+    read.close()
+    assert queue_depth(read) is None
+
+    aq = asyncio.Queue()
+    aq.put_nowait(1)
+    assert queue_depth(aq) == 1
+
+
+def test_sample():
+    loop = asyncio.new_event_loop()
+    try:
+        aq = asyncio.Queue()
+        metrics = ProcessMetrics(loop, queues={'aq': aq},
+                                 process_name='Test')
+        first = metrics.sample()
+        assert first['process'] == 'Test'
+        assert first['pid'] == os.getpid()
+        assert first['cpu_percent'] is None
+        assert first['threads'] >= 1
+        assert first['loop_lag'] is None
+        assert first['queues'] == {'aq': 0}
+        sum(range(100_000))
+        assert metrics.sample()['cpu_percent'] >= 0
+    finally:
+        loop.close()
+
+
+def test_sources():
+    loop = asyncio.new_event_loop()
+    try:
+        metrics = ProcessMetrics(loop, process_name='Test', sources={
+            'clock': lambda: {'latency': 0.01},
+            'broken': lambda: 1 / 0,
+        })
+        sample = metrics.sample()
+        assert sample['clock'] == {'latency': 0.01}
+        assert sample['broken'] is None
+    finally:
+        loop.close()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/stat'),
+                    reason='Reads /proc')
+def test_collector_snapshot():
+    collector = MetricsCollector()
+    worker = SimpleNamespace(
+        name='Worker', restarts=1,
+        process=SimpleNamespace(pid=os.getpid(), is_alive=lambda: True))
+    stopped = SimpleNamespace(
+        name='Stopped', restarts=0,
+        process=SimpleNamespace(pid=1, is_alive=lambda: False))
+    collector.watch((worker, stopped))
+    collector.start()
+    collector.queue.put({'process': 'Worker', 'pid': os.getpid(),
+                         'time': time.time(), 'rss': 0, 'tasks': 3})
+
+    loop = asyncio.new_event_loop()
+    (main, server) = multiprocessing.Pipe()
+    try:
+        collector.serve(loop, main)
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            server.send(time.time())
+            loop.run_until_complete(asyncio.sleep(0.01))
+            assert server.poll(1)
+            snapshot = server.recv()
+            if snapshot['processes']['Worker']['sampled'] is not None:
+                break
+    finally:
+        collector.stop()
+        loop.close()
+
+    processes = snapshot['processes']
+    assert processes['Worker']['tasks'] == 3
+    assert processes['Worker']['restarts'] == 1
+    assert processes['Worker']['alive']
+    # Updated from /proc
+    assert processes['Worker']['rss'] > 0
+    assert not processes['Stopped']['alive']
+    assert processes['Stopped']['pid'] is None
+    assert 'rss' not in processes['Stopped']
@@ -0,0 +1,172 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import sqlite3
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+import pyDE1.database.manage as manage
+from pyDE1.database.profile_library import (
+    import_profiles, list_profiles, match_expression, METADATA_COLUMNS
+)
+from pyDE1.de1.profile import Profile, SourceFormat
+
+
+def make_profile(n: int, fingerprint: str, title: str,
+                 author='Decent', notes=None) -> Profile:
+    profile = Profile()
+    profile.source = f'{{"version": "2", "n": {n}}}'.encode('utf-8')
+    profile._source_format = SourceFormat.JSONv2
+    profile._fingerprint = fingerprint
+    profile.title = title
+    profile.author = author
+    profile.notes = notes
+    profile.beverage_type = 'espresso'
+    return profile
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    path = str(tmp_path / 'pyde1.sqlite3')
+    schema_path = Path(manage.__file__).resolve().parent.joinpath(
+        manage.CURRENT_SCHEMA_RELPATH)
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(schema_path):
+            db.execute(sql)
+        db.commit()
+    return path
+
+
+@pytest.mark.asyncio
+async def test_import_skips_known_fingerprints(db_path):
+    async with aiosqlite.connect(db_path) as db:
+        first = [make_profile(1, 'fp-a', 'Blooming espresso'),
+                 make_profile(2, 'fp-b', 'Londinium')]
+        results = await import_profiles(first, db, 100.0)
+        assert [r['added'] for r in results] == [True, True]
+
+        again = [make_profile(3, 'fp-a', 'Blooming espresso, renamed'),
+                 make_profile(4, 'fp-c', 'Turbo shot'),
+                 make_profile(5, 'fp-c', 'Turbo shot, again')]
+        results = await import_profiles(again, db, 200.0)
+        assert [r['added'] for r in results] == [False, True, False]
+        # The id is of the profile stored for that fingerprint
+        assert results[0]['id'] == first[0].id
+        assert results[2]['id'] == again[1].id
+
+        listed = await list_profiles(db)
+    assert listed['total'] == 3
+
+
+@pytest.mark.asyncio
+async def test_import_is_one_transaction(db_path):
+    async with aiosqlite.connect(db_path) as db:
+        await import_profiles([make_profile(1, 'fp-a', 'First')], db, 100.0)
+        # Same source, so same id, but a different fingerprint
+        batch = [make_profile(2, 'fp-b', 'Second'),
+                 make_profile(1, 'fp-z', 'Conflicts')]
+        with pytest.raises(sqlite3.IntegrityError):
+            await import_profiles(batch, db, 200.0)
+        listed = await list_profiles(db)
+    assert [p['title'] for p in listed['profiles']] == ['First']
+
+
+@pytest.mark.asyncio
+async def test_list_pages_newest_first_without_source(db_path):
+    async with aiosqlite.connect(db_path) as db:
+        for n in range(7):
+            await import_profiles(
+                [make_profile(n, f'fp-{n}', f'Profile {n}')], db, float(n))
+        page = await list_profiles(db, limit=3, offset=3)
+    assert page['total'] == 7
+    assert [p['title'] for p in page['profiles']] \
+           == ['Profile 3', 'Profile 2', 'Profile 1']
+    assert tuple(page['profiles'][0].keys()) == METADATA_COLUMNS
+    assert 'source' not in METADATA_COLUMNS
+
+
+@pytest.mark.asyncio
+async def test_search_title_author_notes(db_path):
+    async with aiosqlite.connect(db_path) as db:
+        await import_profiles([
+            make_profile(1, 'fp-1', 'Blooming espresso', author='Décent'),
+            make_profile(2, 'fp-2', 'Londinium', author='Jeff',
+                         notes='Lever-style bloom'),
+            make_profile(3, 'fp-3', 'Turbo shot', author='Jeff'),
+        ], db, 100.0)
+
+        found = await list_profiles(db, q='bloom')
+        assert {p['id'] for p in found['profiles']} \
+               == {make_profile(1, '', '').id, make_profile(2, '', '').id}
+
+        found = await list_profiles(db, title='bloom')
+        assert [p['title'] for p in found['profiles']] \
+               == ['Blooming espresso']
+
+        # Diacritics are folded
+        found = await list_profiles(db, author='decent')
+        assert [p['title'] for p in found['profiles']] \
+               == ['Blooming espresso']
+
+        found = await list_profiles(db, author='jeff', fingerprint='fp-3')
+        assert [p['title'] for p in found['profiles']] == ['Turbo shot']
+
+        # FTS5 syntax is taken as words
+        found = await list_profiles(db, q='NEAR( "turbo')
+        assert found['total'] == 0
+
+
+def test_match_expression_quotes_words():
+    assert match_expression('lever "bloom') == '"lever"* """bloom"*'
+    assert match_expression('jeff', 'author') == 'author : ("jeff"*)'
+
+
+@pytest.mark.asyncio
+async def test_index_follows_profile_table(db_path):
+    # As another app would, without going through pyDE1
+    with sqlite3.connect(db_path) as db:
+        db.executemany(
+            "INSERT INTO profile (id, source, source_format, fingerprint, "
+            "date_added, title) VALUES (?, x'00', 'JSONv2', ?, ?, ?)",
+            [(f'id-{n}', f'fp-{n}', float(n), f'Profile {n}')
+             for n in range(5)])
+        db.execute("DELETE FROM profile WHERE id IN ('id-0', 'id-2')")
+        db.execute("UPDATE profile SET title = 'Renamed' WHERE id = 'id-3'")
+        db.commit()
+        # Renumbers the rowid of profile, as it has no INTEGER PRIMARY KEY
+        db.execute('VACUUM')
+
+    async with aiosqlite.connect(db_path) as db:
+        found = await list_profiles(db, q='profile')
+        assert sorted(p['id'] for p in found['profiles']) \
+               == ['id-1', 'id-4']
+        found = await list_profiles(db, title='renamed')
+        assert [p['id'] for p in found['profiles']] == ['id-3']
+
+
+def test_upgrade_reindexes_by_id(tmp_path):
+    path = str(tmp_path / 'pyde1.sqlite3')
+    schema_dir = Path(manage.__file__).resolve().parent
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(
+                schema_dir.joinpath('schema/schema.006.sql')):
+            db.execute(sql)
+        db.execute(
+            "INSERT INTO profile (id, source, source_format, fingerprint, "
+            "title) VALUES ('id-1', x'00', 'JSONv2', 'fp-1', 'Londinium')")
+        db.commit()
+        for sql in manage.sql_commands_from_file(
+                schema_dir.joinpath(manage.UPGRADE_FROM_RELPATH[6])):
+            db.execute(sql)
+        db.commit()
+        assert db.execute('PRAGMA user_version').fetchone()[0] == 7
+        assert db.execute(
+            "SELECT id FROM profile_fts WHERE profile_fts MATCH 'londinium'"
+        ).fetchall() == [('id-1',)]
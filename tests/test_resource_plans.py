@@ -0,0 +1,215 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import inspect
+import math
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+import pyDE1.dispatcher.implementation as implementation
+from pyDE1.config import config
+from pyDE1.de1.c_api import MMR0x80LowAddr, PackedAttr
+from pyDE1.de1.mmr_cache import MMRCache
+from pyDE1.de1.notifications import MMR0x80Data
+from pyDE1.dispatcher.implementation import (
+    get_resource_to_dict, patch_resource_from_dict
+)
+from pyDE1.dispatcher.mapping import MAPPING, TO, IsAt
+from pyDE1.dispatcher.plan import Accessor, Branch, plan_for
+from pyDE1.dispatcher.resource import ConnectivityEnum, Resource
+from pyDE1.dispatcher.validate import validate_patch_return_targets
+from pyDE1.exceptions import DE1APIAttributeError, DE1APITypeError
+
+
+def isats(mapping):
+    if isinstance(mapping, IsAt):
+        yield mapping
+    elif isinstance(mapping, dict):
+        for val in mapping.values():
+            yield from isats(val)
+
+
+def mapping_requires(mapping) -> dict:
+    """
+    As walking the mapping for each request did
+    """
+    found = list(isats(mapping))
+    return {
+        'DE1': any(isat.requires_connected_de1 for isat in found),
+        'Scale': any(isat.requires_connected_scale for isat in found),
+    }
+
+
+def writable_packed_attrs(mapping) -> set:
+    return {
+        isat.target for isat in isats(mapping)
+        if inspect.isclass(isat.target)
+        and issubclass(isat.target, PackedAttr)
+        and isat.target.can_write
+        and not (isat.read_only
+                 or (isat.attr_path is None and isat.setter_path is None))
+    }
+
+
+def test_plans_agree_with_mapping():
+    for (resource, mapping) in MAPPING.items():
+        plan = plan_for(resource)
+        assert plan.requires == mapping_requires(mapping), resource
+        assert plan.writable_packed_attrs \
+               == writable_packed_attrs(mapping), resource
+
+    plan = plan_for(Resource.DE1_CONTROL)
+    assert isinstance(plan.nodes[('espresso',)], Branch)
+    accessor = plan.nodes[('espresso', 'stop_at_time')]
+    assert isinstance(accessor, Accessor)
+    assert accessor.types == (float, type(None), int)
+    assert plan_for(Resource.DE1_PROFILE).is_isat
+
+
+def test_validate():
+    assert validate_patch_return_targets(
+        Resource.DE1_CONTROL, {'steam': {'stop_at_time': 30}}) \
+        == {'DE1': True, 'Scale': False}
+    # int for float
+    assert validate_patch_return_targets(
+        Resource.DE1_CONTROL_ESPRESSO, {'stop_at_time': 30}) \
+        == {'DE1': False, 'Scale': False}
+
+    patch = {'mode': 'ready'}
+    validate_patch_return_targets(Resource.SCALE_CONNECTIVITY, patch)
+    assert patch['mode'] is ConnectivityEnum.READY
+
+    with pytest.raises(DE1APIAttributeError, match='No mapping'):
+        validate_patch_return_targets(Resource.DE1_CONTROL,
+                                      {'steam': {'nonesuch': 1}})
+    with pytest.raises(DE1APIAttributeError, match='Unable to write'):
+        validate_patch_return_targets(Resource.SCALE_ID, {'name': 'x'})
+    with pytest.raises(DE1APITypeError, match='Expected'):
+        validate_patch_return_targets(Resource.DE1_CONTROL_ESPRESSO,
+                                      {'stop_at_time': 'soon'})
+    with pytest.raises(DE1APITypeError, match='Expected a dict'):
+        validate_patch_return_targets(Resource.DE1_CONTROL, {'steam': 1})
+
+
+class FakeScaleProcessor:
+
+    def __init__(self):
+        self.scale_name = 'Scale'
+        self.changed_to = None
+
+    def change_scale_to_id(self, value):
+        self.changed_to = value
+        return 'found'
+
+
+@pytest.fixture
+def targets(monkeypatch):
+    fakes = {
+        TO.FlowSequencer: SimpleNamespace(espresso_control=SimpleNamespace(
+            stop_at_time=1.5, stop_at_weight=None)),
+        TO.ScaleProcessor: FakeScaleProcessor(),
+        TO.Scale: None,
+    }
+    for (to, fake) in fakes.items():
+        monkeypatch.setitem(implementation._TARGET_LOOKUP, to,
+                            lambda fake=fake: fake)
+    return fakes
+
+
+@pytest.mark.asyncio
+async def test_get_prunes_as_mapping(targets, monkeypatch):
+    monkeypatch.setattr(config.http, 'PRUNE_EMPTY_NODES', True)
+    assert await get_resource_to_dict(Resource.SCALE) \
+           == {'id': {'name': 'Scale'}}
+    got = await get_resource_to_dict(Resource.DE1_CONTROL_ESPRESSO)
+    assert got == {'stop_at_time': 1.5, 'stop_at_weight': None}
+
+    monkeypatch.setattr(config.http, 'PRUNE_EMPTY_NODES', False)
+    got = await get_resource_to_dict(Resource.SCALE)
+    assert list(got) == list(MAPPING[Resource.SCALE])
+    assert got['id']['name'] == 'Scale'
+    assert math.isnan(got['tare']['tare'])
+    assert list(got['availability']) == ['mode', 'mqtt']
+
+    version = await get_resource_to_dict(Resource.VERSION)
+    assert version == MAPPING[Resource.VERSION]
+
+
+@pytest.mark.asyncio
+async def test_patch(targets):
+    results = await patch_resource_from_dict(
+        Resource.DE1_CONTROL_ESPRESSO, {'stop_at_time': 30})
+    assert results == []
+    assert targets[TO.FlowSequencer].espresso_control.stop_at_time == 30
+
+    # Returned within the dicts enclosing the setter
+    results = await patch_resource_from_dict(Resource.SCALE,
+                                             {'id': {'id': 'scan'}})
+    assert results == [{'id': 'found'}]
+    assert targets[TO.ScaleProcessor].changed_to == 'scan'
+    results = await patch_resource_from_dict(Resource.SCALE_ID,
+                                             {'id': 'scan'})
+    assert results == ['found']
+
+
+class FakeDE1:
+    """
+    Answers read_mmr() after a round trip, recording the block reads
+    """
+
+    def __init__(self):
+        self.is_ready = True
+        self.auto_off_time = None
+        self.feature_flag = SimpleNamespace(
+            last_mmr0x80=MMR0x80LowAddr.LAST_KNOWN,
+            safe_to_read_mmr_continuous=True)
+        self._mmr_dict = {}
+        self._cuuid_dict = defaultdict(lambda: SimpleNamespace(
+            last_value=SimpleNamespace(StartFillLevel=5)))
+        self.mmr_cache = MMRCache(self)
+        self.block_reads = []
+
+    async def read_mmr(self, length, addr_high, addr_low):
+        self.block_reads.append((addr_low, length + 1))
+        await asyncio.sleep(0.01)
+        for addr in range(addr_low, addr_low + (length + 1) * 4, 4):
+            mmr_data = self._mmr_dict.setdefault(
+                addr, MMR0x80Data(MMR0x80LowAddr(addr)))
+            mmr_data.mark_requested()
+            mmr_data.data_raw = b'\x01\x00\x00\x00'
+            mmr_data.mark_updated(mmr_data.data_raw)
+        return []
+
+
+@pytest.mark.asyncio
+async def test_get_reads_mmrs_together(monkeypatch):
+    monkeypatch.setattr(config.http, 'PRUNE_EMPTY_NODES', True)
+    de1 = FakeDE1()
+    monkeypatch.setitem(implementation._TARGET_LOOKUP, TO.DE1, lambda: de1)
+
+    plan = plan_for(Resource.DE1_SETTING)
+    assert len(plan.mmr_targets) > 2
+    got = await get_resource_to_dict(Resource.DE1_SETTING)
+    assert de1.block_reads == de1.mmr_cache.spans(list(plan.mmr_targets))
+    assert len(de1.block_reads) < len(plan.mmr_targets)
+    assert got['start_fill_level'] == {'start_fill_level': 5}
+    assert got['fan_threshold']['temperature'] is not None
+
+    # Only those that are never fresh are read again
+    de1.block_reads.clear()
+    await get_resource_to_dict(Resource.DE1_SETTING)
+    assert de1.block_reads == de1.mmr_cache.spans(
+        [mmr for mmr in plan.mmr_targets if mmr.read_always])
+
+    # Never fresh, but only read once for the GET
+    de1.block_reads.clear()
+    await get_resource_to_dict(Resource.DE1_PRESENCE)
+    assert de1.block_reads == [(MMR0x80LowAddr.USER_PRESENT, 1)]
@@ -0,0 +1,116 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import sqlite3
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+import pyDE1.database.insert as db_insert
+import pyDE1.database.manage as manage
+from pyDE1.database.write_notifications import (
+    RollingBuffers, dump_rolling_buffers_to_database
+)
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    path = str(tmp_path / 'pyde1.sqlite3')
+    schema_path = Path(manage.__file__).resolve().parent.joinpath(
+        manage.CURRENT_SCHEMA_RELPATH)
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(schema_path):
+            db.execute(sql)
+        db.commit()
+    return path
+
+
+def notification(class_name: str, i: int = 0) -> dict:
+    columns = db_insert.NOTIFICATION_COLUMNS[class_name][1]
+    notification = {column: f"{column}-{i}" for column in columns}
+    notification['class'] = class_name
+    if 'volume_by_frames' in notification:
+        notification['volume_by_frames'] = [1.0, 2.5]
+    return notification
+
+
+def test_snapshot_swaps_and_refill_keeps_last_known():
+    buffers = RollingBuffers({'A': 3, 'B': 2})
+    for i in range(5):
+        buffers.append('A', i)
+    buffers.append('B', 'b')
+    assert not buffers.append('C', 'c')
+
+    snapshot = buffers.snapshot()
+    assert list(snapshot['A']) == [2, 3, 4]
+    assert buffers.entries() == {'A': [], 'B': []}
+    # Arrives while the snapshot is recorded
+    buffers.append('A', 5)
+    buffers.append('A', 6)
+    buffers.refill(snapshot)
+    assert buffers.entries() == {'A': [4, 5, 6], 'B': ['b']}
+    # Not changed by what follows
+    assert list(snapshot['A']) == [2, 3, 4]
+    assert buffers.snapshot() is not snapshot
+
+
+@pytest.mark.asyncio
+async def test_rows_match_dict_inserts(db_path):
+    # Each table, from the row with executemany() and from the dict
+    async with aiosqlite.connect(db_path) as db:
+        async with db.cursor() as cur:
+            for class_name in db_insert.NOTIFICATION_COLUMNS:
+                await db_insert.dict_notification_cursor_only(
+                    notification=notification(class_name),
+                    sequence_id='by_dict', cur=cur)
+                await db_insert.notification_rows(
+                    class_name=class_name,
+                    rows=[db_insert.notification_row(
+                        notification(class_name))],
+                    sequence_id='by_row', cur=cur)
+        await db.commit()
+
+    with sqlite3.connect(db_path) as db:
+        for (table, columns) in db_insert.NOTIFICATION_COLUMNS.values():
+            (by_dict, by_row) = [
+                db.execute(f"SELECT * FROM {table} "
+                           "WHERE sequence_id = ?", (sequence_id,)
+                           ).fetchall()
+                for sequence_id in ('by_dict', 'by_row')]
+            assert len(by_dict) == 1
+            assert by_dict[0][1:] == by_row[0][1:], table
+
+
+@pytest.mark.asyncio
+async def test_dump_one_sequence_of_gates(db_path):
+    buffers = RollingBuffers({'WeightAndFlowUpdate': 10,
+                              'SequencerGateNotification': 4})
+    for i in range(12):
+        buffers.append('WeightAndFlowUpdate', db_insert.notification_row(
+            notification('WeightAndFlowUpdate', i)))
+    for sequence_id in ('old', 'seq'):
+        buffers.append('SequencerGateNotification', (
+            sequence_id, db_insert.notification_row(
+                notification('SequencerGateNotification'))))
+
+    async with aiosqlite.connect(db_path) as db:
+        await dump_rolling_buffers_to_database(
+            rolling_buffers=buffers, snapshot=buffers.snapshot(),
+            sequence_id='seq', db=db)
+
+    with sqlite3.connect(db_path) as db:
+        weights = [row[0] for row in db.execute(
+            'SELECT current_weight FROM weight_and_flow_update '
+            "WHERE sequence_id = 'seq' ORDER BY rowid")]
+        (gates,) = db.execute(
+            'SELECT COUNT(*) FROM sequencer_gate_notification').fetchone()
+    assert weights == [f"current_weight-{i}" for i in range(2, 12)]
+    assert gates == 1
+    # Kept for the next sequence
+    assert len(buffers.entries()['WeightAndFlowUpdate']) == 10
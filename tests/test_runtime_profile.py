@@ -0,0 +1,71 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+
+import pyDE1.runtime_profile as runtime_profile
+from pyDE1.config import config
+from pyDE1.runtime_profile import LoopMonitor, profile_for
+
+
+def test_profile_by_process(monkeypatch):
+    monkeypatch.setattr(config.runtime, 'PROFILE', 'production')
+    monkeypatch.setattr(config.runtime, 'PROCESS_PROFILE',
+                        {'Controller': 'debug', 'InboundAPI': 'fast'})
+    assert profile_for('Controller') == 'debug'
+    assert profile_for('DatabaseLogger') == 'production'
+    # Unrecognized is taken as the safer of the two
+    assert profile_for('InboundAPI') == 'debug'
+
+
+@pytest.mark.asyncio
+async def test_monitor_reports_blocking_callback():
+    reports = []
+    loop = asyncio.get_running_loop()
+    monitor = LoopMonitor(loop, reports.append, interval=0.005,
+                          report_interval=0.2, slow=0.03)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    # Blocks the loop, as a slow callback would
+    time.sleep(0.06)
+    await asyncio.sleep(0.2)
+    monitor.stop()
+
+    assert len(reports) >= 1
+    stats = reports[0]
+    assert stats['samples'] > 10
+    assert stats['slow'] >= 1
+    assert stats['max'] >= 0.05
+    assert stats['p50'] < stats['max']
+
+
+def test_startup_report(monkeypatch):
+    monkeypatch.setattr(runtime_profile, 'run_started', None)
+    monkeypatch.setattr(runtime_profile, 'process_started', None)
+    runtime_profile.mark_started(run=time.time() - 2)
+    report = runtime_profile.startup_report('imported', 'Controller')
+    assert report['since_run'] == pytest.approx(2, abs=0.1)
+    assert report['since_process'] < 0.1
+    assert report['modules'] == len(sys.modules)
+
+
+@pytest.mark.parametrize('module', [
+    'pyDE1.dispatcher.mapping',
+    'pyDE1.database.write_notifications',
+])
+def test_api_and_database_do_not_import_bleak(module):
+    out = subprocess.run(
+        [sys.executable, '-c',
+         f"import sys, {module}; print('bleak' in sys.modules)"],
+        capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == 'False'
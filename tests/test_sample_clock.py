@@ -0,0 +1,107 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import random
+from statistics import median
+
+import pytest
+
+from pyDE1.de1.sample_clock import SampleClock
+
+
+def de1_trace(n=3000, line_frequency=60, drift=100e-6, start_count=60000,
+              seed=1):
+    """
+    (host time of the sample, sample_time, arrival) for a ShotSample
+    every 25 half-cycles, with the DE1's second that much longer,
+    and a BLE delay with exponential jitter
+    """
+    rng = random.Random(seed)
+    start = 1_700_000_000.0
+    trace = []
+    for i in range(n):
+        count = start_count + 25 * i
+        sampled = start + (25 * i) / (2 * line_frequency) * (1 + drift)
+        arrival = sampled + 0.03 + rng.expovariate(1 / 0.015)
+        if trace:
+            arrival = max(arrival, trace[-1][2])
+        trace.append((sampled, count % 65536, arrival))
+    return trace
+
+
+def spread(errors):
+    """
+    Largest error about the median, as the BLE delay takes up the rest
+    """
+    m = median(errors)
+    return max(abs(e - m) for e in errors)
+
+
+def test_unwrap_and_drift():
+    # Ten minutes, so the counter wraps
+    trace = de1_trace()
+    clock = SampleClock(60)
+    de1_times = [clock.de1_time(sample_time, arrival)
+                 for (_, sample_time, arrival) in trace]
+    assert clock.count == 25 * (len(trace) - 1)
+    assert clock.restarts == 0
+    assert all(b >= a for (a, b) in zip(de1_times, de1_times[1:]))
+
+    raw = spread([a - s for (s, _, a) in trace[100:]])
+    fitted = spread([t - s for ((s, _, _), t)
+                     in zip(trace[100:], de1_times[100:])])
+    assert raw > 0.05
+    assert fitted < raw / 5
+
+    stats = clock.stats()
+    assert stats['samples'] == 1200
+    assert stats['drift_ppm'] == pytest.approx(100, abs=50)
+    assert 0.005 < stats['latency'] < 0.05
+    assert stats['jitter'] == pytest.approx(0.015, abs=0.005)
+
+
+def test_lost_samples():
+    trace = de1_trace(n=200)
+    del trace[100:110]
+    clock = SampleClock(60)
+    for (_, sample_time, arrival) in trace:
+        clock.de1_time(sample_time, arrival)
+    assert clock.count == 25 * 199
+    assert clock.restarts == 0
+
+
+def test_restarts():
+    trace = de1_trace(n=100)
+    clock = SampleClock(60)
+    assert clock.stats() is None
+    for (_, sample_time, arrival) in trace:
+        last = clock.de1_time(sample_time, arrival)
+
+    # The DE1 restarted, its counter with it
+    assert clock.de1_time(7, trace[-1][2] + 10) == trace[-1][2] + 10
+    assert clock.restarts == 1
+    assert clock.count == 0
+
+    # Arrived before the last, so it starts over,
+    # but not earlier than it has already reported
+    restarted = clock.de1_time(7 + 25, trace[-1][2] + 7)
+    assert clock.restarts == 2
+    assert restarted == trace[-1][2] + 10
+    assert clock.de1_time(7 + 50, trace[-1][2] + 7.25) \
+           == trace[-1][2] + 10
+    assert clock.restarts == 2
+
+    # Too long to know how many times it wrapped
+    clock.de1_time(32, trace[-1][2] + 400)
+    assert clock.restarts == 3
+
+    # Back to nominal
+    clock.line_frequency = 50
+    assert clock.stats() is None
+    assert clock.period == pytest.approx(1 / 100)
+    assert last > trace[-1][0]
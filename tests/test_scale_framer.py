@@ -0,0 +1,134 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import logging
+import random
+
+import pytest
+
+from pyDE1.scale.acaia import (
+    AcaiaAcaia, EventType, HEADER, MessageType, NONSTANDARD_MESSAGES,
+    frame_length, pack_message,
+)
+from pyDE1.scale.events import ScaleWeightUpdate
+from pyDE1.scale.framer import Framer
+
+
+def weight_message(grams: float, length_byte=0x08) -> bytes:
+    mantissa = round(abs(grams) * 10)
+    payload = bytes((EventType.WEIGHT,
+                     mantissa & 0xff, (mantissa >> 8) & 0xff, mantissa >> 16,
+                     0, 1, 0x02 if grams < 0 else 0x00))
+    payload += bytes(length_byte - 1 - len(payload))
+    return bytes(pack_message(MessageType.EVENT, payload))
+
+
+def random_message(rng: random.Random) -> bytes:
+    choice = rng.random()
+    if choice < 0.7:
+        return weight_message(rng.uniform(-10, 2000),
+                              rng.choice((0x08, 0x0a, 0x0c, 0x0e)))
+    if choice < 0.8:
+        return rng.choice(NONSTANDARD_MESSAGES)
+    # A HEADER within a message is not the start of another
+    payload = HEADER + rng.randbytes(rng.randrange(0, 20))
+    return bytes(pack_message(
+        rng.choice((MessageType.STATUS, MessageType.INFO, MessageType.TIMER)),
+        payload))
+
+
+def split(rng: random.Random, stream: bytes, max_packet=20):
+    packets = []
+    while stream:
+        n = rng.randrange(1, max_packet + 1)
+        packets.append(stream[:n])
+        stream = stream[n:]
+    return packets
+
+
+def run_framer(framer: Framer, packets) -> list:
+    frames = []
+    for packet in packets:
+        # A view is only valid until the next packet
+        frames.extend(bytes(frame) for frame in framer.frames(packet))
+    return frames
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_fuzz_random_splits(seed):
+    rng = random.Random(seed)
+    messages = [random_message(rng) for _ in range(500)]
+    # Small enough to need compaction
+    framer = Framer(HEADER, frame_length, capacity=64)
+    frames = run_framer(framer, split(rng, b''.join(messages)))
+    assert frames == messages
+    assert len(framer) == 0
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_fuzz_with_garbage(seed, caplog):
+    rng = random.Random(seed)
+    messages = []
+    stream = bytearray()
+    for _ in range(200):
+        if rng.random() < 0.2:
+            # No HEADER[0], so the garbage can't start a message
+            stream.extend(rng.choice(range(0, 0xef))
+                          for _ in range(rng.randrange(1, 10)))
+        message = random_message(rng)
+        messages.append(message)
+        stream.extend(message)
+    framer = Framer(HEADER, frame_length, capacity=64)
+    with caplog.at_level(logging.WARNING):
+        frames = run_framer(framer, split(rng, bytes(stream)))
+    assert frames == messages
+
+
+def test_partial_header_kept():
+    framer = Framer(HEADER, frame_length)
+    message = weight_message(12.3)
+    assert run_framer(framer, [b'\x01\x02' + message[:1]]) == []
+    assert len(framer) == 1
+    assert run_framer(framer, [message[1:]]) == [message]
+
+
+def test_packet_larger_than_buffer():
+    messages = [weight_message(w / 10) for w in range(100)]
+    framer = Framer(HEADER, frame_length, capacity=32)
+    assert run_framer(framer, [b''.join(messages)]) == messages
+
+
+def test_impossible_length_skipped():
+    framer = Framer(HEADER, frame_length, capacity=32)
+    message = weight_message(1.0)
+    # Length byte of 0xff won't fit
+    frames = run_framer(framer, [b'\xef\xdd\x0c\xff' + message])
+    assert frames == [message]
+
+
+@pytest.mark.asyncio
+async def test_acaia_dispatch():
+    scale = AcaiaAcaia()
+    weights = []
+
+    async def collect(swu: ScaleWeightUpdate):
+        weights.append(swu.weight)
+
+    await scale.event_weight_update.subscribe(collect)
+    stream = b''.join((
+        weight_message(12.3),
+        NONSTANDARD_MESSAGES[0],
+        weight_message(-0.4, 0x0c),
+        bytes(pack_message(MessageType.TIMER, b'\x00\x00')),
+        weight_message(1999.9, 0x0e),
+    ))
+    for packet in split(random.Random(1), stream, max_packet=7):
+        await scale._notification_handler(0, bytearray(packet))
+    await asyncio.sleep(0.1)
+    assert weights == [12.3, -0.4, 1999.9]
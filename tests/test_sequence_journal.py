@@ -0,0 +1,217 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import json
+import multiprocessing
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+import pyDE1.database.manage as manage
+import pyDE1.database.write_notifications as write_notifications
+from pyDE1.config import config
+from pyDE1.database.recorder_control import RecorderControl
+from pyDE1.database.sequence_journal import JournalFull, SequenceJournal
+from pyDE1.database.write_notifications import record_data
+from pyDE1.event_manager.payloads import (
+    EventNotificationAction, SequencerGateName
+)
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    path = str(tmp_path / 'pyde1.sqlite3')
+    schema_path = Path(manage.__file__).resolve().parent.joinpath(
+        manage.CURRENT_SCHEMA_RELPATH)
+    with sqlite3.connect(path) as db:
+        for sql in manage.sql_commands_from_file(schema_path):
+            db.execute(sql)
+        db.commit()
+    return path
+
+
+def weight_and_flow(i: int) -> str:
+    t = 1000 + i * 0.1
+    return json.dumps({
+        'class': 'WeightAndFlowUpdate', 'version': '1.1.0', 'sender': 'Test',
+        'arrival_time': t, 'create_time': t, 'event_time': t,
+        'scale_time': t,
+        'current_weight': i, 'current_weight_time': t,
+        'average_flow': 1.0, 'average_flow_time': t,
+        'median_weight': i, 'median_weight_time': t,
+        'median_flow': 1.0, 'median_flow_time': t,
+    })
+
+
+def test_append_read_discard(tmp_path):
+    journal = SequenceJournal(str(tmp_path / 'j'), slot_bytes=64, slots=32)
+    journal.append('seq', 'short')
+    long = 'x' * 150
+    journal.append('seq', long)
+    assert journal.records == 2
+    # 4 slots for 150 bytes and the header of the record
+    assert journal.used_slots == 1 + 3
+    (slots, records) = journal.read()
+    assert records == [('seq', 'short'), ('seq', long)]
+
+    # Appended while loading
+    journal.append('next', 'later')
+    journal.discard(slots, len(records))
+    assert journal.read() == (1, [('next', 'later')])
+
+    with pytest.raises(JournalFull):
+        journal.append('seq', 'y' * 64 * 32)
+    journal.close()
+
+
+def test_records_kept_across_reopen(tmp_path):
+    filename = str(tmp_path / 'j')
+    journal = SequenceJournal(filename, slot_bytes=64, slots=32)
+    journal.append('seq', 'one')
+    journal.append('seq', 'two')
+    # Without close(), as if the process had exited
+    del journal
+
+    journal = SequenceJournal(filename, slot_bytes=128, slots=8)
+    assert journal.records == 2
+    # The size is kept while there are records
+    assert (journal.slot_bytes, journal.slots) == (64, 32)
+    assert journal.read()[1] == [('seq', 'one'), ('seq', 'two')]
+    journal.close()
+
+
+def sequence_complete(sequence_id: str) -> str:
+    t = time.time()
+    return json.dumps({
+        'class': 'SequencerGateNotification', 'version': '1.1.0',
+        'sender': 'Test', 'arrival_time': t, 'create_time': t,
+        'event_time': t,
+        'name': SequencerGateName.GATE_SEQUENCE_COMPLETE.value,
+        'action': EventNotificationAction.SET.value,
+        'sequence_id': sequence_id,
+        'active_state': 'Espresso',
+    })
+
+
+def weights(db_path: str) -> list:
+    with sqlite3.connect(db_path) as db:
+        return [row[0] for row in db.execute(
+            'SELECT current_weight FROM weight_and_flow_update '
+            "WHERE sequence_id = 'seq' ORDER BY rowid")]
+
+
+@pytest.mark.asyncio
+async def test_deferred_until_complete(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(config.database, 'FILENAME', db_path)
+    monkeypatch.setattr(config.database, 'DEFER_WRITES', True)
+    journal_filename = str(tmp_path / 'sequence.journal')
+    monkeypatch.setattr(config.database, 'JOURNAL_FILENAME',
+                        journal_filename)
+    mp_queue = multiprocessing.Queue()
+
+    async def wait_for(condition, timeout=10):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        return condition()
+
+    recorder = asyncio.create_task(record_data(mp_queue))
+    try:
+        mp_queue.put(RecorderControl(recording=True, sequence_id='seq'))
+        for i in range(50):
+            mp_queue.put(weight_and_flow(i))
+        assert await wait_for(lambda: mp_queue.empty())
+        await asyncio.sleep(0.1)
+        assert weights(db_path) == []
+
+        mp_queue.put(RecorderControl(recording=False, sequence_id='seq'))
+        mp_queue.put(sequence_complete('seq'))
+        assert await wait_for(lambda: len(weights(db_path)) == 50)
+    finally:
+        recorder.cancel()
+        try:
+            await recorder
+        except asyncio.CancelledError:
+            pass
+
+    assert weights(db_path) == list(range(50))
+    journal = SequenceJournal(journal_filename)
+    assert journal.records == 0
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_left_in_journal_loaded_on_start(db_path, tmp_path,
+                                               monkeypatch):
+    monkeypatch.setattr(config.database, 'FILENAME', db_path)
+    monkeypatch.setattr(config.database, 'DEFER_WRITES', True)
+    journal_filename = str(tmp_path / 'sequence.journal')
+    monkeypatch.setattr(config.database, 'JOURNAL_FILENAME',
+                        journal_filename)
+
+    journal = SequenceJournal(journal_filename)
+    for i in range(10):
+        journal.append('seq', weight_and_flow(i))
+    journal.close()
+
+    recorder = asyncio.create_task(record_data(multiprocessing.Queue()))
+    try:
+        deadline = time.time() + 10
+        while not weights(db_path) and time.time() < deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        recorder.cancel()
+        try:
+            await recorder
+        except asyncio.CancelledError:
+            pass
+    assert weights(db_path) == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_full_and_not_loaded(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(config.database, 'FILENAME', db_path)
+    monkeypatch.setattr(config.database, 'DEFER_WRITES', True)
+    monkeypatch.setattr(config.database, 'JOURNAL_FILENAME',
+                        str(tmp_path / 'sequence.journal'))
+    monkeypatch.setattr(config.database, 'JOURNAL_SLOTS', 16)
+
+    async def not_loaded(journal, db):
+        # As when the database can't take them, the journal is kept
+        return 0
+
+    monkeypatch.setattr(write_notifications, 'load_sequence_journal',
+                        not_loaded)
+    mp_queue = multiprocessing.Queue()
+
+    async def wait_for(condition, timeout=10):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        return condition()
+
+    recorder = asyncio.create_task(record_data(mp_queue))
+    try:
+        mp_queue.put(RecorderControl(recording=True, sequence_id='seq'))
+        for i in range(20):
+            mp_queue.put(weight_and_flow(i))
+        assert await wait_for(lambda: mp_queue.empty())
+        # Those that didn't fit are written directly
+        assert await wait_for(lambda: weights(db_path))
+        assert not recorder.done()
+        written = weights(db_path)
+        assert written == list(range(20 - len(written), 20))
+    finally:
+        recorder.cancel()
+        try:
+            await recorder
+        except asyncio.CancelledError:
+            pass
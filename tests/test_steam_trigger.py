@@ -0,0 +1,184 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import asyncio
+import time
+from types import MethodType, SimpleNamespace
+
+import pytest
+
+import pyDE1
+from pyDE1.config import config
+from pyDE1.de1.c_api import API_MachineStates, API_Substates
+from pyDE1.thermometer.time_at_target import TimeAtTargetEstimator
+
+
+class FakeDE1:
+
+    def __init__(self, state=API_MachineStates.Steam):
+        self.current_state = state
+        self.current_substate = API_Substates.Steaming
+        self.end_steam_calls = 0
+
+    async def end_steam(self):
+        self.end_steam_calls += 1
+
+
+class FakeThermometer:
+
+    def __init__(self):
+        self.address = '00:11:22:33:44:55'
+        self.units = SimpleNamespace(name='C', freezing=0)
+        self.is_ready = True
+        self.is_released = False
+        self.rates = []
+
+    async def sample_normal(self):
+        self.rates.append('normal')
+
+    async def request_capture(self):
+        pass
+
+
+class FakeController:
+    """
+    The trigger of SteamTempController, without creating a DE1
+    or subscribing to it, which the methods are taken from
+    """
+
+    def __init__(self, de1: FakeDE1):
+        # Importing it creates a DE1, which needs a running loop
+        from pyDE1.thermometer.steam_to_temperature import \
+            SteamTempController
+
+        self.logger = pyDE1.getLogger('SteamTemp')
+        self._de1 = de1
+        self._thermometer = FakeThermometer()
+        self._tat_estimator = TimeAtTargetEstimator()
+        self._tat_estimator.target = 65
+        self._on_trigger_event = asyncio.Event()
+        self._active = True
+        self._trigger_time = None
+        self._earliest_trigger = 0.0
+        self._trigger_handle = None
+        self.deactivated = 0
+
+        for name in ('_arm_trigger', '_on_trigger', '_end_steam',
+                     '_de1_state_subscriber'):
+            setattr(self, name,
+                    MethodType(getattr(SteamTempController, name), self))
+        self._control_deactivate = MethodType(
+            SteamTempController.control_deactivate, self)
+
+    @property
+    def target(self):
+        return self._tat_estimator.target
+
+    @property
+    def has_triggered(self):
+        return self._on_trigger_event.is_set()
+
+    async def control_deactivate(self):
+        self.deactivated += 1
+        await self._control_deactivate()
+
+    def due_in(self) -> float:
+        loop = asyncio.get_running_loop()
+        return self._trigger_handle.when() - loop.time()
+
+
+@pytest.mark.asyncio
+async def test_rearmed_with_each_estimate():
+    de1 = FakeDE1()
+    controller = FakeController(de1)
+    controller._trigger_time = time.time() + 10
+    controller._arm_trigger()
+    first = controller._trigger_handle
+    assert controller.due_in() == pytest.approx(
+        10 - config.steam.STOP_LAG, abs=0.1)
+
+    controller._trigger_time = time.time() + 0.2 + config.steam.STOP_LAG
+    controller._arm_trigger()
+    assert first.cancelled()
+    assert controller.due_in() == pytest.approx(0.2, abs=0.1)
+
+    await asyncio.sleep(0.4)
+    # Then cleared, as it is no longer being controlled
+    assert not controller.has_triggered
+    assert de1.end_steam_calls == 1
+    assert controller.deactivated == 1
+    assert controller._trigger_handle is None
+
+
+@pytest.mark.asyncio
+async def test_not_before_skip_initial_seconds():
+    de1 = FakeDE1()
+    controller = FakeController(de1)
+    controller._earliest_trigger = time.time() + 0.3
+    # Already past due, as an estimate from the first samples can be
+    controller._trigger_time = time.time() - 5
+    controller._arm_trigger()
+
+    await asyncio.sleep(0.1)
+    assert de1.end_steam_calls == 0
+    assert controller._active
+    await asyncio.sleep(0.4)
+    assert de1.end_steam_calls == 1
+    assert not controller._active
+
+
+@pytest.mark.asyncio
+async def test_cancelled_on_deactivate():
+    de1 = FakeDE1()
+    controller = FakeController(de1)
+    controller._trigger_time = time.time() + 0.2
+    controller._arm_trigger()
+    handle = controller._trigger_handle
+
+    await controller.control_deactivate()
+    assert handle.cancelled()
+    assert controller._trigger_handle is None
+    assert not controller._active
+    assert controller._thermometer.rates == ['normal']
+
+    # Not armed again while inactive
+    controller._trigger_time = time.time() + 0.2
+    controller._arm_trigger()
+    assert controller._trigger_handle is None
+    await asyncio.sleep(0.4)
+    assert de1.end_steam_calls == 0
+
+
+@pytest.mark.asyncio
+async def test_deactivated_on_leaving_steam():
+    de1 = FakeDE1()
+    controller = FakeController(de1)
+    controller._trigger_time = time.time() + 5
+    controller._arm_trigger()
+    handle = controller._trigger_handle
+
+    await controller._de1_state_subscriber(SimpleNamespace(
+        state=API_MachineStates.Steam, substate=API_Substates.Steaming))
+    assert controller.deactivated == 0
+    assert controller._active
+
+    await controller._de1_state_subscriber(SimpleNamespace(
+        state=API_MachineStates.Idle, substate=API_Substates.NoState))
+    assert controller.deactivated == 1
+    assert not controller._active
+    assert handle.cancelled()
+
+    # Left Steam before the timer noticed
+    controller._active = True
+    de1.current_state = API_MachineStates.Idle
+    controller._trigger_time = time.time()
+    controller._arm_trigger()
+    await asyncio.sleep(0.1)
+    assert not controller.has_triggered
+    assert de1.end_steam_calls == 0
+    assert controller.deactivated == 2
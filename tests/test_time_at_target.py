@@ -0,0 +1,101 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import random
+
+import pytest
+
+from pyDE1.config import config
+from pyDE1.thermometer.time_at_target import TimeAtTargetEstimator
+
+
+def least_squares(times, temperatures, target):
+    """
+    As the estimator was, summing over the history for each sample
+    """
+    ns = len(times)
+    t0 = times[-1]
+    t_norm = [t - t0 for t in times]
+    s_x = sum(t_norm)
+    s_y = sum(temperatures)
+    s_xx = sum([x * x for x in t_norm])
+    s_xy = sum(x * y for (x, y) in zip(t_norm, temperatures))
+    mhat = (ns * s_xy - (s_x * s_y)) / (ns * s_xx - (s_x * s_x))
+    bhat = (s_y / ns) - mhat * (s_x / ns)
+    return t0 + (target - bhat) / mhat, mhat, bhat
+
+
+@pytest.mark.asyncio
+async def test_matches_full_sums(monkeypatch):
+    monkeypatch.setattr(config.steam, 'CURVATURE', False)
+    rng = random.Random(1)
+    tat = TimeAtTargetEstimator()
+    tat.target = 65
+    n = config.steam.MAX_SAMPLES_FOR_ESTIMATE
+    start = 1_700_000_000.0
+    times = []
+    temperatures = []
+    assert await tat.new_sample(start, 20) is None
+    times.append(start)
+    temperatures.append(20)
+    # Enough to rebase several times
+    for i in range(1, 60):
+        t = start + i + rng.uniform(-0.05, 0.05)
+        y = 20 + 1.2 * i + rng.uniform(-0.3, 0.3)
+        times.append(t)
+        temperatures.append(y)
+        expected = least_squares(times[-n:], temperatures[-n:], tat.target)
+        t_target = await tat.new_sample(t, y)
+        assert t_target == pytest.approx(expected[0], abs=1e-6)
+        assert tat.rate_of_rise == pytest.approx(expected[1])
+        assert tat.current_est == pytest.approx(expected[2])
+    assert await tat.estimate_time_at_target() == t_target
+
+
+@pytest.mark.asyncio
+async def test_curvature(monkeypatch):
+    monkeypatch.setattr(config.steam, 'CURVATURE', True)
+    tat = TimeAtTargetEstimator()
+    tat.target = 60
+
+    def temperature(x):
+        return 20 + 4 * x - 0.05 * x * x
+
+    start = 1_700_000_000.0
+    for i in range(12):
+        t_target = await tat.new_sample(start + i, temperature(i))
+    # 20 + 4x - 0.05x² = 60
+    assert t_target == pytest.approx(start + 40 - (1600 - 800) ** 0.5)
+    assert tat.rate_of_rise == pytest.approx(4 - 0.1 * 11)
+    assert tat.current_est == pytest.approx(temperature(11))
+
+    # Doesn't reach it, from the slope
+    tat.target = 120
+    assert await tat.estimate_time_at_target() \
+           == pytest.approx(start + 11 + (120 - temperature(11)) / 2.9)
+
+
+@pytest.mark.asyncio
+async def test_gap_and_reset(monkeypatch):
+    monkeypatch.setattr(config.steam, 'CURVATURE', False)
+    tat = TimeAtTargetEstimator()
+    tat.target = 65
+    start = 1_700_000_000.0
+    for i in range(5):
+        await tat.new_sample(start + i, 20 + i)
+    # Starts over, so one sample isn't enough
+    assert await tat.new_sample(start + 10, 40) is None
+    assert await tat.new_sample(start + 11, 42) \
+           == pytest.approx(start + 11 + 23 / 2)
+
+    monkeypatch.setattr(config.steam, 'MAX_SAMPLES_FOR_ESTIMATE', 3)
+    await tat.reset()
+    assert tat.rate_of_rise is None
+    for i in range(6):
+        await tat.new_sample(start + 20 + i, 20 + i * i)
+    assert tat.rate_of_rise == pytest.approx(8)
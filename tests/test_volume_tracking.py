@@ -0,0 +1,97 @@
+"""
+Copyright © 2023 Jeff Kletsky. All Rights Reserved.
+
+License for this software, part of the pyDE1 package, is granted under
+GNU General Public License v3.0 only
+SPDX-License-Identifier: GPL-3.0-only
+"""
+
+import json
+import logging
+from array import array
+from types import SimpleNamespace
+
+import pytest
+
+import pyDE1.database.insert as db_insert
+from pyDE1.de1.c_api import API_MachineStates, MAX_FRAMES
+from pyDE1.de1.de1 import DE1
+from pyDE1.de1.events import ShotSampleUpdate
+from pyDE1.de1.sample_clock import SampleClock
+
+
+def fake_de1(published: list):
+
+    async def publish(sswvu):
+        published.append(sswvu)
+
+    de1 = SimpleNamespace(
+        logger=logging.getLogger('test'),
+        line_frequency=60,
+        current_state=API_MachineStates.Espresso,
+        _event_shot_sample_with_volumes_update=SimpleNamespace(
+            publish=publish),
+        _sample_clock=SampleClock(60),
+        _ssus_start_up=True,
+        _ssus_last_sample_time=0,
+        _tracking_volume_dispensed=False,
+        _number_of_preinfuse_frames=1,
+    )
+    # As DE1._singleton_init() leaves them
+    de1._volume_dispensed_by_frame = array('d', [0.0]) * MAX_FRAMES
+    de1._volume_last_frame = None
+    de1._volume_was_tracking = False
+    DE1._reset_volume_dispensed(de1)
+    return de1
+
+
+def shot_sample(sample_time: int, frame: int, flow=2.4) -> ShotSampleUpdate:
+    return ShotSampleUpdate(
+        arrival_time=sample_time / 120, sample_time=sample_time % 65536,
+        group_pressure=9.0, group_flow=flow, mix_temp=92.0, head_temp=91.0,
+        set_mix_temp=92.0, set_head_temp=92.0, set_group_pressure=9.0,
+        set_group_flow=0.0, frame_number=frame, steam_temp=150)
+
+
+@pytest.mark.asyncio
+async def test_only_changed_frame_until_transition():
+    published = []
+    de1 = fake_de1(published)
+    frames = [0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2]
+
+    await DE1._shot_sample_update_subscriber(de1, shot_sample(0, 0))
+    de1._tracking_volume_dispensed = True
+    for (i, frame) in enumerate(frames, start=1):
+        await DE1._shot_sample_update_subscriber(
+            de1, shot_sample(i * 25, frame))
+    de1._tracking_volume_dispensed = False
+    for i in range(len(frames) + 1, len(frames) + 3):
+        await DE1._shot_sample_update_subscriber(de1, shot_sample(i * 25, 2))
+
+    # 2.4 ml/s for 25 half-cycles at 60 Hz
+    v_inc = 2.4 * 25 / 120
+    assert [u.volume_frame for u in published] \
+           == [None] + frames + [None, None]
+    assert published[3].volume_frame_value == pytest.approx(3 * v_inc)
+    materialized = [i for (i, u) in enumerate(published)
+                    if u.volume_by_frames is not None]
+    # Frame transitions, then when tracking stopped
+    assert materialized == [1, 5, 8, 13]
+    last = published[13].volume_by_frames
+    assert len(last) == MAX_FRAMES
+    assert last[:3] == pytest.approx([4 * v_inc, 3 * v_inc, 5 * v_inc])
+    assert sum(last) == pytest.approx(published[-1].volume_total)
+    assert published[-1].volume_pour == pytest.approx(5 * v_inc)
+    assert de1._volume_dispensed_by_frame.tolist() == last
+
+    # Not shared with the next sequence
+    DE1._reset_volume_dispensed(de1)
+    assert last[0] == pytest.approx(4 * v_inc)
+    assert sum(de1._volume_dispensed_by_frame) == 0
+
+    # Recorded as NULL unless materialized
+    rows = [db_insert.notification_row(json.loads(u.as_json()))
+            for u in published[:3]]
+    assert rows[0][-1] is None
+    assert rows[1][-1] == str(published[1].volume_by_frames)
+    assert rows[2][-1] is None